@@ -11,50 +11,195 @@ from pathlib import Path
 current_dir = Path(__file__).parent.absolute()
 sys.path.insert(0, str(current_dir))
 
-from flask import Flask, request, jsonify, send_from_directory, send_file
+from flask import Blueprint, Flask, Response, request, jsonify, send_from_directory, send_file, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
-from compliance_engine import ComplianceEngine, Transaction, CustomerType
+import metrics
+import profiler
+import serialization
+from compliance_engine import ComplianceEngine, EngineStats, Transaction, CustomerType
 from config import Config
-from database import AssessmentDB
-from rules_manager import RulesManager
+from storage import AssessmentStore, create_store
+from export import STREAM_FORMATS, iter_csv, iter_ndjson
+from rules_manager import RulesManager, validate_rules
+from response_cache import ResponseCache, content_etag
+from mock_bundle import MockDocumentsBundle
+from tenants import TenantRulesets
 import base64
-import json
 import io
-import zipfile
-import tempfile
-from pathlib import Path
-from PIL import Image
-try:
-    from pdf2image import convert_from_bytes
-    PDF_SUPPORT = True
-except ImportError:
-    PDF_SUPPORT = False
+import atexit
+import hmac
+import threading
+from datetime import datetime
+from importlib.util import find_spec
 
-app = Flask(__name__, static_folder='static', static_url_path='/static')
-CORS(app)
+# pdf2image is imported by the first PDF upload (see prepare_document)
+PDF_SUPPORT = find_spec("pdf2image") is not None
 
-# Initialize database
-db = AssessmentDB()
 
-# Initialize rules manager
-rules_manager = RulesManager()
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    jsonify() and request.get_json() through the serialization module
 
-# Initialize OpenAI client if API key is available
-openai_client = None
-if Config.is_openai_enabled():
-    try:
-        from openai import OpenAI
-        openai_client = OpenAI(api_key=Config.OPENAI_API_KEY)
-        print("✓ OpenAI integration enabled")
-    except Exception as e:
-        print(f"⚠ OpenAI initialization failed: {e}")
-        print("  Continuing with rule-based assessment only")
-else:
-    print("⚠ OPENAI_API_KEY not set - using rule-based assessment only")
-    print("  To enable AI-enhanced analysis, add OPENAI_API_KEY to .env file")
+    Pretty-printed output (debug mode) and calls with explicit json
+    arguments still go through Flask's default provider.
+    """
+
+    def dumps(self, obj, **kwargs) -> str:
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return serialization.dumps(obj, sort_keys=self.sort_keys)
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return serialization.loads(s)
+
+    def response(self, *args, **kwargs) -> Response:
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        body = serialization.dumpb(obj, sort_keys=self.sort_keys) + b"\n"
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+# Routes of the API and the web page; create_app() registers them
+api = Blueprint("api", __name__)
+
+# Services shared by the routes, created by init_services() on first use
+db: AssessmentStore
+rules_manager: RulesManager
+tenants: TenantRulesets
+response_cache: ResponseCache
+mock_bundle: MockDocumentsBundle
+# openai.OpenAI client, or None without OPENAI_API_KEY
+openai_client: object
+engine: ComplianceEngine
+SERVICES = ("db", "rules_manager", "tenants", "response_cache", "mock_bundle", "openai_client", "engine")
+_services_lock = threading.Lock()
+_services_ready = False
+
+
+def init_services():
+    """
+    Create the storage, rules, caches, OpenAI client and compliance engine
+
+    Runs once per process; later calls return immediately. Nothing here
+    runs at import, so importing this module stays cheap.
+    """
+    global db, rules_manager, tenants, response_cache, mock_bundle, openai_client, engine, _services_ready
+    with _services_lock:
+        if _services_ready:
+            return
+
+        # Initialize assessment storage (STORAGE_BACKEND: sqlite or memory)
+        db = create_store()
+        # Commit any queued assessments before the process exits
+        atexit.register(db.close)
+
+        # Initialize rules manager; edits to rules_config.json are picked up by polling
+        rules_manager = RulesManager(cache_size=Config.RULES_CACHE_SIZE, data_dir=Config.RULES_DATA_DIR)
+        rules_manager.start_watching(Config.RULES_WATCH_INTERVAL_S)
+        tenants = TenantRulesets(
+            rules_manager,
+            Config.TENANT_RULES_DIR,
+            cache_size=Config.TENANT_CACHE_SIZE,
+            api_keys_file=Config.TENANT_API_KEYS_FILE
+        )
+
+        # Serialized JSON of hot assessments and rulesets, with their ETags
+        response_cache = ResponseCache(Config.RESPONSE_CACHE_SIZE, Config.RESPONSE_CACHE_TTL_S)
+
+        # Mock documents ZIP, built on first download and when mock_users changes
+        mock_bundle = MockDocumentsBundle(current_dir / "mock_users", Config.MOCK_BUNDLE_PATH)
 
-# Initialize compliance engine with rules manager
-engine = ComplianceEngine(openai_client=openai_client, rules_manager=rules_manager)
+        # Initialize OpenAI client if API key is available (the SDK is
+        # only imported when it will be used)
+        openai_client = None
+        if Config.is_openai_enabled():
+            try:
+                from openai import OpenAI
+                openai_client = OpenAI(api_key=Config.OPENAI_API_KEY)
+                print("✓ OpenAI integration enabled")
+            except Exception as e:
+                print(f"⚠ OpenAI initialization failed: {e}")
+                print("  Continuing with rule-based assessment only")
+        else:
+            print("⚠ OPENAI_API_KEY not set - using rule-based assessment only")
+            print("  To enable AI-enhanced analysis, add OPENAI_API_KEY to .env file")
+
+        # Initialize compliance engine with rules manager
+        engine = ComplianceEngine(openai_client=openai_client, rules_manager=rules_manager)
+        if Config.ENGINE_STATS:
+            engine.enable_instrumentation(EngineStats(Config.ENGINE_STATS_SAMPLE_EVERY, registry=metrics.REGISTRY))
+
+        # Cache hit counts for /api/metrics
+        metrics.REGISTRY.add_collector(metrics.cache_collector(lambda: {
+            "rules": rules_manager.get_cache_info(),
+            "tenants": tenants.get_cache_info(),
+            "response": response_cache.get_info(),
+        }))
+        _services_ready = True
+
+
+def create_app() -> Flask:
+    """
+    Build the Flask app (for `flask --app app run` or a WSGI server)
+
+    Every app built in a process shares the services of init_services().
+    """
+    init_services()
+    flask_app = Flask(__name__, static_folder='static', static_url_path='/static')
+    flask_app.json = FastJSONProvider(flask_app)
+    CORS(flask_app)
+    flask_app.register_blueprint(api)
+    for rule in flask_app.url_map.iter_rules():
+        methods = ",".join(sorted(rule.methods - {"HEAD", "OPTIONS"}))
+        profiler.label_route(flask_app.view_functions[rule.endpoint], f"{methods} {rule.rule}")
+    return flask_app
+
+
+def __getattr__(name):
+    """
+    Create the default app (app.app) or the services (app.db, ...) on
+    first access, so `from app import app, db` keeps working
+    """
+    if name == "app":
+        globals()["app"] = create_app()
+        return globals()["app"]
+    if name in SERVICES:
+        init_services()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Fields every risk-check payload must have
+REQUIRED_TRANSACTION_FIELDS = (
+    "amount",
+    "source_country",
+    "destination_country",
+    "purpose",
+    "counterparty_type",
+)
+
+# Supporting document form fields and their labels
+DOCUMENT_TYPES = {
+    'sourceOfFunds': 'Source of Funds Statement',
+    'proofOfIdentity': 'Proof of Identity (KYC)',
+    'proofOfResidency': 'Proof of Residency',
+    'businessRegistration': 'Business Registration/Articles',
+    'contractsInvoices': 'Contracts/Invoices/Payroll'
+}
+
+# Request content types read as NDJSON (one JSON object per line)
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+# Clients may keep ETag-tagged responses but must revalidate them (304 if unchanged)
+CACHE_REVALIDATE = "no-cache"
+# Rules differ by tenant, which the API key header selects
+CACHE_REVALIDATE_PRIVATE = "private, no-cache"
+
+WORD_CONTENT_TYPES = ('application/msword', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document')
 
 
 def parse_customer_type(customer_str: str) -> CustomerType:
@@ -68,13 +213,191 @@ def parse_customer_type(customer_str: str) -> CustomerType:
     return mapping.get(customer_str.lower(), CustomerType.MEDIUM)
 
 
-@app.route("/", methods=["GET"])
+def invalid_date_params(*names):
+    """Return an error message if any of the named query params is not YYYY-MM-DD"""
+    for name in names:
+        value = request.args.get(name)
+        if value:
+            try:
+                datetime.strptime(value, "%Y-%m-%d")
+            except ValueError:
+                return f"Invalid {name} date, expected YYYY-MM-DD"
+    return None
+
+
+def unsupported_storage_error(method_name):
+    """Return an error response if the storage backend lacks a feature"""
+    if not hasattr(db, method_name):
+        return jsonify({"error": f"Not supported by the {type(db).__name__} storage backend"}), 501
+    return None
+
+
+def is_admin(headers) -> bool:
+    """Whether request headers carry the admin token"""
+    token = headers.get("X-Admin-Token", "")
+    return bool(Config.ADMIN_TOKEN) and hmac.compare_digest(token.encode(), Config.ADMIN_TOKEN.encode())
+
+
+def admin_auth_error():
+    """Return an error response unless the request carries the admin token"""
+    if not Config.ADMIN_TOKEN:
+        return jsonify({"error": "Admin endpoints are disabled (set ADMIN_TOKEN)"}), 403
+    if not is_admin(request.headers):
+        return jsonify({"error": "Invalid or missing X-Admin-Token"}), 401
+    return None
+
+
+def etag_response(etag, body=None, cache_control=CACHE_REVALIDATE, vary=None):
+    """
+    Return a JSON response with a strong ETag, or 304 if the client has it
+
+    Args:
+        etag: ETag of the current representation
+        body: Serialized JSON (not needed when the client's copy is current)
+        cache_control: Cache-Control header value
+        vary: Request headers the representation depends on
+    """
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = cache_control
+    if vary:
+        response.headers["Vary"] = vary
+    return response
+
+
+def tenant_from_headers(headers):
+    """
+    Return (tenant ID, (error message, status)) for a request's headers
+
+    The tenant comes from the X-API-Key header or, failing that, the
+    X-Tenant-ID header. Once API keys are configured, X-Tenant-ID is only
+    accepted with the admin token, so the key decides the tenant. No
+    tenant (None) means the global rules.
+    """
+    api_key = headers.get("X-API-Key")
+    if api_key:
+        tenant_id = tenants.tenant_for_api_key(api_key)
+        if not tenant_id:
+            return None, ("Invalid API key", 401)
+        return tenant_id, None
+    tenant_id = headers.get("X-Tenant-ID") or None
+    if tenant_id and tenants.has_api_keys() and not is_admin(headers):
+        return None, ("X-Tenant-ID requires the admin token when API keys are configured; use X-API-Key", 401)
+    return tenant_id, None
+
+
+def rules_for_headers(headers):
+    """Return (rules snapshot, (error message, status)) for a request's tenant"""
+    tenant_id, error = tenant_from_headers(headers)
+    if error:
+        return None, error
+    if not tenant_id:
+        return rules_manager.snapshot, None
+    try:
+        return tenants.snapshot_for(tenant_id), None
+    except KeyError:
+        return None, (f"Unknown tenant: {tenant_id}", 404)
+    except ValueError as e:
+        return None, (str(e), 400)
+
+
+def request_tenant():
+    """Return (tenant ID, error response) for the current request"""
+    tenant_id, error = tenant_from_headers(request.headers)
+    if error:
+        message, status = error
+        return None, (jsonify({"error": message}), status)
+    return tenant_id, None
+
+
+def tenant_rules():
+    """Return (rules snapshot, error response) for the current request's tenant"""
+    rules, error = rules_for_headers(request.headers)
+    if error:
+        message, status = error
+        return None, (jsonify({"error": message}), status)
+    return rules, None
+
+
+def parse_transaction(data):
+    """
+    Validate a risk-check payload
+
+    Returns:
+        (Transaction, None), or (None, error message) if the payload is invalid
+    """
+    # Validate required fields
+    for field in REQUIRED_TRANSACTION_FIELDS:
+        if field not in data:
+            return None, f"Missing required field: {field}"
+
+    # Parse and validate data
+    try:
+        amount = float(data.get("amount", 0))
+    except (ValueError, TypeError):
+        return None, "Invalid amount"
+
+    if amount < 0:
+        return None, "Amount must be positive"
+
+    source_country = data.get("source_country", "").strip()
+    destination_country = data.get("destination_country", "").strip()
+    purpose = data.get("purpose", "").strip()
+    counterparty_type = data.get("counterparty_type", "").strip()
+    history_signals = data.get("history_signals", "").strip()
+
+    if not source_country:
+        return None, "Source country is required"
+    if not destination_country:
+        return None, "Destination country is required"
+    if not purpose:
+        return None, "Purpose is required"
+    if not counterparty_type:
+        return None, "Counterparty type is required"
+
+    # Create transaction object; any history signal counts as structuring
+    return Transaction(
+        amount_usd=amount,
+        origin_country=source_country,
+        destination_country=destination_country,
+        purpose=purpose,
+        customer_type=parse_customer_type(counterparty_type),
+        has_structuring_signals=len(history_signals) > 0,
+    ), None
+
+
+@api.before_app_request
+def start_request_timing():
+    """Collect the request's stage timings (see metrics.stage)"""
+    metrics.start_request()
+
+
+@api.before_app_request
+def sync_rules_version():
+    """Adopt rules saved by another worker process (one stat() when unchanged)"""
+    rules_manager.sync_version()
+
+
+@api.after_app_request
+def add_server_timing(response):
+    """Count the request and report its stage timings in a Server-Timing header"""
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    timings = metrics.end_request(route, request.method, response.status_code)
+    if timings is not None:
+        response.headers["Server-Timing"] = timings.server_timing()
+    return response
+
+
+@api.route("/", methods=["GET"])
 def index():
     """Serve the main HTML page"""
     return send_from_directory("static", "index.html")
 
 
-@app.route("/api/risk-check", methods=["POST"])
+@api.route("/api/risk-check", methods=["POST"])
 def risk_check():
     """
     Perform compliance risk assessment on a transaction
@@ -100,65 +423,22 @@ def risk_check():
     }
     """
     try:
-        data = request.get_json()
-
-        # Validate required fields
-        required_fields = [
-            "amount",
-            "source_country",
-            "destination_country",
-            "purpose",
-            "counterparty_type",
-        ]
-        for field in required_fields:
-            if field not in data:
-                return jsonify({"error": f"Missing required field: {field}"}), 400
-
-        # Parse and validate data
-        try:
-            amount = float(data.get("amount", 0))
-        except (ValueError, TypeError):
-            return jsonify({"error": "Invalid amount"}), 400
-
-        if amount < 0:
-            return jsonify({"error": "Amount must be positive"}), 400
-
-        source_country = data.get("source_country", "").strip()
-        destination_country = data.get("destination_country", "").strip()
-        purpose = data.get("purpose", "").strip()
-        counterparty_type = data.get("counterparty_type", "").strip()
-        history_signals = data.get("history_signals", "").strip()
-
-        if not source_country:
-            return jsonify({"error": "Source country is required"}), 400
-        if not destination_country:
-            return jsonify({"error": "Destination country is required"}), 400
-        if not purpose:
-            return jsonify({"error": "Purpose is required"}), 400
-        if not counterparty_type:
-            return jsonify({"error": "Counterparty type is required"}), 400
-
-        # Convert counterparty type to customer type
-        customer_type = parse_customer_type(counterparty_type)
-
-        # Check for structuring signals
-        has_structuring = len(history_signals) > 0
-
-        # Create transaction object
-        transaction = Transaction(
-            amount_usd=amount,
-            origin_country=source_country,
-            destination_country=destination_country,
-            purpose=purpose,
-            customer_type=customer_type,
-            has_structuring_signals=has_structuring,
-        )
-
-        # Perform compliance review
-        result = engine.review(transaction)
+        with metrics.stage("validate"):
+            data = request.get_json()
+            transaction, error = parse_transaction(data)
+        if error:
+            return jsonify({"error": error}), 400
+
+        # Perform compliance review with the tenant's rules
+        rules, error = tenant_rules()
+        if error:
+            return error
+        with metrics.stage("review"):
+            result = engine.review(transaction, rules=rules)
 
         # Save assessment to database
-        assessment_id = db.save_assessment(data, result)
+        with metrics.stage("save"):
+            assessment_id = db.save_assessment(data, result)
         result['assessment_id'] = assessment_id
 
         return jsonify(result), 200
@@ -167,13 +447,165 @@ def risk_check():
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
 
-@app.route("/api/health", methods=["GET"])
+@api.route("/api/risk-check/batch", methods=["POST"])
+def risk_check_batch():
+    """
+    Perform compliance risk assessment on many transactions
+
+    The body is a JSON array of /api/risk-check payloads, or NDJSON
+    (Content-Type: application/x-ndjson) with one payload per line, read as
+    it arrives. Rows are validated, scored by the rules (no OpenAI
+    analysis) and saved a chunk at a time, one database transaction per
+    chunk, and each chunk's results are streamed back once it is saved.
+
+    Query params:
+    - chunk_size: Rows per chunk (default: RISK_CHECK_BATCH_CHUNK_SIZE)
+
+    Returns NDJSON, one line per row in input order, then a summary:
+    {"row": 0, "assessment_id": 41, "risk_score": 35, ...}
+    {"row": 1, "error": "Missing required field: amount"}
+    {"summary": {"rows": 2, "saved": 1, "errors": 1}}
+    """
+    try:
+        chunk_size = int(request.args.get('chunk_size', Config.RISK_CHECK_BATCH_CHUNK_SIZE))
+        if not 1 <= chunk_size <= Config.RISK_CHECK_BATCH_MAX_CHUNK_SIZE:
+            return jsonify({
+                "error": f"chunk_size must be between 1 and {Config.RISK_CHECK_BATCH_MAX_CHUNK_SIZE}"
+            }), 400
+
+        # One rules snapshot for the whole batch
+        rules, error = tenant_rules()
+        if error:
+            return error
+
+        if request.mimetype in NDJSON_CONTENT_TYPES:
+            records = iter_ndjson_body(request.stream)
+        else:
+            payload = request.get_json(silent=True)
+            if not isinstance(payload, list):
+                return jsonify({"error": "Expected a JSON array of transactions or an NDJSON body"}), 400
+            records = ((record, None) for record in payload)
+
+        return Response(
+            stream_with_context(iter_batch_results(records, rules, chunk_size)),
+            mimetype=STREAM_FORMATS['ndjson']
+        )
+    except ValueError:
+        return jsonify({"error": "chunk_size must be an integer"}), 400
+    except Exception as e:
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
+
+
+def iter_ndjson_body(stream, block_size: int = 65536):
+    """
+    Yield (record, error message) for each non-blank line of an NDJSON body
+
+    The body is read in blocks (readline() on a WSGI input stream reads
+    a byte at a time), so memory holds one block and one partial line.
+    """
+    pending = b""
+    while True:
+        block = stream.read(block_size)
+        lines = (pending + block).split(b"\n")
+        # The last piece is an incomplete line, unless the body has ended
+        pending = lines.pop() if block else b""
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                yield serialization.loads(line), None
+            except ValueError as e:
+                yield None, f"Invalid JSON: {e}"
+        if not block:
+            return
+
+
+def iter_batch_results(records, rules, chunk_size):
+    """
+    Score and save batch rows a chunk at a time
+
+    Args:
+        records: (record, error message) pairs
+        rules: Rules snapshot every row is scored with
+        chunk_size: Rows per chunk
+
+    Yields:
+        NDJSON text, one chunk of result lines at a time, then the summary
+    """
+    summary = {"rows": 0, "saved": 0, "errors": 0}
+
+    def finish(chunk):
+        lines = []
+        for output in score_batch_chunk(chunk, rules):
+            summary["errors" if "error" in output else "saved"] += 1
+            lines.append(serialization.dumps({"row": summary["rows"], **output}))
+            summary["rows"] += 1
+        return "\n".join(lines) + "\n"
+
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield finish(chunk)
+            chunk = []
+    if chunk:
+        yield finish(chunk)
+    yield serialization.dumps({"summary": summary}) + "\n"
+
+
+def score_batch_chunk(chunk, rules):
+    """
+    Validate, score and save one chunk of batch rows
+
+    Args:
+        chunk: (record, error message) pairs
+        rules: Rules snapshot to score with
+
+    Returns:
+        One dict per row, in order: its assessment with assessment_id, or
+        {"error": message} if the row is invalid or could not be saved
+    """
+    outputs = [None] * len(chunk)
+    valid = []
+    for position, (record, error) in enumerate(chunk):
+        if error is None and not isinstance(record, dict):
+            error = "Each row must be a JSON object"
+        if error is None:
+            try:
+                transaction, error = parse_transaction(record)
+            except (AttributeError, TypeError):
+                error = "Countries, purpose, counterparty type and history signals must be strings"
+        if error:
+            outputs[position] = {"error": error}
+        else:
+            valid.append((position, record, transaction))
+
+    if not valid:
+        return outputs
+
+    with metrics.stage("review"):
+        results = engine.review_batch([transaction for _, _, transaction in valid], rules=rules)
+    try:
+        with metrics.stage("save"):
+            ids = db.save_assessments([(record, result) for (_, record, _), result in zip(valid, results)])
+    except Exception as e:
+        for position, _, _ in valid:
+            outputs[position] = {"error": f"Failed to save assessment: {str(e)}"}
+        return outputs
+
+    for (position, _, _), result, assessment_id in zip(valid, results, ids):
+        result['assessment_id'] = assessment_id
+        outputs[position] = result
+    return outputs
+
+
+@api.route("/api/health", methods=["GET"])
 def health():
     """Health check endpoint"""
-    return jsonify({"status": "healthy"}), 200
+    return jsonify({"status": "healthy", "rules_version": rules_manager.snapshot.version}), 200
 
 
-@app.route("/api/assessments", methods=["GET"])
+@api.route("/api/assessments", methods=["GET"])
 def get_assessments():
     """
     Get all stored assessments
@@ -195,164 +627,530 @@ def get_assessments():
         return jsonify({"error": f"Failed to retrieve assessments: {str(e)}"}), 500
 
 
-@app.route("/api/assessments/<int:assessment_id>", methods=["GET"])
+@api.route("/api/assessments/search", methods=["GET"])
+def search_assessments():
+    """
+    Full-text search over rationale, triggered rules, AI insights and
+    document verification notes
+
+    Query params:
+    - q: Search words; all must match (required)
+    - raw: If "true", q is an FTS5 query (phrases, OR, NEAR, prefix*)
+    - limit: Number of results to return (default: 20, max: 100)
+    - offset: Number of results to skip (default: 0)
+    """
+    try:
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({"error": "Missing search query: q"}), 400
+
+        raw = request.args.get('raw', 'false').lower() == 'true'
+        limit = min(int(request.args.get('limit', 20)), 100)
+        offset = int(request.args.get('offset', 0))
+
+        storage_error = unsupported_storage_error("search_assessments")
+        if storage_error:
+            return storage_error
+        if not db.search_enabled:
+            return jsonify({"error": "Full-text search is not available (SQLite built without FTS5)"}), 503
+
+        try:
+            page = db.search_assessments(query, limit=limit, offset=offset, raw=raw)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        return jsonify({
+            "query": query,
+            "results": page['results'],
+            "count": len(page['results']),
+            "offset": offset,
+            "has_more": page['has_more']
+        }), 200
+    except Exception as e:
+        return jsonify({"error": f"Failed to search assessments: {str(e)}"}), 500
+
+
+@api.route("/api/assessments/export", methods=["GET"])
+def export_assessments():
+    """
+    Stream all stored assessments as NDJSON or CSV
+
+    Rows are read with a single database cursor and written as they are
+    fetched, so memory use does not grow with the export size.
+
+    Query params:
+    - format: ndjson or csv (default: ndjson)
+    - since_id: Only assessments with a greater ID (incremental export)
+    - start: First day to include, YYYY-MM-DD (optional)
+    - end: Last day to include, YYYY-MM-DD (optional)
+    """
+    try:
+        export_format = request.args.get('format', 'ndjson').lower()
+        if export_format not in STREAM_FORMATS:
+            return jsonify({"error": f"Unsupported export format: {export_format}"}), 400
+
+        date_error = invalid_date_params("start", "end")
+        if date_error:
+            return jsonify({"error": date_error}), 400
+
+        since_id = int(request.args.get('since_id', 0))
+        rows = db.iter_assessment_rows(
+            since_id=since_id,
+            start=request.args.get('start'),
+            end=request.args.get('end')
+        )
+        encoder = iter_ndjson if export_format == 'ndjson' else iter_csv
+
+        return Response(
+            stream_with_context(encoder(rows)),
+            mimetype=STREAM_FORMATS[export_format],
+            headers={
+                "Content-Disposition": f"attachment; filename=assessments_export.{export_format}"
+            }
+        )
+    except ValueError:
+        return jsonify({"error": "since_id must be an integer"}), 400
+    except Exception as e:
+        return jsonify({"error": f"Failed to export assessments: {str(e)}"}), 500
+
+
+@api.route("/api/assessments/<int:assessment_id>", methods=["GET"])
 def get_assessment(assessment_id):
     """Get a specific assessment by ID"""
     try:
+        # Hot assessments are served from their cached JSON, keyed by the
+        # version of the data holding them, so rows rewritten in place (such
+        # as by rebuild_rule_hits) or cleared are read again
+        version = db.get_data_version(assessment_id)
+        cached = response_cache.get(("assessment", assessment_id, version)) if version else None
+        if cached:
+            etag, body = cached
+            return etag_response(etag, body)
+
+        # A row still in the write-behind queue can fail to commit, so it is
+        # served but not cached
+        pending = db.is_pending(assessment_id)
         assessment = db.get_assessment_by_id(assessment_id)
         if not assessment:
             return jsonify({"error": "Assessment not found"}), 404
-        return jsonify(assessment), 200
+        body = jsonify(assessment).get_data()
+        etag = content_etag(f"assessment-{assessment_id}", body)
+        if version and not pending:
+            response_cache.put(("assessment", assessment_id, version), etag, body)
+        return etag_response(etag, body)
     except Exception as e:
         return jsonify({"error": f"Failed to retrieve assessment: {str(e)}"}), 500
 
 
-@app.route("/api/statistics", methods=["GET"])
+@api.route("/api/assessments/<int:assessment_id>/re-evaluate", methods=["POST"])
+def reevaluate_assessment(assessment_id):
+    """
+    Score a stored assessment again, without OpenAI analysis
+    
+    Query params:
+        rules: "original" (default) to use the ruleset that produced the
+               stored score, "current" for the rules in effect now, or a
+               rules_version content hash
+    
+    Returns JSON with the stored and re-evaluated score and level
+    """
+    try:
+        assessment = db.get_assessment_by_id(assessment_id)
+        if not assessment:
+            return jsonify({"error": "Assessment not found"}), 404
+        
+        requested = request.args.get("rules", "original")
+        if requested == "current":
+            rules, error = tenant_rules()
+            if error:
+                return error
+        else:
+            rules_version = assessment.get("rules_version") if requested == "original" else requested
+            if not rules_version:
+                return jsonify({
+                    "error": "Assessment was scored before rules versions were recorded (use rules=current)"
+                }), 409
+            rules = rules_manager.get_snapshot(rules_version)
+            if not rules:
+                return jsonify({"error": f"Rules version {rules_version} is not in the rules history"}), 404
+        
+        transaction = Transaction(
+            amount_usd=float(assessment["amount"]),
+            origin_country=assessment["source_country"],
+            destination_country=assessment["destination_country"],
+            purpose=assessment["purpose"],
+            customer_type=parse_customer_type(assessment["counterparty_type"]),
+            has_structuring_signals=len(assessment.get("history_signals") or "") > 0,
+        )
+        result = engine.review(transaction, rules=rules, use_ai=False)
+        
+        return jsonify({
+            "assessment_id": assessment_id,
+            "stored": {
+                "risk_score": assessment["risk_score"],
+                "risk_level": assessment["risk_level"],
+                "rules_version": assessment.get("rules_version"),
+            },
+            "result": result,
+            "changed": (result["risk_score"], result["risk_level"]) != (assessment["risk_score"], assessment["risk_level"]),
+        }), 200
+    except Exception as e:
+        return jsonify({"error": f"Failed to re-evaluate assessment: {str(e)}"}), 500
+
+
+@api.route("/api/statistics", methods=["GET"])
 def get_statistics():
     """Get summary statistics of all assessments"""
     try:
-        stats = db.get_statistics()
-        return jsonify(stats), 200
+        # Statistics only change with the stored data, so its version is the
+        # ETag and a client that has it current costs no query
+        version = db.get_data_version()
+        if not version:
+            body = jsonify(db.get_statistics()).get_data()
+            return etag_response(content_etag("statistics", body), body)
+
+        etag = f"statistics-{version}"
+        if request.if_none_match.contains_weak(etag):
+            return etag_response(etag)
+        cached = response_cache.get(("statistics", version))
+        if cached:
+            return etag_response(*cached)
+        body = jsonify(db.get_statistics()).get_data()
+        response_cache.put(("statistics", version), etag, body)
+        return etag_response(etag, body)
     except Exception as e:
         return jsonify({"error": f"Failed to retrieve statistics: {str(e)}"}), 500
 
 
-@app.route("/history", methods=["GET"])
-def history():
-    """Serve the assessment history page"""
-    return send_from_directory("static", "history.html")
+@api.route("/api/analytics", methods=["GET"])
+def get_analytics():
+    """
+    Get precomputed volume and risk-mix trends
 
+    Query params:
+    - dimension: day, corridor or purpose (default: day)
+    - start: First day to include, YYYY-MM-DD (optional)
+    - end: Last day to include, YYYY-MM-DD (optional)
+    - key: Single corridor ("Origin → Destination") or purpose; returns
+      a daily series for it (optional)
+    """
+    try:
+        dimension = request.args.get('dimension', 'day')
+        start = request.args.get('start')
+        end = request.args.get('end')
+        key = request.args.get('key')
 
-@app.route("/configure", methods=["GET"])
-def configure():
-    """Serve the rules configuration page"""
-    return send_from_directory("static", "configure.html")
+        date_error = invalid_date_params("start", "end")
+        if date_error:
+            return jsonify({"error": date_error}), 400
 
+        storage_error = unsupported_storage_error("get_analytics")
+        if storage_error:
+            return storage_error
 
-@app.route("/api/download-mock-documents", methods=["GET"])
-def download_mock_documents():
+        try:
+            buckets = db.get_analytics(dimension=dimension, start=start, end=end, key=key)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        return jsonify({
+            "dimension": dimension,
+            "start": start,
+            "end": end,
+            "buckets": buckets,
+            "count": len(buckets)
+        }), 200
+    except Exception as e:
+        return jsonify({"error": f"Failed to retrieve analytics: {str(e)}"}), 500
+
+
+@api.route("/api/analytics/rules", methods=["GET"])
+def get_rule_analytics():
     """
-    Download all mock test documents as a ZIP file
-    Includes Low, Medium, and High risk scenarios with instructions
+    Get per-rule hit rates and rule co-occurrence
+
+    Query params:
+    - start: First day to include, YYYY-MM-DD (optional)
+    - end: Last day to include, YYYY-MM-DD (optional)
     """
     try:
-        # Create a temporary ZIP file
-        temp_zip = tempfile.NamedTemporaryFile(delete=False, suffix='.zip')
-        
-        with zipfile.ZipFile(temp_zip.name, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            mock_users_dir = Path(__file__).parent / "mock_users"
-            
-            # Add all PDFs from each risk level
-            for risk_folder in ['low_risk', 'medium_risk', 'high_risk']:
-                folder_path = mock_users_dir / risk_folder
-                if folder_path.exists():
-                    for pdf_file in folder_path.glob('*.pdf'):
-                        arcname = f"{risk_folder}/{pdf_file.name}"
-                        zipf.write(pdf_file, arcname)
-            
-            # Add instructions
-            instructions_file = mock_users_dir / "TEST_INSTRUCTIONS.md"
-            if instructions_file.exists():
-                zipf.write(instructions_file, "TEST_INSTRUCTIONS.md")
-            
-            # Add README for judges
-            readme_file = mock_users_dir / "README_FOR_JUDGES.md"
-            if readme_file.exists():
-                zipf.write(readme_file, "README.md")
-            
-            # Add quick reference
-            quick_ref_content = """# 🧪 Mock Documents Test Guide
+        start = request.args.get('start')
+        end = request.args.get('end')
 
-## 📦 What's Included
+        date_error = invalid_date_params("start", "end")
+        if date_error:
+            return jsonify({"error": date_error}), 400
 
-- **low_risk/** - 4 PDFs for Low Risk scenario
-- **medium_risk/** - 4 PDFs for Medium Risk scenario  
-- **high_risk/** - 4 PDFs for High Risk scenario
+        storage_error = unsupported_storage_error("get_rule_analytics")
+        if storage_error:
+            return storage_error
 
----
+        analytics = db.get_rule_analytics(start=start, end=end)
+        analytics.update({"start": start, "end": end})
+        return jsonify(analytics), 200
+    except Exception as e:
+        return jsonify({"error": f"Failed to retrieve rule analytics: {str(e)}"}), 500
 
-## 🟢 LOW RISK TEST
 
-**Form Inputs:**
-- Amount: $3,000
-- From: Singapore → To: Philippines
-- Purpose: Services
-- Type: Freelancer
+@api.route("/api/db/metrics", methods=["GET"])
+def get_db_metrics():
+    """Get database write-path metrics (write-behind queue depth, commit latency, failed rows) and response cache counts (admin)"""
+    auth_error = admin_auth_error()
+    if auth_error:
+        return auth_error
+    try:
+        return jsonify({**db.get_write_metrics(), "response_cache": response_cache.get_info()}), 200
+    except Exception as e:
+        return jsonify({"error": f"Failed to retrieve database metrics: {str(e)}"}), 500
 
-**Upload:** All 4 PDFs from `low_risk/` folder
-**Expected:** Score 0-10 (LOW) ✅
 
----
+@api.route("/api/metrics", methods=["GET"])
+def get_metrics():
+    """
+    Prometheus metrics: request and stage latency histograms, LLM call and
+    token counters, cache hits and errors
+    """
+    try:
+        return Response(metrics.REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+    except Exception as e:
+        return jsonify({"error": f"Failed to render metrics: {str(e)}"}), 500
 
-## 🟡 MEDIUM RISK TEST
 
-**Form Inputs:**
-- Amount: $18,000
-- From: Vietnam → To: Indonesia
-- Purpose: Trade Finance
-- Type: SMB
+@api.route("/api/engine/stats", methods=["GET"])
+def get_engine_stats():
+    """Per-rule hit counts, risk factor tiers and sampled step latencies (ENGINE_STATS, admin)"""
+    auth_error = admin_auth_error()
+    if auth_error:
+        return auth_error
+    try:
+        if not engine.stats:
+            return jsonify({"enabled": False}), 200
+        return jsonify({"enabled": True, **engine.stats.snapshot()}), 200
+    except Exception as e:
+        return jsonify({"error": f"Failed to retrieve engine stats: {str(e)}"}), 500
 
-**Upload:** All 4 PDFs from `medium_risk/` folder
-**Expected:** Score 50-60 (MEDIUM) ⚠️
 
----
+@api.route("/api/engine/stats/reset", methods=["POST"])
+def reset_engine_stats():
+    """Zero the engine's rule hit counts and latency samples (admin)"""
+    auth_error = admin_auth_error()
+    if auth_error:
+        return auth_error
+    try:
+        if not engine.stats:
+            return jsonify({"error": "Engine instrumentation is disabled (set ENGINE_STATS=true)"}), 409
+        engine.stats.reset()
+        return jsonify({"message": "Engine stats reset"}), 200
+    except Exception as e:
+        return jsonify({"error": f"Failed to reset engine stats: {str(e)}"}), 500
 
-## 🔴 HIGH RISK TEST
 
-**Form Inputs:**
-- Amount: $35,000
-- From: Cayman Islands → To: Vietnam
-- Purpose: Investment
-- Type: NGO
-- History: "multiple small transactions under $10k"
+@api.route("/api/admin/profile", methods=["POST"])
+def profile_process():
+    """
+    Sample the stacks of every thread in this process for a while (admin)
 
-**Upload:** All 4 PDFs from `high_risk/` folder
-**Expected:** Score 95-100 (HIGH) 🚨
+    Query parameters: seconds (default 10, at most PROFILER_MAX_SECONDS),
+    interval_ms (default 10), include_idle (true to keep waiting threads)
+    and format: "collapsed" (default) returns one "stack count" line per
+    stack for flamegraph.pl or speedscope, with the sample count and
+    overhead in X-Profile-* headers; "json" returns them in one object.
 
----
+    The request blocks while sampling. Sampling uses at most 5% of one
+    core (profiler.MAX_OVERHEAD); one profile runs at a time.
+    """
+    auth_error = admin_auth_error()
+    if auth_error:
+        return auth_error
 
-**Start testing at:** http://localhost:8000
-"""
-            
-            zipf.writestr("README.md", quick_ref_content)
-        
-        # Send the ZIP file
+    try:
+        seconds = float(request.args.get("seconds", 10))
+        interval_ms = float(request.args.get("interval_ms", 10))
+    except ValueError:
+        return jsonify({"error": "seconds and interval_ms must be numbers"}), 400
+    if not 0 < seconds <= Config.PROFILER_MAX_SECONDS:
+        return jsonify({"error": f"seconds must be between 0 and {Config.PROFILER_MAX_SECONDS:g}"}), 400
+    if not 1 <= interval_ms <= 1000:
+        return jsonify({"error": "interval_ms must be between 1 and 1000"}), 400
+    output_format = request.args.get("format", "collapsed")
+    if output_format not in ("collapsed", "json"):
+        return jsonify({"error": "format must be collapsed or json"}), 400
+    include_idle = request.args.get("include_idle", "false").lower() == "true"
+
+    try:
+        result = profiler.sample_stacks(seconds, interval_ms / 1000, include_idle=include_idle)
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 409
+    except Exception as e:
+        return jsonify({"error": f"Failed to profile: {str(e)}"}), 500
+
+    if output_format == "json":
+        return jsonify(result), 200
+    body = "\n".join(profiler.to_collapsed(result["stacks"])) + "\n"
+    response = Response(body, mimetype="text/plain")
+    response.headers["X-Profile-Samples"] = str(result["samples"])
+    response.headers["X-Profile-Duration"] = str(result["duration_s"])
+    response.headers["X-Profile-Overhead-Pct"] = str(result["overhead_pct"])
+    return response
+
+
+# State of the most recent admin snapshot (one runs at a time)
+snapshot_lock = threading.Lock()
+snapshot_status = {"state": "idle"}
+
+
+def run_snapshot():
+    """Background thread body for POST /api/admin/snapshot"""
+    def record_progress(progress):
+        with snapshot_lock:
+            snapshot_status["progress"] = progress
+
+    try:
+        report = db.snapshot(
+            Config.DB_SNAPSHOT_DIR,
+            pages_per_step=Config.DB_SNAPSHOT_PAGES_PER_STEP,
+            step_sleep_ms=Config.DB_SNAPSHOT_STEP_SLEEP_MS,
+            keep=Config.DB_SNAPSHOT_KEEP,
+            on_progress=record_progress
+        )
+        with snapshot_lock:
+            snapshot_status.update({"state": "completed", "report": report})
+        print(f"✓ Snapshot written to {report['path']} ({report['mb_per_s']} MB/s)")
+    except Exception as e:
+        with snapshot_lock:
+            snapshot_status.update({"state": "failed", "error": str(e)})
+        print(f"❌ Snapshot failed: {e}")
+
+
+@api.route("/api/admin/snapshot", methods=["POST"])
+def start_snapshot():
+    """
+    Start an online snapshot of the database in the background
+
+    Requires the X-Admin-Token header. Poll GET /api/admin/snapshot for
+    progress and the final report.
+    """
+    auth_error = admin_auth_error()
+    if auth_error:
+        return auth_error
+
+    storage_error = unsupported_storage_error("snapshot")
+    if storage_error:
+        return storage_error
+
+    with snapshot_lock:
+        if snapshot_status["state"] == "running":
+            return jsonify({"error": "A snapshot is already running", **snapshot_status}), 409
+        snapshot_status.clear()
+        snapshot_status.update({"state": "running", "started_at": datetime.utcnow().isoformat()})
+        status = dict(snapshot_status)
+
+    threading.Thread(target=run_snapshot, name="db-snapshot", daemon=True).start()
+    return jsonify(status), 202
+
+
+@api.route("/api/admin/snapshot", methods=["GET"])
+def get_snapshot_status():
+    """Get progress of the running snapshot, or the report of the last one"""
+    auth_error = admin_auth_error()
+    if auth_error:
+        return auth_error
+
+    with snapshot_lock:
+        return jsonify(dict(snapshot_status)), 200
+
+
+@api.route("/history", methods=["GET"])
+def history():
+    """Serve the assessment history page"""
+    return send_from_directory("static", "history.html")
+
+
+@api.route("/configure", methods=["GET"])
+def configure():
+    """Serve the rules configuration page"""
+    return send_from_directory("static", "configure.html")
+
+
+@api.route("/api/download-mock-documents", methods=["GET"])
+def download_mock_documents():
+    """
+    Download all mock test documents as a ZIP file
+    Includes Low, Medium, and High risk scenarios with instructions
+
+    The ZIP is built once (and again only when mock_users changes) and
+    streamed from disk, with ETag and Range support.
+    """
+    try:
+        path, etag = mock_bundle.get()
         return send_file(
-            temp_zip.name,
+            path,
             mimetype='application/zip',
             as_attachment=True,
-            download_name='mock_compliance_documents.zip'
+            download_name='mock_compliance_documents.zip',
+            conditional=True,
+            etag=etag
         )
         
     except Exception as e:
         return jsonify({"error": f"Failed to create download: {str(e)}"}), 500
 
 
-@app.route("/api/rules", methods=["GET"])
+@api.route("/api/rules", methods=["GET"])
 def get_rules():
-    """Get current compliance rules configuration"""
+    """Get current compliance rules configuration (the tenant's effective rules if one is selected)"""
     try:
-        rules = rules_manager.get_rules()
-        return jsonify(rules), 200
+        rules, error = tenant_rules()
+        if error:
+            return error
+
+        # A ruleset's content hash identifies it, so it is also its ETag
+        cached = response_cache.get(("rules", rules.content_hash))
+        if cached:
+            etag, body = cached
+        else:
+            etag = f"rules-{rules.content_hash}"
+            body = jsonify(rules.rules).get_data()
+            response_cache.put(("rules", rules.content_hash), etag, body)
+        return etag_response(etag, body, cache_control=CACHE_REVALIDATE_PRIVATE, vary="X-Tenant-ID, X-API-Key")
     except Exception as e:
         return jsonify({"error": f"Failed to get rules: {str(e)}"}), 500
 
 
-@app.route("/api/rules", methods=["POST"])
+@api.route("/api/rules", methods=["POST"])
 def update_rules():
-    """Update compliance rules configuration"""
+    """Update compliance rules configuration (the tenant's overrides if one is selected)"""
     try:
         new_rules = request.get_json()
         
         if not new_rules:
             return jsonify({"error": "No rules data provided"}), 400
         
-        # Save new rules
+        tenant_id, error = request_tenant()
+        if error:
+            return error
+        if tenant_id:
+            # Only admins create tenants; others can edit existing ones
+            try:
+                rules = tenants.save_overrides(tenant_id, new_rules, create=is_admin(request.headers))
+            except KeyError:
+                return jsonify({"error": f"Unknown tenant: {tenant_id} (creating a tenant requires X-Admin-Token)"}), 404
+            except ValueError as e:
+                return jsonify({"error": f"Invalid rules: {str(e)}"}), 400
+            return jsonify({
+                "message": f"Rules updated successfully for tenant {tenant_id}",
+                "rules": rules.rules
+            }), 200
+        
+        try:
+            validate_rules(new_rules)
+        except ValueError as e:
+            return jsonify({"error": f"Invalid rules: {str(e)}"}), 400
+        
+        # Save new rules (new reviews use them as soon as this returns)
         success = rules_manager.save_rules(new_rules)
         
         if success:
-            # Reload rules in the compliance engine
-            engine.reload_rules()
             return jsonify({
                 "message": "Rules updated successfully",
                 "rules": rules_manager.get_rules()
@@ -364,15 +1162,68 @@ def update_rules():
         return jsonify({"error": f"Failed to update rules: {str(e)}"}), 500
 
 
-@app.route("/api/rules/reset", methods=["POST"])
+@api.route("/api/rules/versions", methods=["GET"])
+def get_rules_versions():
+    """List every ruleset kept in the rules history, newest first"""
+    try:
+        return jsonify({
+            "current": rules_manager.snapshot.content_hash,
+            "versions": rules_manager.list_versions(),
+            "cache": rules_manager.get_cache_info(),
+        }), 200
+    except Exception as e:
+        return jsonify({"error": f"Failed to list rules versions: {str(e)}"}), 500
+
+
+@api.route("/api/rules/versions/<rules_version>", methods=["GET"])
+def get_rules_version(rules_version):
+    """Get one ruleset from the rules history by content hash"""
+    try:
+        rules = rules_manager.get_ruleset(rules_version)
+        if rules is None:
+            return jsonify({"error": "Rules version not found"}), 404
+        return jsonify(rules), 200
+    except Exception as e:
+        return jsonify({"error": f"Failed to get rules version: {str(e)}"}), 500
+
+
+@api.route("/api/tenants", methods=["GET"])
+def list_tenants():
+    """List tenants with their own rules, and the tenant cache metrics (admin only)"""
+    error = admin_auth_error()
+    if error:
+        return error
+    try:
+        return jsonify({
+            "tenants": tenants.list_tenants(),
+            "cache": tenants.get_cache_info(),
+        }), 200
+    except Exception as e:
+        return jsonify({"error": f"Failed to list tenants: {str(e)}"}), 500
+
+
+@api.route("/api/rules/reset", methods=["POST"])
 def reset_rules():
-    """Reset rules to default configuration"""
+    """Reset rules to default configuration (a tenant's rules to the global rules)"""
     try:
+        tenant_id, error = request_tenant()
+        if error:
+            return error
+        if tenant_id:
+            try:
+                rules = tenants.save_overrides(tenant_id, {})
+            except KeyError:
+                return jsonify({"error": f"Unknown tenant: {tenant_id}"}), 404
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            return jsonify({
+                "message": f"Tenant {tenant_id} now uses the global rules",
+                "rules": rules.rules
+            }), 200
+        
         success = rules_manager.reset_to_defaults()
         
         if success:
-            # Reload rules in the compliance engine
-            engine.reload_rules()
             return jsonify({
                 "message": "Rules reset to defaults",
                 "rules": rules_manager.get_rules()
@@ -384,7 +1235,7 @@ def reset_rules():
         return jsonify({"error": f"Failed to reset rules: {str(e)}"}), 500
 
 
-@app.route("/api/risk-check-with-documents", methods=["POST"])
+@api.route("/api/risk-check-with-documents", methods=["POST"])
 def risk_check_with_documents():
     """
     Perform compliance risk assessment with supporting documents
@@ -396,76 +1247,24 @@ def risk_check_with_documents():
         if not transaction_data_str:
             return jsonify({"error": "No transaction data provided"}), 400
         
-        transaction_data = json.loads(transaction_data_str)
-        
         # Validate required fields (same as regular endpoint)
-        required_fields = [
-            "amount",
-            "source_country",
-            "destination_country",
-            "purpose",
-            "counterparty_type",
-        ]
-        for field in required_fields:
-            if field not in transaction_data:
-                return jsonify({"error": f"Missing required field: {field}"}), 400
-        
-        # Parse and validate data
-        try:
-            amount = float(transaction_data.get("amount", 0))
-        except (ValueError, TypeError):
-            return jsonify({"error": "Invalid amount"}), 400
-
-        if amount < 0:
-            return jsonify({"error": "Amount must be positive"}), 400
-
-        source_country = transaction_data.get("source_country", "").strip()
-        destination_country = transaction_data.get("destination_country", "").strip()
-        purpose = transaction_data.get("purpose", "").strip()
-        counterparty_type = transaction_data.get("counterparty_type", "").strip()
-        history_signals = transaction_data.get("history_signals", "").strip()
-
-        # Validation checks
-        if not source_country:
-            return jsonify({"error": "Source country is required"}), 400
-        if not destination_country:
-            return jsonify({"error": "Destination country is required"}), 400
-        if not purpose:
-            return jsonify({"error": "Purpose is required"}), 400
-        if not counterparty_type:
-            return jsonify({"error": "Counterparty type is required"}), 400
-
-        # Convert counterparty type to customer type
-        customer_type = parse_customer_type(counterparty_type)
-
-        # Check for structuring signals
-        has_structuring = len(history_signals) > 0
-
-        # Create transaction object
-        transaction = Transaction(
-            amount_usd=amount,
-            origin_country=source_country,
-            destination_country=destination_country,
-            purpose=purpose,
-            customer_type=customer_type,
-            has_structuring_signals=has_structuring,
-        )
-
-        # Perform standard compliance review
-        result = engine.review(transaction)
+        with metrics.stage("validate"):
+            transaction_data = serialization.loads(transaction_data_str)
+            transaction, error = parse_transaction(transaction_data)
+        if error:
+            return jsonify({"error": error}), 400
+
+        # Perform standard compliance review with the tenant's rules
+        rules, error = tenant_rules()
+        if error:
+            return error
+        with metrics.stage("review"):
+            result = engine.review(transaction, rules=rules)
         
         # If documents are uploaded and OpenAI is available, enhance with document analysis
         if openai_client and request.files:
-            document_types = {
-                'sourceOfFunds': 'Source of Funds Statement',
-                'proofOfIdentity': 'Proof of Identity (KYC)',
-                'proofOfResidency': 'Proof of Residency',
-                'businessRegistration': 'Business Registration/Articles',
-                'contractsInvoices': 'Contracts/Invoices/Payroll'
-            }
-            
             uploaded_docs = {}
-            for doc_key, doc_label in document_types.items():
+            for doc_key, doc_label in DOCUMENT_TYPES.items():
                 if doc_key in request.files:
                     file = request.files[doc_key]
                     if file and file.filename != '':
@@ -477,38 +1276,11 @@ def risk_check_with_documents():
             if uploaded_docs:
                 # Analyze documents as supporting evidence and get score adjustment
                 doc_context = analyze_documents_as_evidence(uploaded_docs, transaction, result)
-                
-                if doc_context:
-                    result['document_verification'] = doc_context
-                    result['documents_reviewed'] = len(uploaded_docs)
-                    
-                    # APPLY DOCUMENT SCORE ADJUSTMENT
-                    if 'score_adjustment' in doc_context:
-                        original_score = result['risk_score']
-                        adjustment = doc_context['score_adjustment']
-                        
-                        # Apply adjustment
-                        result['risk_score'] = max(0, min(100, original_score + adjustment))
-                        
-                        # Recalculate risk level based on new score
-                        result['risk_level'] = engine._score_to_level(result['risk_score'])
-                        
-                        # Add explanation
-                        result['score_adjustment_applied'] = {
-                            'original_score': original_score,
-                            'adjustment': adjustment,
-                            'final_score': result['risk_score'],
-                            'reason': doc_context.get('adjustment_reason', 'Based on document verification')
-                        }
-                        
-                        # Update rationale
-                        if adjustment > 0:
-                            result['rationale'] += f" DOCUMENT ALERT: Risk increased by {adjustment} points due to document concerns."
-                        elif adjustment < 0:
-                            result['rationale'] += f" Documents verified successfully, risk reduced by {abs(adjustment)} points."
+                apply_document_verification(result, doc_context, len(uploaded_docs), rules)
 
         # Save assessment to database
-        assessment_id = db.save_assessment(transaction_data, result)
+        with metrics.stage("save"):
+            assessment_id = db.save_assessment(transaction_data, result)
         result['assessment_id'] = assessment_id
 
         return jsonify(result), 200
@@ -523,9 +1295,7 @@ def analyze_documents_as_evidence(uploaded_docs, transaction, risk_result):
     Returns verification context AND score adjustment based on document findings
     """
     try:
-        document_summaries = []
-        score_adjustment = 0
-        adjustment_reasons = []
+        reviews = []
         
         for doc_key, doc_info in uploaded_docs.items():
             file = doc_info['file']
@@ -534,42 +1304,81 @@ def analyze_documents_as_evidence(uploaded_docs, transaction, risk_result):
             # Reset file pointer
             file.seek(0)
             
-            # Check file type and convert PDFs
-            content_type = file.content_type
-            filename = file.filename.lower()
-            
-            # Skip Word documents
-            if content_type in ['application/msword', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'] or filename.endswith(('.doc', '.docx')):
+            image, skipped = prepare_document(file.read(), file.content_type, file.filename)
+            if skipped:
                 continue
             
-            # Read file data
-            file_data = file.read()
-            
-            # Handle PDFs - convert to image
-            if content_type == 'application/pdf' or filename.endswith('.pdf'):
-                if not PDF_SUPPORT:
-                    continue
-                
-                try:
-                    images = convert_from_bytes(file_data, first_page=1, last_page=1)
-                    if images:
-                        img_byte_arr = io.BytesIO()
-                        images[0].save(img_byte_arr, format='PNG')
-                        img_byte_arr = img_byte_arr.getvalue()
-                        base64_image = base64.b64encode(img_byte_arr).decode('utf-8')
-                        image_format = 'png'
-                    else:
-                        continue
-                except Exception:
-                    continue
-            else:
-                base64_image = base64.b64encode(file_data).decode('utf-8')
-                image_format = content_type.split('/')[-1]
-                if image_format == 'jpeg':
-                    image_format = 'jpg'
-            
-            # Ask AI to verify document and critique its quality/authenticity
-            prompt = f"""You are reviewing {doc_label} for AML/KYC compliance.
+            try:
+                with metrics.llm_call("document_evidence") as record:
+                    response = openai_client.chat.completions.create(
+                        **evidence_request(doc_label, transaction, risk_result, *image)
+                    )
+                    record(response)
+                reviews.append((doc_label, serialization.loads(response.choices[0].message.content)))
+            except Exception as e:
+                print(f"Error analyzing {doc_label}: {e}")
+                continue
+        
+        return summarize_evidence(reviews)
+        
+    except Exception as e:
+        print(f"Error in document evidence analysis: {e}")
+        return None
+
+
+def prepare_document(file_data, content_type, filename):
+    """
+    Prepare an uploaded document for the vision model
+
+    PDFs are rendered to a PNG of their first page (poppler; CPU-bound).
+
+    Returns:
+        ((base64 image, image format), None), or (None, entry) if the
+        document is skipped, where entry says why (Word documents, PDFs
+        without pdf2image, failed conversions)
+    """
+    content_type = content_type or ''
+    filename = (filename or '').lower()
+
+    # Handle Word documents differently
+    if content_type in WORD_CONTENT_TYPES or filename.endswith(('.doc', '.docx')):
+        # For Word documents, inform user to convert or use text extraction
+        return None, {
+            "note": "Word document detected. For best results, please convert to PDF or image format.",
+            "status": "skipped"
+        }
+
+    # Handle PDFs - convert to image
+    if content_type == 'application/pdf' or filename.endswith('.pdf'):
+        if not PDF_SUPPORT:
+            return None, {"error": "PDF support not available. Please install pdf2image.", "status": "error"}
+        try:
+            from pdf2image import convert_from_bytes
+
+            # Convert PDF first page to image
+            with metrics.stage("pdf_render"):
+                images = convert_from_bytes(file_data, first_page=1, last_page=1)
+                if not images:
+                    return None, {"error": "Could not convert PDF to image", "status": "error"}
+                img_byte_arr = io.BytesIO()
+                images[0].save(img_byte_arr, format='PNG')
+            with metrics.stage("base64"):
+                return (base64.b64encode(img_byte_arr.getvalue()).decode('utf-8'), 'png'), None
+        except Exception as e:
+            return None, {"error": f"PDF conversion failed: {str(e)}", "status": "error"}
+
+    # Handle images directly
+    image_format = content_type.split('/')[-1]
+    if image_format == 'jpeg':
+        image_format = 'jpg'
+    with metrics.stage("base64"):
+        return (base64.b64encode(file_data).decode('utf-8'), image_format), None
+
+
+def evidence_request(doc_label, transaction, risk_result, base64_image, image_format):
+    """Arguments of the chat completion call reviewing one document"""
+    # Ask AI to verify document and critique its quality/authenticity
+    prompt = f"""You are reviewing {doc_label} for AML/KYC compliance.
 
 CLAIMED TRANSACTION DETAILS (from form):
 - Amount: ${transaction.amount_usd:,.2f}
@@ -626,84 +1435,130 @@ Return JSON with:
 - score_adjustment: number (-10 to +40)
 - adjustment_reason: explanation including both quality critique and verification result"""
 
-            try:
-                response = openai_client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": "You are an expert AML/KYC compliance analyst. Your document review directly impacts risk scores. Be thorough but fair."
-                        },
-                        {
-                            "role": "user",
-                            "content": [
-                                {"type": "text", "text": prompt},
-                                {
-                                    "type": "image_url",
-                                    "image_url": {
-                                        "url": f"data:image/{image_format};base64,{base64_image}"
-                                    }
-                                }
-                            ]
+    return {
+        "model": "gpt-4o-mini",
+        "messages": [
+            {
+                "role": "system",
+                "content": "You are an expert AML/KYC compliance analyst. Your document review directly impacts risk scores. Be thorough but fair."
+            },
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": prompt},
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": f"data:image/{image_format};base64,{base64_image}"
                         }
-                    ],
-                    max_tokens=700,
-                    temperature=0.2,
-                    response_format={"type": "json_object"}
-                )
-                
-                doc_analysis = json.loads(response.choices[0].message.content)
-                
-                # Extract score adjustment
-                doc_adjustment = doc_analysis.get('score_adjustment', 0)
-                doc_reason = doc_analysis.get('adjustment_reason', '')
-                
-                # Accumulate adjustments
-                score_adjustment += doc_adjustment
-                if doc_adjustment != 0:
-                    adjustment_reasons.append(f"{doc_label}: {doc_reason} ({doc_adjustment:+d} points)")
-                
-                document_summaries.append({
-                    "document_type": doc_label,
-                    "analysis": doc_analysis
-                })
-                
-            except Exception as e:
-                print(f"Error analyzing {doc_label}: {e}")
-                continue
-        
-        if document_summaries:
-            # Calculate overall verification status
-            verified_count = sum(1 for doc in document_summaries if doc['analysis'].get('verified', False))
-            total_count = len(document_summaries)
-            verification_rate = verified_count / total_count if total_count > 0 else 0
-            
-            # Determine overall status
-            if verification_rate >= 0.8:
-                overall_status = "Documents strongly support the transaction"
-            elif verification_rate >= 0.5:
-                overall_status = "Documents partially support the transaction with some concerns"
-            else:
-                overall_status = "Documents raise significant concerns about the transaction"
-            
-            return {
-                "documents_analyzed": len(document_summaries),
-                "document_reviews": document_summaries,
-                "verified_count": verified_count,
-                "verification_rate": round(verification_rate * 100, 1),
-                "overall_verification": overall_status,
-                "score_adjustment": score_adjustment,
-                "adjustment_reason": " | ".join(adjustment_reasons) if adjustment_reasons else "No adjustments needed"
+                    }
+                ]
             }
-        
-        return None
-        
-    except Exception as e:
-        print(f"Error in document evidence analysis: {e}")
+        ],
+        "max_tokens": 700,
+        "temperature": 0.2,
+        "response_format": {"type": "json_object"}
+    }
+
+
+def summarize_evidence(reviews):
+    """
+    Combine per-document reviews into the verification context
+
+    Args:
+        reviews: (document label, parsed AI review) pairs
+
+    Returns:
+        Verification context with the total score adjustment, or None if
+        no document was reviewed
+    """
+    document_summaries = []
+    score_adjustment = 0
+    adjustment_reasons = []
+
+    for doc_label, doc_analysis in reviews:
+        try:
+            # Extract score adjustment
+            doc_adjustment = doc_analysis.get('score_adjustment', 0)
+            doc_reason = doc_analysis.get('adjustment_reason', '')
+            if doc_adjustment != 0:
+                reason = f"{doc_label}: {doc_reason} ({doc_adjustment:+d} points)"
+        except Exception as e:
+            print(f"Error analyzing {doc_label}: {e}")
+            continue
+
+        # Accumulate adjustments
+        score_adjustment += doc_adjustment
+        if doc_adjustment != 0:
+            adjustment_reasons.append(reason)
+
+        document_summaries.append({
+            "document_type": doc_label,
+            "analysis": doc_analysis
+        })
+
+    if not document_summaries:
         return None
 
+    # Calculate overall verification status
+    verified_count = sum(1 for doc in document_summaries if doc['analysis'].get('verified', False))
+    total_count = len(document_summaries)
+    verification_rate = verified_count / total_count if total_count > 0 else 0
+
+    # Determine overall status
+    if verification_rate >= 0.8:
+        overall_status = "Documents strongly support the transaction"
+    elif verification_rate >= 0.5:
+        overall_status = "Documents partially support the transaction with some concerns"
+    else:
+        overall_status = "Documents raise significant concerns about the transaction"
+
+    return {
+        "documents_analyzed": len(document_summaries),
+        "document_reviews": document_summaries,
+        "verified_count": verified_count,
+        "verification_rate": round(verification_rate * 100, 1),
+        "overall_verification": overall_status,
+        "score_adjustment": score_adjustment,
+        "adjustment_reason": " | ".join(adjustment_reasons) if adjustment_reasons else "No adjustments needed"
+    }
+
+
+def apply_document_verification(result, doc_context, documents_reviewed, rules):
+    """Add the document verification to an assessment and apply its score adjustment"""
+    if not doc_context:
+        return
+
+    result['document_verification'] = doc_context
+    result['documents_reviewed'] = documents_reviewed
 
-@app.route("/api/analyze-documents", methods=["POST"])
+    # APPLY DOCUMENT SCORE ADJUSTMENT
+    if 'score_adjustment' in doc_context:
+        original_score = result['risk_score']
+        adjustment = doc_context['score_adjustment']
+
+        # Apply adjustment
+        result['risk_score'] = max(0, min(100, original_score + adjustment))
+
+        # Recalculate risk level based on new score
+        result['risk_level'] = engine._score_to_level(result['risk_score'], rules)
+
+        # Add explanation
+        result['score_adjustment_applied'] = {
+            'original_score': original_score,
+            'adjustment': adjustment,
+            'final_score': result['risk_score'],
+            'reason': doc_context.get('adjustment_reason', 'Based on document verification')
+        }
+
+        # Update rationale
+        if adjustment > 0:
+            result['rationale'] += f" DOCUMENT ALERT: Risk increased by {adjustment} points due to document concerns."
+        elif adjustment < 0:
+            result['rationale'] += f" Documents verified successfully, risk reduced by {abs(adjustment)} points."
+
+
+@api.route("/api/analyze-documents", methods=["POST"])
 def analyze_documents():
     """
     Analyze uploaded KYC/AML documents to extract transaction details
@@ -717,16 +1572,8 @@ def analyze_documents():
             }), 503
         
         # Collect all uploaded documents
-        document_types = {
-            'sourceOfFunds': 'Source of Funds Statement',
-            'proofOfIdentity': 'Proof of Identity (KYC)',
-            'proofOfResidency': 'Proof of Residency',
-            'businessRegistration': 'Business Registration/Articles',
-            'contractsInvoices': 'Contracts/Invoices/Payroll'
-        }
-        
         uploaded_docs = {}
-        for doc_key, doc_label in document_types.items():
+        for doc_key, doc_label in DOCUMENT_TYPES.items():
             if doc_key in request.files:
                 file = request.files[doc_key]
                 if file and file.filename != '':
@@ -739,86 +1586,36 @@ def analyze_documents():
             return jsonify({"error": "No documents uploaded"}), 400
         
         # Analyze each document with OpenAI
-        document_analysis = {}
-        extracted_data_combined = {
-            "amount": None,
-            "currency": "USD",
-            "source_country": None,
-            "destination_country": None,
-            "purpose": None,
-            "counterparty_type": None,
-            "history_signals": ""
-        }
-        
+        extractions = []
         for doc_key, doc_info in uploaded_docs.items():
             file = doc_info['file']
-            doc_label = doc_info['label']
             
             # Reset file pointer
             file.seek(0)
             
-            # Check file type
-            content_type = file.content_type
-            filename = file.filename.lower()
-            
-            # Handle Word documents differently
-            if content_type in ['application/msword', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'] or filename.endswith(('.doc', '.docx')):
-                # For Word documents, inform user to convert or use text extraction
-                document_analysis[doc_key] = {
-                    "note": "Word document detected. For best results, please convert to PDF or image format.",
-                    "filename": file.filename,
-                    "status": "skipped"
-                }
+            image, skipped = prepare_document(file.read(), file.content_type, file.filename)
+            if skipped:
+                extractions.append((doc_key, None, {**skipped, "filename": file.filename}))
                 continue
             
-            # Read file data
-            file_data = file.read()
-            
-            # Handle PDFs - convert to image
-            if content_type == 'application/pdf' or filename.endswith('.pdf'):
-                if not PDF_SUPPORT:
-                    document_analysis[doc_key] = {
-                        "error": "PDF support not available. Please install pdf2image.",
-                        "filename": file.filename,
-                        "status": "error"
-                    }
-                    continue
-                
-                try:
-                    # Convert PDF first page to image
-                    images = convert_from_bytes(file_data, first_page=1, last_page=1)
-                    if images:
-                        # Convert PIL Image to bytes
-                        img_byte_arr = io.BytesIO()
-                        images[0].save(img_byte_arr, format='PNG')
-                        img_byte_arr = img_byte_arr.getvalue()
-                        
-                        # Encode as base64
-                        base64_image = base64.b64encode(img_byte_arr).decode('utf-8')
-                        image_format = 'png'
-                    else:
-                        document_analysis[doc_key] = {
-                            "error": "Could not convert PDF to image",
-                            "filename": file.filename,
-                            "status": "error"
-                        }
-                        continue
-                except Exception as e:
-                    document_analysis[doc_key] = {
-                        "error": f"PDF conversion failed: {str(e)}",
-                        "filename": file.filename,
-                        "status": "error"
-                    }
-                    continue
-            else:
-                # Handle images directly
-                base64_image = base64.b64encode(file_data).decode('utf-8')
-                image_format = content_type.split('/')[-1]
-                if image_format == 'jpeg':
-                    image_format = 'jpg'
-            
-            # Create document-specific prompt
-            system_prompt = f"""You are an expert KYC/AML compliance analyst analyzing: {doc_label}.
+            # Call OpenAI Vision API
+            with metrics.llm_call("document_extraction") as record:
+                response = openai_client.chat.completions.create(
+                    **extraction_request(doc_info['label'], *image)
+                )
+                record(response)
+            extractions.append((doc_key, *parse_extraction(response.choices[0].message.content)))
+        
+        return jsonify(combine_extractions(extractions, len(uploaded_docs))), 200
+        
+    except Exception as e:
+        return jsonify({"error": f"Failed to analyze documents: {str(e)}"}), 500
+
+
+def extraction_request(doc_label, base64_image, image_format):
+    """Arguments of the chat completion call extracting details from one document"""
+    # Create document-specific prompt
+    system_prompt = f"""You are an expert KYC/AML compliance analyst analyzing: {doc_label}.
 
 Extract relevant information for transaction compliance:
 - Transaction amount and currency
@@ -831,85 +1628,103 @@ Extract relevant information for transaction compliance:
 - Source of funds verification (if financial statement)
 
 Return a JSON object with all relevant fields you can extract."""
-            
-            # Call OpenAI Vision API
-            response = openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
+    
+    return {
+        "model": "gpt-4o-mini",
+        "messages": [
+            {
+                "role": "system",
+                "content": system_prompt
+            },
+            {
+                "role": "user",
+                "content": [
                     {
-                        "role": "system",
-                        "content": system_prompt
+                        "type": "text",
+                        "text": f"Analyze this {doc_label} document and extract transaction/compliance details. Return as JSON with fields: amount, currency, source_country, destination_country, purpose, counterparty_type, identity_verified, business_legitimate, red_flags, notes. Use null for fields you cannot determine."
                     },
                     {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": f"Analyze this {doc_label} document and extract transaction/compliance details. Return as JSON with fields: amount, currency, source_country, destination_country, purpose, counterparty_type, identity_verified, business_legitimate, red_flags, notes. Use null for fields you cannot determine."
-                            },
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/{image_format};base64,{base64_image}"
-                                }
-                            }
-                        ]
+                        "type": "image_url",
+                        "image_url": {
+                            "url": f"data:image/{image_format};base64,{base64_image}"
+                        }
                     }
-                ],
-                max_tokens=800,
-                temperature=0.2
-            )
-            
-            # Parse response
-            extracted_text = response.choices[0].message.content
-            
-            try:
-                # Find JSON in response
-                if "```json" in extracted_text:
-                    extracted_text = extracted_text.split("```json")[1].split("```")[0].strip()
-                elif "```" in extracted_text:
-                    extracted_text = extracted_text.split("```")[1].split("```")[0].strip()
-                
-                doc_data = json.loads(extracted_text)
-                document_analysis[doc_key] = doc_data
-                
-                # Merge transaction data (prioritize non-null values)
-                if doc_data.get("amount"):
-                    extracted_data_combined["amount"] = doc_data["amount"]
-                if doc_data.get("currency"):
-                    extracted_data_combined["currency"] = doc_data["currency"]
-                if doc_data.get("source_country"):
-                    extracted_data_combined["source_country"] = doc_data["source_country"]
-                if doc_data.get("destination_country"):
-                    extracted_data_combined["destination_country"] = doc_data["destination_country"]
-                if doc_data.get("purpose"):
-                    extracted_data_combined["purpose"] = doc_data["purpose"]
-                if doc_data.get("counterparty_type"):
-                    extracted_data_combined["counterparty_type"] = doc_data["counterparty_type"]
-                if doc_data.get("red_flags"):
-                    if extracted_data_combined["history_signals"]:
-                        extracted_data_combined["history_signals"] += "; " + doc_data["red_flags"]
-                    else:
-                        extracted_data_combined["history_signals"] = doc_data["red_flags"]
-                
-            except json.JSONDecodeError:
-                document_analysis[doc_key] = {
-                    "error": "Could not parse document data",
-                    "raw_response": extracted_text[:200]
-                }
+                ]
+            }
+        ],
+        "max_tokens": 800,
+        "temperature": 0.2
+    }
+
+
+def parse_extraction(extracted_text):
+    """
+    Parse the JSON a document extraction returned
+
+    Returns:
+        (extracted data, None), or (None, error entry) if it is not JSON
+    """
+    try:
+        # Find JSON in response
+        if "```json" in extracted_text:
+            extracted_text = extracted_text.split("```json")[1].split("```")[0].strip()
+        elif "```" in extracted_text:
+            extracted_text = extracted_text.split("```")[1].split("```")[0].strip()
         
-        # Return extracted data
-        return jsonify({
-            "extracted_data": extracted_data_combined,
-            "document_analysis": document_analysis,
-            "documents_analyzed": len(uploaded_docs),
-            "message": f"Successfully analyzed {len(uploaded_docs)} document(s)"
-        }), 200
+        return serialization.loads(extracted_text), None
         
-    except Exception as e:
-        return jsonify({"error": f"Failed to analyze documents: {str(e)}"}), 500
+    except ValueError:
+        return None, {
+            "error": "Could not parse document data",
+            "raw_response": extracted_text[:200]
+        }
+
+
+def combine_extractions(extractions, documents_analyzed):
+    """
+    Build the /api/analyze-documents response
+
+    Args:
+        extractions: (form field, extracted data, skip/error entry) triples
+            in upload order; later documents win conflicting fields
+        documents_analyzed: Number of uploaded documents
+    """
+    document_analysis = {}
+    extracted_data_combined = {
+        "amount": None,
+        "currency": "USD",
+        "source_country": None,
+        "destination_country": None,
+        "purpose": None,
+        "counterparty_type": None,
+        "history_signals": ""
+    }
+    
+    for doc_key, doc_data, problem in extractions:
+        if problem:
+            document_analysis[doc_key] = problem
+            continue
+        document_analysis[doc_key] = doc_data
+        
+        # Merge transaction data (prioritize non-null values)
+        for field in ("amount", "currency", "source_country", "destination_country", "purpose", "counterparty_type"):
+            if doc_data.get(field):
+                extracted_data_combined[field] = doc_data[field]
+        if doc_data.get("red_flags"):
+            if extracted_data_combined["history_signals"]:
+                extracted_data_combined["history_signals"] += "; " + doc_data["red_flags"]
+            else:
+                extracted_data_combined["history_signals"] = doc_data["red_flags"]
+    
+    # Return extracted data
+    return {
+        "extracted_data": extracted_data_combined,
+        "document_analysis": document_analysis,
+        "documents_analyzed": documents_analyzed,
+        "message": f"Successfully analyzed {documents_analyzed} document(s)"
+    }
 
 
 if __name__ == "__main__":
     # Run with debug=True for development
-    app.run(debug=True, host="0.0.0.0", port=8000)
+    create_app().run(debug=True, host="0.0.0.0", port=8000)
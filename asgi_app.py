@@ -0,0 +1,301 @@
+"""
+ASGI serving mode for the compliance review API
+Serves the OpenAI-bound endpoints natively async, so requests waiting on
+OpenAI hold no thread, and every other route through the Flask app
+
+Run with (after pip install -r requirements-asgi.txt):
+    uvicorn asgi_app:app --host 0.0.0.0 --port 8000
+
+Routes and payloads are the same as app.py. SQLite writes and PDF rendering
+(poppler) run on a thread pool (ASGI_THREADPOOL_SIZE); Flask routes run on
+their own pool (ASGI_WSGI_WORKERS), so slow exports cannot starve them.
+"""
+
+import asyncio
+import contextlib
+
+try:
+    import anyio.to_thread
+    from a2wsgi import WSGIMiddleware
+    from starlette.applications import Starlette
+    from starlette.concurrency import run_in_threadpool
+    from starlette.datastructures import UploadFile
+    from starlette.middleware import Middleware
+    from starlette.middleware.cors import CORSMiddleware
+    from starlette.responses import Response
+    from starlette.routing import Mount, Route
+    ASGI_SUPPORT = True
+except ImportError:
+    ASGI_SUPPORT = False
+
+from app import (
+    DOCUMENT_TYPES,
+    app as flask_app,
+    apply_document_verification,
+    combine_extractions,
+    db,
+    engine as flask_engine,
+    evidence_request,
+    extraction_request,
+    openai_client,
+    parse_extraction,
+    parse_transaction,
+    prepare_document,
+    rules_for_headers,
+    rules_manager,
+    summarize_evidence,
+)
+import metrics
+import profiler
+import serialization
+from compliance_engine import ComplianceEngine
+from config import Config
+
+# Async OpenAI client for the natively async routes
+async_openai_client = None
+if Config.is_openai_enabled():
+    try:
+        from openai import AsyncOpenAI
+        async_openai_client = AsyncOpenAI(api_key=Config.OPENAI_API_KEY)
+    except Exception as e:
+        print(f"⚠ Async OpenAI initialization failed: {e}")
+
+engine = ComplianceEngine(
+    openai_client=openai_client,
+    rules_manager=rules_manager,
+    async_openai_client=async_openai_client
+)
+if flask_engine.stats:
+    # Both serving paths count into the same stats
+    engine.enable_instrumentation(flask_engine.stats)
+
+
+def json_response(payload, status_code: int = 200):
+    """Render a payload exactly as the Flask routes' jsonify() does"""
+    flask_response = flask_app.json.response(payload)
+    return Response(flask_response.get_data(), status_code=status_code, media_type=flask_response.mimetype)
+
+
+class ServerTimingMiddleware:
+    """
+    Time a natively async route: count it in /api/metrics and report its
+    stages in a Server-Timing header (Flask routes do this in app.py)
+    """
+
+    def __init__(self, app, route: str):
+        self.app = app
+        self.route = route
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        timings = metrics.start_request()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                metrics.end_request(self.route, scope["method"], message["status"])
+                headers = [*message.get("headers", []), (b"server-timing", timings.server_timing().encode())]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_timing)
+
+
+def uploaded_documents(form):
+    """Get the non-empty document uploads of a form: field -> UploadFile"""
+    return {
+        doc_key: form[doc_key]
+        for doc_key in DOCUMENT_TYPES
+        if isinstance(form.get(doc_key), UploadFile) and form[doc_key].filename
+    }
+
+
+async def read_document(upload):
+    """Read an upload and prepare it for the vision model off the event loop"""
+    file_data = await upload.read()
+    # pdf2image renders PDFs with poppler: CPU-bound, so it runs on the thread pool
+    return await run_in_threadpool(prepare_document, file_data, upload.content_type, upload.filename)
+
+
+async def risk_check(request):
+    """Async /api/risk-check (see app.risk_check)"""
+    try:
+        # File stats, locks and tenant compiles stay off the event loop
+        await run_in_threadpool(rules_manager.sync_version)
+        with metrics.stage("validate"):
+            data = await request.json()
+            transaction, error = parse_transaction(data)
+        if error:
+            return json_response({"error": error}, 400)
+
+        # Perform compliance review with the tenant's rules
+        rules, error = await run_in_threadpool(rules_for_headers, request.headers)
+        if error:
+            message, status = error
+            return json_response({"error": message}, status)
+        with metrics.stage("review"):
+            result = await engine.review_async(transaction, rules=rules)
+
+        # Save assessment to database
+        with metrics.stage("save"):
+            result['assessment_id'] = await run_in_threadpool(db.save_assessment, data, result)
+
+        return json_response(result)
+
+    except Exception as e:
+        return json_response({"error": f"Server error: {str(e)}"}, 500)
+
+
+async def risk_check_with_documents(request):
+    """Async /api/risk-check-with-documents (see app.risk_check_with_documents)"""
+    try:
+        await run_in_threadpool(rules_manager.sync_version)
+        async with request.form() as form:
+            # Get transaction data
+            transaction_data_str = form.get('transaction_data')
+            if not transaction_data_str or not isinstance(transaction_data_str, str):
+                return json_response({"error": "No transaction data provided"}, 400)
+
+            with metrics.stage("validate"):
+                transaction_data = serialization.loads(transaction_data_str)
+                transaction, error = parse_transaction(transaction_data)
+            if error:
+                return json_response({"error": error}, 400)
+
+            # Perform standard compliance review with the tenant's rules
+            rules, error = await run_in_threadpool(rules_for_headers, request.headers)
+            if error:
+                message, status = error
+                return json_response({"error": message}, status)
+            with metrics.stage("review"):
+                result = await engine.review_async(transaction, rules=rules)
+
+            # Documents are reviewed concurrently when OpenAI is available
+            uploads = uploaded_documents(form)
+            if async_openai_client and uploads:
+                doc_context = await analyze_documents_as_evidence(uploads, transaction, result)
+                apply_document_verification(result, doc_context, len(uploads), rules)
+
+        # Save assessment to database
+        with metrics.stage("save"):
+            result['assessment_id'] = await run_in_threadpool(db.save_assessment, transaction_data, result)
+
+        return json_response(result)
+
+    except Exception as e:
+        return json_response({"error": f"Server error: {str(e)}"}, 500)
+
+
+async def analyze_documents_as_evidence(uploads, transaction, risk_result):
+    """
+    Review uploaded documents concurrently (see app.analyze_documents_as_evidence)
+
+    Returns:
+        Verification context with the score adjustment, or None
+    """
+    async def review(doc_key, upload):
+        doc_label = DOCUMENT_TYPES[doc_key]
+        try:
+            image, skipped = await read_document(upload)
+            if skipped:
+                return None
+            with metrics.llm_call("document_evidence") as record:
+                response = await async_openai_client.chat.completions.create(
+                    **evidence_request(doc_label, transaction, risk_result, *image)
+                )
+                record(response)
+            return doc_label, serialization.loads(response.choices[0].message.content)
+        except Exception as e:
+            print(f"Error analyzing {doc_label}: {e}")
+            return None
+
+    try:
+        reviews = await asyncio.gather(*(review(doc_key, upload) for doc_key, upload in uploads.items()))
+        return summarize_evidence([review for review in reviews if review])
+    except Exception as e:
+        print(f"Error in document evidence analysis: {e}")
+        return None
+
+
+async def analyze_documents(request):
+    """Async /api/analyze-documents (see app.analyze_documents)"""
+    try:
+        # Check if OpenAI is available
+        if not async_openai_client:
+            return json_response({
+                "error": "Document analysis requires OpenAI API. Please configure OPENAI_API_KEY."
+            }, 503)
+
+        async with request.form() as form:
+            uploads = uploaded_documents(form)
+            if not uploads:
+                return json_response({"error": "No documents uploaded"}, 400)
+
+            async def extract(doc_key, upload):
+                image, skipped = await read_document(upload)
+                if skipped:
+                    return doc_key, None, {**skipped, "filename": upload.filename}
+                with metrics.llm_call("document_extraction") as record:
+                    response = await async_openai_client.chat.completions.create(
+                        **extraction_request(DOCUMENT_TYPES[doc_key], *image)
+                    )
+                    record(response)
+                return (doc_key, *parse_extraction(response.choices[0].message.content))
+
+            # gather() keeps upload order, so documents merge as in the Flask route
+            extractions = await asyncio.gather(*(extract(doc_key, upload) for doc_key, upload in uploads.items()))
+
+        return json_response(combine_extractions(extractions, len(uploads)))
+
+    except Exception as e:
+        return json_response({"error": f"Failed to analyze documents: {str(e)}"}, 500)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    """Size the thread pool used for SQLite and PDF rendering"""
+    anyio.to_thread.current_default_thread_limiter().total_tokens = Config.ASGI_THREADPOOL_SIZE
+    yield
+
+
+def create_asgi_app(wsgi_workers: int = None):
+    """
+    Build the ASGI application
+
+    Args:
+        wsgi_workers: Threads running Flask routes (default: Config.ASGI_WSGI_WORKERS)
+    """
+    # Same CORS policy as flask_cors.CORS(app); preflight requests fall
+    # through to the Flask app, which answers them. Each route is timed
+    # under its path, as Flask routes are under theirs.
+    def middleware(route):
+        return [
+            Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"]),
+            Middleware(ServerTimingMiddleware, route=route),
+        ]
+
+    # Samples from POST /api/admin/profile taken while a handler runs on
+    # the event loop are attributed to its route
+    for handler, route in ((risk_check, "POST /api/risk-check"),
+                           (risk_check_with_documents, "POST /api/risk-check-with-documents"),
+                           (analyze_documents, "POST /api/analyze-documents")):
+        profiler.label_route(handler, route)
+
+    return Starlette(
+        routes=[
+            Route("/api/risk-check", risk_check, methods=["POST"], middleware=middleware("/api/risk-check")),
+            Route("/api/risk-check-with-documents", risk_check_with_documents, methods=["POST"],
+                  middleware=middleware("/api/risk-check-with-documents")),
+            Route("/api/analyze-documents", analyze_documents, methods=["POST"],
+                  middleware=middleware("/api/analyze-documents")),
+            Mount("/", app=WSGIMiddleware(flask_app, workers=wsgi_workers or Config.ASGI_WSGI_WORKERS)),
+        ],
+        lifespan=lifespan,
+    )
+
+
+if ASGI_SUPPORT:
+    app = create_asgi_app()
+else:
+    app = None
+    print("⚠ ASGI serving mode needs starlette, a2wsgi and python-multipart (pip install -r requirements-asgi.txt)")
@@ -0,0 +1,1155 @@
+#!/usr/bin/env python3
+"""
+Performance benchmarks for the Compliance Review System
+Run `python benchmark.py --help` to list the available benchmarks.
+`benchmark.py suite --output results.json` runs the standard suite on
+seeded datasets; `benchmark.py compare` flags regressions between two
+result files.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import types
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+import metrics
+import serialization
+from compliance_engine import ComplianceEngine, EngineStats, RuleHits, Transaction, CustomerType
+from database import AssessmentDB
+from export import iter_csv, iter_ndjson
+from rule_dsl import compile_custom_rules
+from rules_manager import RULES_FILE, RulesManager, write_atomic
+from storage import InMemoryAssessmentStore
+
+COUNTRIES = [
+    "Singapore", "United Kingdom", "Philippines", "United States",
+    "Vietnam", "Indonesia", "India", "Nigeria", "Cayman Islands", "Brazil",
+]
+PURPOSES = ["payroll", "services", "trade finance", "remittance", "investment", "gambling", "consulting"]
+COUNTERPARTY_TYPES = {
+    "freelancer": CustomerType.LOW,
+    "smb": CustomerType.MEDIUM,
+    "corporate": CustomerType.MEDIUM,
+    "ngo": CustomerType.HIGH,
+}
+DOCUMENT_NOTES = [
+    "Invoice amounts match the declared transfer",
+    "The invoice date is after the transfer date",
+    "Bank statement shows regular payroll deposits",
+    "Passport scan is blurry and the expiry date is unreadable",
+    "Business registration lists a different director",
+    "Contract terms are consistent with the stated purpose",
+    "Source of funds letter is unsigned",
+    "Utility bill address does not match the residency claim",
+]
+
+
+def generate_assessments(count: int, seed: int = 42) -> Iterator[Tuple[Dict, Dict]]:
+    """
+    Yield (transaction_data, assessment_result) pairs scored by the real engine
+
+    The same seed always produces the same dataset. About one in five
+    assessments carries document verification notes.
+    """
+    rng = random.Random(seed)
+    engine = ComplianceEngine()
+
+    for _ in range(count):
+        counterparty = rng.choice(list(COUNTERPARTY_TYPES))
+        transaction_data = {
+            "amount": round(rng.lognormvariate(8.5, 1.2), 2),
+            "currency": "USD",
+            "source_country": rng.choice(COUNTRIES),
+            "destination_country": rng.choice(COUNTRIES),
+            "purpose": rng.choice(PURPOSES),
+            "counterparty_type": counterparty,
+            "history_signals": "multiple small transactions" if rng.random() < 0.1 else "",
+        }
+        result = engine.review(Transaction(
+            amount_usd=transaction_data["amount"],
+            origin_country=transaction_data["source_country"],
+            destination_country=transaction_data["destination_country"],
+            purpose=transaction_data["purpose"],
+            customer_type=COUNTERPARTY_TYPES[counterparty],
+            has_structuring_signals=bool(transaction_data["history_signals"]),
+        ))
+        if rng.random() < 0.2:
+            notes = rng.sample(DOCUMENT_NOTES, 2)
+            result["document_verification"] = {
+                "overall_verification": rng.choice([
+                    "Documents strongly support the transaction",
+                    "Documents raise significant concerns about the transaction",
+                ]),
+                "document_reviews": [
+                    {"document_type": "Contracts/Invoices/Payroll", "analysis": {"notes": notes[0], "red_flags": [notes[1]]}}
+                ],
+            }
+        yield transaction_data, result
+
+
+def populate(db: AssessmentDB, count: int, seed: int = 42, batch_size: int = 10000) -> float:
+    """
+    Insert a generated dataset spread over the last year, in large transactions
+
+    Returns:
+        Rows inserted per second
+    """
+    start_day = datetime(2025, 1, 1)
+    rows = []
+    started = time.perf_counter()
+    for index, (transaction_data, result) in enumerate(generate_assessments(count, seed)):
+        row = db._build_row(transaction_data, result)
+        row["timestamp"] = (start_day + timedelta(seconds=index * 365 * 86400 // max(count, 1))).isoformat()
+        rows.append(row)
+        if len(rows) >= batch_size:
+            write_rows(db, rows)
+            rows = []
+    if rows:
+        write_rows(db, rows)
+    return count / (time.perf_counter() - started)
+
+
+def write_rows(db: AssessmentDB, rows: List[Dict]):
+    """Write prepared rows with one transaction per database file"""
+    for path, shard_rows in db._group_by_shard(rows).items():
+        conn = db._connect(path)
+        with conn:
+            db._write_rows(conn, shard_rows)
+        conn.close()
+
+
+def measure(func, repeat: int, setup=None) -> Dict:
+    """
+    Run func repeatedly and summarize its latency in milliseconds
+
+    Args:
+        func: Operation to time
+        repeat: Timed runs
+        setup: Called before each run, outside the timing
+    """
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "runs": repeat,
+        "p50_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        "max_ms": round(timings[-1], 3),
+    }
+
+
+def bench_search(args) -> List[Dict]:
+    """Full-text search latency over a generated dataset"""
+    queries = [
+        "invoice",
+        "documents raised concerns invoices",
+        "high risk investment",
+        "passport expiry",
+        "structuring",
+    ]
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db = AssessmentDB(os.path.join(tmp, "bench.db"))
+        if not db.search_enabled:
+            print("❌ This SQLite build has no FTS5 support")
+            return results
+
+        print(f"Populating {args.rows:,} assessments...")
+        rate = populate(db, args.rows, seed=args.seed)
+        print(f"  {rate:,.0f} rows/s with search index maintenance")
+
+        for query in queries:
+            for offset in (0, 100):
+                stats = measure(
+                    lambda: db.search_assessments(query, limit=20, offset=offset),
+                    args.repeat
+                )
+                stats.update({"benchmark": "search", "query": query, "offset": offset, "rows": args.rows})
+                results.append(stats)
+                print(f"  {query!r:40} offset={offset:<4} p50={stats['p50_ms']:8.3f}ms p95={stats['p95_ms']:8.3f}ms")
+    return results
+
+
+def bench_import(args) -> List[Dict]:
+    """Bulk import throughput for exported CSV/JSONL and raw transactions"""
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        source = AssessmentDB(os.path.join(tmp, "source.db"))
+        print(f"Populating {args.rows:,} assessments...")
+        populate(source, args.rows, seed=args.seed)
+
+        files = {"assessments.csv": iter_csv, "assessments.jsonl": iter_ndjson}
+        for name, encoder in files.items():
+            with open(os.path.join(tmp, name), "w", newline="", encoding="utf-8") as output:
+                for chunk in encoder(source.iter_assessment_rows()):
+                    output.write(chunk)
+        with open(os.path.join(tmp, "transactions.jsonl"), "w", encoding="utf-8") as output:
+            for transaction_data, _ in generate_assessments(args.rows, seed=args.seed + 1):
+                output.write(json.dumps(transaction_data) + "\n")
+
+        cases = [
+            ("assessments.csv", {"index_search": False}),
+            ("assessments.csv", {}),
+            ("assessments.jsonl", {}),
+            ("transactions.jsonl", {"score": True}),
+        ]
+        for index, (name, options) in enumerate(cases):
+            db = AssessmentDB(os.path.join(tmp, f"import_{index}.db"))
+            report = db.bulk_import(os.path.join(tmp, name), **options)
+            label = ", ".join(f"{key}={value}" for key, value in options.items()) or "defaults"
+            results.append({
+                "benchmark": "import", "file": name, "options": options,
+                "rows": report['rows_imported'], "rows_per_s": report['rows_per_s'],
+            })
+            print(f"  {name:20} {label:20} {report['rows_per_s']:>10,} rows/s")
+    return results
+
+
+def bench_storage(args) -> List[Dict]:
+    """Save/read/export throughput per storage backend (conformance: tests/test_storage.py)"""
+    results = []
+    pairs = list(generate_assessments(args.rows, seed=args.seed))
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = {
+            "sqlite": lambda: AssessmentDB(os.path.join(tmp, "sqlite.db")),
+            "sqlite-write-behind": lambda: AssessmentDB(os.path.join(tmp, "write_behind.db"), write_behind=True),
+            "memory": InMemoryAssessmentStore,
+        }
+        for name, factory in backends.items():
+            store = factory()
+            started = time.perf_counter()
+            ids = [store.save_assessment(transaction_data, result) for transaction_data, result in pairs]
+            store.flush()
+            save_rate = len(pairs) / (time.perf_counter() - started)
+
+            rng = random.Random(args.seed)
+            timings = {
+                "get": measure(lambda: store.get_assessment_by_id(rng.choice(ids)), args.repeat),
+                "list": measure(lambda: store.get_all_assessments(limit=100), args.repeat),
+                "statistics": measure(lambda: store.get_statistics(), args.repeat),
+            }
+            started = time.perf_counter()
+            exported = sum(1 for _ in store.iter_assessment_rows())
+            export_rate = exported / (time.perf_counter() - started)
+            store.close()
+
+            results.append({
+                "benchmark": "storage", "backend": name, "rows": len(pairs),
+                "save_rows_per_s": round(save_rate), "export_rows_per_s": round(export_rate),
+                **{f"{operation}_p50_ms": stats['p50_ms'] for operation, stats in timings.items()},
+            })
+            print(f"  {name:20} save {save_rate:>10,.0f} rows/s  export {export_rate:>10,.0f} rows/s  "
+                  + "  ".join(f"{operation} p50={stats['p50_ms']:.3f}ms" for operation, stats in timings.items()))
+    return results
+
+
+# Table sizes measured by the scale benchmark (up to --rows)
+SCALE_SIZES = (10_000, 1_000_000)
+
+
+def bench_scale(args) -> List[Dict]:
+    """save_assessment, get_all_assessments and get_statistics latency as the SQLite table grows"""
+    results = []
+    sizes = [size for size in SCALE_SIZES if size <= args.rows] or [args.rows]
+    # Assessments saved by the timed saves, separate from the table contents
+    new_pairs = itertools.cycle(list(generate_assessments(args.repeat, seed=args.seed + len(SCALE_SIZES))))
+    with tempfile.TemporaryDirectory() as tmp:
+        db = AssessmentDB(os.path.join(tmp, "scale.db"))
+        rows = 0
+        for step, size in enumerate(sizes):
+            print(f"Populating {size:,} assessments...")
+            # Each step adds its own reproducible dataset on top of the last
+            populate_rate = populate(db, size - rows, seed=args.seed + step)
+            rows = size
+
+            timings = {
+                "save": measure(lambda: db.save_assessment(*next(new_pairs)), args.repeat),
+                "list": measure(lambda: db.get_all_assessments(limit=100), args.repeat),
+                "list_deep": measure(lambda: db.get_all_assessments(limit=100, offset=size // 2), args.repeat),
+                "statistics": measure(db.get_statistics, args.repeat),
+            }
+            rows += args.repeat
+            results.append({
+                "benchmark": "scale", "backend": "sqlite", "rows": size,
+                "populate_rows_per_s": round(populate_rate),
+                **{f"{operation}_p50_ms": stats['p50_ms'] for operation, stats in timings.items()},
+                **{f"{operation}_p95_ms": stats['p95_ms'] for operation, stats in timings.items()},
+            })
+            print(f"  {size:>10,} rows  " + "  ".join(
+                f"{operation} p50={stats['p50_ms']:.3f}ms" for operation, stats in timings.items()))
+        db.close()
+    return results
+
+
+def bench_json(args) -> List[Dict]:
+    """Save/list/detail round trips with each JSON backend, per storage backend"""
+    results = []
+    pairs = list(generate_assessments(args.rows, seed=args.seed))
+    default_backend = serialization.JSON_BACKEND
+    # Responses of the stdlib backend, which every other backend must match
+    expected = {}
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for json_backend in reversed(serialization.available_backends()):
+                serialization.use_backend(json_backend)
+                stores = {
+                    "sqlite": lambda: AssessmentDB(os.path.join(tmp, f"{json_backend}.db")),
+                    "memory": InMemoryAssessmentStore,
+                }
+                for store_backend, factory in stores.items():
+                    store = factory()
+                    started = time.perf_counter()
+                    ids = [store.save_assessment(transaction_data, result) for transaction_data, result in pairs]
+                    store.flush()
+                    save_rate = len(pairs) / (time.perf_counter() - started)
+
+                    # What the API does: read, then encode the response as jsonify() does
+                    def list_page():
+                        return serialization.dumpb(store.get_all_assessments(limit=100), sort_keys=True)
+
+                    def detail(assessment_id):
+                        return serialization.dumpb(store.get_assessment_by_id(assessment_id), sort_keys=True)
+
+                    # Timestamps differ between runs, everything else must match
+                    responses = [serialization.loads(detail(assessment_id)) for assessment_id in ids[:50]]
+                    for response in responses:
+                        response.pop("timestamp")
+                    if store_backend in expected:
+                        assert responses == expected[store_backend], f"{json_backend} responses differ from json"
+                    else:
+                        expected[store_backend] = responses
+
+                    rng = random.Random(args.seed)
+                    timings = {
+                        "list": measure(list_page, args.repeat),
+                        "detail": measure(lambda: detail(rng.choice(ids)), args.repeat),
+                    }
+                    store.close()
+
+                    results.append({
+                        "benchmark": "json", "json_backend": json_backend, "backend": store_backend,
+                        "rows": len(pairs), "save_rows_per_s": round(save_rate),
+                        **{f"{operation}_p50_ms": stats["p50_ms"] for operation, stats in timings.items()},
+                    })
+                    print(f"  {json_backend:8} {store_backend:7} save {save_rate:>10,.0f} rows/s  "
+                          + "  ".join(f"{operation} p50={stats['p50_ms']:.3f}ms" for operation, stats in timings.items()))
+    finally:
+        serialization.use_backend(default_backend)
+    return results
+
+
+def generate_transactions(count: int, seed: int = 42) -> List[Transaction]:
+    """Random transactions for the engine benchmarks"""
+    rng = random.Random(seed)
+    return [
+        Transaction(
+            amount_usd=round(rng.lognormvariate(8.5, 1.2), 2),
+            origin_country=rng.choice(COUNTRIES),
+            destination_country=rng.choice(COUNTRIES),
+            purpose=rng.choice(PURPOSES),
+            customer_type=rng.choice(list(CustomerType)),
+            has_structuring_signals=rng.random() < 0.1,
+        )
+        for _ in range(count)
+    ]
+
+
+def builtin_rules_as_dsl(rules: Dict) -> List[Dict]:
+    """Express the engine's built-in risk factors as custom rules"""
+    country, purpose, customer = (rules["country_risk_scores"], rules["purpose_risk_scores"],
+                                  rules["customer_type_scores"])
+    thresholds = rules["amount_thresholds"]
+    in_list = lambda field, name: {"field": field, "in_rules": name}
+    not_in = lambda field, name: {"not": in_list(field, name)}
+    return [
+        {"first": [
+            {"id": "dsl_country_high", "when": in_list("origin_country", "high_risk_countries"),
+             "score": country["high"], "text": "Origin country '{origin_country}' classified as high-risk"},
+            {"id": "dsl_country_medium", "when": in_list("origin_country", "medium_risk_countries"),
+             "score": country["medium"], "text": "Origin country '{origin_country}' classified as medium-risk"},
+            {"id": "dsl_country_low", "when": in_list("origin_country", "low_risk_countries"),
+             "score": country["low"]},
+            {"id": "dsl_country_unknown", "score": country["medium"],
+             "text": "Origin country '{origin_country}' not in known risk database"},
+        ]},
+        {"first": [
+            {"id": "dsl_purpose_high", "when": in_list("purpose", "high_risk_purposes"),
+             "score": purpose["high"], "text": "Transaction purpose '{purpose}' classified as high-risk"},
+            {"id": "dsl_purpose_medium", "when": in_list("purpose", "medium_risk_purposes"),
+             "score": purpose["medium"], "text": "Transaction purpose '{purpose}' classified as medium-risk"},
+            {"id": "dsl_purpose_low", "when": in_list("purpose", "low_risk_purposes"), "score": purpose["low"]},
+            {"id": "dsl_purpose_unknown", "score": purpose["medium"],
+             "text": "Transaction purpose '{purpose}' not in known database"},
+        ]},
+        {"first": [
+            {"id": "dsl_customer_high", "when": {"field": "customer_type", "eq": "high"},
+             "score": customer["high"], "text": "Customer classified as PEP/NGO (high-risk profile)"},
+            {"id": "dsl_customer_medium", "when": {"field": "customer_type", "eq": "medium"},
+             "score": customer["medium"]},
+            {"id": "dsl_customer_low", "score": customer["low"]},
+        ]},
+        {"id": "dsl_amount_high_risk_origin", "when": {"all": [
+            {"field": "amount", "gt": thresholds["high_risk_origin_threshold"]},
+            in_list("origin_country", "high_risk_countries")]},
+         "score": 40, "text": f"Amount ${{amount:,.2f}} exceeds ${thresholds['high_risk_origin_threshold']:,.0f} "
+                              "from high-risk country"},
+        {"first": [
+            {"id": "dsl_amount_general_high", "when": {"field": "amount", "gt": thresholds["general_high_threshold"]},
+             "score": 40, "text": f"Amount ${{amount:,.2f}} exceeds ${thresholds['general_high_threshold']:,.0f} threshold"},
+            {"id": "dsl_amount_moderate", "when": {"field": "amount", "gt": thresholds["moderate_threshold"]},
+             "score": 15,
+             "text": f"Amount ${{amount:,.2f}} is above moderate threshold (${thresholds['moderate_threshold']:,.0f})"},
+        ]},
+        {"id": "dsl_structuring", "when": {"field": "structuring_signals", "eq": True},
+         "score": 15, "text": "Structuring signals detected (multiple small transactions)"},
+    ]
+
+
+def builtin_score(engine: ComplianceEngine, transaction: Transaction, rules, hits: RuleHits) -> int:
+    """Uncapped score of the built-in risk factors, computed as ComplianceEngine.review() does"""
+    return (
+        rules.country_risk_scores[engine._assess_country_risk(transaction.origin_country, rules, hits)]
+        + rules.purpose_risk_scores[engine._assess_purpose_risk(transaction.purpose, rules, hits)]
+        + rules.customer_type_scores[transaction.customer_type.value]
+        + (engine._assess_customer_risk(transaction.customer_type, hits) and 0)
+        + engine._assess_amount_risk(transaction.amount_usd, transaction.origin_country, rules, hits)
+        + engine._assess_structuring(transaction.has_structuring_signals, hits)
+    )
+
+
+def bench_rules(args) -> List[Dict]:
+    """Compiled custom rules against the equivalent built-in risk factors"""
+    engine = ComplianceEngine(rules_manager=RulesManager())
+    rules = engine.rules
+    compiled = compile_custom_rules({**rules.rules, "custom_rules": builtin_rules_as_dsl(rules.rules)})
+    transactions = generate_transactions(args.rows, args.seed)
+
+    for transaction in transactions:
+        expected = builtin_score(engine, transaction, rules, RuleHits())
+        actual = compiled.evaluate(transaction, RuleHits().add)
+        assert actual == expected, f"DSL scored {actual}, built-in rules {expected}: {transaction}"
+    print(f"✓ {len(compiled)} DSL rules score all {len(transactions):,} transactions like the built-in rules")
+
+    def builtin_pass():
+        for transaction in transactions:
+            builtin_score(engine, transaction, rules, RuleHits())
+
+    def dsl_pass():
+        evaluate = compiled.evaluate
+        for transaction in transactions:
+            evaluate(transaction, RuleHits().add)
+
+    # Alternate the two passes and keep the best time of each, so load
+    # from other processes affects both alike
+    passes = {"built-in": builtin_pass, "compiled DSL": dsl_pass}
+    best = {name: float("inf") for name in passes}
+    for _ in range(args.repeat):
+        for name, run in passes.items():
+            started = time.perf_counter()
+            run()
+            best[name] = min(best[name], time.perf_counter() - started)
+
+    results = []
+    rates = {}
+    for name in passes:
+        rates[name] = len(transactions) / best[name]
+        results.append({"benchmark": "rules", "path": name, "rows": len(transactions),
+                        "transactions_per_s": round(rates[name]), "best_pass_ms": round(best[name] * 1000, 3)})
+        print(f"  {name:14} {rates[name]:>12,.0f} transactions/s  (best pass {best[name] * 1000:.1f}ms)")
+
+    ratio = rates["compiled DSL"] / rates["built-in"]
+    marker = "✓" if ratio >= 0.95 else "⚠"
+    print(f"{marker} Compiled DSL runs at {ratio:.2f}x the speed of the built-in rules")
+    return results
+
+
+def bench_reload(args) -> List[Dict]:
+    """Rules reload latency: change checks, reloads of an edited file, saves and cross-worker syncs"""
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        # A copy of the rules, so the benchmark leaves rules_config.json,
+        # its version file and the history untouched
+        rules_file = Path(tmp) / RULES_FILE.name
+        if RULES_FILE.exists():
+            write_atomic(rules_file, RULES_FILE.read_text())
+        manager = RulesManager(rules_file=str(rules_file), data_dir=tmp)
+        other_worker = RulesManager(rules_file=str(rules_file), data_dir=tmp)
+        rules = manager.get_rules()
+        edits = itertools.count(1)
+
+        def edited():
+            # A top-level key the engine ignores still makes a new ruleset
+            return {**rules, "benchmark_edit": next(edits)}
+
+        def edit_file():
+            write_atomic(rules_file, json.dumps(edited(), indent=2))
+
+        def reload():
+            assert manager.check_for_changes(), "edited rules file was not reloaded"
+
+        def sync():
+            assert manager.sync_version(), "rules saved by the other worker were not adopted"
+
+        cases = {
+            "check, unchanged": (lambda: manager.check_for_changes(), None),
+            "reload edited file": (reload, edit_file),
+            "save": (lambda: manager.save_rules(edited()), None),
+            "sync from other worker": (sync, lambda: other_worker.save_rules(edited())),
+        }
+        for name, (run, setup) in cases.items():
+            # Every reload reports itself; keep the output to the results
+            with contextlib.redirect_stdout(io.StringIO()):
+                stats = measure(run, args.repeat, setup)
+            stats.update({"benchmark": "reload", "case": name})
+            results.append(stats)
+            print(f"  {name:24} p50={stats['p50_ms']:8.3f}ms p95={stats['p95_ms']:8.3f}ms")
+    return results
+
+
+def bench_engine(args) -> List[Dict]:
+    """Review throughput without and with the engine instrumentation (EngineStats)"""
+    engine = ComplianceEngine(rules_manager=RulesManager())
+    transactions = generate_transactions(args.rows, args.seed)
+    expected = engine.review_batch(transactions)
+
+    stats = engine.enable_instrumentation(EngineStats(sample_every=1))
+    assert engine.review_batch(transactions) == expected, "instrumentation changed review results"
+    snapshot = stats.snapshot()
+    assert snapshot["reviews"] == len(transactions)
+    assert sum(snapshot["rule_hits"].values()) == sum(len(result["triggered_rule_ids"]) for result in expected)
+    assert all(sum(tiers.values()) == len(transactions) for tiers in snapshot["tiers"].values())
+    assert all(step["samples"] == len(transactions) for step in snapshot["steps"].values())
+    print(f"✓ Instrumentation counts every rule hit and tier of {len(transactions):,} reviews")
+
+    def instrumented(sample_every):
+        def enable():
+            engine.enable_instrumentation(EngineStats(sample_every=sample_every))
+        return enable
+
+    # Alternate the modes and keep the best pass of each
+    modes = {
+        "disabled": engine.disable_instrumentation,
+        "enabled, 1 in 100 timed": instrumented(100),
+        "enabled, every call timed": instrumented(1),
+    }
+    best = {mode: float("inf") for mode in modes}
+    for _ in range(args.repeat):
+        for mode, configure in modes.items():
+            configure()
+            started = time.perf_counter()
+            engine.review_batch(transactions)
+            best[mode] = min(best[mode], time.perf_counter() - started)
+
+    results = []
+    for mode, seconds in best.items():
+        rate = len(transactions) / seconds
+        overhead = seconds / best["disabled"] - 1
+        results.append({"benchmark": "engine", "mode": mode, "rows": len(transactions),
+                        "reviews_per_s": round(rate), "overhead_pct": round(overhead * 100, 1)})
+        print(f"  {mode:26} {rate:>10,.0f} reviews/s  overhead {overhead * 100:5.1f}%")
+
+    engine.enable_instrumentation(EngineStats(sample_every=1))
+    engine.review_batch(transactions)
+    print("Slowest steps (avg):")
+    for step, latency in sorted(engine.stats.snapshot()["steps"].items(), key=lambda item: -item[1]["avg_us"]):
+        print(f"  {step:22} {latency['avg_us']:8.2f}µs")
+    engine.disable_instrumentation()
+    return results
+
+
+def bench_batch(args) -> List[Dict]:
+    """One /api/risk-check request per transaction against /api/risk-check/batch"""
+    results = []
+    from config import Config
+    Config.STORAGE_BACKEND = "memory"
+    import app as flask_module
+    # Rules only: the batch endpoint makes no OpenAI calls
+    flask_module.engine.openai_client = None
+    client = flask_module.app.test_client()
+    payloads = [transaction_data for transaction_data, _ in generate_assessments(args.rows, seed=args.seed)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        flask_module.db = AssessmentDB(os.path.join(tmp, "batch.db"))
+
+        started = time.perf_counter()
+        for payload in payloads:
+            assert client.post("/api/risk-check", json=payload).status_code == 200
+        rates = {"single requests": len(payloads) / (time.perf_counter() - started)}
+
+        body = "".join(json.dumps(payload) + "\n" for payload in payloads)
+        for chunk_size in (100, Config.RISK_CHECK_BATCH_CHUNK_SIZE):
+            started = time.perf_counter()
+            response = client.post(f"/api/risk-check/batch?chunk_size={chunk_size}", data=body,
+                                   content_type="application/x-ndjson")
+            summary = json.loads(response.get_data(as_text=True).splitlines()[-1])["summary"]
+            rates[f"batch, chunks of {chunk_size}"] = len(payloads) / (time.perf_counter() - started)
+            assert summary == {"rows": len(payloads), "saved": len(payloads), "errors": 0}, summary
+        flask_module.db.close()
+
+    for name, rate in rates.items():
+        results.append({"benchmark": "batch", "path": name, "rows": len(payloads), "rows_per_s": round(rate)})
+        print(f"  {name:24} {rate:>10,.0f} transactions/s")
+    print(f"✓ Batch is {max(rates.values()) / rates['single requests']:.1f}x faster than single requests")
+    return results
+
+
+def bench_http_cache(args) -> List[Dict]:
+    """Polling latency of ETag-tagged endpoints: uncached, cached and 304"""
+    results = []
+    from config import Config
+    Config.STORAGE_BACKEND = "memory"
+    import app as flask_module
+    client = flask_module.app.test_client()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        flask_module.db = AssessmentDB(os.path.join(tmp, "http_cache.db"))
+        print(f"Populating {args.rows:,} assessments...")
+        populate(flask_module.db, args.rows, seed=args.seed)
+        hot_id = random.Random(args.seed).randint(1, args.rows)
+
+        for url in ("/api/rules", "/api/statistics", f"/api/assessments/{hot_id}"):
+            def get(headers=None):
+                response = client.get(url, headers=headers)
+                assert response.status_code in (200, 304), response.status_code
+                return response
+
+            def uncached():
+                flask_module.response_cache.clear()
+                get()
+
+            etag = get().headers["ETag"]
+            cases = {
+                "uncached": uncached,
+                "cached": get,
+                "304": lambda: get({"If-None-Match": etag}),
+            }
+            for name, run in cases.items():
+                stats = measure(run, args.repeat)
+                stats.update({"benchmark": "http_cache", "url": url, "case": name, "rows": args.rows})
+                results.append(stats)
+                print(f"  {url:24} {name:10} p50={stats['p50_ms']:8.3f}ms p95={stats['p95_ms']:8.3f}ms")
+        flask_module.db.close()
+    return results
+
+
+# Import-time budgets: module -> (cumulative ms, median of --repeat fresh
+# interpreters; modules its import must not load)
+IMPORT_BUDGETS = {
+    "compliance_engine": (60, ("flask", "openai", "PIL", "pdf2image", "pyarrow")),
+    "app": (400, ("openai", "PIL", "pdf2image", "pyarrow")),
+}
+
+
+def import_profile(module: str) -> Tuple[float, List[str]]:
+    """
+    Import a module in a fresh interpreter with `python -X importtime`
+
+    Returns:
+        (cumulative import time in ms, names of the modules it loaded)
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)), check=True
+    )
+    cumulative_ms = None
+    loaded = []
+    for line in completed.stderr.splitlines():
+        # import time: <self us> | <cumulative us> | <indented module name>
+        parts = line.split("|")
+        if not line.startswith("import time:") or len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].strip()
+        loaded.append(name)
+        if parts[2] == f" {name}" and name == module:
+            cumulative_ms = int(parts[1]) / 1000
+    if cumulative_ms is None:
+        raise RuntimeError(f"python -X importtime did not report {module}")
+    return cumulative_ms, loaded
+
+
+def bench_startup(args) -> List[Dict]:
+    """Import time of the engine and the app against their budgets"""
+    results = []
+    failures = []
+    for module, (budget_ms, forbidden) in IMPORT_BUDGETS.items():
+        timings = []
+        for _ in range(args.repeat):
+            cumulative_ms, loaded = import_profile(module)
+            timings.append(cumulative_ms)
+        median_ms = statistics.median(timings)
+        eager = sorted({name.split(".")[0] for name in loaded} & set(forbidden))
+        ok = median_ms <= budget_ms and not eager
+        if not ok:
+            failures.append(module)
+        results.append({"benchmark": "startup", "module": module, "runs": args.repeat,
+                        "p50_ms": round(median_ms, 1), "min_ms": round(min(timings), 1),
+                        "budget_ms": budget_ms, "eager_imports": eager, "ok": ok})
+        print(f"{'✓' if ok else '❌'} import {module:18} p50={median_ms:7.1f}ms  min={min(timings):7.1f}ms  "
+              f"budget={budget_ms}ms" + (f"  loads {', '.join(eager)} at import" if eager else ""))
+    assert not failures, f"Import-time budget exceeded: {', '.join(failures)}"
+    return results
+
+
+# Simulated OpenAI round trip for the concurrency benchmark
+SIMULATED_LLM_LATENCY_S = 0.2
+CONCURRENCY_LEVELS = (10, 100, 1000)
+SIMULATED_DOCUMENT_REVIEW = json.dumps({
+    "verified": True, "score_adjustment": -5, "adjustment_reason": "Invoice matches the transfer",
+})
+
+
+class SimulatedOpenAI:
+    """Stands in for the OpenAI client: every completion takes latency_s"""
+
+    def __init__(self, latency_s: float):
+        self.latency_s = latency_s
+        self.chat = types.SimpleNamespace(completions=self)
+
+    def _completion(self):
+        message = types.SimpleNamespace(content=SIMULATED_DOCUMENT_REVIEW)
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+    def create(self, **kwargs):
+        time.sleep(self.latency_s)
+        return self._completion()
+
+
+class SimulatedAsyncOpenAI(SimulatedOpenAI):
+    """Async counterpart of SimulatedOpenAI"""
+
+    async def create(self, **kwargs):
+        await asyncio.sleep(self.latency_s)
+        return self._completion()
+
+
+async def run_concurrent_requests(asgi_app, concurrency: int) -> Dict:
+    """
+    Send `concurrency` requests at once: every tenth uploads a document
+    (one OpenAI call), the rest are rule-only risk checks
+
+    Returns:
+        Wall time and per-kind latencies in milliseconds
+    """
+    import httpx
+
+    transaction = {
+        "amount": 12000, "source_country": "Vietnam", "destination_country": "United States",
+        "purpose": "payroll", "counterparty_type": "smb",
+    }
+    latencies = {"rules": [], "documents": []}
+
+    async def send(client, index):
+        started = time.perf_counter()
+        if index % 10 == 9:
+            kind = "documents"
+            response = await client.post(
+                "/api/risk-check-with-documents",
+                data={"transaction_data": json.dumps(transaction)},
+                files={"contractsInvoices": ("invoice.png", b"\x89PNG simulated", "image/png")},
+            )
+        else:
+            kind = "rules"
+            response = await client.post("/api/risk-check", json=transaction)
+        assert response.status_code == 200, f"{kind} request failed: {response.text}"
+        if kind == "documents":
+            assert response.json()["documents_reviewed"] == 1, "document was not reviewed"
+        latencies[kind].append((time.perf_counter() - started) * 1000)
+
+    transport = httpx.ASGITransport(app=asgi_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(send(client, index) for index in range(concurrency)))
+        wall_s = time.perf_counter() - started
+
+    summary = {"wall_s": wall_s}
+    for kind, timings in latencies.items():
+        timings.sort()
+        summary[f"{kind}_p50_ms"] = round(statistics.median(timings), 1) if timings else None
+        summary[f"{kind}_p95_ms"] = round(timings[int(len(timings) * 0.95)], 1) if timings else None
+    return summary
+
+
+def bench_concurrency(args) -> List[Dict]:
+    """Parallel requests against the Flask (threaded) and ASGI serving modes"""
+    results = []
+    # The app module opens its storage on first use: keep benchmark rows in memory
+    from config import Config
+    Config.STORAGE_BACKEND = "memory"
+    import app as flask_module
+    import asgi_app
+    if not asgi_app.ASGI_SUPPORT:
+        print("❌ The ASGI serving mode needs starlette, a2wsgi and python-multipart")
+        return results
+    try:
+        import httpx  # noqa: F401  (drives both apps in-process)
+    except ImportError:
+        print("❌ The concurrency benchmark needs httpx")
+        return results
+    from a2wsgi import WSGIMiddleware
+
+    # Rule-only checks make no OpenAI call; document reviews take the simulated latency
+    flask_module.openai_client = SimulatedOpenAI(SIMULATED_LLM_LATENCY_S)
+    asgi_app.async_openai_client = SimulatedAsyncOpenAI(SIMULATED_LLM_LATENCY_S)
+    for engine in (flask_module.engine, asgi_app.engine):
+        engine.openai_client = engine.async_openai_client = None
+
+    # Flask as a threaded WSGI server runs it: one thread per in-flight request
+    modes = {
+        f"flask ({Config.ASGI_WSGI_WORKERS} threads)": WSGIMiddleware(flask_module.app, workers=Config.ASGI_WSGI_WORKERS),
+        "asgi": asgi_app.create_asgi_app(),
+    }
+    print(f"Every tenth request reviews a document (simulated OpenAI latency {SIMULATED_LLM_LATENCY_S * 1000:.0f}ms)")
+    levels = [level for level in CONCURRENCY_LEVELS if level <= args.rows]
+    for application in modes.values():
+        # Warm up: start the thread pools and load the form parser
+        asyncio.run(run_concurrent_requests(application, min(CONCURRENCY_LEVELS)))
+    for concurrency in levels:
+        for mode, application in modes.items():
+            summary = asyncio.run(run_concurrent_requests(application, concurrency))
+            rate = concurrency / summary["wall_s"]
+            results.append({"benchmark": "concurrency", "mode": mode, "concurrency": concurrency,
+                            "requests_per_s": round(rate), **summary})
+            print(f"  {concurrency:>5} parallel  {mode:20} {rate:>8,.0f} req/s  "
+                  f"rule-only p50={summary['rules_p50_ms']:8.1f}ms p95={summary['rules_p95_ms']:8.1f}ms  "
+                  f"documents p50={summary['documents_p50_ms']:8.1f}ms")
+    flask_module.db.close()
+    return results
+
+
+def bench_documents(args) -> List[Dict]:
+    """PDF rasterization (first page to base64 PNG) of the mock documents, as uploads go to the vision model"""
+    results = []
+    from app import PDF_SUPPORT, prepare_document
+    if not PDF_SUPPORT:
+        print("❌ The documents benchmark needs pdf2image")
+        return results
+
+    mock_dir = Path(__file__).parent / "mock_users"
+    documents = sorted(mock_dir.rglob("*.pdf"))
+    if not documents:
+        print(f"❌ No mock documents in {mock_dir} (run generate_mock_docs.py)")
+        return results
+
+    for path in documents:
+        data = path.read_bytes()
+        name = path.relative_to(mock_dir).as_posix()
+        image, skipped = prepare_document(data, "application/pdf", path.name)
+        if skipped:
+            print(f"❌ {name}: {skipped['error']}")
+            return results
+
+        stats = measure(lambda: prepare_document(data, "application/pdf", path.name), args.repeat)
+        stats.update({"benchmark": "documents", "document": name, "pdf_bytes": len(data),
+                      "base64_bytes": len(image[0])})
+        results.append(stats)
+        print(f"  {name:32} {len(data) / 1024:7.1f}KB  p50={stats['p50_ms']:8.1f}ms p95={stats['p95_ms']:8.1f}ms")
+
+    total_ms = sum(stats["p50_ms"] for stats in results)
+    print(f"✓ {len(results)} documents rasterized in {total_ms:.0f}ms (sum of p50s)")
+    return results
+
+
+def bench_e2e(args) -> List[Dict]:
+    """End-to-end latency of the main routes through the Flask test client, with a stubbed OpenAI client"""
+    results = []
+    from config import Config
+    Config.STORAGE_BACKEND = "memory"
+    import app as flask_module
+    client = flask_module.app.test_client()
+    # Instant completions: the latency measured is the app's own
+    stub = SimulatedOpenAI(0)
+    flask_module.openai_client = stub
+    payloads = itertools.cycle(
+        [transaction_data for transaction_data, _ in generate_assessments(args.rows, seed=args.seed)]
+    )
+    document = ("invoice.png", b"\x89PNG simulated", "image/png")
+
+    def check(response):
+        assert response.status_code == 200, f"{response.status_code}: {response.get_data(as_text=True)[:200]}"
+
+    def risk_check():
+        check(client.post("/api/risk-check", json=next(payloads)))
+
+    def risk_check_with_documents():
+        response = client.post("/api/risk-check-with-documents", content_type="multipart/form-data", data={
+            "transaction_data": json.dumps(next(payloads)),
+            "contractsInvoices": (io.BytesIO(document[1]), document[0], document[2]),
+        })
+        check(response)
+        assert response.get_json()["documents_reviewed"] == 1, "document was not reviewed"
+
+    def analyze_documents():
+        check(client.post("/api/analyze-documents", content_type="multipart/form-data", data={
+            "contractsInvoices": (io.BytesIO(document[1]), document[0], document[2]),
+        }))
+
+    def uncached(url):
+        def get():
+            flask_module.response_cache.clear()
+            check(client.get(url))
+        return get
+
+    def rules_only():
+        flask_module.engine.openai_client = None
+
+    def ai_analysis():
+        flask_module.engine.openai_client = stub
+
+    # (route, engine mode, request); every case sends --rows requests
+    cases = [
+        ("POST /api/risk-check", "rules only", rules_only, risk_check),
+        ("POST /api/risk-check", "AI analysis", ai_analysis, risk_check),
+        ("POST /api/risk-check-with-documents", "AI analysis", ai_analysis, risk_check_with_documents),
+        ("POST /api/analyze-documents", "AI analysis", ai_analysis, analyze_documents),
+        ("GET /api/assessments", "uncached", rules_only, uncached("/api/assessments")),
+        ("GET /api/statistics", "uncached", rules_only, uncached("/api/statistics")),
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        flask_module.db = AssessmentDB(os.path.join(tmp, "e2e.db"))
+        for route, mode, configure, run in cases:
+            configure()
+            run()  # Warm up
+            stats = measure(run, args.rows)
+            stats.update({"benchmark": "e2e", "route": route, "case": mode})
+            results.append(stats)
+            print(f"  {route:38} {mode:12} p50={stats['p50_ms']:8.3f}ms p95={stats['p95_ms']:8.3f}ms")
+        flask_module.db.close()
+    assert metrics.LLM_CALLS.get("risk_analysis", "ok") > 0, "the stubbed OpenAI client was not called"
+    return results
+
+
+BENCHMARKS = {
+    "batch": bench_batch,
+    "concurrency": bench_concurrency,
+    "documents": bench_documents,
+    "e2e": bench_e2e,
+    "engine": bench_engine,
+    "http_cache": bench_http_cache,
+    "import": bench_import,
+    "json": bench_json,
+    "reload": bench_reload,
+    "rules": bench_rules,
+    "scale": bench_scale,
+    "search": bench_search,
+    "startup": bench_startup,
+    "storage": bench_storage,
+}
+
+# Dataset size per benchmark when --rows is not given
+DEFAULT_ROWS = {
+    "batch": 5_000,
+    "concurrency": max(CONCURRENCY_LEVELS),
+    "documents": 0,
+    "e2e": 500,
+    "engine": 20_000,
+    "http_cache": 100_000,
+    "import": 200_000,
+    "json": 20_000,
+    "reload": 0,
+    "rules": 20_000,
+    "scale": max(SCALE_SIZES),
+    "search": 2_000_000,
+    "startup": 0,
+    "storage": 20_000,
+}
+
+# Benchmarks run by `benchmark.py suite`, each in a fresh interpreter
+SUITE = ("engine", "rules", "reload", "storage", "scale", "json", "documents", "e2e", "batch", "http_cache", "startup")
+
+# Result fields that identify a measurement (with "benchmark" and every
+# text field); the other fields are measured values
+KEY_FIELDS = ("rows", "offset", "concurrency", "options")
+
+
+def run_metadata(args) -> Dict:
+    """Where and how results were produced, stored with them"""
+    def git(*command):
+        try:
+            completed = subprocess.run(["git", *command], capture_output=True, text=True,
+                                       cwd=os.path.dirname(os.path.abspath(__file__)))
+            return completed.stdout.strip() if completed.returncode == 0 else None
+        except OSError:
+            return None
+
+    status = git("status", "--porcelain", "--untracked-files=no")
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(status) if status is not None else None,
+        "created_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "json_backend": serialization.JSON_BACKEND,
+        "seed": args.seed,
+        "repeat": args.repeat,
+    }
+
+
+def write_results(path: str, args, results: List[Dict]):
+    """Save results with the run metadata as JSON, for `benchmark.py compare`"""
+    with open(path, "w", encoding="utf-8") as output:
+        json.dump({**run_metadata(args), "results": results}, output, indent=2)
+    print(f"✓ {len(results)} results written to {path}")
+
+
+def run_suite(args) -> Tuple[List[Dict], List[str]]:
+    """
+    Run every SUITE benchmark in its own interpreter
+
+    --rows, when given, caps each benchmark's dataset size.
+
+    Returns:
+        (results of every benchmark, names of the benchmarks that failed)
+    """
+    results = []
+    failed = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in SUITE:
+            rows = min(DEFAULT_ROWS[name], args.rows) if args.rows else DEFAULT_ROWS[name]
+            path = os.path.join(tmp, f"{name}.json")
+            print(f"\n== {name} ==")
+            completed = subprocess.run([
+                sys.executable, os.path.abspath(__file__), name, "--rows", str(rows),
+                "--repeat", str(args.repeat), "--seed", str(args.seed), "--output", path,
+            ])
+            if completed.returncode != 0 or not os.path.exists(path):
+                print(f"❌ {name} failed (exit code {completed.returncode})")
+                failed.append(name)
+                continue
+            with open(path, encoding="utf-8") as result_file:
+                benchmark_results = json.load(result_file)["results"]
+            if not benchmark_results:
+                # Benchmarks report missing dependencies and return nothing
+                print(f"⚠ {name} produced no results")
+            results += benchmark_results
+    return results, failed
+
+
+def metric_direction(field: str) -> int:
+    """1 if higher is better, -1 if lower is better, 0 if the field is not compared"""
+    if field.endswith("_per_s"):
+        return 1
+    if field.endswith("p50_ms") or field == "best_pass_ms":
+        return -1
+    return 0
+
+
+def result_key(result: Dict) -> str:
+    """Identity of a measurement, matching it across result files"""
+    key = {field: value for field, value in result.items()
+           if field == "benchmark" or field in KEY_FIELDS or isinstance(value, str)}
+    return json.dumps(key, sort_keys=True)
+
+
+def compare_results(baseline: Dict, current: Dict, threshold_pct: float) -> List[Dict]:
+    """
+    Compare the measurements two result files have in common
+
+    Returns:
+        One entry per compared value: key, field, both values, change in
+        percent (positive = better) and whether it regressed beyond threshold_pct
+    """
+    baseline_results = {result_key(result): result for result in baseline["results"]}
+    changes = []
+    for result in current["results"]:
+        previous = baseline_results.get(result_key(result))
+        if previous is None:
+            continue
+        for field, value in result.items():
+            direction = metric_direction(field)
+            old = previous.get(field)
+            if not direction or not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or not old:
+                continue
+            change_pct = (value - old) / old * 100 * direction
+            changes.append({
+                "key": result_key(result), "field": field, "baseline": old, "current": value,
+                "change_pct": round(change_pct, 1), "regression": change_pct < -threshold_pct,
+            })
+    return changes
+
+
+def run_compare(args) -> int:
+    """`benchmark.py compare BASELINE CURRENT`: report changes, exit code 1 on regressions"""
+    if len(args.files) != 2:
+        print("❌ compare needs two result files: benchmark.py compare BASELINE.json CURRENT.json")
+        return 2
+    loaded = []
+    for path in args.files:
+        with open(path, encoding="utf-8") as result_file:
+            loaded.append(json.load(result_file))
+    baseline, current = loaded
+    print(f"Baseline {baseline.get('commit') or '?'}  current {current.get('commit') or '?'}  "
+          f"(threshold {args.threshold:g}%)")
+
+    changes = compare_results(baseline, current, args.threshold)
+    regressions = [change for change in changes if change["regression"]]
+    improvements = [change for change in changes if change["change_pct"] > args.threshold]
+    for marker, entries in (("❌", regressions), ("✓", improvements)):
+        for change in entries:
+            label = " ".join(str(value) for value in json.loads(change["key"]).values())
+            print(f"{marker} {label}  {change['field']}: {change['baseline']} -> {change['current']} "
+                  f"({change['change_pct']:+.1f}%)")
+    print(f"{len(changes)} values compared: {len(regressions)} regressions, {len(improvements)} improvements")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump({"threshold_pct": args.threshold, "changes": changes}, output, indent=2)
+    return 1 if regressions else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Compliance Review System benchmarks",
+        epilog="Compare two commits: benchmark.py suite --output base.json (on the base commit), "
+               "benchmark.py suite --output head.json, then benchmark.py compare base.json head.json"
+    )
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS) + ["compare", "suite"],
+                        help="Benchmark to run, suite (the benchmarks in SUITE) or compare (two result files)")
+    parser.add_argument("files", nargs="*", help="compare: baseline and current result files")
+    parser.add_argument("--rows", type=int, help="Dataset size, or the highest concurrency level (default depends on the benchmark)")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per measurement (default: 20)")
+    parser.add_argument("--seed", type=int, default=42, help="Dataset random seed (default: 42)")
+    parser.add_argument("--output", help="Write the results (or the comparison) to this JSON file")
+    parser.add_argument("--threshold", type=float, default=10,
+                        help="compare: percent change counted as a regression (default: 10)")
+    args = parser.parse_args(argv)
+    if args.files and args.benchmark != "compare":
+        parser.error("result files are only read by compare")
+
+    if args.benchmark == "compare":
+        return run_compare(args)
+    if args.benchmark == "suite":
+        results, failed = run_suite(args)
+        if args.output:
+            write_results(args.output, args, results)
+        if failed:
+            print(f"❌ Failed: {', '.join(failed)}")
+        return 1 if failed else 0
+
+    args.rows = args.rows or DEFAULT_ROWS[args.benchmark]
+    results = BENCHMARKS[args.benchmark](args)
+    if args.output:
+        write_results(args.output, args, results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
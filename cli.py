@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Command-line maintenance tools for the Compliance Review System
+Run `python cli.py --help` to list the available commands
+"""
+
+import argparse
+import json
+import sys
+
+from config import Config
+from database import AssessmentDB
+from export import COLUMNAR_FORMATS, COLUMNAR_SUPPORT, iter_csv, iter_ndjson, track_last_id, write_columnar
+
+
+def open_db(args) -> AssessmentDB:
+    """Open the assessments database selected by the global options"""
+    return AssessmentDB(args.db, partition_dir=args.partition_dir or None)
+
+
+def cmd_verify_stats(args) -> int:
+    """Check the statistics aggregates against a full recount"""
+    db = open_db(args)
+    report = db.verify_statistics(repair=args.repair)
+
+    if report['consistent']:
+        print("✓ Statistics aggregates are consistent")
+    elif report['repaired']:
+        print("⚠ Statistics aggregates had drifted and were rebuilt")
+    else:
+        print("❌ Statistics aggregates are inconsistent (run with --repair to rebuild)")
+    print(json.dumps({'stored': report['stored'], 'actual': report['actual']}, indent=2))
+
+    return 0 if report['consistent'] or report['repaired'] else 1
+
+
+def cmd_backfill_analytics(args) -> int:
+    """Rebuild the analytics rollups and rule hits from existing assessments"""
+    db = open_db(args)
+    written = db.rebuild_rollups()
+    print(f"✓ Analytics rollups rebuilt ({written} rollup rows)")
+    hits = db.rebuild_rule_hits()
+    print(f"✓ Rule hits rebuilt ({hits} rule hits)")
+    return 0
+
+
+def cmd_rebuild_search_index(args) -> int:
+    """Re-index existing assessments for full-text search"""
+    db = open_db(args)
+    if not db.search_enabled:
+        print("❌ This SQLite build has no FTS5 support")
+        return 1
+    indexed = db.rebuild_search_index()
+    print(f"✓ Search index rebuilt ({indexed} assessments indexed)")
+    return 0
+
+
+def cmd_export(args) -> int:
+    """Export assessments as NDJSON, CSV, Parquet or Arrow"""
+    db = open_db(args)
+    progress = {}
+    rows = track_last_id(
+        db.iter_assessment_rows(since_id=args.since_id, start=args.start, end=args.end),
+        progress
+    )
+
+    if args.format in COLUMNAR_FORMATS:
+        if not COLUMNAR_SUPPORT:
+            print("❌ Columnar export requires pyarrow. Install it with: pip install pyarrow", file=sys.stderr)
+            return 1
+        if not args.output:
+            print(f"❌ --output is required for {args.format} export", file=sys.stderr)
+            return 1
+        write_columnar(rows, args.output, file_format=args.format)
+    else:
+        encoder = iter_ndjson if args.format == "ndjson" else iter_csv
+        output = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+        try:
+            for chunk in encoder(rows):
+                output.write(chunk)
+        finally:
+            if args.output:
+                output.close()
+
+    # Summary goes to stderr so stdout can be piped
+    print(f"✓ Exported {progress.get('rows', 0)} assessments", file=sys.stderr)
+    if progress.get("last_id") is not None:
+        print(f"  Next incremental export: --since-id {progress['last_id']}", file=sys.stderr)
+    return 0
+
+
+def cmd_import(args) -> int:
+    """Bulk import transactions or assessments from CSV or JSONL"""
+    db = open_db(args)
+
+    def show_progress(progress):
+        print(f"  {progress['rows_imported']:,} rows imported ({progress['rows_per_s']:,} rows/s)")
+
+    report = db.bulk_import(
+        args.file,
+        file_format=args.format,
+        score=args.score,
+        batch_size=args.batch_size,
+        defer_indexes=not args.keep_indexes,
+        index_search=not args.skip_search_index,
+        restart=args.restart,
+        on_progress=show_progress
+    )
+
+    print(f"✓ Imported {report['rows_imported']:,} of {report['rows_read']:,} rows "
+          f"in {report['elapsed_s']}s ({report['rows_per_s']:,} rows/s)")
+    if report['rows_already_imported']:
+        print(f"  Skipped {report['rows_already_imported']:,} rows imported by an earlier run")
+    if report['rows_failed']:
+        print(f"⚠ {report['rows_failed']:,} rows could not be imported")
+        for error in report['errors']:
+            print(f"  Row {error['position']}: {error['error']}")
+    if args.skip_search_index and db.search_enabled:
+        print("  Run `python cli.py rebuild-search-index` to make the imported rows searchable")
+    return 0 if not report['rows_failed'] else 1
+
+
+def cmd_partitions(args) -> int:
+    """List monthly partitions"""
+    db = open_db(args)
+    if not db.partition_dir:
+        print("Partitioning is not enabled (set DB_PARTITION_DIR or pass --partition-dir)")
+        return 1
+    for partition in db.list_partitions():
+        status = "archived" if partition['archived'] else "active"
+        print(f"{partition['month']}  {status:8}  {partition['size_bytes']:>12,} bytes  {partition['path']}")
+    return 0
+
+
+def cmd_retention(args) -> int:
+    """Archive and drop partitions according to the retention policy"""
+    db = open_db(args)
+    if not db.partition_dir:
+        print("Partitioning is not enabled (set DB_PARTITION_DIR or pass --partition-dir)")
+        return 1
+    report = db.apply_retention(
+        archive_after_months=args.archive_after,
+        retain_months=args.retain
+    )
+    print(f"✓ Archived: {', '.join(report['archived']) or 'none'}")
+    print(f"✓ Dropped: {', '.join(report['dropped']) or 'none'}")
+    return 0
+
+
+def cmd_restore_partition(args) -> int:
+    """Bring an archived partition back into the active set"""
+    db = open_db(args)
+    path = db.restore_partition(args.month)
+    print(f"✓ Restored {args.month} to {path}")
+    return 0
+
+
+def cmd_snapshot(args) -> int:
+    """Take an online snapshot of the assessments database"""
+    db = open_db(args)
+    reported = {}
+
+    def show_progress(progress):
+        # One line per file every 10%
+        decile = int(progress['percent'] // 10)
+        if reported.get(progress['file']) != decile:
+            reported[progress['file']] = decile
+            print(f"  {progress['file']}: {progress['percent']:5.1f}% "
+                  f"({progress['pages_copied']}/{progress['pages_total']} pages)")
+
+    report = db.snapshot(
+        args.output_dir,
+        pages_per_step=args.pages_per_step,
+        step_sleep_ms=args.sleep_ms,
+        keep=args.keep,
+        on_progress=show_progress
+    )
+    for result in report['files']:
+        print(f"✓ {result['file']}: {result['bytes']:,} bytes in {result['steps']} steps "
+              f"(longest step {result['max_step_ms']} ms)")
+    print(f"✓ Snapshot written to {report['path']} "
+          f"({report['bytes']:,} bytes in {report['elapsed_s']}s, {report['mb_per_s']} MB/s)")
+    if report['pruned']:
+        print(f"  Pruned old snapshots: {', '.join(report['pruned'])}")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the argument parser with one sub-command per tool"""
+    parser = argparse.ArgumentParser(description="Compliance Review System maintenance tools")
+    parser.add_argument("--db", help="Path to the assessments database (default: compliance_assessments.db)")
+    parser.add_argument("--partition-dir", default=Config.DB_PARTITION_DIR,
+                        help="Monthly partition directory (default: DB_PARTITION_DIR)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    verify = subparsers.add_parser("verify-stats", help="Verify (and optionally rebuild) statistics aggregates")
+    verify.add_argument("--repair", action="store_true", help="Rebuild the aggregates if they have drifted")
+    verify.set_defaults(func=cmd_verify_stats)
+
+    backfill = subparsers.add_parser("backfill-analytics", help="Rebuild analytics rollups and rule hits from existing assessments")
+    backfill.set_defaults(func=cmd_backfill_analytics)
+
+    reindex = subparsers.add_parser("rebuild-search-index", help="Re-index existing assessments for full-text search")
+    reindex.set_defaults(func=cmd_rebuild_search_index)
+
+    export = subparsers.add_parser("export", help="Export assessments (NDJSON, CSV, Parquet, Arrow)")
+    export.add_argument("--format", choices=["ndjson", "csv", *COLUMNAR_FORMATS], default="ndjson")
+    export.add_argument("--output", "-o", help="Output file (default: stdout; required for parquet/arrow)")
+    export.add_argument("--since-id", type=int, default=0, help="Only assessments with a greater ID")
+    export.add_argument("--start", help="First day to include (YYYY-MM-DD)")
+    export.add_argument("--end", help="Last day to include (YYYY-MM-DD)")
+    export.set_defaults(func=cmd_export)
+
+    bulk = subparsers.add_parser("import", help="Bulk import transactions or assessments (CSV, JSONL)")
+    bulk.add_argument("file", help="CSV or JSONL file")
+    bulk.add_argument("--format", choices=["csv", "jsonl"], help="File format (default: from the extension)")
+    bulk.add_argument("--score", action="store_true",
+                      help="Score each transaction with the current rules (otherwise rows must carry an assessment)")
+    bulk.add_argument("--batch-size", type=int, default=50000, help="Rows per transaction (default: 50,000)")
+    bulk.add_argument("--keep-indexes", action="store_true", help="Maintain secondary indexes during the import")
+    bulk.add_argument("--skip-search-index", action="store_true",
+                      help="Do not index imported rows for search (rebuild the index afterwards)")
+    bulk.add_argument("--restart", action="store_true", help="Ignore the checkpoint of an earlier run")
+    bulk.set_defaults(func=cmd_import)
+
+    partitions = subparsers.add_parser("partitions", help="List monthly partitions")
+    partitions.set_defaults(func=cmd_partitions)
+
+    retention = subparsers.add_parser("retention", help="Archive and drop old partitions")
+    retention.add_argument("--archive-after", type=int, default=Config.DB_ARCHIVE_AFTER_MONTHS,
+                           help="Compress partitions at least this many months old (default: DB_ARCHIVE_AFTER_MONTHS)")
+    retention.add_argument("--retain", type=int, default=Config.DB_RETENTION_MONTHS,
+                           help="Drop partitions at least this many months old (default: DB_RETENTION_MONTHS)")
+    retention.set_defaults(func=cmd_retention)
+
+    restore = subparsers.add_parser("restore-partition", help="Restore an archived partition")
+    restore.add_argument("month", help="Month to restore (YYYY-MM)")
+    restore.set_defaults(func=cmd_restore_partition)
+
+    snapshot = subparsers.add_parser("snapshot", help="Take an online snapshot of the database")
+    snapshot.add_argument("--output-dir", default=Config.DB_SNAPSHOT_DIR,
+                          help="Directory for timestamped snapshots (default: DB_SNAPSHOT_DIR)")
+    snapshot.add_argument("--pages-per-step", type=int, default=Config.DB_SNAPSHOT_PAGES_PER_STEP,
+                          help="Pages copied per backup step (default: DB_SNAPSHOT_PAGES_PER_STEP)")
+    snapshot.add_argument("--sleep-ms", type=int, default=Config.DB_SNAPSHOT_STEP_SLEEP_MS,
+                          help="Pause between backup steps (default: DB_SNAPSHOT_STEP_SLEEP_MS)")
+    snapshot.add_argument("--keep", type=int, default=Config.DB_SNAPSHOT_KEEP,
+                          help="Snapshots to keep, 0 = all (default: DB_SNAPSHOT_KEEP)")
+    snapshot.set_defaults(func=cmd_snapshot)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
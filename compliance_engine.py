@@ -4,11 +4,67 @@ Implements rule-based risk assessment with optional OpenAI-enhanced analysis
 Supports configurable rules via RulesManager
 """
 
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 from enum import Enum
 from dataclasses import dataclass
+from types import SimpleNamespace
+import itertools
 import json
-from rules_manager import RulesManager
+import re
+import threading
+import time
+import metrics
+from rules_manager import RulesManager, RulesSnapshot
+
+
+# Stable identifiers for the built-in rules. The position of each ID is its
+# bit in the assessments.rule_mask column, so only append to this tuple.
+RULE_IDS = (
+    "country_high_risk",
+    "country_medium_risk",
+    "country_unknown",
+    "purpose_high_risk",
+    "purpose_medium_risk",
+    "purpose_unknown",
+    "customer_pep_ngo",
+    "amount_high_risk_origin",
+    "amount_general_high",
+    "amount_moderate",
+    "structuring_signals",
+)
+RULE_BITS = {rule_id: 1 << position for position, rule_id in enumerate(RULE_IDS)}
+
+# Patterns matching the rule text of each rule, for assessments stored
+# before rule IDs were recorded
+LEGACY_RULE_PATTERNS = [
+    (re.compile(r"^Origin country '.*' classified as high-risk$"), "country_high_risk"),
+    (re.compile(r"^Origin country '.*' classified as medium-risk$"), "country_medium_risk"),
+    (re.compile(r"^Origin country '.*' not in known risk database$"), "country_unknown"),
+    (re.compile(r"^Transaction purpose '.*' classified as high-risk$"), "purpose_high_risk"),
+    (re.compile(r"^Transaction purpose '.*' classified as medium-risk$"), "purpose_medium_risk"),
+    (re.compile(r"^Transaction purpose '.*' not in known database$"), "purpose_unknown"),
+    (re.compile(r"^Customer classified as PEP/NGO"), "customer_pep_ngo"),
+    (re.compile(r"^Amount .* from high-risk country$"), "amount_high_risk_origin"),
+    (re.compile(r"^Amount .* exceeds .* threshold$"), "amount_general_high"),
+    (re.compile(r"^Amount .* is above moderate threshold"), "amount_moderate"),
+    (re.compile(r"^Structuring signals detected"), "structuring_signals"),
+]
+
+
+def rule_id_for_text(rule_text: str) -> Optional[str]:
+    """Map the text of a triggered rule back to its rule ID"""
+    for pattern, rule_id in LEGACY_RULE_PATTERNS:
+        if pattern.search(rule_text):
+            return rule_id
+    return None
+
+
+def rule_mask(rule_ids: List[str]) -> int:
+    """Combine rule IDs into a bitmask (unknown IDs are ignored)"""
+    mask = 0
+    for rule_id in rule_ids:
+        mask |= RULE_BITS.get(rule_id, 0)
+    return mask
 
 
 class RiskLevel(Enum):
@@ -36,134 +92,299 @@ class Transaction:
     has_structuring_signals: bool = False
 
 
+class RuleHits:
+    """Rules triggered during one review, by ID and human-readable text"""
+
+    __slots__ = ("rule_ids", "texts")
+
+    def __init__(self):
+        self.rule_ids: List[str] = []
+        self.texts: List[str] = []
+
+    def add(self, rule_id: str, rule_text: str):
+        """Record a triggered rule"""
+        self.rule_ids.append(rule_id)
+        self.texts.append(rule_text)
+
+
+# Review steps EngineStats times: method name -> step name
+INSTRUMENTED_STEPS = {
+    "_assess_country_risk": "assess_country_risk",
+    "_assess_purpose_risk": "assess_purpose_risk",
+    "_assess_customer_risk": "assess_customer_risk",
+    "_assess_amount_risk": "assess_amount_risk",
+    "_assess_structuring": "assess_structuring",
+    "_score_to_level": "score_to_level",
+    "_generate_rationale": "generate_rationale",
+    "_generate_checklist": "generate_checklist",
+}
+# Step latency buckets in seconds (rule steps take microseconds)
+STEP_BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 1e-3, 1e-2)
+# Rules setting the amount tier, highest first
+AMOUNT_TIERS = (
+    ("amount_high_risk_origin", "high_risk_origin"),
+    ("amount_general_high", "general_high"),
+    ("amount_moderate", "moderate"),
+)
+
+
+class EngineStats:
+    """
+    Rule hit counts and sampled step latencies of ComplianceEngine reviews
+
+    Every review counts the rules it triggered and the tier of each risk
+    factor; in one review in `sample_every`, each step in
+    INSTRUMENTED_STEPS is timed. See ComplianceEngine.enable_instrumentation().
+
+    A review costs one dictionary update: it is counted by its outcome
+    (rule IDs and tiers), and per-rule and per-tier counts are summed from
+    those when read.
+    """
+
+    def __init__(self, sample_every: int = 100, registry: metrics.MetricsRegistry = None):
+        """
+        Args:
+            sample_every: Time the steps of one review in this many
+            registry: Registry to export the stats through, such as
+                metrics.REGISTRY (default: not exported)
+        """
+        self.sample_every = max(1, sample_every)
+        self._reviews = itertools.count()
+        # (rule IDs, country tier, purpose tier, customer type value, risk level) -> reviews
+        self._outcomes: Dict[tuple, int] = {}
+        self._lock = threading.Lock()
+        self.step_seconds = (registry or metrics.MetricsRegistry()).histogram(
+            "compliance_engine_step_seconds", "Sampled latency of each review step", ("step",), STEP_BUCKETS
+        )
+        if registry is not None:
+            registry.add_collector(self.collect)
+
+    def record_review(self, rule_ids: List[str], country_risk: str, purpose_risk: str,
+                      customer_type: CustomerType, risk_level: str):
+        """Count one review's triggered rules and risk factor tiers"""
+        # Keyed by the customer type's value: hashing an Enum member runs Python code
+        outcome = (tuple(rule_ids), country_risk, purpose_risk, customer_type.value, risk_level)
+        with self._lock:
+            self._outcomes[outcome] = self._outcomes.get(outcome, 0) + 1
+
+    def sample_review(self) -> bool:
+        """Whether the next review's steps are timed (one review in sample_every)"""
+        return not next(self._reviews) % self.sample_every
+
+    def timed(self, step: str, method):
+        """Wrap a bound method so every call is timed"""
+        observe = self.step_seconds.observe
+        perf_counter = time.perf_counter
+
+        def timed_call(*args):
+            started = perf_counter()
+            result = method(*args)
+            observe(perf_counter() - started, step)
+            return result
+
+        return timed_call
+
+    def counts(self) -> Tuple[int, Dict[str, int], Dict[Tuple[str, str], int]]:
+        """(reviews, rule ID -> hits, (factor, tier) -> reviews)"""
+        with self._lock:
+            outcomes = list(self._outcomes.items())
+        reviews = 0
+        rule_hits: Dict[str, int] = {}
+        tiers: Dict[Tuple[str, str], int] = {}
+        for (rule_ids, country_risk, purpose_risk, customer_type, risk_level), count in outcomes:
+            reviews += count
+            for rule_id in rule_ids:
+                rule_hits[rule_id] = rule_hits.get(rule_id, 0) + count
+            amount_tier = next((tier for rule_id, tier in AMOUNT_TIERS if rule_id in rule_ids), "below_threshold")
+            for tier in (
+                ("country", "unknown" if "country_unknown" in rule_ids else country_risk),
+                ("purpose", "unknown" if "purpose_unknown" in rule_ids else purpose_risk),
+                ("customer", customer_type),
+                ("amount", amount_tier),
+                ("risk_level", risk_level),
+            ):
+                tiers[tier] = tiers.get(tier, 0) + count
+        return reviews, rule_hits, tiers
+
+    def snapshot(self) -> Dict:
+        """Counts so far: rule hits (most frequent first), tiers and step latencies"""
+        reviews, rule_hits, tier_counts = self.counts()
+        tiers: Dict[str, Dict[str, int]] = {}
+        for (factor, tier), count in sorted(tier_counts.items()):
+            tiers.setdefault(factor, {})[tier] = count
+        steps = {
+            step: {"samples": count, "avg_us": round(total / count * 1e6, 3) if count else 0}
+            for (step,), (count, total) in sorted(self.step_seconds.snapshot().items())
+        }
+        return {
+            "reviews": reviews,
+            "sample_every": self.sample_every,
+            "rule_hits": dict(sorted(rule_hits.items(), key=lambda item: (-item[1], item[0]))),
+            "tiers": tiers,
+            "steps": steps,
+        }
+
+    def collect(self):
+        """Metric families for metrics.REGISTRY (see MetricsRegistry.add_collector)"""
+        reviews, rule_hits, tiers = self.counts()
+        yield "compliance_engine_reviews_total", "counter", "Reviews run by the compliance engine", [({}, reviews)]
+        yield ("compliance_rule_hits_total", "counter", "Reviews that triggered each rule",
+               [({"rule": rule_id}, count) for rule_id, count in sorted(rule_hits.items())])
+        yield ("compliance_rule_tiers_total", "counter", "Reviews by risk factor and tier",
+               [({"factor": factor, "tier": tier}, count) for (factor, tier), count in sorted(tiers.items())])
+
+    def reset(self):
+        """Zero every count and latency sample"""
+        with self._lock:
+            self._outcomes.clear()
+        self.step_seconds.reset()
+
+
 class ComplianceEngine:
-    """Compliance review engine with AML/KYC rules"""
+    """
+    Compliance review engine with AML/KYC rules
+
+    Each review reads one rules snapshot and keeps its results local, so a
+    single engine can serve concurrent reviews while the rules are reloaded.
+    """
 
-    def __init__(self, openai_client=None, rules_manager=None):
-        self.triggered_rules: List[str] = []
-        self.risk_score: int = 0
+    def __init__(self, openai_client=None, rules_manager=None, async_openai_client=None):
         self.openai_client = openai_client
+        # AsyncOpenAI client used by review_async() (ASGI serving mode)
+        self.async_openai_client = async_openai_client
         self.rules_manager = rules_manager or RulesManager()
-        self._load_rules()
+        # Rule hit and step latency instrumentation (see enable_instrumentation)
+        self.stats: Optional[EngineStats] = None
+        # Timed versions of the INSTRUMENTED_STEPS methods, used by sampled reviews
+        self._timed_steps: Optional[SimpleNamespace] = None
     
-    def _load_rules(self):
-        """Load rules from RulesManager"""
-        rules = self.rules_manager.get_rules()
-        
-        # Geographic risk classifications
-        self.HIGH_RISK_COUNTRIES = set(rules.get("high_risk_countries", []))
-        self.MEDIUM_RISK_COUNTRIES = set(rules.get("medium_risk_countries", []))
-        self.LOW_RISK_COUNTRIES = set(rules.get("low_risk_countries", []))
-        
-        # Transaction purpose risk classifications
-        self.HIGH_RISK_PURPOSES = set(rules.get("high_risk_purposes", []))
-        self.MEDIUM_RISK_PURPOSES = set(rules.get("medium_risk_purposes", []))
-        self.LOW_RISK_PURPOSES = set(rules.get("low_risk_purposes", []))
-        
-        # Risk scoring base values
-        self.COUNTRY_RISK_SCORES = rules.get("country_risk_scores", {
-            "high": 35,
-            "medium": 18,
-            "low": 5,
-        })
-        
-        self.PURPOSE_RISK_SCORES = rules.get("purpose_risk_scores", {
-            "high": 28,
-            "medium": 15,
-            "low": 3,
-        })
-        
-        customer_scores = rules.get("customer_type_scores", {
-            "low": 5,
-            "medium": 15,
-            "high": 40,
-        })
-        self.CUSTOMER_TYPE_SCORES = {
-            CustomerType.LOW: customer_scores.get("low", 5),
-            CustomerType.MEDIUM: customer_scores.get("medium", 15),
-            CustomerType.HIGH: customer_scores.get("high", 40),
-        }
-        
-        # Thresholds
-        thresholds = rules.get("amount_thresholds", {})
-        self.HIGH_RISK_ORIGIN_THRESHOLD = thresholds.get("high_risk_origin_threshold", 10000)
-        self.GENERAL_HIGH_THRESHOLD = thresholds.get("general_high_threshold", 25000)
-        self.MODERATE_THRESHOLD = thresholds.get("moderate_threshold", 15000)
-        
-        score_thresholds = rules.get("risk_score_thresholds", {})
-        self.LOW_MAX_SCORE = score_thresholds.get("low_max", 30)
-        self.MEDIUM_MAX_SCORE = score_thresholds.get("medium_max", 70)
+    @property
+    def rules(self) -> RulesSnapshot:
+        """The rules snapshot new reviews will use"""
+        return self.rules_manager.snapshot
     
-    def reload_rules(self):
-        """Reload rules from configuration"""
-        self._load_rules()
+    def reload_rules(self) -> bool:
+        """
+        Pick up rules changed on disk since the last load
+        
+        Rules saved through the RulesManager take effect immediately; this
+        is only needed for edits made to the rules file directly.
+        """
+        return self.rules_manager.check_for_changes()
 
-    def review(self, transaction: Transaction) -> Dict:
+    def enable_instrumentation(self, stats: EngineStats = None) -> EngineStats:
+        """
+        Count rule hits and sample step latencies of every review
+
+        The sampling decision is made once per review: a sampled review
+        calls timed wrappers of its steps, any other review the plain
+        methods. Without instrumentation a review pays a single attribute
+        check.
+
+        Args:
+            stats: Stats to record into (default: new EngineStats)
+        """
+        self.disable_instrumentation()
+        self.stats = stats or EngineStats()
+        self._timed_steps = SimpleNamespace(**{
+            method_name: self.stats.timed(step, getattr(self, method_name))
+            for method_name, step in INSTRUMENTED_STEPS.items()
+        })
+        return self.stats
+
+    def disable_instrumentation(self):
+        """Remove the instrumentation (its stats are kept by their owner)"""
+        self.stats = None
+        self._timed_steps = None
+
+    def review(
+        self,
+        transaction: Transaction,
+        rules: RulesSnapshot = None,
+        use_ai: bool = True
+    ) -> Dict:
         """
         Perform compliance review on a transaction
         Returns JSON-formatted risk assessment
+        
+        Args:
+            transaction: Transaction to review
+            rules: Rules snapshot to apply (default: the current rules)
+            use_ai: Add OpenAI analysis when a client is configured
         """
-        self.triggered_rules = []
-        self.risk_score = 0
-        checklist_items = []
+        rules = rules or self.rules_manager.snapshot
+        hits = RuleHits()
+        stats = self.stats
+        steps = (self._timed_steps or self) if stats is not None and stats.sample_review() else self
 
         # Rule 1: Check country risk
-        country_risk = self._assess_country_risk(transaction.origin_country)
+        country_risk = steps._assess_country_risk(transaction.origin_country, rules, hits)
         
         # Rule 2: Check purpose risk
-        purpose_risk = self._assess_purpose_risk(transaction.purpose)
+        purpose_risk = steps._assess_purpose_risk(transaction.purpose, rules, hits)
 
         # Rule 3: Customer type assessment
-        customer_risk = self._assess_customer_risk(transaction.customer_type)
+        steps._assess_customer_risk(transaction.customer_type, hits)
 
         # Rule 4: Amount threshold checks
-        amount_risk = self._assess_amount_risk(
+        amount_risk = steps._assess_amount_risk(
             transaction.amount_usd, 
-            transaction.origin_country
+            transaction.origin_country,
+            rules,
+            hits
         )
 
         # Rule 5: Structuring signals
-        structuring_risk = self._assess_structuring(transaction.has_structuring_signals)
+        structuring_risk = steps._assess_structuring(transaction.has_structuring_signals, hits)
 
         # Calculate base risk score
-        self.risk_score = (
-            self.COUNTRY_RISK_SCORES[country_risk] +
-            self.PURPOSE_RISK_SCORES[purpose_risk] +
-            self.CUSTOMER_TYPE_SCORES[transaction.customer_type] +
+        risk_score = (
+            rules.country_risk_scores[country_risk] +
+            rules.purpose_risk_scores[purpose_risk] +
+            rules.customer_type_scores[transaction.customer_type.value] +
             amount_risk
         )
 
         # Apply structuring adjustment (raises by one level)
         if structuring_risk > 0:
-            self.risk_score += structuring_risk
+            risk_score += structuring_risk
+
+        # Rule 6: Custom rules from the rules configuration
+        if rules.custom_rules:
+            risk_score += rules.custom_rules.evaluate(transaction, hits.add)
 
-        # Cap score at 100
-        self.risk_score = min(self.risk_score, 100)
+        # Keep score within 0-100
+        risk_score = max(0, min(risk_score, 100))
 
         # Determine risk level
-        risk_level = self._score_to_level(self.risk_score)
+        risk_level = steps._score_to_level(risk_score, rules)
+
+        if stats is not None:
+            stats.record_review(hits.rule_ids, country_risk, purpose_risk, transaction.customer_type, risk_level)
 
         # Generate rationale
-        rationale = self._generate_rationale(transaction, country_risk, purpose_risk)
+        rationale = steps._generate_rationale(transaction, country_risk, purpose_risk)
 
         # Generate checklist
-        checklist_items = self._generate_checklist(transaction, risk_level)
+        checklist_items = steps._generate_checklist(transaction, risk_level, rules)
 
         # Enhance with OpenAI analysis if available
         ai_analysis = None
-        if self.openai_client:
+        if self.openai_client and use_ai:
             try:
-                ai_analysis = self._get_ai_risk_analysis(transaction, self.risk_score, risk_level)
+                ai_analysis = self._get_ai_risk_analysis(transaction, risk_score, risk_level, hits.texts)
             except Exception as e:
                 print(f"OpenAI analysis failed: {e}")
                 # Continue with rule-based assessment
 
         result = {
-            "risk_score": self.risk_score,
+            "risk_score": risk_score,
             "risk_level": risk_level,
-            "triggered_rules": self.triggered_rules,
+            "triggered_rules": hits.texts,
+            "triggered_rule_ids": hits.rule_ids,
             "rationale": rationale,
             "checklist_items": checklist_items,
+            "rules_version": rules.content_hash,
         }
 
         # Add AI insights if available
@@ -172,52 +393,97 @@ class ComplianceEngine:
 
         return result
 
-    def _assess_country_risk(self, country: str) -> str:
+    def review_batch(self, transactions: Iterable[Transaction], rules: RulesSnapshot = None) -> List[Dict]:
+        """
+        Review many transactions against one rules snapshot
+
+        Rules only: no OpenAI analysis, so a batch is not bound by its latency.
+
+        Args:
+            transactions: Transactions to review
+            rules: Rules snapshot to apply (default: the current rules)
+
+        Returns:
+            One result per transaction, as returned by review()
+        """
+        rules = rules or self.rules_manager.snapshot
+        review = self.review
+        return [review(transaction, rules, False) for transaction in transactions]
+
+    async def review_async(
+        self,
+        transaction: Transaction,
+        rules: RulesSnapshot = None,
+        use_ai: bool = True
+    ) -> Dict:
+        """
+        Perform compliance review, awaiting the OpenAI analysis
+
+        The rules run inline (they take microseconds); only the OpenAI call
+        is awaited, on the async client. Returns the same result as review().
+        """
+        result = self.review(transaction, rules=rules, use_ai=False)
+        if self.async_openai_client and use_ai:
+            ai_analysis = await self._get_ai_risk_analysis_async(
+                transaction, result["risk_score"], result["risk_level"], result["triggered_rules"]
+            )
+            if ai_analysis:
+                result["ai_insights"] = ai_analysis
+        return result
+
+    def _assess_country_risk(self, country: str, rules: RulesSnapshot, hits: RuleHits) -> str:
         """Assess risk level of origin country"""
-        if country in self.HIGH_RISK_COUNTRIES:
-            self.triggered_rules.append(
+        if country in rules.high_risk_countries:
+            hits.add(
+                "country_high_risk",
                 f"Origin country '{country}' classified as high-risk"
             )
             return "high"
-        elif country in self.MEDIUM_RISK_COUNTRIES:
-            self.triggered_rules.append(
+        elif country in rules.medium_risk_countries:
+            hits.add(
+                "country_medium_risk",
                 f"Origin country '{country}' classified as medium-risk"
             )
             return "medium"
-        elif country in self.LOW_RISK_COUNTRIES:
+        elif country in rules.low_risk_countries:
             return "low"
         else:
-            self.triggered_rules.append(
+            hits.add(
+                "country_unknown",
                 f"Origin country '{country}' not in known risk database"
             )
             return "medium"  # Default to medium for unknown countries
 
-    def _assess_purpose_risk(self, purpose: str) -> str:
+    def _assess_purpose_risk(self, purpose: str, rules: RulesSnapshot, hits: RuleHits) -> str:
         """Assess risk level of transaction purpose"""
         purpose_lower = purpose.lower()
         
-        if purpose_lower in self.HIGH_RISK_PURPOSES:
-            self.triggered_rules.append(
+        if purpose_lower in rules.high_risk_purposes:
+            hits.add(
+                "purpose_high_risk",
                 f"Transaction purpose '{purpose}' classified as high-risk"
             )
             return "high"
-        elif purpose_lower in self.MEDIUM_RISK_PURPOSES:
-            self.triggered_rules.append(
+        elif purpose_lower in rules.medium_risk_purposes:
+            hits.add(
+                "purpose_medium_risk",
                 f"Transaction purpose '{purpose}' classified as medium-risk"
             )
             return "medium"
-        elif purpose_lower in self.LOW_RISK_PURPOSES:
+        elif purpose_lower in rules.low_risk_purposes:
             return "low"
         else:
-            self.triggered_rules.append(
+            hits.add(
+                "purpose_unknown",
                 f"Transaction purpose '{purpose}' not in known database"
             )
             return "medium"  # Default to medium for unknown purposes
 
-    def _assess_customer_risk(self, customer_type: CustomerType) -> str:
+    def _assess_customer_risk(self, customer_type: CustomerType, hits: RuleHits) -> str:
         """Assess risk based on customer type"""
         if customer_type == CustomerType.HIGH:
-            self.triggered_rules.append(
+            hits.add(
+                "customer_pep_ngo",
                 "Customer classified as PEP/NGO (high-risk profile)"
             )
             return "high"
@@ -226,47 +492,52 @@ class ComplianceEngine:
         else:
             return "low"
 
-    def _assess_amount_risk(self, amount: float, country: str) -> int:
+    def _assess_amount_risk(self, amount: float, country: str, rules: RulesSnapshot, hits: RuleHits) -> int:
         """Assess risk based on transaction amount"""
         score = 0
 
         # Rule: If amount > threshold USD from a high-risk origin → High
-        if amount > self.HIGH_RISK_ORIGIN_THRESHOLD and country in self.HIGH_RISK_COUNTRIES:
-            self.triggered_rules.append(
-                f"Amount ${amount:,.2f} exceeds ${self.HIGH_RISK_ORIGIN_THRESHOLD:,.0f} from high-risk country"
+        if amount > rules.high_risk_origin_threshold and country in rules.high_risk_countries:
+            hits.add(
+                "amount_high_risk_origin",
+                f"Amount ${amount:,.2f} exceeds ${rules.high_risk_origin_threshold:,.0f} from high-risk country"
             )
             score += 40
 
         # Rule: If amount > general high threshold USD → High
-        if amount > self.GENERAL_HIGH_THRESHOLD:
-            self.triggered_rules.append(
-                f"Amount ${amount:,.2f} exceeds ${self.GENERAL_HIGH_THRESHOLD:,.0f} threshold"
+        if amount > rules.general_high_threshold:
+            hits.add(
+                "amount_general_high",
+                f"Amount ${amount:,.2f} exceeds ${rules.general_high_threshold:,.0f} threshold"
             )
             score += 40
 
         # Moderate threshold
-        elif amount > self.MODERATE_THRESHOLD:
-            self.triggered_rules.append(
-                f"Amount ${amount:,.2f} is above moderate threshold (${self.MODERATE_THRESHOLD:,.0f})"
+        elif amount > rules.moderate_threshold:
+            hits.add(
+                "amount_moderate",
+                f"Amount ${amount:,.2f} is above moderate threshold (${rules.moderate_threshold:,.0f})"
             )
             score += 15
 
         return score
 
-    def _assess_structuring(self, has_signals: bool) -> int:
+    def _assess_structuring(self, has_signals: bool, hits: RuleHits) -> int:
         """Assess structuring risk - raises risk by one level"""
         if has_signals:
-            self.triggered_rules.append(
+            hits.add(
+                "structuring_signals",
                 "Structuring signals detected (multiple small transactions)"
             )
             return 15  # Raises risk by approximately one level
         return 0
 
-    def _score_to_level(self, score: int) -> str:
-        """Convert risk score to risk level"""
-        if score <= self.LOW_MAX_SCORE:
+    def _score_to_level(self, score: int, rules: RulesSnapshot = None) -> str:
+        """Convert risk score to risk level (with the current rules by default)"""
+        rules = rules or self.rules_manager.snapshot
+        if score <= rules.low_max_score:
             return RiskLevel.LOW.value
-        elif score <= self.MEDIUM_MAX_SCORE:
+        elif score <= rules.medium_max_score:
             return RiskLevel.MEDIUM.value
         else:
             return RiskLevel.HIGH.value
@@ -314,7 +585,7 @@ class ComplianceEngine:
         rationale = " ".join(parts) if parts else "Transaction meets low-risk criteria."
         return rationale
 
-    def _generate_checklist(self, transaction: Transaction, risk_level: str) -> List[str]:
+    def _generate_checklist(self, transaction: Transaction, risk_level: str, rules: RulesSnapshot) -> List[str]:
         """Generate compliance checklist items based on risk level"""
         checklist = []
 
@@ -341,13 +612,13 @@ class ComplianceEngine:
             checklist.append("Standard AML checks sufficient")
 
         # Geographic checks
-        if transaction.origin_country not in self.LOW_RISK_COUNTRIES:
+        if transaction.origin_country not in rules.low_risk_countries:
             checklist.append(
                 f"Research sanctions and regulatory status of {transaction.origin_country}"
             )
 
         # Purpose-specific checks
-        if transaction.purpose.lower() in self.HIGH_RISK_PURPOSES:
+        if transaction.purpose.lower() in rules.high_risk_purposes:
             checklist.append(f"Verify legitimacy of {transaction.purpose} activity")
 
         return checklist
@@ -356,7 +627,8 @@ class ComplianceEngine:
         self, 
         transaction: Transaction, 
         calculated_score: int, 
-        calculated_level: str
+        calculated_level: str,
+        triggered_rules: List[str]
     ) -> Optional[Dict]:
         """
         Use OpenAI to provide enhanced risk analysis and recommendations
@@ -371,51 +643,91 @@ class ComplianceEngine:
         if not self.openai_client:
             return None
 
-        # Construct prompt for OpenAI
-        prompt = self._build_ai_prompt(transaction, calculated_score, calculated_level)
-
         try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": (
-                            "You are an expert AML/KYC compliance officer with 15+ years of experience. "
-                            "Your role is to provide insightful risk analysis for money transfer transactions. "
-                            "Be thorough, professional, and focus on practical compliance considerations."
-                        )
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=0.3,  # Lower temperature for more consistent, focused responses
-                max_tokens=800,
-                response_format={"type": "json_object"}
-            )
+            with metrics.llm_call("risk_analysis") as record:
+                response = self.openai_client.chat.completions.create(
+                    **self._ai_request(transaction, calculated_score, calculated_level, triggered_rules)
+                )
+                record(response)
+            return self._parse_ai_response(response)
+
+        except Exception as e:
+            print(f"Error getting AI analysis: {e}")
+            return None
 
-            # Parse the response
-            ai_response = json.loads(response.choices[0].message.content)
-            
-            return {
-                "enhanced_rationale": ai_response.get("enhanced_rationale", ""),
-                "additional_red_flags": ai_response.get("additional_red_flags", []),
-                "recommendations": ai_response.get("recommendations", []),
-                "risk_adjustment": ai_response.get("risk_adjustment", None),
-                "confidence_level": ai_response.get("confidence_level", "medium")
-            }
+    async def _get_ai_risk_analysis_async(
+        self,
+        transaction: Transaction,
+        calculated_score: int,
+        calculated_level: str,
+        triggered_rules: List[str]
+    ) -> Optional[Dict]:
+        """Same as _get_ai_risk_analysis(), awaiting the async OpenAI client"""
+        if not self.async_openai_client:
+            return None
+
+        try:
+            with metrics.llm_call("risk_analysis") as record:
+                response = await self.async_openai_client.chat.completions.create(
+                    **self._ai_request(transaction, calculated_score, calculated_level, triggered_rules)
+                )
+                record(response)
+            return self._parse_ai_response(response)
 
         except Exception as e:
             print(f"Error getting AI analysis: {e}")
             return None
 
+    def _ai_request(
+        self,
+        transaction: Transaction,
+        calculated_score: int,
+        calculated_level: str,
+        triggered_rules: List[str]
+    ) -> Dict:
+        """Arguments of the chat completion call for the AI analysis"""
+        # Construct prompt for OpenAI
+        prompt = self._build_ai_prompt(transaction, calculated_score, calculated_level, triggered_rules)
+
+        return {
+            "model": "gpt-4o-mini",
+            "messages": [
+                {
+                    "role": "system",
+                    "content": (
+                        "You are an expert AML/KYC compliance officer with 15+ years of experience. "
+                        "Your role is to provide insightful risk analysis for money transfer transactions. "
+                        "Be thorough, professional, and focus on practical compliance considerations."
+                    )
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "temperature": 0.3,  # Lower temperature for more consistent, focused responses
+            "max_tokens": 800,
+            "response_format": {"type": "json_object"}
+        }
+
+    def _parse_ai_response(self, response) -> Dict:
+        """Extract the AI insights from a chat completion"""
+        ai_response = json.loads(response.choices[0].message.content)
+
+        return {
+            "enhanced_rationale": ai_response.get("enhanced_rationale", ""),
+            "additional_red_flags": ai_response.get("additional_red_flags", []),
+            "recommendations": ai_response.get("recommendations", []),
+            "risk_adjustment": ai_response.get("risk_adjustment", None),
+            "confidence_level": ai_response.get("confidence_level", "medium")
+        }
+
     def _build_ai_prompt(
         self, 
         transaction: Transaction, 
         calculated_score: int, 
-        calculated_level: str
+        calculated_level: str,
+        triggered_rules: List[str]
     ) -> str:
         """Build the prompt for OpenAI analysis"""
         
@@ -432,7 +744,7 @@ TRANSACTION DETAILS:
 RULE-BASED ASSESSMENT:
 - Calculated Risk Score: {calculated_score}/100
 - Risk Level: {calculated_level}
-- Triggered Rules: {", ".join(self.triggered_rules) if self.triggered_rules else "None"}
+- Triggered Rules: {", ".join(triggered_rules) if triggered_rules else "None"}
 
 Please provide a detailed compliance analysis in JSON format with the following structure:
 {{
@@ -23,6 +23,90 @@ class Config:
     FLASK_ENV = os.getenv('FLASK_ENV', 'development')
     FLASK_DEBUG = os.getenv('FLASK_DEBUG', 'True').lower() == 'true'
     
+    # Storage backend: "sqlite" (compliance_assessments.db) or "memory"
+    # (in-process only, for tests and ephemeral deployments)
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'sqlite')
+    
+    # Database Configuration
+    # Write-behind mode queues assessments and group-commits them from a
+    # single writer thread (one transaction per batch instead of per request).
+    # Safe with several worker processes; rows that fail to commit are kept
+    # in <database>.failed.jsonl and counted in /api/db/metrics (admin).
+    DB_WRITE_BEHIND = os.getenv('DB_WRITE_BEHIND', 'False').lower() == 'true'
+    DB_WRITE_BATCH_SIZE = int(os.getenv('DB_WRITE_BATCH_SIZE', '200'))
+    DB_WRITE_MAX_DELAY_MS = int(os.getenv('DB_WRITE_MAX_DELAY_MS', '50'))
+    
+    # Monthly partitioning: one database file per month in this directory
+    # (empty = single compliance_assessments.db file)
+    DB_PARTITION_DIR = os.getenv('DB_PARTITION_DIR', '')
+    # Retention policy in months of age (0 = never archive / keep forever)
+    DB_ARCHIVE_AFTER_MONTHS = int(os.getenv('DB_ARCHIVE_AFTER_MONTHS', '0'))
+    DB_RETENTION_MONTHS = int(os.getenv('DB_RETENTION_MONTHS', '0'))
+    
+    # Online snapshots (SQLite incremental backup): pages copied per step,
+    # pause between steps so writers get the database, and snapshots kept
+    DB_SNAPSHOT_DIR = os.getenv('DB_SNAPSHOT_DIR', str(Path(__file__).parent / 'snapshots'))
+    DB_SNAPSHOT_PAGES_PER_STEP = int(os.getenv('DB_SNAPSHOT_PAGES_PER_STEP', '256'))
+    DB_SNAPSHOT_STEP_SLEEP_MS = int(os.getenv('DB_SNAPSHOT_STEP_SLEEP_MS', '5'))
+    DB_SNAPSHOT_KEEP = int(os.getenv('DB_SNAPSHOT_KEEP', '24'))
+    
+    # Admin endpoints require this token in the X-Admin-Token header
+    # (unset = admin endpoints disabled)
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+    
+    # Seconds between checks of rules_config.json for edits made outside
+    # the app (0 = no hot reload)
+    RULES_WATCH_INTERVAL_S = float(os.getenv('RULES_WATCH_INTERVAL_S', '2'))
+    # Compiled rulesets kept in memory for re-evaluating past assessments
+    RULES_CACHE_SIZE = int(os.getenv('RULES_CACHE_SIZE', '16'))
+    # Rules state shared by worker processes: the version counter, the lock
+    # file of rules writers and the history of every ruleset in effect
+    # (created on the first save or reload)
+    RULES_DATA_DIR = os.getenv('RULES_DATA_DIR', str(Path(__file__).parent / 'data' / 'rules'))
+    
+    # Per-tenant rule overrides, one <tenant>.json file per tenant, selected
+    # by the X-Tenant-ID header or by an API key (X-API-Key) listed in
+    # TENANT_API_KEYS_FILE, a JSON object mapping keys to tenant IDs
+    TENANT_RULES_DIR = os.getenv('TENANT_RULES_DIR', str(Path(__file__).parent / 'tenant_rules'))
+    TENANT_API_KEYS_FILE = os.getenv('TENANT_API_KEYS_FILE', '')
+    # Compiled tenant rulesets kept in memory (least recently used are dropped)
+    TENANT_CACHE_SIZE = int(os.getenv('TENANT_CACHE_SIZE', '256'))
+    
+    # Serialized responses of hot assessments and rulesets (ETag-tagged);
+    # entries expire after the TTL so deletions by other processes show up
+    RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', '256'))
+    RESPONSE_CACHE_TTL_S = float(os.getenv('RESPONSE_CACHE_TTL_S', '60'))
+    
+    # /api/risk-check/batch: rows validated, scored and saved (one database
+    # transaction) per chunk; clients may pick up to the maximum chunk size
+    RISK_CHECK_BATCH_CHUNK_SIZE = int(os.getenv('RISK_CHECK_BATCH_CHUNK_SIZE', '500'))
+    RISK_CHECK_BATCH_MAX_CHUNK_SIZE = int(os.getenv('RISK_CHECK_BATCH_MAX_CHUNK_SIZE', '5000'))
+    
+    # JSON encoder for API responses and stored assessments: auto picks
+    # orjson, then msgspec, when installed, else the standard library
+    JSON_BACKEND = os.getenv('JSON_BACKEND', 'auto')
+    
+    # Compliance engine instrumentation: per-rule hit counts and sampled
+    # step latencies in /api/metrics and /api/engine/stats (admin). The
+    # steps of one review in ENGINE_STATS_SAMPLE_EVERY are timed. Enabled,
+    # it costs about +25% per rules-only review at 1 in 100 (1.5µs on a
+    # ~6µs review, mostly counting; `python benchmark.py engine`), which is
+    # negligible next to OpenAI analysis or a database write.
+    ENGINE_STATS = os.getenv('ENGINE_STATS', 'False').lower() == 'true'
+    ENGINE_STATS_SAMPLE_EVERY = int(os.getenv('ENGINE_STATS_SAMPLE_EVERY', '100'))
+    
+    # Longest run of POST /api/admin/profile (sampling profiler), in seconds
+    PROFILER_MAX_SECONDS = float(os.getenv('PROFILER_MAX_SECONDS', '60'))
+    
+    # Prebuilt ZIP served by /api/download-mock-documents
+    MOCK_BUNDLE_PATH = os.getenv('MOCK_BUNDLE_PATH', str(Path(__file__).parent / 'mock_compliance_documents.zip'))
+    
+    # ASGI serving mode (uvicorn asgi_app:app): threads for SQLite and PDF
+    # rendering offloaded from the event loop, and threads running the
+    # Flask routes that are not served natively async
+    ASGI_THREADPOOL_SIZE = int(os.getenv('ASGI_THREADPOOL_SIZE', '40'))
+    ASGI_WSGI_WORKERS = int(os.getenv('ASGI_WSGI_WORKERS', '10'))
+    
     @classmethod
     def validate(cls):
         """Validate required configuration"""
@@ -4,26 +4,134 @@ Uses SQLite for simplicity and portability
 """
 
 import sqlite3
-import json
-from datetime import datetime
+import gzip
+import os
+import queue
+import re
+import threading
+import time
+import shutil
+from datetime import date, datetime
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional, Tuple
+
+import serialization
+from compliance_engine import ComplianceEngine, RULE_IDS, rule_id_for_text, rule_mask
+from importer import decode_record, iter_records, raw_assessment_row, record_timestamp, record_to_assessment
+from storage import ASSESSMENT_COLUMNS, AssessmentStore, build_row, row_to_assessment
 
 DATABASE_PATH = Path(__file__).parent / "compliance_assessments.db"
 
+# Columns added after the original schema: name -> column definition.
+# Databases created before a column existed get it via ALTER TABLE.
+ADDED_COLUMNS = {
+    "rule_mask": "INTEGER NOT NULL DEFAULT 0",
+    "rules_version": "TEXT",
+}
+
+# Risk levels tracked in the assessment_summary aggregate row
+SUMMARY_LEVEL_COLUMNS = {
+    "Low": "low_count",
+    "Medium": "medium_count",
+    "High": "high_count",
+}
+
+# Rollup dimensions maintained in analytics_rollup: dimension -> SQL key
+# expression over an assessments row ({ref} is NEW, OLD or the table name)
+ANALYTICS_DIMENSIONS = {
+    "day": "''",
+    "corridor": "{ref}.source_country || ' → ' || {ref}.destination_country",
+    "purpose": "lower({ref}.purpose)",
+}
+
+# Text indexed for full-text search, as SQL expressions over an assessments
+# row ({ref} is NEW or the table name). JSON columns contribute their string
+# values only, so keys and punctuation do not pollute the index.
+SEARCH_COLUMNS = {
+    "rationale": "{ref}.rationale",
+    "triggered_rules": "(SELECT group_concat(value, ' ') FROM json_each({ref}.triggered_rules))",
+    "ai_insights": "(SELECT group_concat(value, ' ') FROM json_tree({ref}.ai_insights) WHERE type = 'text')",
+    "documents": (
+        "(SELECT group_concat(value, ' ') FROM json_tree({ref}.full_response, '$.document_verification')"
+        " WHERE type = 'text')"
+    ),
+}
+# Columns SEARCH_COLUMNS reads; updating any of them re-indexes the row
+SEARCH_SOURCE_COLUMNS = ("rationale", "triggered_rules", "ai_insights", "full_response")
+
+# Monthly partition files: assessments_YYYY-MM.db. IDs in a partition start
+# at YYYYMM * PARTITION_ID_STRIDE, so an ID identifies its partition and
+# IDs stay unique (and ordered by month) across files.
+PARTITION_FILE_PATTERN = re.compile(r"^assessments_(\d{4}-\d{2})\.db$")
+ARCHIVE_FILE_PATTERN = re.compile(r"^assessments_(\d{4}-\d{2})\.db\.gz$")
+PARTITION_ID_STRIDE = 10 ** 9
+MIN_PARTITION_ID = 190001 * PARTITION_ID_STRIDE
+
+# Snapshot directories are named by their UTC start time
+SNAPSHOT_DIR_PATTERN = re.compile(r"^\d{8}T\d{6}Z$")
+
+INSERT_ASSESSMENT_SQL = "INSERT INTO assessments ({}) VALUES ({})".format(
+    ", ".join(ASSESSMENT_COLUMNS),
+    ", ".join(f":{column}" for column in ASSESSMENT_COLUMNS),
+)
 
-class AssessmentDB:
-    """Manages storage and retrieval of compliance assessments"""
 
-    def __init__(self, db_path: str = None):
+class AssessmentDB(AssessmentStore):
+    """Manages storage and retrieval of compliance assessments in SQLite"""
+
+    def __init__(
+        self,
+        db_path: str = None,
+        write_behind: bool = False,
+        batch_size: int = 200,
+        max_delay_ms: int = 50,
+        partition_dir: str = None
+    ):
         self.db_path = db_path or str(DATABASE_PATH)
-        self._initialize_db()
+        self.search_enabled = fts5_available()
+
+        # Optional monthly partitioning: assessments go to one file per month
+        # in partition_dir. An existing single-file database at db_path is
+        # kept as the oldest ("legacy") partition.
+        self.partition_dir = Path(partition_dir) if partition_dir else None
+        self._initialized_paths = set()
+        self._init_lock = threading.Lock()
+        if self.partition_dir:
+            (self.partition_dir / "archive").mkdir(parents=True, exist_ok=True)
+            if Path(self.db_path).exists():
+                self._ensure_shard(self.db_path)
+        else:
+            self._ensure_shard(self.db_path)
+
+        # Optional write-behind mode: inserts are queued and group-committed
+        # by a single background writer thread
+        self._write_queue = None
+        if write_behind:
+            self._write_queue = WriteBehindQueue(
+                self, batch_size=batch_size, max_delay_ms=max_delay_ms
+            )
+
+    def _connect(self, path: str = None) -> sqlite3.Connection:
+        """Open a connection to the assessments database (or one partition)"""
+        return sqlite3.connect(path or self.db_path, timeout=30)
 
-    def _initialize_db(self):
+    def _ensure_shard(self, path: str):
+        """Create the schema in a database file the first time it is used"""
+        if path in self._initialized_paths:
+            return
+        with self._init_lock:
+            if path not in self._initialized_paths:
+                self._initialize_db(path)
+                self._initialized_paths.add(path)
+
+    def _initialize_db(self, path: str = None):
         """Create the assessments table if it doesn't exist"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connect(path)
         cursor = conn.cursor()
 
+        # WAL lets readers keep working while the writer commits
+        cursor.execute("PRAGMA journal_mode=WAL")
+
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS assessments (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -41,13 +149,402 @@ class AssessmentDB:
                 rationale TEXT,
                 checklist_items TEXT,
                 ai_insights TEXT,
-                full_response TEXT NOT NULL
+                full_response TEXT NOT NULL,
+                rule_mask INTEGER NOT NULL DEFAULT 0,
+                rules_version TEXT
+            )
+        """)
+        self._add_missing_columns(cursor)
+
+        self._initialize_summary(cursor)
+        self._initialize_rollups(cursor)
+        self._initialize_rule_hits(cursor)
+        if self.search_enabled:
+            self._initialize_search_index(cursor)
+
+        # Progress of bulk imports, per source file (see bulk_import())
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS import_checkpoints (
+                source TEXT PRIMARY KEY,
+                position INTEGER NOT NULL,
+                rows_imported INTEGER NOT NULL DEFAULT 0,
+                updated_at TEXT NOT NULL
             )
         """)
 
+        # New partitions number their rows from YYYYMM * PARTITION_ID_STRIDE
+        month = partition_month(path or self.db_path)
+        if month:
+            cursor.execute("""
+                INSERT INTO sqlite_sequence (name, seq)
+                SELECT 'assessments', ?
+                WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'assessments')
+            """, (month_id_base(month),))
+
         conn.commit()
         conn.close()
 
+    def _add_missing_columns(self, cursor: sqlite3.Cursor):
+        """Bring an assessments table created by an older version up to date"""
+        cursor.execute("PRAGMA table_info(assessments)")
+        existing = {row[1] for row in cursor.fetchall()}
+        for column, definition in ADDED_COLUMNS.items():
+            if column not in existing:
+                cursor.execute(f"ALTER TABLE assessments ADD COLUMN {column} {definition}")
+
+    def _initialize_summary(self, cursor: sqlite3.Cursor):
+        """
+        Create the running aggregates used by get_statistics()
+
+        A single summary row is kept up to date by triggers on the
+        assessments table, so statistics never need a full-table scan.
+        Every change to the table also bumps the row's version, which
+        get_data_version() reads.
+        """
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS assessment_summary (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                total INTEGER NOT NULL DEFAULT 0,
+                score_sum INTEGER NOT NULL DEFAULT 0,
+                low_count INTEGER NOT NULL DEFAULT 0,
+                medium_count INTEGER NOT NULL DEFAULT 0,
+                high_count INTEGER NOT NULL DEFAULT 0,
+                version INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+
+        for event, op, ref in (("INSERT", "+", "NEW"), ("DELETE", "-", "OLD")):
+            level_updates = ", ".join(
+                f"{column} = {column} {op} ({ref}.risk_level = '{level}')"
+                for level, column in SUMMARY_LEVEL_COLUMNS.items()
+            )
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS assessments_summary_{event.lower()}
+                AFTER {event} ON assessments
+                BEGIN
+                    UPDATE assessment_summary SET
+                        total = total {op} 1,
+                        score_sum = score_sum {op} {ref}.risk_score,
+                        {level_updates},
+                        version = version + 1
+                    WHERE id = 1;
+                END
+            """)
+
+        # Rows rewritten in place (a corrected score, recovered rule IDs)
+        level_updates = ", ".join(
+            f"{column} = {column} - (OLD.risk_level = '{level}') + (NEW.risk_level = '{level}')"
+            for level, column in SUMMARY_LEVEL_COLUMNS.items()
+        )
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS assessments_summary_update
+            AFTER UPDATE ON assessments
+            BEGIN
+                UPDATE assessment_summary SET
+                    score_sum = score_sum - OLD.risk_score + NEW.risk_score,
+                    {level_updates},
+                    version = version + 1
+                WHERE id = 1;
+            END
+        """)
+
+        cursor.execute("SELECT 1 FROM assessment_summary WHERE id = 1")
+        if not cursor.fetchone():
+            # New table (or a database created before aggregates existed)
+            self._rebuild_summary(cursor)
+
+    def _compute_summary(self, cursor: sqlite3.Cursor) -> Dict:
+        """Compute the aggregate values from scratch with a full-table scan"""
+        cursor.execute("SELECT COUNT(*), COALESCE(SUM(risk_score), 0) FROM assessments")
+        total, score_sum = cursor.fetchone()
+
+        cursor.execute("""
+            SELECT risk_level, COUNT(*) as count
+            FROM assessments
+            GROUP BY risk_level
+        """)
+        by_level = {row[0]: row[1] for row in cursor.fetchall()}
+
+        summary = {'total': total, 'score_sum': score_sum}
+        for level, column in SUMMARY_LEVEL_COLUMNS.items():
+            summary[column] = by_level.get(level, 0)
+        return summary
+
+    def _read_summary(self, cursor: sqlite3.Cursor) -> Dict:
+        """Read the maintained aggregate row"""
+        columns = ['total', 'score_sum', *SUMMARY_LEVEL_COLUMNS.values(), 'version']
+        cursor.execute(f"SELECT {', '.join(columns)} FROM assessment_summary WHERE id = 1")
+        row = cursor.fetchone()
+        return dict(zip(columns, row)) if row else None
+
+    def _rebuild_summary(self, cursor: sqlite3.Cursor):
+        """Replace the aggregate row with freshly computed values"""
+        summary = self._compute_summary(cursor)
+        cursor.execute("SELECT version FROM assessment_summary WHERE id = 1")
+        row = cursor.fetchone()
+        # A new file starts from the clock (in microseconds), so a file that
+        # replaces a cleared or dropped one never repeats its versions
+        summary['version'] = (row[0] + 1) if row else time.time_ns() // 1000
+        cursor.execute(
+            "INSERT OR REPLACE INTO assessment_summary (id, {}) VALUES (1, {})".format(
+                ", ".join(summary), ", ".join(f":{column}" for column in summary)
+            ),
+            summary
+        )
+
+    def _initialize_rollups(self, cursor: sqlite3.Cursor):
+        """
+        Create the per-day analytics rollups used by get_analytics()
+
+        Each assessment adds to one row per dimension (day total, corridor,
+        purpose), keyed by day and risk level, via insert/delete triggers.
+        Rows saved before the rollups existed are added by rebuild_rollups()
+        (`python cli.py backfill-analytics`).
+        """
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS analytics_rollup (
+                dimension TEXT NOT NULL,
+                day TEXT NOT NULL,
+                key TEXT NOT NULL,
+                risk_level TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                score_sum INTEGER NOT NULL DEFAULT 0,
+                amount_sum REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (dimension, day, key, risk_level)
+            ) WITHOUT ROWID
+        """)
+
+        insert_statements = []
+        delete_statements = []
+        for dimension, key_expr in ANALYTICS_DIMENSIONS.items():
+            insert_statements.append(f"""
+                INSERT INTO analytics_rollup (dimension, day, key, risk_level, count, score_sum, amount_sum)
+                VALUES ('{dimension}', substr(NEW.timestamp, 1, 10), {key_expr.format(ref='NEW')},
+                        NEW.risk_level, 1, NEW.risk_score, NEW.amount)
+                ON CONFLICT (dimension, day, key, risk_level) DO UPDATE SET
+                    count = count + 1,
+                    score_sum = score_sum + excluded.score_sum,
+                    amount_sum = amount_sum + excluded.amount_sum;
+            """)
+            match = f"""
+                dimension = '{dimension}' AND day = substr(OLD.timestamp, 1, 10)
+                AND key = {key_expr.format(ref='OLD')} AND risk_level = OLD.risk_level
+            """
+            delete_statements.append(f"""
+                UPDATE analytics_rollup SET
+                    count = count - 1,
+                    score_sum = score_sum - OLD.risk_score,
+                    amount_sum = amount_sum - OLD.amount
+                WHERE {match};
+                DELETE FROM analytics_rollup WHERE count <= 0 AND {match};
+            """)
+
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS assessments_rollup_insert
+            AFTER INSERT ON assessments
+            BEGIN {"".join(insert_statements)} END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS assessments_rollup_delete
+            AFTER DELETE ON assessments
+            BEGIN {"".join(delete_statements)} END
+        """)
+
+    def _initialize_rule_hits(self, cursor: sqlite3.Cursor):
+        """
+        Create the rule-hit table and indexes used by get_rule_analytics()
+
+        Each triggered rule ID becomes a rule_hits row (day, rule_id,
+        assessment_id), and assessments.rule_mask holds the same rules as
+        bits (see compliance_engine.RULE_IDS). Both are covered by indexes,
+        so hit rates and co-occurrence never decode the JSON columns.
+        Rows saved before rule IDs were recorded are classified by
+        rebuild_rule_hits() (`python cli.py backfill-analytics`).
+        """
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS rule_hits (
+                day TEXT NOT NULL,
+                rule_id TEXT NOT NULL,
+                assessment_id INTEGER NOT NULL,
+                PRIMARY KEY (day, rule_id, assessment_id)
+            ) WITHOUT ROWID
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_rule_hits_assessment
+            ON rule_hits (assessment_id)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_assessments_timestamp_rule_mask
+            ON assessments (timestamp, rule_mask)
+        """)
+
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS assessments_rule_hits_insert
+            AFTER INSERT ON assessments
+            BEGIN
+                INSERT OR IGNORE INTO rule_hits (day, rule_id, assessment_id)
+                SELECT substr(NEW.timestamp, 1, 10), value, NEW.id
+                FROM json_each(NEW.full_response, '$.triggered_rule_ids');
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS assessments_rule_hits_delete
+            AFTER DELETE ON assessments
+            BEGIN
+                DELETE FROM rule_hits WHERE assessment_id = OLD.id;
+            END
+        """)
+
+    def _initialize_search_index(self, cursor: sqlite3.Cursor):
+        """
+        Create the FTS5 index over rationale, rules, AI insights and documents
+
+        The index is kept in sync by insert/update/delete triggers. Rows saved
+        before the index existed are added by rebuild_search_index()
+        (`python cli.py rebuild-search-index`).
+        """
+        cursor.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS assessments_fts
+            USING fts5({", ".join(SEARCH_COLUMNS)}, tokenize = 'porter unicode61')
+        """)
+
+        values = ", ".join(expr.format(ref="NEW") for expr in SEARCH_COLUMNS.values())
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS assessments_fts_insert
+            AFTER INSERT ON assessments
+            BEGIN
+                INSERT INTO assessments_fts (rowid, {", ".join(SEARCH_COLUMNS)})
+                VALUES (NEW.id, {values});
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS assessments_fts_delete
+            AFTER DELETE ON assessments
+            BEGIN
+                DELETE FROM assessments_fts WHERE rowid = OLD.id;
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS assessments_fts_update
+            AFTER UPDATE OF {", ".join(SEARCH_SOURCE_COLUMNS)} ON assessments
+            BEGIN
+                DELETE FROM assessments_fts WHERE rowid = OLD.id;
+                INSERT INTO assessments_fts (rowid, {", ".join(SEARCH_COLUMNS)})
+                VALUES (NEW.id, {values});
+            END
+        """)
+
+    def _partitions(self) -> List[tuple]:
+        """List (month, path) for the active monthly partitions, oldest first"""
+        if not self.partition_dir:
+            return []
+        partitions = []
+        for entry in os.scandir(self.partition_dir):
+            match = PARTITION_FILE_PATTERN.match(entry.name)
+            if match:
+                partitions.append((match.group(1), entry.path))
+        partitions.sort()
+        return partitions
+
+    def _shards(self, newest_first: bool = False) -> List[tuple]:
+        """
+        List the database files that hold assessments as (month, path)
+
+        Without partitioning this is just the main database (month None).
+        With partitioning it is the legacy database, if present, followed
+        by each monthly partition.
+        """
+        if not self.partition_dir:
+            shards = [(None, self.db_path)]
+        else:
+            shards = self._partitions()
+            if Path(self.db_path).exists():
+                shards.insert(0, (None, self.db_path))
+        for _, path in shards:
+            self._ensure_shard(path)
+        return shards[::-1] if newest_first else shards
+
+    def _shard_path_for_row(self, row: Dict) -> str:
+        """Database file a new row is written to (its month's partition)"""
+        if not self.partition_dir:
+            return self.db_path
+        path = str(self.partition_dir / f"assessments_{row['timestamp'][:7]}.db")
+        self._ensure_shard(path)
+        return path
+
+    def _shard_path_for_id(self, assessment_id: int) -> Optional[str]:
+        """Database file holding an assessment ID, or None if it cannot exist"""
+        if not self.partition_dir:
+            return self.db_path
+        if assessment_id >= MIN_PARTITION_ID:
+            yyyymm = assessment_id // PARTITION_ID_STRIDE
+            path = self.partition_dir / f"assessments_{yyyymm // 100:04d}-{yyyymm % 100:02d}.db"
+        else:
+            path = Path(self.db_path)
+        if not path.exists():
+            return None
+        self._ensure_shard(str(path))
+        return str(path)
+
+    def _reserve_ids(self, path: str, count: int) -> int:
+        """
+        Reserve a block of IDs in a database file, across processes
+
+        Raises the file's AUTOINCREMENT counter by count inside an IMMEDIATE
+        transaction, so other processes (and plain inserts) allocate above
+        the block. IDs of a block left unused when a process exits are
+        skipped, as AUTOINCREMENT skips IDs of rolled-back inserts.
+
+        Returns:
+            First ID of the block
+        """
+        conn = self._connect(path)
+        conn.isolation_level = None
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'assessments'").fetchone()
+            max_id = conn.execute("SELECT MAX(id) FROM assessments").fetchone()[0] or 0
+            last_id = max(row[0] if row else 0, max_id)
+            if row:
+                conn.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = 'assessments'", (last_id + count,))
+            else:
+                conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('assessments', ?)", (last_id + count,))
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return last_id + 1
+
+    def _build_row(self, transaction_data: Dict, assessment_result: Dict) -> Dict:
+        """Convert a transaction and its assessment into an assessments row"""
+        return build_row(transaction_data, assessment_result)
+
+    def _write_rows(self, conn: sqlite3.Connection, rows: List[Dict]) -> List[int]:
+        """
+        Insert rows inside the caller's transaction
+
+        Rows with an id of None get one assigned by SQLite.
+
+        Returns:
+            IDs of the inserted rows, in order
+        """
+        cursor = conn.cursor()
+        ids = []
+        for row in rows:
+            cursor.execute(INSERT_ASSESSMENT_SQL, row)
+            ids.append(row['id'] if row['id'] is not None else cursor.lastrowid)
+        return ids
+
+    def _group_by_shard(self, rows: List[Dict]) -> Dict[str, List[Dict]]:
+        """Split rows by the database file they belong in"""
+        groups = {}
+        for row in rows:
+            groups.setdefault(self._shard_path_for_row(row), []).append(row)
+        return groups
+
     def save_assessment(
         self,
         transaction_data: Dict,
@@ -55,98 +552,124 @@ class AssessmentDB:
     ) -> int:
         """
         Save a compliance assessment to the database
-        
+
+        In write-behind mode the row is queued and its ID is reserved
+        immediately; the row becomes visible once the writer commits it.
+
         Args:
             transaction_data: Input transaction details
             assessment_result: Risk assessment result from ComplianceEngine
-            
+
         Returns:
             ID of the saved assessment
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        row = self._build_row(transaction_data, assessment_result)
 
-        # Prepare data
-        timestamp = datetime.utcnow().isoformat()
-        
-        cursor.execute("""
-            INSERT INTO assessments (
-                timestamp, amount, currency, source_country, destination_country,
-                purpose, counterparty_type, history_signals, risk_score, risk_level,
-                triggered_rules, rationale, checklist_items, ai_insights, full_response
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            timestamp,
-            transaction_data.get('amount'),
-            transaction_data.get('currency', 'USD'),
-            transaction_data.get('source_country'),
-            transaction_data.get('destination_country'),
-            transaction_data.get('purpose'),
-            transaction_data.get('counterparty_type'),
-            transaction_data.get('history_signals', ''),
-            assessment_result.get('risk_score'),
-            assessment_result.get('risk_level'),
-            json.dumps(assessment_result.get('triggered_rules', [])),
-            assessment_result.get('rationale'),
-            json.dumps(assessment_result.get('checklist_items', [])),
-            json.dumps(assessment_result.get('ai_insights')) if assessment_result.get('ai_insights') else None,
-            json.dumps(assessment_result)
-        ))
-
-        assessment_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        if self._write_queue:
+            return self._write_queue.submit(row)
+
+        conn = self._connect(self._shard_path_for_row(row))
+        try:
+            with conn:
+                assessment_id = self._write_rows(conn, [row])[0]
+        finally:
+            conn.close()
 
         return assessment_id
 
+    def save_assessments(self, pairs: List[Tuple[Dict, Dict]]) -> List[int]:
+        """
+        Save several assessments with one transaction per database file
+
+        In write-behind mode the rows are queued like single saves (the
+        writer group-commits them anyway).
+
+        Args:
+            pairs: (transaction_data, assessment_result) pairs
+
+        Returns:
+            IDs of the saved assessments, in order
+        """
+        rows = [self._build_row(transaction_data, assessment_result) for transaction_data, assessment_result in pairs]
+
+        if self._write_queue:
+            return [self._write_queue.submit(row) for row in rows]
+
+        for path, shard_rows in self._group_by_shard(rows).items():
+            conn = self._connect(path)
+            try:
+                with conn:
+                    for row, assessment_id in zip(shard_rows, self._write_rows(conn, shard_rows)):
+                        row['id'] = assessment_id
+            finally:
+                conn.close()
+
+        return [row['id'] for row in rows]
+
+    def _row_to_assessment(self, row) -> Dict:
+        """Convert a database row into an assessment dictionary"""
+        return row_to_assessment(row)
+
     def get_all_assessments(self, limit: int = 100, offset: int = 0) -> List[Dict]:
         """
         Retrieve all assessments from the database
-        
+
         Args:
             limit: Maximum number of records to return
             offset: Number of records to skip
-            
+
         Returns:
             List of assessment dictionaries
         """
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            SELECT * FROM assessments
-            ORDER BY timestamp DESC
-            LIMIT ? OFFSET ?
-        """, (limit, offset))
+        shards = self._shards(newest_first=True)
+        rows = []
+        for _, path in shards:
+            if len(rows) >= limit:
+                break
+            conn = self._connect(path)
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
 
-        rows = cursor.fetchall()
-        conn.close()
+            # Whole partitions inside the offset are skipped using their row count
+            if len(shards) > 1:
+                shard_total = self._read_summary(cursor)['total']
+                if offset >= shard_total:
+                    offset -= shard_total
+                    conn.close()
+                    continue
 
-        assessments = []
-        for row in rows:
-            assessment = dict(row)
-            # Parse JSON fields
-            assessment['triggered_rules'] = json.loads(assessment['triggered_rules'])
-            assessment['checklist_items'] = json.loads(assessment['checklist_items'])
-            if assessment['ai_insights']:
-                assessment['ai_insights'] = json.loads(assessment['ai_insights'])
-            assessment['full_response'] = json.loads(assessment['full_response'])
-            assessments.append(assessment)
+            cursor.execute("""
+                SELECT * FROM assessments
+                ORDER BY timestamp DESC
+                LIMIT ? OFFSET ?
+            """, (limit - len(rows), offset))
+            rows.extend(cursor.fetchall())
+            offset = 0
+            conn.close()
 
-        return assessments
+        return [self._row_to_assessment(row) for row in rows]
 
     def get_assessment_by_id(self, assessment_id: int) -> Optional[Dict]:
         """
         Retrieve a single assessment by ID
-        
+
         Args:
             assessment_id: ID of the assessment
-            
+
         Returns:
             Assessment dictionary or None if not found
         """
-        conn = sqlite3.connect(self.db_path)
+        # Rows still waiting in the write-behind queue are served from memory
+        if self._write_queue:
+            pending = self._write_queue.get_pending(assessment_id)
+            if pending:
+                return self._row_to_assessment(pending)
+
+        path = self._shard_path_for_id(assessment_id)
+        if not path:
+            return None
+
+        conn = self._connect(path)
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
 
@@ -157,37 +680,85 @@ class AssessmentDB:
         if not row:
             return None
 
-        assessment = dict(row)
-        assessment['triggered_rules'] = json.loads(assessment['triggered_rules'])
-        assessment['checklist_items'] = json.loads(assessment['checklist_items'])
-        if assessment['ai_insights']:
-            assessment['ai_insights'] = json.loads(assessment['ai_insights'])
-        assessment['full_response'] = json.loads(assessment['full_response'])
+        return self._row_to_assessment(row)
 
-        return assessment
+    def iter_assessment_rows(
+        self,
+        since_id: int = None,
+        start: str = None,
+        end: str = None,
+        batch_size: int = 1000
+    ) -> Iterator[tuple]:
+        """
+        Stream raw assessment rows in ID order with a single cursor
 
-    def get_statistics(self) -> Dict:
-        """Get summary statistics of assessments"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        JSON columns are returned as stored (unparsed text), and rows are
+        fetched in batches, so memory use is constant regardless of the
+        table size.
 
-        # Total assessments
-        cursor.execute("SELECT COUNT(*) FROM assessments")
-        total = cursor.fetchone()[0]
+        Args:
+            since_id: Only rows with an ID greater than this (incremental export)
+            start: First day to include (YYYY-MM-DD, inclusive)
+            end: Last day to include (YYYY-MM-DD, inclusive)
+            batch_size: Rows fetched from SQLite per round trip
 
-        # By risk level
-        cursor.execute("""
-            SELECT risk_level, COUNT(*) as count
-            FROM assessments
-            GROUP BY risk_level
-        """)
-        risk_breakdown = {row[0]: row[1] for row in cursor.fetchall()}
+        Yields:
+            Tuples of values in ASSESSMENT_COLUMNS order
+        """
+        since_id = since_id or 0
+        conditions = ["id > ?"]
+        params = [since_id]
+        if start:
+            conditions.append("timestamp >= ?")
+            params.append(start)
+        if end:
+            conditions.append("timestamp < date(?, '+1 day')")
+            params.append(end)
 
-        # Average risk score
-        cursor.execute("SELECT AVG(risk_score) FROM assessments")
-        avg_score = cursor.fetchone()[0] or 0
+        for month, path in self._shards():
+            # Partitions outside the date range or below since_id are skipped unopened
+            if month and not month_in_range(month, start, end):
+                continue
+            if month and month_id_base(next_month(month)) <= since_id:
+                continue
 
-        conn.close()
+            conn = self._connect(path)
+            try:
+                cursor = conn.cursor()
+                cursor.arraysize = batch_size
+                cursor.execute(f"""
+                    SELECT {", ".join(ASSESSMENT_COLUMNS)}
+                    FROM assessments
+                    WHERE {" AND ".join(conditions)}
+                    ORDER BY id
+                """, params)
+                while True:
+                    rows = cursor.fetchmany()
+                    if not rows:
+                        break
+                    yield from rows
+            finally:
+                conn.close()
+
+    def get_statistics(self) -> Dict:
+        """Get summary statistics of assessments (reads the aggregate row)"""
+        summary = {}
+        for _, path in self._shards():
+            conn = self._connect(path)
+            add_counts(summary, self._read_summary(conn.cursor()))
+            conn.close()
+
+        return self._summary_to_statistics(summary)
+
+    def _summary_to_statistics(self, summary: Dict) -> Dict:
+        """Format aggregate values the way /api/statistics reports them"""
+        total = summary.get('total', 0)
+        risk_breakdown = {
+            level: summary[column]
+            for level, column in SUMMARY_LEVEL_COLUMNS.items()
+            if summary.get(column)
+        }
+        avg_score = summary['score_sum'] / total if total else 0
 
         return {
             'total_assessments': total,
@@ -195,11 +766,1315 @@ class AssessmentDB:
             'average_risk_score': round(avg_score, 2)
         }
 
+    def verify_statistics(self, repair: bool = False) -> Dict:
+        """
+        Check the maintained aggregates against a full-table recount
+
+        Args:
+            repair: Rebuild the aggregates from scratch if they have drifted
+
+        Returns:
+            Dictionary with the stored and recomputed values and whether
+            they matched (and were repaired)
+        """
+        consistent = True
+        stored_total = {}
+        actual_total = {}
+        for _, path in self._shards():
+            conn = self._connect(path)
+            try:
+                with conn:
+                    cursor = conn.cursor()
+                    stored = self._read_summary(cursor)
+                    actual = self._compute_summary(cursor)
+                    shard_consistent = stored is not None and all(
+                        stored[column] == value for column, value in actual.items()
+                    )
+                    if repair and not shard_consistent:
+                        self._rebuild_summary(cursor)
+            finally:
+                conn.close()
+            consistent = consistent and shard_consistent
+            add_counts(stored_total, stored or {})
+            add_counts(actual_total, actual)
+
+        return {
+            'consistent': consistent,
+            'repaired': repair and not consistent,
+            'stored': stored_total,
+            'actual': actual_total,
+        }
+
+    def rebuild_statistics(self):
+        """Recompute the aggregates from scratch"""
+        for _, path in self._shards():
+            conn = self._connect(path)
+            try:
+                with conn:
+                    self._rebuild_summary(conn.cursor())
+            finally:
+                conn.close()
+
+    def rebuild_rollups(self) -> int:
+        """
+        Recompute the analytics rollups from the assessments table
+
+        Used to backfill data saved before the rollups existed, or to
+        repair them. Runs in one transaction, so readers never see a
+        partially rebuilt rollup.
+
+        Returns:
+            Number of rollup rows written
+        """
+        written = 0
+        for _, path in self._shards():
+            conn = self._connect(path)
+            try:
+                with conn:
+                    cursor = conn.cursor()
+                    cursor.execute("DELETE FROM analytics_rollup")
+                    for dimension, key_expr in ANALYTICS_DIMENSIONS.items():
+                        cursor.execute(f"""
+                            INSERT INTO analytics_rollup (dimension, day, key, risk_level, count, score_sum, amount_sum)
+                            SELECT ?, substr(timestamp, 1, 10), {key_expr.format(ref='assessments')}, risk_level,
+                                   COUNT(*), SUM(risk_score), SUM(amount)
+                            FROM assessments
+                            GROUP BY 2, 3, 4
+                        """, (dimension,))
+                    cursor.execute("SELECT COUNT(*) FROM analytics_rollup")
+                    written += cursor.fetchone()[0]
+            finally:
+                conn.close()
+        return written
+
+    def get_analytics(
+        self,
+        dimension: str = "day",
+        start: str = None,
+        end: str = None,
+        key: str = None
+    ) -> List[Dict]:
+        """
+        Query the precomputed analytics rollups
+
+        Args:
+            dimension: "day" for a daily series, or "corridor"/"purpose"
+                for totals per corridor or purpose over the range
+            start: First day to include (YYYY-MM-DD, inclusive)
+            end: Last day to include (YYYY-MM-DD, inclusive)
+            key: Restrict to a single corridor/purpose; the result is then
+                a daily series for that key
+
+        Returns:
+            List of buckets with total, risk breakdown, average score and
+            total amount
+        """
+        if dimension not in ANALYTICS_DIMENSIONS:
+            raise ValueError(f"Unknown analytics dimension: {dimension}")
+
+        conditions = ["dimension = ?"]
+        params = [dimension]
+        if start:
+            conditions.append("day >= ?")
+            params.append(start)
+        if end:
+            conditions.append("day <= ?")
+            params.append(end)
+        if key is not None:
+            conditions.append("key = ?")
+            params.append(key)
+
+        # Daily series for the "day" dimension or a single key, otherwise one bucket per key
+        bucket = "day" if dimension == "day" or key is not None else "key"
+
+        rows = []
+        for month, path in self._shards():
+            if month and not month_in_range(month, start, end):
+                continue
+            conn = self._connect(path)
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT {bucket}, risk_level, SUM(count), SUM(score_sum), SUM(amount_sum)
+                FROM analytics_rollup
+                WHERE {" AND ".join(conditions)}
+                GROUP BY 1, 2
+            """, params)
+            rows.extend(cursor.fetchall())
+            conn.close()
+
+        buckets = {}
+        for bucket_value, risk_level, count, score_sum, amount_sum in rows:
+            entry = buckets.setdefault(bucket_value, {
+                bucket: bucket_value,
+                'total_assessments': 0,
+                'risk_breakdown': {},
+                'score_sum': 0,
+                'total_amount': 0,
+            })
+            entry['total_assessments'] += count
+            entry['risk_breakdown'][risk_level] = entry['risk_breakdown'].get(risk_level, 0) + count
+            entry['score_sum'] += score_sum
+            entry['total_amount'] += amount_sum
+
+        results = []
+        for entry in buckets.values():
+            score_sum = entry.pop('score_sum')
+            entry['average_risk_score'] = round(score_sum / entry['total_assessments'], 2)
+            entry['total_amount'] = round(entry['total_amount'], 2)
+            results.append(entry)
+
+        if bucket == "day":
+            results.sort(key=lambda entry: entry['day'])
+        else:
+            results.sort(key=lambda entry: entry['total_assessments'], reverse=True)
+        return results
+
+    def bulk_import(
+        self,
+        path: str,
+        file_format: str = None,
+        score: bool = False,
+        batch_size: int = 50000,
+        defer_indexes: bool = True,
+        index_search: bool = True,
+        restart: bool = False,
+        on_progress=None
+    ) -> Dict:
+        """
+        Import a large CSV or JSONL file of transactions or assessments
+
+        Rows are written with executemany, one transaction per batch. The
+        insert triggers are dropped inside each batch transaction and the
+        derived tables (statistics, rollups, rule hits, search index) are
+        updated once per batch with set-based statements, then the
+        triggers are restored before commit, so other connections never
+        see a partial batch. Secondary indexes are dropped for the whole
+        import and rebuilt at the end.
+
+        Every batch records how far through the file it got in the same
+        transaction, so running the same import again after an
+        interruption resumes where it stopped.
+
+        Args:
+            path: CSV or JSONL file (format taken from the extension unless given)
+            file_format: "csv" or "jsonl"
+            score: Score each transaction with the current rules instead
+                of importing an existing assessment
+            batch_size: Rows per transaction
+            defer_indexes: Drop secondary indexes until the import finishes
+            index_search: Add imported rows to the full-text index (if
+                False, run rebuild_search_index() afterwards)
+            restart: Forget the checkpoint and import the whole file again
+            on_progress: Optional callable receiving a progress dictionary
+                after every batch
+
+        Returns:
+            Dictionary with row counts, the first errors, elapsed time and
+            rows per second
+        """
+        if self._write_queue:
+            raise RuntimeError("Bulk import assigns IDs itself and cannot run in write-behind mode")
+
+        source = f"{Path(path).resolve()}:{os.path.getsize(path)}"
+        engine = ComplianceEngine() if score else None
+        report = {
+            'source': str(path),
+            'rows_read': 0,
+            'rows_imported': 0,
+            'rows_already_imported': 0,
+            'rows_failed': 0,
+            'errors': [],
+        }
+
+        connections = {}
+        checkpoints = {}
+        dropped_indexes = {}
+        batch = []
+        started = time.perf_counter()
+
+        def open_shard(shard_path):
+            conn = self._connect(shard_path)
+            conn.isolation_level = None
+            conn.execute("PRAGMA cache_size = -65536")
+            if restart:
+                conn.execute("DELETE FROM import_checkpoints WHERE source = ?", (source,))
+            row = conn.execute(
+                "SELECT position FROM import_checkpoints WHERE source = ?", (source,)
+            ).fetchone()
+            checkpoints[shard_path] = row[0] if row else 0
+            if defer_indexes:
+                dropped_indexes[shard_path] = self._drop_secondary_indexes(conn)
+            connections[shard_path] = conn
+
+        def write_batch():
+            for shard_path, entries in self._group_entries_by_shard(batch).items():
+                self._import_batch(connections[shard_path], source, entries, index_search)
+            report['rows_imported'] += len(batch)
+            batch.clear()
+            if on_progress:
+                elapsed = time.perf_counter() - started
+                on_progress({
+                    'rows_read': report['rows_read'],
+                    'rows_imported': report['rows_imported'],
+                    'rows_per_s': round(report['rows_imported'] / elapsed) if elapsed else 0,
+                })
+
+        try:
+            for position, raw in enumerate(iter_records(path, file_format), start=1):
+                report['rows_read'] += 1
+                try:
+                    record = decode_record(raw)
+                    timestamp = record_timestamp(record)
+                    shard_path = self._shard_path_for_row({'timestamp': timestamp})
+                    if shard_path not in connections:
+                        open_shard(shard_path)
+                    if position <= checkpoints[shard_path]:
+                        report['rows_already_imported'] += 1
+                        continue
+
+                    # Exported CSV rows go in as stored; their rule hits are
+                    # read from the stored rule IDs by SQLite (rule_ids None)
+                    raw_row = None if engine else raw_assessment_row(record)
+                    if raw_row:
+                        row = {'id': None, 'timestamp': timestamp, **raw_row}
+                        rule_ids = None
+                    else:
+                        transaction_data, result = record_to_assessment(record, engine)
+                        row = self._build_row(transaction_data, result)
+                        row['timestamp'] = timestamp
+                        rule_ids = result.get('triggered_rule_ids')
+                        if rule_ids is None:
+                            rule_ids = [rule_id for rule_id in map(rule_id_for_text, result.get('triggered_rules', [])) if rule_id]
+                            row['rule_mask'] = rule_mask(rule_ids)
+                except (ValueError, KeyError, TypeError) as e:
+                    report['rows_failed'] += 1
+                    if len(report['errors']) < 20:
+                        report['errors'].append({'position': position, 'error': str(e)})
+                    continue
+
+                batch.append((position, shard_path, row, rule_ids))
+                if len(batch) >= batch_size:
+                    write_batch()
+            if batch:
+                write_batch()
+        finally:
+            for shard_path, conn in connections.items():
+                for sql in dropped_indexes.get(shard_path, []):
+                    conn.execute(sql)
+                conn.close()
+
+        elapsed = time.perf_counter() - started
+        report['elapsed_s'] = round(elapsed, 3)
+        report['rows_per_s'] = round(report['rows_imported'] / elapsed) if elapsed else 0
+        return report
+
+    def _group_entries_by_shard(self, entries: List[tuple]) -> Dict[str, List[tuple]]:
+        """Split (position, shard path, row, rule IDs) import entries by file"""
+        groups = {}
+        for entry in entries:
+            groups.setdefault(entry[1], []).append(entry)
+        return groups
+
+    def _drop_secondary_indexes(self, conn: sqlite3.Connection) -> List[str]:
+        """
+        Drop the secondary indexes maintained during inserts
+
+        Returns:
+            CREATE INDEX statements to restore them
+        """
+        indexes = conn.execute("""
+            SELECT name, sql FROM sqlite_master
+            WHERE type = 'index' AND tbl_name IN ('assessments', 'rule_hits') AND sql IS NOT NULL
+        """).fetchall()
+        for name, _ in indexes:
+            conn.execute(f"DROP INDEX {name}")
+        return [sql for _, sql in indexes]
+
+    def _import_batch(self, conn: sqlite3.Connection, source: str, entries: List[tuple], index_search: bool):
+        """Write one batch of import entries to a database file in one transaction"""
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            triggers = cursor.execute("""
+                SELECT name, sql FROM sqlite_master
+                WHERE type = 'trigger' AND tbl_name = 'assessments'
+            """).fetchall()
+            for name, _ in triggers:
+                cursor.execute(f"DROP TRIGGER {name}")
+
+            # IDs are assigned here so rule hits can be written without a lookup
+            cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'assessments'")
+            row = cursor.fetchone()
+            cursor.execute("SELECT MAX(id) FROM assessments")
+            first_id = max(row[0] if row else 0, cursor.fetchone()[0] or 0) + 1
+            hits = []
+            stored_hits = False
+            for offset, (_, _, assessment, rule_ids) in enumerate(entries):
+                assessment['id'] = first_id + offset
+                if rule_ids is None:
+                    stored_hits = True
+                    continue
+                day = assessment['timestamp'][:10]
+                hits.extend((day, rule_id, assessment['id']) for rule_id in rule_ids)
+            last_id = first_id + len(entries) - 1
+
+            cursor.executemany(INSERT_ASSESSMENT_SQL, [assessment for _, _, assessment, _ in entries])
+            cursor.executemany(
+                "INSERT OR IGNORE INTO rule_hits (day, rule_id, assessment_id) VALUES (?, ?, ?)", hits
+            )
+            if stored_hits:
+                cursor.execute("""
+                    INSERT OR IGNORE INTO rule_hits (day, rule_id, assessment_id)
+                    SELECT substr(a.timestamp, 1, 10), hit.value, a.id
+                    FROM assessments a, json_each(a.full_response, '$.triggered_rule_ids') hit
+                    WHERE a.id BETWEEN ? AND ?
+                """, (first_id, last_id))
+            self._apply_derived_range(cursor, first_id, last_id, index_search)
+
+            for _, sql in triggers:
+                cursor.execute(sql)
+            cursor.execute("""
+                INSERT INTO import_checkpoints (source, position, rows_imported, updated_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (source) DO UPDATE SET
+                    position = excluded.position,
+                    rows_imported = rows_imported + excluded.rows_imported,
+                    updated_at = excluded.updated_at
+            """, (source, entries[-1][0], len(entries), datetime.utcnow().isoformat()))
+            cursor.execute("COMMIT")
+        except BaseException:
+            cursor.execute("ROLLBACK")
+            raise
+
+    def _apply_derived_range(self, cursor: sqlite3.Cursor, first_id: int, last_id: int, index_search: bool):
+        """
+        Add a contiguous range of new assessments to the statistics,
+        rollups and search index (what the insert triggers do per row)
+        """
+        level_sums = ", ".join(
+            f"SUM(risk_level = '{level}')" for level in SUMMARY_LEVEL_COLUMNS
+        )
+        cursor.execute(f"""
+            SELECT COUNT(*), COALESCE(SUM(risk_score), 0), {level_sums}
+            FROM assessments WHERE id BETWEEN ? AND ?
+        """, (first_id, last_id))
+        total, score_sum, *level_counts = cursor.fetchone()
+        level_updates = ", ".join(
+            f"{column} = {column} + ?" for column in SUMMARY_LEVEL_COLUMNS.values()
+        )
+        cursor.execute(f"""
+            UPDATE assessment_summary SET
+                total = total + ?,
+                score_sum = score_sum + ?,
+                {level_updates},
+                version = version + 1
+            WHERE id = 1
+        """, (total, score_sum, *(count or 0 for count in level_counts)))
+
+        for dimension, key_expr in ANALYTICS_DIMENSIONS.items():
+            cursor.execute(f"""
+                INSERT INTO analytics_rollup (dimension, day, key, risk_level, count, score_sum, amount_sum)
+                SELECT ?, substr(timestamp, 1, 10), {key_expr.format(ref='assessments')}, risk_level,
+                       COUNT(*), SUM(risk_score), SUM(amount)
+                FROM assessments
+                WHERE id BETWEEN ? AND ?
+                GROUP BY 2, 3, 4
+                ON CONFLICT (dimension, day, key, risk_level) DO UPDATE SET
+                    count = count + excluded.count,
+                    score_sum = score_sum + excluded.score_sum,
+                    amount_sum = amount_sum + excluded.amount_sum
+            """, (dimension, first_id, last_id))
+
+        if self.search_enabled and index_search:
+            values = ", ".join(expr.format(ref="assessments") for expr in SEARCH_COLUMNS.values())
+            cursor.execute(f"""
+                INSERT INTO assessments_fts (rowid, {", ".join(SEARCH_COLUMNS)})
+                SELECT id, {values} FROM assessments WHERE id BETWEEN ? AND ?
+            """, (first_id, last_id))
+
+    def rebuild_rule_hits(self) -> int:
+        """
+        Recompute rule_hits and rule_mask for every assessment
+
+        Rule IDs are taken from the stored result, or for assessments saved
+        before IDs were recorded, recovered from the triggered rule text.
+
+        Returns:
+            Number of rule hits written
+        """
+        written = 0
+        for _, path in self._shards():
+            conn = self._connect(path)
+            try:
+                with conn:
+                    read_cursor = conn.cursor()
+                    write_cursor = conn.cursor()
+                    write_cursor.execute("DELETE FROM rule_hits")
+                    read_cursor.execute("""
+                        SELECT id, timestamp, triggered_rules,
+                               json_extract(full_response, '$.triggered_rule_ids')
+                        FROM assessments
+                    """)
+                    for assessment_id, timestamp, triggered_rules, stored_ids in read_cursor:
+                        if stored_ids is not None:
+                            rule_ids = serialization.loads(stored_ids)
+                        else:
+                            rule_ids = [rule_id_for_text(text) for text in serialization.loads(triggered_rules or '[]')]
+                            rule_ids = [rule_id for rule_id in rule_ids if rule_id]
+                        write_cursor.executemany(
+                            "INSERT OR IGNORE INTO rule_hits (day, rule_id, assessment_id) VALUES (?, ?, ?)",
+                            [(timestamp[:10], rule_id, assessment_id) for rule_id in rule_ids]
+                        )
+                        written += len(rule_ids)
+                        write_cursor.execute(
+                            "UPDATE assessments SET rule_mask = ? WHERE id = ?",
+                            (rule_mask(rule_ids), assessment_id)
+                        )
+            finally:
+                conn.close()
+        return written
+
+    def get_rule_analytics(self, start: str = None, end: str = None) -> Dict:
+        """
+        Per-rule hit rates and rule co-occurrence over a date range
+
+        Hit counts come from the rule_hits primary key, totals from the
+        daily rollup, and co-occurrence from the (timestamp, rule_mask)
+        index, so no assessment row is read.
+
+        Args:
+            start: First day to include (YYYY-MM-DD, inclusive)
+            end: Last day to include (YYYY-MM-DD, inclusive)
+
+        Returns:
+            Dictionary with the number of assessments, per-rule hits and
+            hit rates, and pairs of rules that fired together
+        """
+        day_conditions = ["1 = 1"]
+        day_params = []
+        time_conditions = ["1 = 1"]
+        time_params = []
+        if start:
+            day_conditions.append("day >= ?")
+            day_params.append(start)
+            time_conditions.append("timestamp >= ?")
+            time_params.append(start)
+        if end:
+            day_conditions.append("day <= ?")
+            day_params.append(end)
+            time_conditions.append("timestamp < date(?, '+1 day')")
+            time_params.append(end)
+
+        total = 0
+        hits = {}
+        masks = {}
+        for month, path in self._shards():
+            if month and not month_in_range(month, start, end):
+                continue
+            conn = self._connect(path)
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT COALESCE(SUM(count), 0) FROM analytics_rollup
+                WHERE dimension = 'day' AND {" AND ".join(day_conditions)}
+            """, day_params)
+            total += cursor.fetchone()[0]
+
+            cursor.execute(f"""
+                SELECT rule_id, COUNT(*) FROM rule_hits
+                WHERE {" AND ".join(day_conditions)}
+                GROUP BY rule_id
+            """, day_params)
+            add_counts(hits, dict(cursor.fetchall()))
+
+            cursor.execute(f"""
+                SELECT rule_mask, COUNT(*) FROM assessments
+                WHERE {" AND ".join(time_conditions)} AND rule_mask != 0
+                GROUP BY rule_mask
+            """, time_params)
+            add_counts(masks, dict(cursor.fetchall()))
+            conn.close()
+
+        # Expand each distinct combination of rules into its pairs
+        pairs = {}
+        for mask, count in masks.items():
+            fired = [rule_id for bit, rule_id in enumerate(RULE_IDS) if mask >> bit & 1]
+            for index, first in enumerate(fired):
+                for second in fired[index + 1:]:
+                    pairs[(first, second)] = pairs.get((first, second), 0) + count
+
+        rules = [
+            {
+                'rule_id': rule_id,
+                'hits': count,
+                'hit_rate': round(count / total, 4) if total else 0,
+            }
+            for rule_id, count in sorted(hits.items(), key=lambda item: item[1], reverse=True)
+        ]
+        co_occurrence = [
+            {
+                'rules': list(pair),
+                'count': count,
+                'rate': round(count / total, 4) if total else 0,
+            }
+            for pair, count in sorted(pairs.items(), key=lambda item: item[1], reverse=True)
+        ]
+
+        return {
+            'total_assessments': total,
+            'rules': rules,
+            'co_occurrence': co_occurrence,
+        }
+
+    def rebuild_search_index(self) -> int:
+        """
+        Re-index every assessment for full-text search
+
+        Returns:
+            Number of indexed assessments
+        """
+        if not self.search_enabled:
+            raise RuntimeError("Full-text search requires SQLite with FTS5")
+
+        values = ", ".join(expr.format(ref="assessments") for expr in SEARCH_COLUMNS.values())
+        indexed = 0
+        for _, path in self._shards():
+            conn = self._connect(path)
+            try:
+                with conn:
+                    cursor = conn.cursor()
+                    cursor.execute("DELETE FROM assessments_fts")
+                    cursor.execute(f"""
+                        INSERT INTO assessments_fts (rowid, {", ".join(SEARCH_COLUMNS)})
+                        SELECT id, {values} FROM assessments
+                    """)
+                    indexed += cursor.rowcount
+                    cursor.execute("INSERT INTO assessments_fts (assessments_fts) VALUES ('optimize')")
+            finally:
+                conn.close()
+        return indexed
+
+    def search_assessments(
+        self,
+        query: str,
+        limit: int = 20,
+        offset: int = 0,
+        raw: bool = False
+    ) -> Dict:
+        """
+        Full-text search over rationale, triggered rules, AI insights and
+        document verification text, ranked by BM25
+
+        Args:
+            query: Search words (all must match); with raw=True, an FTS5
+                query expression (phrases, OR, NEAR, prefix*)
+            limit: Maximum number of results to return
+            offset: Number of results to skip
+            raw: Pass the query to FTS5 unchanged
+
+        Returns:
+            Dictionary with the ranked results and whether more are available
+        """
+        if not self.search_enabled:
+            raise RuntimeError("Full-text search requires SQLite with FTS5")
+
+        if raw:
+            match = query
+        else:
+            terms = re.findall(r"\w+", query)
+            match = " ".join(f'"{term}"' for term in terms)
+        if not match.strip():
+            raise ValueError("Search query is empty")
+
+        # With several partitions, each returns its top offset+limit hits and
+        # the merged list is paged (BM25 statistics are per partition)
+        shards = self._shards()
+        if len(shards) > 1:
+            shard_limit, shard_offset = offset + limit + 1, 0
+        else:
+            shard_limit, shard_offset = limit + 1, offset
+
+        rows = []
+        for _, path in shards:
+            rows.extend(self._search_shard(path, match, shard_limit, shard_offset))
+        if len(shards) > 1:
+            rows.sort(key=lambda row: row['rank'])
+            rows = rows[offset:offset + limit + 1]
+
+        results = []
+        for row in rows[:limit]:
+            result = dict(row)
+            result['rank'] = round(result['rank'], 6)
+            results.append(result)
+
+        return {
+            'results': results,
+            'has_more': len(rows) > limit,
+        }
+
+    def _search_shard(self, path: str, match: str, limit: int, offset: int) -> List[sqlite3.Row]:
+        """Run a full-text query against one database file"""
+        conn = self._connect(path)
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        try:
+            # Rank inside the index first so only the requested page is
+            # joined to assessments; fetch one extra row to detect more pages
+            cursor.execute("""
+                SELECT a.id, a.timestamp, a.amount, a.currency, a.source_country,
+                       a.destination_country, a.purpose, a.counterparty_type,
+                       a.risk_score, a.risk_level, hits.rank, hits.snippet
+                FROM (
+                    SELECT rowid, rank,
+                           snippet(assessments_fts, -1, '[', ']', '…', 16) AS snippet
+                    FROM assessments_fts
+                    WHERE assessments_fts MATCH ?
+                    ORDER BY rank
+                    LIMIT ? OFFSET ?
+                ) hits
+                JOIN assessments a ON a.id = hits.rowid
+                ORDER BY hits.rank
+            """, (match, limit, offset))
+            return cursor.fetchall()
+        except sqlite3.OperationalError as e:
+            raise ValueError(f"Invalid search query: {e}")
+        finally:
+            conn.close()
+
+    def get_write_metrics(self) -> Dict:
+        """Get write-path metrics (queue depth and commit latency)"""
+        if not self._write_queue:
+            return {'write_behind': False}
+        metrics = self._write_queue.get_metrics()
+        metrics['write_behind'] = True
+        return metrics
+
+    def get_data_version(self, assessment_id: int = None) -> Optional[str]:
+        """
+        Version of the stored assessments, from the summary rows
+
+        The summary triggers bump a file's version on every insert, update
+        and delete (by any process, including rebuild_rule_hits rewriting
+        rows in place), so this reads one row per file. Rows still in the
+        write-behind queue are not part of it.
+
+        Args:
+            assessment_id: Only look at the file that holds this assessment
+
+        Returns:
+            The versions of the files summed, or None if the assessment's
+            file does not exist
+        """
+        if assessment_id is not None:
+            path = self._shard_path_for_id(assessment_id)
+            if not path:
+                return None
+            paths = [path]
+        else:
+            paths = [path for _, path in self._shards()]
+
+        version = 0
+        for path in paths:
+            conn = self._connect(path)
+            try:
+                cursor = conn.execute("SELECT version FROM assessment_summary WHERE id = 1")
+                row = cursor.fetchone()
+            finally:
+                conn.close()
+            version += row[0] if row else 0
+        return str(version)
+
+    def is_pending(self, assessment_id: int) -> bool:
+        """Whether an assessment is still waiting in the write-behind queue"""
+        return bool(self._write_queue and self._write_queue.get_pending(assessment_id))
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Wait until every queued assessment has been committed
+
+        Returns:
+            True if the queue drained before the timeout
+        """
+        if not self._write_queue:
+            return True
+        return self._write_queue.flush(timeout=timeout)
+
+    def close(self):
+        """Flush pending writes and stop the background writer"""
+        if self._write_queue:
+            self._write_queue.close()
+
     def clear_all(self):
         """Clear all assessments from database (for testing)"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM assessments")
-        conn.commit()
+        self.flush()
+        for partition in self.list_partitions():
+            self.drop_partition(partition['month'])
+        for month, path in self._shards():
+            if month:
+                continue
+            conn = self._connect(path)
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM assessments")
+            conn.commit()
+            conn.close()
+            self._forget_file(path)
+
+    def list_partitions(self) -> List[Dict]:
+        """List active and archived monthly partitions, oldest first"""
+        partitions = []
+        for month, path in self._partitions():
+            partitions.append({
+                'month': month,
+                'path': path,
+                'size_bytes': os.path.getsize(path),
+                'archived': False,
+            })
+        if self.partition_dir:
+            for entry in os.scandir(self.partition_dir / "archive"):
+                match = ARCHIVE_FILE_PATTERN.match(entry.name)
+                if match:
+                    partitions.append({
+                        'month': match.group(1),
+                        'path': entry.path,
+                        'size_bytes': entry.stat().st_size,
+                        'archived': True,
+                    })
+        partitions.sort(key=lambda partition: partition['month'])
+        return partitions
+
+    def archive_partition(self, month: str) -> str:
+        """
+        Compress a partition into the archive directory and detach it
+
+        Archived months no longer appear in listings, statistics or search
+        until restore_partition() brings them back.
+
+        Returns:
+            Path of the compressed archive
+        """
+        path = self._require_partition_dir() / f"assessments_{month}.db"
+        if not path.exists():
+            raise ValueError(f"No active partition for {month}")
+        # Queued rows for the month go into the archive
+        self.flush()
+
+        # Fold the WAL into the main file so the archive is self-contained
+        conn = self._connect(str(path))
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
         conn.close()
 
+        archive_path = self.partition_dir / "archive" / f"{path.name}.gz"
+        with open(path, 'rb') as source, gzip.open(archive_path, 'wb') as target:
+            shutil.copyfileobj(source, target, length=1024 * 1024)
+        self._remove_partition_files(path)
+        return str(archive_path)
+
+    def restore_partition(self, month: str) -> str:
+        """
+        Decompress an archived partition back into the active set
+
+        Returns:
+            Path of the restored partition
+        """
+        partition_dir = self._require_partition_dir()
+        archive_path = partition_dir / "archive" / f"assessments_{month}.db.gz"
+        if not archive_path.exists():
+            raise ValueError(f"No archived partition for {month}")
+
+        path = partition_dir / f"assessments_{month}.db"
+        if path.exists():
+            raise ValueError(f"Partition for {month} is already active")
+        temp_path = path.with_suffix(".db.restoring")
+        with gzip.open(archive_path, 'rb') as source, open(temp_path, 'wb') as target:
+            shutil.copyfileobj(source, target, length=1024 * 1024)
+        os.replace(temp_path, path)
+        archive_path.unlink()
+        self._forget_file(path)
+        return str(path)
+
+    def drop_partition(self, month: str) -> bool:
+        """
+        Delete a month of assessments, active or archived
+
+        The partition files are unlinked, so this takes the same time
+        whatever the number of rows and needs no VACUUM.
+
+        Returns:
+            True if anything was deleted
+        """
+        partition_dir = self._require_partition_dir()
+        self.flush()
+        dropped = self._remove_partition_files(partition_dir / f"assessments_{month}.db")
+        archive_path = partition_dir / "archive" / f"assessments_{month}.db.gz"
+        if archive_path.exists():
+            archive_path.unlink()
+            dropped = True
+        return dropped
+
+    def apply_retention(
+        self,
+        archive_after_months: int = 0,
+        retain_months: int = 0,
+        today: date = None
+    ) -> Dict:
+        """
+        Archive and drop partitions by age
+
+        A partition's age is the number of months between it and the current
+        month (the current month is age 0 and is never touched).
+
+        Args:
+            archive_after_months: Compress active partitions at least this old (0 = never)
+            retain_months: Drop partitions (active or archived) at least this old (0 = keep forever)
+            today: Reference date (default: today, UTC)
+
+        Returns:
+            Dictionary listing the archived and dropped months
+        """
+        today = today or datetime.utcnow().date()
+        current = today.year * 12 + today.month - 1
+        report = {'archived': [], 'dropped': []}
+
+        for partition in self.list_partitions():
+            year, month_number = (int(part) for part in partition['month'].split('-'))
+            age = current - (year * 12 + month_number - 1)
+            if age <= 0:
+                continue
+            if retain_months and age >= retain_months:
+                if self.drop_partition(partition['month']):
+                    report['dropped'].append(partition['month'])
+            elif archive_after_months and age >= archive_after_months and not partition['archived']:
+                self.archive_partition(partition['month'])
+                report['archived'].append(partition['month'])
+
+        return report
+
+    def snapshot(
+        self,
+        target_dir: str,
+        pages_per_step: int = 256,
+        step_sleep_ms: int = 5,
+        keep: int = 0,
+        on_progress=None
+    ) -> Dict:
+        """
+        Take a consistent online copy of every active database file
+
+        Uses SQLite's incremental backup API: each step copies at most
+        pages_per_step pages and then pauses for step_sleep_ms, so the
+        service keeps reading and writing while the snapshot runs. Each
+        file is copied as of the moment its backup starts. Files are
+        written under a .partial name and renamed when complete, so a
+        snapshot directory never contains a torn copy.
+
+        Args:
+            target_dir: Directory that receives one timestamped snapshot
+                directory per call
+            pages_per_step: Pages copied per backup step
+            step_sleep_ms: Pause between steps, in milliseconds
+            keep: Number of most recent snapshots to keep (0 = keep all)
+            on_progress: Optional callable receiving a progress dictionary
+                after every step
+
+        Returns:
+            Dictionary with the snapshot path, per-file results, total
+            size, elapsed time and throughput
+        """
+        started_at = datetime.utcnow()
+        snapshot_path = Path(target_dir) / started_at.strftime("%Y%m%dT%H%M%SZ")
+        snapshot_path.mkdir(parents=True)
+
+        started = time.perf_counter()
+        files = []
+        for _, path in self._shards():
+            files.append(self._backup_file(
+                path, snapshot_path / Path(path).name,
+                pages_per_step, step_sleep_ms, on_progress
+            ))
+        elapsed = time.perf_counter() - started
+
+        total_bytes = sum(result['bytes'] for result in files)
+        report = {
+            'path': str(snapshot_path),
+            'started_at': started_at.isoformat(),
+            'files': files,
+            'bytes': total_bytes,
+            'elapsed_s': round(elapsed, 3),
+            'mb_per_s': round(total_bytes / 1e6 / elapsed, 2) if elapsed else 0,
+            'pruned': prune_snapshots(target_dir, keep) if keep else [],
+        }
+        return report
+
+    def _backup_file(
+        self,
+        path: str,
+        target: Path,
+        pages_per_step: int,
+        step_sleep_ms: int,
+        on_progress=None
+    ) -> Dict:
+        """Copy one database file with the incremental backup API"""
+        stats = {
+            'file': Path(path).name,
+            'pages': 0,
+            'bytes': 0,
+            'steps': 0,
+            'max_step_ms': 0.0,
+        }
+        step_started = [time.perf_counter()]
+
+        def progress(status, remaining, total):
+            step_ms = (time.perf_counter() - step_started[0]) * 1000
+            stats['steps'] += 1
+            stats['pages'] = total
+            stats['max_step_ms'] = max(stats['max_step_ms'], step_ms)
+            if on_progress:
+                on_progress({
+                    'file': stats['file'],
+                    'pages_copied': total - remaining,
+                    'pages_total': total,
+                    'percent': round((total - remaining) * 100 / total, 1) if total else 100.0,
+                    'step_ms': round(step_ms, 3),
+                })
+            if remaining and step_sleep_ms:
+                time.sleep(step_sleep_ms / 1000)
+            step_started[0] = time.perf_counter()
+
+        source = sqlite3.connect(path, timeout=30, isolation_level=None)
+        partial = target.with_name(target.name + ".partial")
+        destination = sqlite3.connect(str(partial))
+        try:
+            # Pin a WAL read snapshot for the whole copy. Otherwise every
+            # commit from another connection restarts the backup, and under
+            # steady traffic it would never finish. Writers are not blocked.
+            source.execute("BEGIN")
+            source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+            source.backup(destination, pages=max(1, pages_per_step), progress=progress)
+            source.execute("COMMIT")
+            page_size = source.execute("PRAGMA page_size").fetchone()[0]
+        finally:
+            destination.close()
+            source.close()
+        os.replace(partial, target)
+
+        stats['bytes'] = stats['pages'] * page_size
+        stats['max_step_ms'] = round(stats['max_step_ms'], 3)
+        return stats
+
+    def _require_partition_dir(self) -> Path:
+        if not self.partition_dir:
+            raise RuntimeError("Partition operations require partition_dir to be configured")
+        return self.partition_dir
+
+    def _remove_partition_files(self, path: Path) -> bool:
+        """Unlink a partition and its WAL/shared-memory files"""
+        removed = False
+        for file_path in (path, Path(f"{path}-wal"), Path(f"{path}-shm")):
+            if file_path.exists():
+                file_path.unlink()
+                removed = True
+        self._initialized_paths.discard(str(path))
+        self._forget_file(path)
+        return removed
+
+    def _forget_file(self, path):
+        """Make the write-behind writer let go of a removed or replaced file"""
+        if self._write_queue:
+            self._write_queue.forget_file(str(path))
+
+
+class WriteBehindQueue:
+    """
+    Batches assessment inserts from request threads into group commits
+
+    IDs are handed out from blocks reserved in each database file (see
+    AssessmentDB._reserve_ids), so several worker processes can run
+    write-behind queues on the same files. Rows that cannot be committed
+    are appended to a dead-letter file (JSON lines) and counted in the
+    write metrics.
+    """
+
+    _STOP = object()
+    # Most recent failed rows listed in the write metrics
+    MAX_RECENT_FAILURES = 20
+
+    def __init__(self, db: AssessmentDB, batch_size: int = 200, max_delay_ms: int = 50,
+                 dead_letter_path: str = None):
+        self.db = db
+        self.batch_size = max(1, batch_size)
+        self.max_delay = max(0, max_delay_ms) / 1000.0
+        self.dead_letter_path = dead_letter_path or f"{db.db_path}.failed.jsonl"
+
+        self._queue = queue.Queue()
+        self._pending: Dict[int, Dict] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        # Reserved ID block per database file (one per monthly partition):
+        # path -> [next ID, last ID of the block]
+        self._id_blocks: Dict[str, List[int]] = {}
+        # Bumped when a database file is dropped, archived or restored; the
+        # writer then reopens its connections instead of writing to an
+        # unlinked file
+        self._generation = 0
+
+        # Metrics
+        self._batches = 0
+        self._rows_committed = 0
+        self._rows_failed = 0
+        self._recent_failures: List[Dict] = []
+        self._commit_ms_total = 0.0
+        self._commit_ms_max = 0.0
+        self._commit_ms_last = 0.0
+
+        self._thread = threading.Thread(
+            target=self._run, name="assessment-writer", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, row: Dict) -> int:
+        """
+        Queue a row for writing and reserve its ID
+
+        Returns:
+            The reserved assessment ID
+        """
+        path = self.db._shard_path_for_row(row)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Write-behind queue is closed")
+            block = self._id_blocks.get(path)
+            if block is None or block[0] > block[1]:
+                first_id = self.db._reserve_ids(path, self.batch_size)
+                block = self._id_blocks[path] = [first_id, first_id + self.batch_size - 1]
+            row['id'] = block[0]
+            block[0] += 1
+            self._pending[row['id']] = row
+        self._queue.put(row)
+        return row['id']
+
+    def forget_file(self, path: str):
+        """
+        Stop using a database file that was removed or replaced
+
+        Drops its reserved IDs (a new file numbers its rows afresh) and
+        makes the writer reopen its connections before the next commit.
+        """
+        with self._lock:
+            self._id_blocks.pop(str(path), None)
+            self._generation += 1
+
+    def get_pending(self, assessment_id: int) -> Optional[Dict]:
+        """Get a row that has been queued but not yet committed"""
+        with self._lock:
+            return self._pending.get(assessment_id)
+
+    def _run(self):
+        """Writer loop: collect up to batch_size rows or max_delay, then commit"""
+        connections = {}
+        generation = self._generation
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is self._STOP:
+                self._queue.task_done()
+                break
+
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is self._STOP:
+                    self._queue.task_done()
+                    stopping = True
+                    break
+                batch.append(item)
+
+            if generation != self._generation:
+                for conn in connections.values():
+                    conn.close()
+                connections.clear()
+                generation = self._generation
+            try:
+                self._commit(connections, batch)
+            except Exception as e:
+                # Never let the writer die: flush() and close() wait for it
+                self._fail_rows(batch, e)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+        for conn in connections.values():
+            conn.close()
+
+    def _commit(self, connections: Dict[str, sqlite3.Connection], batch: List[Dict]):
+        """Write a batch in one transaction per file, falling back to row-by-row on error"""
+        started = time.perf_counter()
+        failed = []
+        for path, rows in self.db._group_by_shard(batch).items():
+            try:
+                if path not in connections:
+                    connections[path] = self.db._connect(path)
+                conn = connections[path]
+                with conn:
+                    self.db._write_rows(conn, rows)
+            except Exception as e:
+                print(f"⚠ Write-behind batch of {len(rows)} failed, retrying rows individually: {e}")
+                for row in rows:
+                    try:
+                        conn = connections.get(path) or connections.setdefault(path, self.db._connect(path))
+                        with conn:
+                            self.db._write_rows(conn, [row])
+                    except Exception as row_error:
+                        failed.append((row, row_error))
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        for row, error in failed:
+            self._dead_letter(row, error)
+        with self._lock:
+            for row in batch:
+                self._pending.pop(row['id'], None)
+            self._batches += 1
+            self._rows_committed += len(batch) - len(failed)
+            self._commit_ms_last = elapsed_ms
+            self._commit_ms_total += elapsed_ms
+            self._commit_ms_max = max(self._commit_ms_max, elapsed_ms)
+
+    def _fail_rows(self, rows: List[Dict], error: Exception):
+        """Dead-letter rows the writer could not even attempt to commit"""
+        for row in rows:
+            self._dead_letter(row, error)
+        with self._lock:
+            for row in rows:
+                self._pending.pop(row['id'], None)
+
+    def _dead_letter(self, row: Dict, error: Exception):
+        """Record a row that was not saved, so it can be inspected and re-imported"""
+        print(f"❌ Assessment {row['id']} was not saved: {error}")
+        record = {
+            'id': row['id'],
+            'error': str(error),
+            'failed_at': datetime.utcnow().isoformat(),
+        }
+        try:
+            with open(self.dead_letter_path, 'a', encoding='utf-8') as dead_letter:
+                dead_letter.write(serialization.dumps({**record, 'row': row}) + "\n")
+        except Exception as e:
+            print(f"❌ Could not write assessment {row['id']} to {self.dead_letter_path}: {e}")
+        with self._lock:
+            self._rows_failed += 1
+            self._recent_failures.append(record)
+            del self._recent_failures[:-self.MAX_RECENT_FAILURES]
+
+    def flush(self, timeout: float = None) -> bool:
+        """Block until all queued rows are committed"""
+        if timeout is None:
+            self._queue.join()
+            return True
+        deadline = time.monotonic() + timeout
+        while self.get_queue_depth() > 0:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def close(self):
+        """Stop accepting rows, commit everything queued and stop the writer"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._queue.put(self._STOP)
+        self._thread.join()
+
+    def get_queue_depth(self) -> int:
+        """Number of rows reserved but not yet committed"""
+        with self._lock:
+            return len(self._pending)
+
+    def get_metrics(self) -> Dict:
+        """Snapshot of queue depth and group-commit statistics"""
+        with self._lock:
+            batches = self._batches
+            return {
+                'queue_depth': len(self._pending),
+                'batch_size': self.batch_size,
+                'max_delay_ms': round(self.max_delay * 1000, 2),
+                'batches_committed': batches,
+                'rows_committed': self._rows_committed,
+                'rows_failed': self._rows_failed,
+                'recent_failures': list(self._recent_failures),
+                'dead_letter_path': self.dead_letter_path,
+                'avg_batch_rows': round(self._rows_committed / batches, 2) if batches else 0,
+                'commit_latency_ms': {
+                    'last': round(self._commit_ms_last, 3),
+                    'avg': round(self._commit_ms_total / batches, 3) if batches else 0,
+                    'max': round(self._commit_ms_max, 3),
+                },
+            }
+
+
+def fts5_available() -> bool:
+    """Check whether this SQLite build supports FTS5 full-text search"""
+    conn = sqlite3.connect(":memory:")
+    try:
+        conn.execute("CREATE VIRTUAL TABLE probe USING fts5(text)")
+        return True
+    except sqlite3.OperationalError:
+        print("⚠ Full-text search disabled: SQLite was built without FTS5")
+        return False
+    finally:
+        conn.close()
+
+
+def prune_snapshots(target_dir: str, keep: int) -> List[str]:
+    """
+    Delete all but the newest snapshot directories
+
+    Returns:
+        Names of the deleted snapshots
+    """
+    snapshots = sorted(
+        entry.name for entry in os.scandir(target_dir)
+        if entry.is_dir() and SNAPSHOT_DIR_PATTERN.match(entry.name)
+    )
+    pruned = snapshots[:-keep] if keep > 0 else []
+    for name in pruned:
+        shutil.rmtree(Path(target_dir) / name)
+    return pruned
+
+
+def partition_month(path: str) -> Optional[str]:
+    """Month (YYYY-MM) of a partition file, or None for other databases"""
+    match = PARTITION_FILE_PATTERN.match(Path(path).name)
+    return match.group(1) if match else None
+
+
+def month_id_base(month: str) -> int:
+    """First ID of a month's partition (IDs are allocated above this value)"""
+    year, month_number = month.split('-')
+    return (int(year) * 100 + int(month_number)) * PARTITION_ID_STRIDE
+
+
+def next_month(month: str) -> str:
+    """The month after a YYYY-MM month"""
+    year, month_number = (int(part) for part in month.split('-'))
+    if month_number == 12:
+        return f"{year + 1:04d}-01"
+    return f"{year:04d}-{month_number + 1:02d}"
+
+
+def month_in_range(month: str, start: str = None, end: str = None) -> bool:
+    """Whether a YYYY-MM month overlaps an inclusive YYYY-MM-DD day range"""
+    if start and month < start[:7]:
+        return False
+    if end and month > end[:7]:
+        return False
+    return True
+
+
+def add_counts(total: Dict, counts: Dict):
+    """Add numeric values from counts into total, key by key"""
+    for key, value in counts.items():
+        total[key] = total.get(key, 0) + value
@@ -0,0 +1,161 @@
+"""
+Bulk export of compliance assessments
+Streams NDJSON or CSV with constant memory, and writes columnar
+(Parquet / Arrow IPC) files when pyarrow is installed
+"""
+
+import csv
+import io
+from importlib.util import find_spec
+from typing import Dict, Iterable, Iterator
+
+import serialization
+from database import ASSESSMENT_COLUMNS
+
+# pyarrow is imported by the first columnar export (see write_columnar)
+COLUMNAR_SUPPORT = find_spec("pyarrow") is not None
+
+# Columns stored as JSON text; exported as-is instead of being decoded and re-encoded
+JSON_COLUMNS = {"triggered_rules", "checklist_items", "ai_insights", "full_response"}
+
+# Streaming formats and their MIME types
+STREAM_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+# Columnar formats written to a file (require pyarrow)
+COLUMNAR_FORMATS = ("parquet", "arrow")
+
+INTEGER_COLUMNS = {"id", "risk_score", "rule_mask"}
+FLOAT_COLUMNS = {"amount"}
+
+
+def iter_ndjson(rows: Iterable[tuple], chunk_rows: int = 500) -> Iterator[str]:
+    """
+    Encode raw assessment rows as newline-delimited JSON
+
+    Each line has the same fields as an item from /api/assessments. Stored
+    JSON columns are spliced into the line verbatim, so no row is parsed.
+
+    Args:
+        rows: Tuples in ASSESSMENT_COLUMNS order (see AssessmentDB.iter_assessment_rows)
+        chunk_rows: Lines joined into each yielded chunk
+    """
+    prefixes = [("{" if index == 0 else ",") + serialization.dumps(column) + ":"
+                for index, column in enumerate(ASSESSMENT_COLUMNS)]
+    is_json = [column in JSON_COLUMNS for column in ASSESSMENT_COLUMNS]
+
+    dumps = serialization.dumps
+    chunk = []
+    for row in rows:
+        parts = []
+        for prefix, raw_json, value in zip(prefixes, is_json, row):
+            parts.append(prefix)
+            if value is None:
+                parts.append("null")
+            elif raw_json:
+                parts.append(value)
+            else:
+                parts.append(dumps(value))
+        parts.append("}\n")
+        chunk.append("".join(parts))
+        if len(chunk) >= chunk_rows:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+
+def iter_csv(rows: Iterable[tuple], chunk_rows: int = 500) -> Iterator[str]:
+    """
+    Encode raw assessment rows as CSV with a header line
+
+    JSON columns are written as their stored JSON text.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(ASSESSMENT_COLUMNS)
+
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= chunk_rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            pending = 0
+    yield buffer.getvalue()
+
+
+def write_columnar(
+    rows: Iterable[tuple],
+    path: str,
+    file_format: str = "parquet",
+    batch_rows: int = 10000
+) -> int:
+    """
+    Write raw assessment rows to a Parquet or Arrow IPC file in record batches
+
+    Args:
+        rows: Tuples in ASSESSMENT_COLUMNS order
+        path: Output file path
+        file_format: "parquet" or "arrow"
+        batch_rows: Rows buffered per record batch (bounds memory use)
+
+    Returns:
+        Number of rows written
+    """
+    if not COLUMNAR_SUPPORT:
+        raise RuntimeError("Columnar export requires pyarrow. Install it with: pip install pyarrow")
+    if file_format not in COLUMNAR_FORMATS:
+        raise ValueError(f"Unknown columnar format: {file_format}")
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        (column, pa.int64() if column in INTEGER_COLUMNS
+         else pa.float64() if column in FLOAT_COLUMNS
+         else pa.string())
+        for column in ASSESSMENT_COLUMNS
+    ])
+
+    if file_format == "parquet":
+        writer = pq.ParquetWriter(path, schema)
+        write_batch = writer.write_batch
+    else:
+        writer = pa.ipc.new_file(path, schema)
+        write_batch = writer.write_batch
+
+    written = 0
+    columns = [[] for _ in ASSESSMENT_COLUMNS]
+    try:
+        for row in rows:
+            for values, value in zip(columns, row):
+                values.append(value)
+            if len(columns[0]) >= batch_rows:
+                write_batch(pa.record_batch(columns, schema=schema))
+                written += len(columns[0])
+                columns = [[] for _ in ASSESSMENT_COLUMNS]
+        if columns[0]:
+            write_batch(pa.record_batch(columns, schema=schema))
+            written += len(columns[0])
+    finally:
+        writer.close()
+
+    return written
+
+
+def track_last_id(rows: Iterable[tuple], progress: Dict) -> Iterator[tuple]:
+    """
+    Pass rows through while recording the row count and highest ID seen
+
+    progress["last_id"] is the since_id for the next incremental export.
+    """
+    progress.setdefault("rows", 0)
+    progress.setdefault("last_id", None)
+    for row in rows:
+        progress["rows"] += 1
+        progress["last_id"] = row[0]
+        yield row
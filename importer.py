@@ -0,0 +1,206 @@
+"""
+Bulk import of historical transactions and assessments
+Reads CSV or JSONL files record by record; see AssessmentDB.bulk_import()
+"""
+
+import csv
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+import serialization
+from compliance_engine import ComplianceEngine, Transaction, CustomerType
+
+# File extensions recognised when no format is given
+IMPORT_FORMATS = {
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+}
+
+REQUIRED_FIELDS = ("amount", "source_country", "destination_country", "purpose", "counterparty_type")
+
+COUNTERPARTY_TYPES = {
+    "freelancer": CustomerType.LOW,
+    "smb": CustomerType.MEDIUM,
+    "corporate": CustomerType.MEDIUM,
+    "ngo": CustomerType.HIGH,
+}
+
+# Assessment fields that exported CSV files hold as JSON text
+JSON_FIELDS = ("triggered_rules", "checklist_items", "ai_insights", "full_response")
+
+
+def detect_format(path: str) -> str:
+    """Guess the import format from the file extension"""
+    file_format = IMPORT_FORMATS.get(Path(path).suffix.lower())
+    if not file_format:
+        raise ValueError(f"Cannot tell the format of {path} (expected .csv, .jsonl or .ndjson)")
+    return file_format
+
+
+def iter_records(path: str, file_format: str = None) -> Iterator[Union[Dict, str]]:
+    """
+    Read raw records from a CSV or JSONL file without holding it in memory
+
+    CSV rows are yielded as dictionaries and JSONL lines as text (decoded
+    by decode_record(), so a malformed line fails on its own).
+    """
+    file_format = file_format or detect_format(path)
+    with open(path, newline="", encoding="utf-8") as source:
+        if file_format == "csv":
+            yield from csv.DictReader(source)
+        elif file_format == "jsonl":
+            for line in source:
+                if line.strip():
+                    yield line
+        else:
+            raise ValueError(f"Unknown import format: {file_format}")
+
+
+def decode_record(raw: Union[Dict, str]) -> Dict:
+    """Turn a raw record into a dictionary"""
+    if isinstance(raw, dict):
+        return raw
+    try:
+        record = serialization.loads(raw)
+    except ValueError as e:
+        raise ValueError(f"Invalid JSON: {e}")
+    if not isinstance(record, dict):
+        raise ValueError("Each JSONL line must be an object")
+    return record
+
+
+def record_timestamp(record: Dict) -> str:
+    """
+    Normalized ISO timestamp of a record (now, UTC, if it has none)
+
+    Accepts full ISO timestamps or plain YYYY-MM-DD dates.
+    """
+    value = record.get("timestamp")
+    if not value:
+        return datetime.utcnow().isoformat()
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).replace(tzinfo=None).isoformat()
+    except ValueError:
+        raise ValueError(f"Invalid timestamp: {value}")
+
+
+def raw_assessment_row(record: Dict) -> Optional[Dict]:
+    """
+    Columns of an exported CSV assessment row, with JSON text kept as is
+
+    Rows written by the CSV export already hold every stored column, so
+    they are imported without decoding and re-encoding their JSON.
+
+    Returns:
+        Column values (without id and timestamp), or None if the record
+        is not an exported row with rule IDs and a rule mask
+    """
+    full_response = record.get("full_response")
+    if not isinstance(full_response, str) or '"triggered_rule_ids"' not in full_response:
+        return None
+    if record.get("rule_mask") in (None, "") or record.get("risk_score") in (None, "") or not record.get("risk_level"):
+        return None
+    for field in REQUIRED_FIELDS:
+        if record.get(field) in (None, ""):
+            raise ValueError(f"Missing required field: {field}")
+    try:
+        amount = float(record["amount"])
+        risk_score = int(record["risk_score"])
+        mask = int(record["rule_mask"])
+    except (ValueError, TypeError):
+        raise ValueError("Invalid amount, risk_score or rule_mask")
+
+    return {
+        "amount": amount,
+        "currency": record.get("currency") or "USD",
+        "source_country": record["source_country"],
+        "destination_country": record["destination_country"],
+        "purpose": record["purpose"],
+        "counterparty_type": record["counterparty_type"],
+        "history_signals": record.get("history_signals") or "",
+        "risk_score": risk_score,
+        "risk_level": record["risk_level"],
+        "triggered_rules": record.get("triggered_rules") or "[]",
+        "rationale": record.get("rationale"),
+        "checklist_items": record.get("checklist_items") or "[]",
+        "ai_insights": record.get("ai_insights") or None,
+        "full_response": full_response,
+        "rule_mask": mask,
+        "rules_version": record.get("rules_version") or None,
+    }
+
+
+def record_to_assessment(record: Dict, engine: Optional[ComplianceEngine] = None) -> Tuple[Dict, Dict]:
+    """
+    Convert a record into (transaction_data, assessment_result)
+
+    With an engine the transaction is scored by the current rules.
+    Otherwise the record must already carry its assessment, either as a
+    full_response object (as written by the export) or as risk_score,
+    risk_level, triggered_rules, rationale and checklist_items fields.
+
+    Raises:
+        ValueError: If the record is missing fields or is not scored
+    """
+    for field in REQUIRED_FIELDS:
+        if record.get(field) in (None, ""):
+            raise ValueError(f"Missing required field: {field}")
+    try:
+        amount = float(record["amount"])
+    except (ValueError, TypeError):
+        raise ValueError(f"Invalid amount: {record['amount']}")
+    if amount < 0:
+        raise ValueError("Amount must be positive")
+
+    transaction_data = {
+        "amount": amount,
+        "currency": record.get("currency") or "USD",
+        "source_country": str(record["source_country"]).strip(),
+        "destination_country": str(record["destination_country"]).strip(),
+        "purpose": str(record["purpose"]).strip(),
+        "counterparty_type": str(record["counterparty_type"]).strip(),
+        "history_signals": (record.get("history_signals") or "").strip(),
+    }
+
+    if engine:
+        result = engine.review(Transaction(
+            amount_usd=amount,
+            origin_country=transaction_data["source_country"],
+            destination_country=transaction_data["destination_country"],
+            purpose=transaction_data["purpose"],
+            customer_type=COUNTERPARTY_TYPES.get(transaction_data["counterparty_type"].lower(), CustomerType.MEDIUM),
+            has_structuring_signals=len(transaction_data["history_signals"]) > 0,
+        ))
+        return transaction_data, result
+
+    fields = {}
+    for field in JSON_FIELDS:
+        value = record.get(field)
+        if isinstance(value, str) and value:
+            try:
+                value = serialization.loads(value)
+            except ValueError:
+                raise ValueError(f"Invalid JSON in {field}")
+        fields[field] = value
+
+    if isinstance(fields["full_response"], dict):
+        return transaction_data, fields["full_response"]
+
+    if record.get("risk_score") in (None, "") or not record.get("risk_level"):
+        raise ValueError("Record has no assessment (import with scoring enabled)")
+    try:
+        risk_score = int(record["risk_score"])
+    except (ValueError, TypeError):
+        raise ValueError(f"Invalid risk_score: {record['risk_score']}")
+    result = {
+        "risk_score": risk_score,
+        "risk_level": record["risk_level"],
+        "triggered_rules": fields["triggered_rules"] or [],
+        "rationale": record.get("rationale") or "",
+        "checklist_items": fields["checklist_items"] or [],
+    }
+    if fields["ai_insights"]:
+        result["ai_insights"] = fields["ai_insights"]
+    return transaction_data, result
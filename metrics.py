@@ -0,0 +1,350 @@
+"""
+Request stage timings and Prometheus metrics
+stage() times one part of a request (validation, review, LLM call, PDF
+rendering, ...) with a monotonic clock. The time goes into a histogram
+and, while a request is being served, into its Server-Timing header.
+REGISTRY renders every counter and histogram for /api/metrics in the
+Prometheus text format.
+
+Standard library only, so the engine can import it without slowing startup.
+"""
+
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Histogram bucket upper bounds, in seconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# (labels, value) samples of a metric family, as produced by collectors
+Samples = List[Tuple[Dict[str, str], float]]
+
+# Request methods counted under their own label; any other is counted as "other"
+HTTP_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "CONNECT", "TRACE"})
+
+
+def _escape(value) -> str:
+    """Escape a label value (backslash, double quote, newline)"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    """{name="value",...}, or "" without labels"""
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with a fixed set of label names"""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1):
+        """Add to the counter of a label combination"""
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def get(self, *label_values: str) -> float:
+        with self._lock:
+            return self._values.get(label_values, 0)
+
+    def snapshot(self) -> Dict[Tuple[str, ...], float]:
+        """Value of every label combination"""
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(dict(zip(self.label_names, key)))} {_format_value(value)}"
+                for key, value in values]
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram:
+    """Latency histogram (seconds) with a fixed set of label names"""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # Label values -> [count per bucket (last is +Inf), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, *label_values: str):
+        """Record one observation"""
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += seconds
+            series[2] += 1
+
+    def get(self, *label_values: str) -> Tuple[int, float]:
+        """(count, sum in seconds) of a label combination"""
+        with self._lock:
+            series = self._series.get(label_values)
+            return (series[2], series[1]) if series else (0, 0.0)
+
+    def snapshot(self) -> Dict[Tuple[str, ...], Tuple[int, float]]:
+        """(count, sum in seconds) of every label combination"""
+        with self._lock:
+            return {key: (series[2], series[1]) for key, series in self._series.items()}
+
+    def render(self) -> List[str]:
+        with self._lock:
+            snapshot = sorted((key, (list(series[0]), series[1], series[2])) for key, series in self._series.items())
+        lines = []
+        for key, (bucket_counts, total, count) in snapshot:
+            labels = dict(zip(self.label_names, key))
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float("inf")), bucket_counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': _format_value(float(bound))})} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+class MetricsRegistry:
+    """
+    Counters, histograms and collectors rendered together
+
+    Collectors are called at render time and return
+    (name, type, help, samples) families, for values kept elsewhere such
+    as cache hit counts.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, Samples]]]] = []
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> Counter:
+        """Get or create a counter"""
+        return self._register(name, lambda: Counter(name, help_text, label_names))
+
+    def histogram(self, name: str, help_text: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Get or create a histogram"""
+        return self._register(name, lambda: Histogram(name, help_text, label_names, buckets))
+
+    def add_collector(self, collector: Callable[[], Iterable[Tuple[str, str, str, Samples]]]):
+        """Add a function producing metric families at render time"""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        lines = []
+        for metric in metrics:
+            kind = "histogram" if isinstance(metric, Histogram) else "counter"
+            lines += [f"# HELP {metric.name} {metric.help}", f"# TYPE {metric.name} {kind}", *metric.render()]
+        for collector in collectors:
+            try:
+                families = list(collector())
+            except Exception as e:
+                print(f"⚠ Metrics collector failed: {e}")
+                continue
+            for name, kind, help_text, samples in families:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+                lines += [f"{name}{_format_labels(labels)} {_format_value(value)}" for labels, value in samples]
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """Zero every counter and histogram (collectors keep their own state)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.reset()
+
+    def _register(self, name: str, factory):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = factory()
+            return metric
+
+
+REGISTRY = MetricsRegistry()
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "compliance_request_seconds", "Time to produce a response, by route", ("route",)
+)
+REQUESTS = REGISTRY.counter(
+    "compliance_requests_total", "Requests served, by route, method and status code", ("route", "method", "status")
+)
+STAGE_SECONDS = REGISTRY.histogram(
+    "compliance_stage_seconds", "Time spent in each request stage", ("stage",)
+)
+STAGE_ERRORS = REGISTRY.counter(
+    "compliance_stage_errors_total", "Stages that raised an exception", ("stage",)
+)
+LLM_CALLS = REGISTRY.counter(
+    "compliance_llm_calls_total", "OpenAI calls, by purpose and outcome (ok or error)", ("purpose", "outcome")
+)
+LLM_TOKENS = REGISTRY.counter(
+    "compliance_llm_tokens_total", "OpenAI tokens used, by purpose and kind (prompt or completion)", ("purpose", "kind")
+)
+
+
+class RequestTimings:
+    """Stage durations of one request, for its Server-Timing header"""
+
+    __slots__ = ("started", "stages")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: List[Tuple[str, float]] = []
+
+    def elapsed(self) -> float:
+        """Seconds since the request started"""
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        """
+        Server-Timing header value, durations in milliseconds
+
+        A stage run several times (one PDF per document) is reported once
+        with its total time. Stages can nest ("review" includes its "llm"
+        call); "total" is the whole request so far.
+        """
+        totals: Dict[str, float] = {}
+        for name, seconds in list(self.stages):
+            totals[name] = totals.get(name, 0.0) + seconds
+        parts = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in totals.items()]
+        parts.append(f"total;dur={self.elapsed() * 1000:.2f}")
+        return ", ".join(parts)
+
+
+# Timings of the request being served in this context (thread or task);
+# tasks and thread-pool calls started by the request inherit it
+_current_request: "contextvars.ContextVar[Optional[RequestTimings]]" = contextvars.ContextVar(
+    "current_request", default=None
+)
+
+
+def start_request() -> RequestTimings:
+    """Start collecting stage timings for the request served in this context"""
+    timings = RequestTimings()
+    _current_request.set(timings)
+    return timings
+
+
+def current_request() -> Optional[RequestTimings]:
+    """Timings of the request served in this context, if any"""
+    return _current_request.get()
+
+
+def end_request(route: str, method: str, status: int) -> Optional[RequestTimings]:
+    """
+    Stop collecting stage timings and count the request
+
+    Clients choose the method, so one outside HTTP_METHODS is counted as
+    "other" to keep the number of label combinations bounded.
+
+    Returns:
+        The request's timings, or None if start_request() was not called
+    """
+    timings = _current_request.get()
+    _current_request.set(None)
+    if timings is not None:
+        REQUEST_SECONDS.observe(timings.elapsed(), route)
+    REQUESTS.inc(route, method if method in HTTP_METHODS else "other", str(status))
+    return timings
+
+
+@contextmanager
+def stage(name: str):
+    """Time a request stage (also counts it as an error if it raises)"""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(name)
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        STAGE_SECONDS.observe(seconds, name)
+        timings = _current_request.get()
+        if timings is not None:
+            timings.stages.append((name, seconds))
+
+
+@contextmanager
+def llm_call(purpose: str):
+    """
+    Time an OpenAI call (stage "llm") and count it with its token usage
+
+    Yields a function to call with the completion, which records the tokens:
+
+        with metrics.llm_call("risk_analysis") as record:
+            record(client.chat.completions.create(...))
+    """
+    responses = []
+    try:
+        with stage("llm"):
+            yield responses.append
+    except Exception:
+        LLM_CALLS.inc(purpose, "error")
+        raise
+    LLM_CALLS.inc(purpose, "ok")
+    usage = getattr(responses[-1], "usage", None) if responses else None
+    if usage is not None:
+        LLM_TOKENS.inc(purpose, "prompt", amount=getattr(usage, "prompt_tokens", 0) or 0)
+        LLM_TOKENS.inc(purpose, "completion", amount=getattr(usage, "completion_tokens", 0) or 0)
+
+
+def cache_collector(caches: Callable[[], Dict[str, Dict]]):
+    """
+    Collector exporting hit/miss counts and sizes of caches
+
+    Args:
+        caches: Returns cache name -> get_cache_info()-style dictionary
+            (size, hits, and misses or loads)
+    """
+    def collect():
+        infos = caches()
+        families = [
+            ("compliance_cache_hits_total", "counter", "Cache hits, by cache", "hits"),
+            ("compliance_cache_misses_total", "counter", "Cache misses (or loads), by cache", "misses"),
+            ("compliance_cache_entries", "gauge", "Entries held, by cache", "size"),
+        ]
+        for name, kind, help_text, field in families:
+            samples = []
+            for cache, info in infos.items():
+                value = info.get(field, info.get("loads")) if field == "misses" else info.get(field)
+                if value is not None:
+                    samples.append(({"cache": cache}, value))
+            yield name, kind, help_text, samples
+    return collect
@@ -0,0 +1,150 @@
+"""
+Mock documents bundle
+Builds the ZIP of mock_users test documents once and rebuilds it only when
+the source files change, so downloads are served from a file on disk
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import zipfile
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+RISK_FOLDERS = ('low_risk', 'medium_risk', 'high_risk')
+
+# Written into the bundle as README.md
+QUICK_REFERENCE = """# 🧪 Mock Documents Test Guide
+
+## 📦 What's Included
+
+- **low_risk/** - 4 PDFs for Low Risk scenario
+- **medium_risk/** - 4 PDFs for Medium Risk scenario  
+- **high_risk/** - 4 PDFs for High Risk scenario
+
+---
+
+## 🟢 LOW RISK TEST
+
+**Form Inputs:**
+- Amount: $3,000
+- From: Singapore → To: Philippines
+- Purpose: Services
+- Type: Freelancer
+
+**Upload:** All 4 PDFs from `low_risk/` folder
+**Expected:** Score 0-10 (LOW) ✅
+
+---
+
+## 🟡 MEDIUM RISK TEST
+
+**Form Inputs:**
+- Amount: $18,000
+- From: Vietnam → To: Indonesia
+- Purpose: Trade Finance
+- Type: SMB
+
+**Upload:** All 4 PDFs from `medium_risk/` folder
+**Expected:** Score 50-60 (MEDIUM) ⚠️
+
+---
+
+## 🔴 HIGH RISK TEST
+
+**Form Inputs:**
+- Amount: $35,000
+- From: Cayman Islands → To: Vietnam
+- Purpose: Investment
+- Type: NGO
+- History: "multiple small transactions under $10k"
+
+**Upload:** All 4 PDFs from `high_risk/` folder
+**Expected:** Score 95-100 (HIGH) 🚨
+
+---
+
+**Start testing at:** http://localhost:8000
+"""
+
+
+class MockDocumentsBundle:
+    """
+    The mock documents ZIP, kept up to date with its sources
+
+    The bundle's ETag is a hash of the source files' names, sizes and
+    mtimes. It is stored as the ZIP comment, so a bundle built by an earlier
+    process (or another worker) is reused when the sources are unchanged.
+    """
+
+    def __init__(self, source_dir: str, bundle_path: str):
+        self.source_dir = Path(source_dir)
+        self.bundle_path = Path(bundle_path)
+        self._lock = threading.Lock()
+        self._etag: Optional[str] = None
+
+    def get(self) -> Tuple[Path, str]:
+        """
+        Get the bundle, rebuilding it first if the sources changed
+
+        Returns:
+            (path of the ZIP file, ETag)
+        """
+        sources = self._sources()
+        etag = self._etag_for(sources)
+        with self._lock:
+            if etag != self._etag or not self.bundle_path.exists():
+                if read_bundle_etag(self.bundle_path) != etag:
+                    self._build(sources, etag)
+                    print(f"✓ Built mock documents bundle ({len(sources)} files)")
+                self._etag = etag
+        return self.bundle_path, etag
+
+    def _sources(self) -> List[Tuple[Path, str]]:
+        """(file, name in the ZIP) pairs, in bundle order"""
+        sources = []
+        # Add all PDFs from each risk level
+        for risk_folder in RISK_FOLDERS:
+            folder_path = self.source_dir / risk_folder
+            if folder_path.exists():
+                for pdf_file in sorted(folder_path.glob('*.pdf')):
+                    sources.append((pdf_file, f"{risk_folder}/{pdf_file.name}"))
+        # Add instructions and the README for judges
+        for name in ("TEST_INSTRUCTIONS.md", "README_FOR_JUDGES.md"):
+            if (self.source_dir / name).exists():
+                sources.append((self.source_dir / name, name))
+        return sources
+
+    def _etag_for(self, sources: List[Tuple[Path, str]]) -> str:
+        """Hash of the sources' names, sizes and mtimes and the quick reference"""
+        digest = hashlib.sha256(QUICK_REFERENCE.encode())
+        for path, arcname in sources:
+            stat = path.stat()
+            digest.update(f"{arcname}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+        return f"mock-documents-{digest.hexdigest()[:16]}"
+
+    def _build(self, sources: List[Tuple[Path, str]], etag: str):
+        """Write the ZIP to a temporary file and move it into place"""
+        self.bundle_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(suffix='.zip', dir=self.bundle_path.parent)
+        try:
+            with os.fdopen(fd, 'wb') as output, zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as zipf:
+                for path, arcname in sources:
+                    zipf.write(path, arcname)
+                zipf.writestr("README.md", QUICK_REFERENCE)
+                zipf.comment = etag.encode()
+            # Downloads in progress keep reading the file they opened
+            os.replace(temp_path, self.bundle_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+
+def read_bundle_etag(path: Path) -> Optional[str]:
+    """ETag stored in an existing bundle (None if there is no valid bundle)"""
+    try:
+        with zipfile.ZipFile(path) as zipf:
+            return zipf.comment.decode() or None
+    except (OSError, zipfile.BadZipFile, UnicodeDecodeError):
+        return None
@@ -0,0 +1,134 @@
+"""
+Sampling profiler for a live process
+A background-free stack sampler: the calling thread reads every other
+thread's Python stack with sys._current_frames() at a fixed interval and
+counts identical stacks. The result is in the collapsed format read by
+flamegraph.pl and speedscope ("frame;frame;frame count" per line).
+
+Each stack starts with the route its thread is serving ("route POST
+/api/risk-check"), or the thread's name when it serves none, followed by
+module.qualified_name frames, so ComplianceEngine methods read as
+compliance_engine.ComplianceEngine._assess_amount_risk.
+
+Overhead: a sample walks every thread's frames while holding the GIL
+(roughly 0.1-0.5ms for a few dozen threads). The sampler measures its own
+cost and stretches the interval so sampling takes at most MAX_OVERHEAD of
+one core; the achieved overhead is reported with the profile. One profile
+runs at a time.
+
+The sampler needs the GIL to take a sample, so under CPU-bound load the
+effective rate is capped by sys.getswitchinterval() (5ms by default), and
+samples land where threads give up the GIL: blocking I/O (SQLite, OpenAI,
+poppler) is well represented, short pure-Python calls less so.
+"""
+
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+# Most of the process's time sampling may take (fraction of one core)
+MAX_OVERHEAD = 0.05
+# Deepest stack recorded; deeper frames are cut at the root end
+MAX_DEPTH = 128
+# Modules whose leaf frames mean the thread is waiting, not working
+IDLE_MODULES = frozenset({"threading", "selectors", "queue", "socket", "socketserver", "ssl", "select"})
+
+# Code objects of route handlers -> route label (see label_route)
+_route_labels: Dict[object, str] = {}
+_profile_lock = threading.Lock()
+
+
+def label_route(handler: Callable, route: str):
+    """Attribute samples taken inside a route handler to its route"""
+    code = getattr(handler, "__code__", None)
+    if code is not None:
+        _route_labels[code] = route
+
+
+def frame_label(frame) -> str:
+    """module.qualified_name of a frame's function"""
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}.{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def collapse_stack(frame, thread_name: str, include_idle: bool) -> Optional[str]:
+    """
+    One thread's stack as "root;outer;...;leaf"
+
+    Returns:
+        The collapsed stack, or None for an idle thread (unless include_idle)
+    """
+    if not include_idle and frame.f_globals.get("__name__") in IDLE_MODULES:
+        return None
+    labels = []
+    route = None
+    while frame is not None:
+        if len(labels) < MAX_DEPTH:
+            labels.append(frame_label(frame))
+        route = _route_labels.get(frame.f_code, route)
+        frame = frame.f_back
+    labels.append(f"route {route}" if route else f"thread {thread_name}")
+    # Semicolons separate frames in the collapsed format
+    return ";".join(label.replace(";", ":") for label in reversed(labels))
+
+
+def sample_stacks(duration_s: float, interval_s: float = 0.01, include_idle: bool = False) -> Dict:
+    """
+    Sample every other thread's stack for a while
+
+    Args:
+        duration_s: How long to sample
+        interval_s: Time between samples (stretched to keep within MAX_OVERHEAD)
+        include_idle: Keep stacks of threads waiting on locks, sockets or queues
+
+    Returns:
+        {"stacks": {collapsed stack: samples}, "samples": sampling rounds,
+         "duration_s", "interval_s", "overhead_pct": share of one core spent sampling}
+
+    Raises:
+        RuntimeError: If another profile is running
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise RuntimeError("A profile is already running")
+    try:
+        own_thread = threading.get_ident()
+        stacks: Dict[str, int] = {}
+        rounds = 0
+        sampling_s = 0.0
+        started = time.perf_counter()
+        deadline = started + duration_s
+        while True:
+            sample_started = time.perf_counter()
+            if sample_started >= deadline:
+                break
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+                stack = collapse_stack(frame, names.get(thread_id, str(thread_id)), include_idle)
+                if stack:
+                    stacks[stack] = stacks.get(stack, 0) + 1
+            del frame
+            rounds += 1
+            cost = time.perf_counter() - sample_started
+            sampling_s += cost
+            # Sleeping cost / MAX_OVERHEAD between samples bounds the overhead
+            time.sleep(max(interval_s, cost / MAX_OVERHEAD - cost))
+        elapsed = time.perf_counter() - started
+    finally:
+        _profile_lock.release()
+
+    return {
+        "stacks": stacks,
+        "samples": rounds,
+        "duration_s": round(elapsed, 3),
+        "interval_s": interval_s,
+        "overhead_pct": round(sampling_s / elapsed * 100, 3) if elapsed else 0,
+    }
+
+
+def to_collapsed(stacks: Dict[str, int]) -> List[str]:
+    """Collapsed-format lines ("stack count"), most frequent first"""
+    return [f"{stack} {count}" for stack, count in sorted(stacks.items(), key=lambda item: (-item[1], item[0]))]
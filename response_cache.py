@@ -0,0 +1,72 @@
+"""
+Serialized response cache
+Keeps the JSON bodies of hot GET responses with their ETags, so repeated
+polls skip the database read and the serialization
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+
+def content_etag(prefix: str, body: bytes) -> str:
+    """Strong ETag for a response body: prefix plus a hash of the bytes"""
+    return f"{prefix}-{hashlib.sha256(body).hexdigest()[:16]}"
+
+
+class ResponseCache:
+    """
+    LRU of (ETag, body) pairs with a time-to-live
+
+    The TTL bounds how long an entry can outlive a change made by another
+    process (such as a retention run deleting assessments).
+    """
+
+    def __init__(self, max_size: int = 256, ttl_s: float = 60):
+        self.max_size = max(0, max_size)
+        self.ttl_s = ttl_s
+        self._entries: "OrderedDict[Hashable, Tuple[float, str, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: Hashable) -> Optional[Tuple[str, bytes]]:
+        """Get a cached (ETag, body), or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl_s:
+                if entry is not None:
+                    del self._entries[key]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[1], entry[2]
+
+    def put(self, key: Hashable, etag: str, body: bytes):
+        """Cache a response body, evicting the least recently used entries"""
+        if not self.max_size:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), etag, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_info(self) -> Dict:
+        """Size and hit/miss counts"""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_s": self.ttl_s,
+                "hits": self._hits,
+                "misses": self._misses,
+            }
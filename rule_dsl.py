@@ -0,0 +1,316 @@
+"""
+Declarative custom risk rules
+Compiles the "custom_rules" section of rules_config.json into one Python
+function per ruleset, so rules are parsed once at load time and each
+transaction runs plain bytecode
+
+Example rule:
+    {
+        "id": "destination_high_risk_large",
+        "when": {"all": [
+            {"field": "destination_country", "in_rules": "high_risk_countries"},
+            {"field": "amount", "gt": 5000}
+        ]},
+        "score": 20,
+        "text": "Amount ${amount:,.2f} sent to high-risk country '{destination_country}'"
+    }
+
+Conditions are {"all": [...]}, {"any": [...]}, {"not": condition} or a
+comparison {"field": name, operator: value}. `in_rules` names another list
+of the same ruleset (such as high_risk_countries).
+
+{"first": [rule, ...]} groups tiered rules: only the first rule whose
+condition holds applies, and the last rule may omit "when" to apply
+otherwise. A rule without "text"
+only adds its score and is not listed among the triggered rules, like the
+built-in low-risk tiers.
+"""
+
+import math
+import re
+import string
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Transaction fields rules can test: name -> expression over the
+# Transaction `t`. Purposes are compared lowercased, as by the built-in rules.
+FIELDS = {
+    "amount": "t.amount_usd",
+    "origin_country": "t.origin_country",
+    "destination_country": "t.destination_country",
+    "purpose": "t.purpose.lower()",
+    "customer_type": "t.customer_type.value",
+    "structuring_signals": "t.has_structuring_signals",
+}
+NUMERIC_FIELDS = ("amount",)
+# Values of the right type for each field, to check text templates at load time
+SAMPLE_VALUES = {
+    "amount": 1.0,
+    "origin_country": "",
+    "destination_country": "",
+    "purpose": "",
+    "customer_type": "",
+    "structuring_signals": False,
+}
+
+# Comparison operators: name -> Python operator
+COMPARISONS = {
+    "eq": "==",
+    "ne": "!=",
+    "gt": ">",
+    "gte": ">=",
+    "lt": "<",
+    "lte": "<=",
+}
+MEMBERSHIP = {
+    "in": "in",
+    "not_in": "not in",
+    "in_rules": "in",
+    "not_in_rules": "not in",
+}
+OPERATORS = (*COMPARISONS, *MEMBERSHIP, "contains")
+
+RULE_ID_PATTERN = re.compile(r"^[a-z][a-z0-9_]{0,62}$")
+# Format specs allowed in rule texts (fill, alignment, sign, width, grouping, precision, type)
+FORMAT_SPEC_PATTERN = re.compile(r"^[\w ,.<>=^+\-#%]*$")
+
+
+class CompiledRuleSet:
+    """
+    Custom rules compiled into a single function
+
+    evaluate(transaction, add) calls add(rule_id, text) for every matching
+    rule that has a text and returns the sum of the matching rules' scores.
+    """
+
+    def __init__(self, rule_ids: List[str], source: str, evaluate: Callable):
+        self.rule_ids = rule_ids
+        self.source = source
+        self.evaluate = evaluate
+
+    def __len__(self) -> int:
+        return len(self.rule_ids)
+
+
+class _Compiler:
+    """
+    Turns rule definitions into Python source
+
+    Values become literals (set literals in membership tests compile to
+    frozenset constants), and a comparison used by several rules is
+    evaluated once per transaction.
+    """
+
+    def __init__(self, rules: Dict):
+        self.rules = rules
+        self.used_fields = set()
+        # Comparison expression -> [local name, number of uses]
+        self.comparisons: Dict[str, list] = {}
+
+    def literal(self, value, where: str) -> str:
+        """Python literal for a JSON scalar"""
+        if isinstance(value, float) and not math.isfinite(value):
+            raise ValueError(f"{where}: numbers must be finite")
+        if not isinstance(value, (str, int, float, bool)):
+            raise ValueError(f"{where}: expected a string, number or boolean, got {value!r}")
+        return repr(value)
+
+    def comparison(self, expression: str) -> str:
+        """Register a comparison and return a placeholder resolved by finish()"""
+        entry = self.comparisons.setdefault(expression, [f"c{len(self.comparisons)}", 0])
+        entry[1] += 1
+        return f"\0{entry[0]}\0"
+
+    def finish(self, lines: List[str]) -> List[str]:
+        """Hoist comparisons used more than once into locals and inline the rest"""
+        hoisted = []
+        replacements = {}
+        for expression, (name, uses) in self.comparisons.items():
+            if uses > 1:
+                hoisted.append(f"    {name} = {expression}")
+                replacements[f"\0{name}\0"] = name
+            else:
+                replacements[f"\0{name}\0"] = f"({expression})"
+        pattern = re.compile("\0c\\d+\0")
+        return hoisted + [pattern.sub(lambda match: replacements[match.group()], line) for line in lines]
+
+    def field(self, name, where: str) -> str:
+        if name not in FIELDS:
+            raise ValueError(f"{where}: unknown field '{name}' (expected one of {', '.join(FIELDS)})")
+        self.used_fields.add(name)
+        return f"f_{name}"
+
+    def condition(self, node, where: str) -> str:
+        """Compile a condition to a Python expression"""
+        if not isinstance(node, dict) or not node:
+            raise ValueError(f"{where}: a condition must be a non-empty object")
+
+        if "all" in node or "any" in node:
+            key = "all" if "all" in node else "any"
+            parts = node[key]
+            if len(node) != 1 or not isinstance(parts, list) or not parts:
+                raise ValueError(f"{where}: '{key}' must be the only key and hold a non-empty list")
+            joiner = " and " if key == "all" else " or "
+            return "(" + joiner.join(
+                self.condition(part, f"{where}.{key}[{index}]") for index, part in enumerate(parts)
+            ) + ")"
+
+        if "not" in node:
+            if len(node) != 1:
+                raise ValueError(f"{where}: 'not' must be the only key")
+            return f"(not {self.condition(node['not'], f'{where}.not')})"
+
+        operators = [key for key in node if key != "field"]
+        if "field" not in node or len(operators) != 1 or operators[0] not in OPERATORS:
+            raise ValueError(
+                f"{where}: a comparison needs 'field' and exactly one operator ({', '.join(OPERATORS)})"
+            )
+        operator = operators[0]
+        field = self.field(node["field"], where)
+        value = node[operator]
+
+        if operator in COMPARISONS:
+            if node["field"] in NUMERIC_FIELDS or operator not in ("eq", "ne"):
+                if not isinstance(value, (int, float)) or isinstance(value, bool):
+                    raise ValueError(f"{where}: '{operator}' on {node['field']} needs a number")
+            elif not isinstance(value, (str, bool, int, float)):
+                raise ValueError(f"{where}: '{operator}' needs a string, number or boolean")
+            if node["field"] == "purpose" and isinstance(value, str):
+                value = value.lower()
+            return self.comparison(f"{field} {COMPARISONS[operator]} {self.literal(value, where)}")
+
+        if operator in ("in_rules", "not_in_rules"):
+            values = self.rules.get(value)
+            if not isinstance(value, str) or not isinstance(values, list):
+                raise ValueError(f"{where}: '{operator}' must name a list in the ruleset, got {value!r}")
+        else:
+            values = value
+        if operator in MEMBERSHIP:
+            if not isinstance(values, list):
+                raise ValueError(f"{where}: '{operator}' needs a list")
+            if node["field"] == "purpose":
+                values = [item.lower() if isinstance(item, str) else item for item in values]
+            literals = sorted({self.literal(item, where) for item in values})
+            members = "{" + ", ".join(literals) + "}" if literals else "()"
+            return self.comparison(f"{field} {MEMBERSHIP[operator]} {members}")
+
+        # contains: case-insensitive substring match on a text field
+        if node["field"] in NUMERIC_FIELDS or node["field"] == "structuring_signals" or not isinstance(value, str):
+            raise ValueError(f"{where}: 'contains' needs a text field and a string")
+        text = field if node["field"] == "purpose" else f"{field}.lower()"
+        return self.comparison(f"{self.literal(value.lower(), where)} in {text}")
+
+    def text(self, template, where: str) -> str:
+        """Compile a rule text template to an f-string"""
+        if not isinstance(template, str) or not template:
+            raise ValueError(f"{where}: 'text' must be a non-empty string")
+        try:
+            parts = list(string.Formatter().parse(template))
+            template.format(**SAMPLE_VALUES)
+        except KeyError as e:
+            raise ValueError(f"{where}: text refers to unknown field {e}")
+        except (ValueError, TypeError, IndexError) as e:
+            raise ValueError(f"{where}: invalid text template: {e}")
+
+        pieces = []
+        for literal, name, format_spec, conversion in parts:
+            if literal:
+                pieces.append(repr(literal))
+            if name is None:
+                continue
+            if name not in FIELDS:
+                raise ValueError(f"{where}: text refers to unknown field '{name}'")
+            if not FORMAT_SPEC_PATTERN.match(format_spec or ""):
+                raise ValueError(f"{where}: unsupported format spec '{format_spec}' for {name}")
+            # Texts show the purpose as entered, not lowercased
+            if name == "purpose":
+                value = "t.purpose"
+            else:
+                value = self.field(name, where)
+            conversion = f"!{conversion}" if conversion else ""
+            format_spec = f":{format_spec}" if format_spec else ""
+            pieces.append(f"f'{{{value}{conversion}{format_spec}}}'")
+        # Adjacent literals compile to a single f-string
+        return " ".join(pieces)
+
+
+def compile_custom_rules(rules: Dict, reserved_ids=()) -> Optional[CompiledRuleSet]:
+    """
+    Compile the custom_rules of a ruleset
+
+    Args:
+        rules: Full rules configuration (custom rules may refer to its lists)
+        reserved_ids: Rule IDs custom rules may not reuse (the built-in rules)
+
+    Returns:
+        The compiled rule set, or None if the ruleset has no custom rules
+
+    Raises:
+        ValueError: If a rule is invalid
+    """
+    definitions = rules.get("custom_rules") or []
+    if not isinstance(definitions, list):
+        raise ValueError("custom_rules must be a list")
+    if not definitions:
+        return None
+
+    compiler = _Compiler(rules)
+    body = []
+    rule_ids = []
+
+    def compile_rule(definition, where: str, required_when: bool = True) -> Tuple[Optional[str], List[str]]:
+        """Compile one rule to (condition, statements); condition None means always"""
+        if not isinstance(definition, dict):
+            raise ValueError(f"{where}: each custom rule must be an object")
+        rule_id = definition.get("id")
+        if not isinstance(rule_id, str) or not RULE_ID_PATTERN.match(rule_id):
+            raise ValueError(f"{where}: 'id' must be lowercase letters, digits and underscores")
+        if rule_id in reserved_ids or rule_id in rule_ids:
+            raise ValueError(f"{where}: rule ID '{rule_id}' is already used")
+        score = definition.get("score", 0)
+        if not isinstance(score, int) or isinstance(score, bool):
+            raise ValueError(f"{where}: 'score' must be a whole number")
+        if "when" not in definition and required_when:
+            raise ValueError(f"{where}: missing 'when' condition")
+
+        condition = compiler.condition(definition["when"], f"{where}.when") if "when" in definition else None
+        actions = []
+        if definition.get("text") is not None:
+            actions.append(f"add({rule_id!r}, {compiler.text(definition['text'], where)})")
+        if score:
+            actions.append(f"score += {score!r}")
+        if not actions:
+            raise ValueError(f"{where}: a rule needs a 'text', a non-zero 'score' or both")
+        rule_ids.append(rule_id)
+        return condition, actions
+
+    for index, definition in enumerate(definitions):
+        where = f"custom_rules[{index}]"
+        if isinstance(definition, dict) and "first" in definition:
+            # Tiers: the first case whose condition holds applies
+            cases = definition["first"]
+            if len(definition) != 1 or not isinstance(cases, list) or not cases:
+                raise ValueError(f"{where}: 'first' must be the only key and hold a non-empty list of rules")
+            for position, case in enumerate(cases):
+                is_last = position == len(cases) - 1
+                condition, actions = compile_rule(case, f"{where}.first[{position}]", required_when=not is_last)
+                if condition is None:
+                    body.append("    else:" if position else "    if True:")
+                else:
+                    body.append(f"    {'elif' if position else 'if'} {condition}:")
+                body.extend(f"        {action}" for action in actions)
+            continue
+
+        condition, actions = compile_rule(definition, where)
+        body.append(f"    if {condition}:")
+        body.extend(f"        {action}" for action in actions)
+
+    # Each field is read from the transaction once per evaluation
+    prologue = [f"    f_{name} = {FIELDS[name]}" for name in sorted(compiler.used_fields)]
+    source = "\n".join(["def evaluate(t, add):", *prologue, *compiler.finish(["    score = 0", *body]),
+                        "    return score"])
+
+    # Field names and operators come from fixed tables and values are
+    # literals, so the source holds no user-supplied code
+    namespace = {"__builtins__": {}}
+    exec(compile(source, "<custom_rules>", "exec"), namespace)
+    return CompiledRuleSet(rule_ids, source, namespace["evaluate"])
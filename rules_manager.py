@@ -3,23 +3,293 @@ Rules Manager for Configurable Compliance Rules
 Handles loading, saving, and managing risk assessment rules
 """
 
+import copy
+import hashlib
 import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
 from pathlib import Path
-from typing import Dict, List
+from types import MappingProxyType
+from typing import Dict, FrozenSet, List, Mapping, Optional, Tuple
+
+from rule_dsl import CompiledRuleSet, compile_custom_rules
+
+try:
+    import fcntl
+    FILE_LOCKING = True
+except ImportError:
+    # No cross-process locking (Windows): run a single worker process
+    FILE_LOCKING = False
 
 RULES_FILE = Path(__file__).parent / "rules_config.json"
 
+RULE_LIST_KEYS = (
+    "high_risk_countries", "medium_risk_countries", "low_risk_countries",
+    "high_risk_purposes", "medium_risk_purposes", "low_risk_purposes",
+)
+RISK_TIERS = ("high", "medium", "low")
+
+
+@dataclass(frozen=True)
+class RulesSnapshot:
+    """
+    One immutable, precompiled version of the rules
+
+    A review reads a single snapshot from start to finish, so a reload
+    can never show it half-updated sets. `rules` is the snapshot's own
+    copy of the configuration it was compiled from; it is shared by every
+    reader, so treat it as read-only (RulesManager.get_rules() returns a
+    copy to modify).
+
+    `version` is the shared counter of the deployment (0 for rulesets
+    loaded from history); `content_hash` identifies the ruleset itself
+    and is stamped on assessments as their rules_version.
+    """
+    version: int
+    content_hash: str
+    rules: Dict
+    high_risk_countries: FrozenSet[str]
+    medium_risk_countries: FrozenSet[str]
+    low_risk_countries: FrozenSet[str]
+    high_risk_purposes: FrozenSet[str]
+    medium_risk_purposes: FrozenSet[str]
+    low_risk_purposes: FrozenSet[str]
+    country_risk_scores: Mapping[str, int]
+    purpose_risk_scores: Mapping[str, int]
+    customer_type_scores: Mapping[str, int]
+    high_risk_origin_threshold: float
+    general_high_threshold: float
+    moderate_threshold: float
+    low_max_score: int
+    medium_max_score: int
+    # Compiled custom_rules (None if the ruleset has none)
+    custom_rules: Optional[CompiledRuleSet] = None
+    # (mtime_ns, size, inode) of the rules file this snapshot was read from
+    file_signature: Optional[Tuple[int, int, int]] = None
+
+
+def ruleset_hash(rules: Dict) -> str:
+    """Content hash of a ruleset (key order and whitespace do not matter)"""
+    canonical = json.dumps(rules, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()[:16]
+
+
+def validate_rules(rules: Dict):
+    """
+    Check that a rules configuration can be compiled
+
+    Raises:
+        ValueError: Describing the first problem found
+    """
+    _validate_settings(rules)
+    compile_custom_rules(rules, builtin_rule_ids())
+
+
+def _validate_settings(rules: Dict):
+    """Check every part of a rules configuration except custom_rules"""
+    if not isinstance(rules, dict):
+        raise ValueError("Rules must be a JSON object")
+    for key in RULE_LIST_KEYS:
+        values = rules.get(key, [])
+        if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+            raise ValueError(f"{key} must be a list of strings")
+    for key in ("country_risk_scores", "purpose_risk_scores", "customer_type_scores"):
+        scores = rules.get(key, {})
+        if not isinstance(scores, dict):
+            raise ValueError(f"{key} must be an object")
+        for tier, score in scores.items():
+            if tier not in RISK_TIERS:
+                raise ValueError(f"{key} has unknown tier '{tier}' (expected high, medium or low)")
+            if not isinstance(score, (int, float)) or isinstance(score, bool):
+                raise ValueError(f"{key}.{tier} must be a number")
+    for key in ("amount_thresholds", "risk_score_thresholds"):
+        thresholds = rules.get(key, {})
+        if not isinstance(thresholds, dict):
+            raise ValueError(f"{key} must be an object")
+        for name, value in thresholds.items():
+            if not isinstance(value, (int, float)) or isinstance(value, bool) or value < 0:
+                raise ValueError(f"{key}.{name} must be a non-negative number")
+    score_thresholds = rules.get("risk_score_thresholds", {})
+    if score_thresholds.get("low_max", 30) > score_thresholds.get("medium_max", 70):
+        raise ValueError("risk_score_thresholds.low_max must not exceed medium_max")
+
+
+def builtin_rule_ids() -> Tuple[str, ...]:
+    """IDs of the rules built into the engine, which custom rules may not reuse"""
+    # Imported here because compliance_engine itself imports this module
+    from compliance_engine import RULE_IDS
+    return RULE_IDS
+
+
+def compile_rules(rules: Dict, version: int, signature: Tuple[int, int, int] = None) -> RulesSnapshot:
+    """
+    Validate a rules configuration and build its snapshot
+
+    Missing entries fall back to the built-in defaults. The snapshot keeps
+    a deep copy of `rules`, so later changes to the caller's dictionary
+    cannot reach it.
+
+    Raises:
+        ValueError: If the configuration is invalid
+    """
+    _validate_settings(rules)
+    rules = copy.deepcopy(rules)
+    custom_rules = compile_custom_rules(rules, builtin_rule_ids())
+
+    def scores(key: str, defaults: Dict) -> Mapping[str, int]:
+        return MappingProxyType({**defaults, **rules.get(key, {})})
+
+    thresholds = rules.get("amount_thresholds", {})
+    score_thresholds = rules.get("risk_score_thresholds", {})
+    return RulesSnapshot(
+        version=version,
+        content_hash=ruleset_hash(rules),
+        rules=rules,
+        **{key: frozenset(rules.get(key, [])) for key in RULE_LIST_KEYS},
+        country_risk_scores=scores("country_risk_scores", {"high": 35, "medium": 18, "low": 5}),
+        purpose_risk_scores=scores("purpose_risk_scores", {"high": 28, "medium": 15, "low": 3}),
+        customer_type_scores=scores("customer_type_scores", {"low": 5, "medium": 15, "high": 40}),
+        high_risk_origin_threshold=thresholds.get("high_risk_origin_threshold", 10000),
+        general_high_threshold=thresholds.get("general_high_threshold", 25000),
+        moderate_threshold=thresholds.get("moderate_threshold", 15000),
+        low_max_score=score_thresholds.get("low_max", 30),
+        medium_max_score=score_thresholds.get("medium_max", 70),
+        custom_rules=custom_rules,
+        file_signature=signature,
+    )
+
+
+def file_signature(path: Path) -> Optional[Tuple[int, int, int]]:
+    """(mtime_ns, size, inode) of a file, or None if it does not exist"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+def read_version_file(path: Path) -> Dict:
+    """
+    Read the shared rules version from a version file
+    
+    Returns:
+        Dictionary with the version (0 if none was published yet) and the
+        signature of the rules file it was published for
+    """
+    try:
+        with open(path, 'r') as f:
+            state = json.load(f)
+        signature = state.get("rules_signature")
+        return {
+            "version": int(state.get("version", 0)),
+            "rules_signature": tuple(signature) if signature else None,
+        }
+    except (OSError, ValueError, TypeError):
+        return {"version": 0, "rules_signature": None}
+
+
+def write_atomic(path: Path, content: str):
+    """Write a file through a temporary file and a rename, so readers never see it half-written"""
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.stem}_", suffix=path.suffix)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(content)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
 class RulesManager:
-    """Manages compliance rules configuration"""
+    """
+    Manages compliance rules configuration
+
+    The current rules are an immutable RulesSnapshot. Changes build a new
+    snapshot and swap it in with a single assignment (copy-on-write), so
+    readers never take a lock.
+
+    Worker processes share a version counter in rules_config.version in
+    the data directory. Every save bumps it, and each worker adopts the new
+    rules the next time it calls sync_version() (once per request), so
+    all workers score with the same rules version.
+
+    Every ruleset that goes into effect is also kept in history/ in the
+    data directory by content hash, and recently used rulesets stay
+    compiled in an LRU cache, so assessments can be re-evaluated under the
+    rules that scored them.
+
+    Nothing is written to the data directory until the rules are first
+    saved or reloaded; until then the version counter is only read.
+    """
     
-    def __init__(self):
-        self.rules = self.load_rules()
+    def __init__(self, cache_size: int = 16, rules_file: str = None, data_dir: str = None):
+        """
+        Args:
+            cache_size: Compiled rulesets kept in the LRU cache
+            rules_file: Rules configuration (default: rules_config.json)
+            data_dir: Directory for the shared version counter, the writers'
+                lock file and the history (default: Config.RULES_DATA_DIR)
+        """
+        if data_dir is None:
+            # Imported here so the engine can be used without the app's settings loaded
+            from config import Config
+            data_dir = Config.RULES_DATA_DIR
+        self.rules_file = Path(rules_file) if rules_file else RULES_FILE
+        self.data_dir = Path(data_dir)
+        self.version_file = self.data_dir / "rules_config.version"
+        self.lock_file = self.data_dir / "rules_config.lock"
+        self.history_dir = self.data_dir / "history"
+        self._write_lock = threading.Lock()
+        # Compiled snapshots by content hash, least recently used first
+        self._compiled: "OrderedDict[str, RulesSnapshot]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._cache_size = max(1, cache_size)
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._watcher = None
+        self._watch_stop = threading.Event()
+        # Signature of a rules file edit that failed validation (not retried until it changes)
+        self._rejected_signature = None
+        # Signature of the version file when it was last read
+        self._version_file_signature = None
+        
+        signature = file_signature(self.rules_file)
+        rules = self.load_rules()
+        state = read_version_file(self.version_file)
+        self._version_file_signature = file_signature(self.version_file)
+        try:
+            validate_rules(rules)
+            # The version this rules file has (or will have once a worker publishes it)
+            published = state["rules_signature"] == signature and state["version"]
+            version = state["version"] if published else state["version"] + 1
+        except ValueError as e:
+            print(f"Error loading rules: {e}")
+            self._rejected_signature = signature
+            rules = self._get_default_rules()
+            version = state["version"]
+        self._snapshot = compile_rules(rules, version, signature)
+        self._cache(self._snapshot)
+    
+    @property
+    def snapshot(self) -> RulesSnapshot:
+        """The current rules snapshot"""
+        return self._snapshot
+    
+    @property
+    def rules(self) -> Dict:
+        """The current rules configuration (read-only)"""
+        return self._snapshot.rules
     
     def load_rules(self) -> Dict:
         """Load rules from JSON file"""
         try:
-            if RULES_FILE.exists():
-                with open(RULES_FILE, 'r') as f:
+            if self.rules_file.exists():
+                with open(self.rules_file, 'r') as f:
                     return json.load(f)
             else:
                 return self._get_default_rules()
@@ -28,29 +298,283 @@ class RulesManager:
             return self._get_default_rules()
     
     def save_rules(self, rules: Dict) -> bool:
-        """Save rules to JSON file"""
+        """Validate rules, write them to the JSON file and swap them in"""
         try:
-            with open(RULES_FILE, 'w') as f:
-                json.dump(rules, f, indent=2)
-            self.rules = rules
+            validate_rules(rules)
+            with self._shared_lock():
+                write_atomic(self.rules_file, json.dumps(rules, indent=2))
+                signature = file_signature(self.rules_file)
+                self._swap(rules, signature, self._publish(signature))
             return True
         except Exception as e:
             print(f"Error saving rules: {e}")
             return False
     
     def get_rules(self) -> Dict:
-        """Get current rules"""
-        return self.rules.copy()
+        """Get a copy of the current rules (safe to modify)"""
+        return copy.deepcopy(self._snapshot.rules)
     
     def update_rules(self, updates: Dict) -> bool:
         """Update specific rules"""
         try:
-            self.rules.update(updates)
-            return self.save_rules(self.rules)
+            return self.save_rules({**self._snapshot.rules, **updates})
         except Exception as e:
             print(f"Error updating rules: {e}")
             return False
     
+    def sync_version(self) -> bool:
+        """
+        Adopt rules saved by another worker process
+        
+        Cheap enough to call on every request: unless the shared version
+        file changed, this is a single stat() call.
+        
+        Returns:
+            True if a new snapshot was swapped in
+        """
+        version_signature = file_signature(self.version_file)
+        if version_signature == self._version_file_signature:
+            return False
+        
+        with self._write_lock:
+            state = read_version_file(self.version_file)
+            if state["version"] == self._snapshot.version:
+                self._version_file_signature = version_signature
+                return False
+            
+            # The rules file is replaced before the version file, so it
+            # can only be newer than the version read; if so, leave the
+            # version file signature unrecorded and retry next time
+            signature = file_signature(self.rules_file)
+            if signature != state["rules_signature"]:
+                return False
+            try:
+                with open(self.rules_file, 'r') as f:
+                    rules = json.load(f)
+                snapshot = self._swap(rules, signature, state["version"])
+            except (OSError, ValueError) as e:
+                print(f"⚠ Could not load rules version {state['version']}: {e}")
+                return False
+            self._version_file_signature = version_signature
+        print(f"✓ Loaded rules version {snapshot.version} saved by another worker")
+        return True
+    
+    def check_for_changes(self) -> bool:
+        """
+        Reload rules saved by another worker, or the rules file if it was
+        edited directly since the last load
+        
+        Invalid edits are reported and ignored; the current rules stay in
+        effect until the file is fixed. A valid edit bumps the shared
+        version once, whichever worker notices it first.
+        
+        Returns:
+            True if a new snapshot was swapped in
+        """
+        if self.sync_version():
+            return True
+        
+        signature = file_signature(self.rules_file)
+        if signature == self._snapshot.file_signature or signature == self._rejected_signature:
+            return False
+        
+        with self._shared_lock():
+            signature = file_signature(self.rules_file)
+            if signature == self._snapshot.file_signature:
+                return False
+            try:
+                if signature is None:
+                    rules = self._get_default_rules()
+                else:
+                    with open(self.rules_file, 'r') as f:
+                        rules = json.load(f)
+                validate_rules(rules)
+            except (OSError, ValueError) as e:
+                self._rejected_signature = signature
+                print(f"⚠ Ignoring invalid {self.rules_file.name}: {e}")
+                return False
+            snapshot = self._swap(rules, signature, self._publish(signature))
+        print(f"✓ Reloaded {self.rules_file.name} (rules version {snapshot.version})")
+        return True
+    
+    def get_snapshot(self, content_hash: str) -> Optional[RulesSnapshot]:
+        """
+        Get the compiled snapshot of a ruleset by content hash
+        
+        Recently used rulesets come from the LRU cache; others are loaded
+        from the history and compiled once.
+        
+        Returns:
+            The snapshot, or None if the ruleset is not in the history
+        """
+        current = self._snapshot
+        if current.content_hash == content_hash:
+            return current
+        
+        with self._cache_lock:
+            snapshot = self._compiled.get(content_hash)
+            if snapshot:
+                self._compiled.move_to_end(content_hash)
+                self._cache_hits += 1
+                return snapshot
+            self._cache_misses += 1
+        
+        rules = self.get_ruleset(content_hash)
+        if rules is None:
+            return None
+        snapshot = compile_rules(rules, 0)
+        self._cache(snapshot)
+        return snapshot
+    
+    def get_ruleset(self, content_hash: str) -> Optional[Dict]:
+        """Get a ruleset from the history by content hash (None if unknown)"""
+        current = self._snapshot
+        if current.content_hash == content_hash:
+            return copy.deepcopy(current.rules)
+        # Hashes are hex; anything else cannot name a history file
+        if not content_hash or not all(c in "0123456789abcdef" for c in content_hash):
+            return None
+        try:
+            with open(self.history_dir / f"{content_hash}.json", 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+    
+    def list_versions(self) -> List[Dict]:
+        """
+        List the rulesets in the history, newest first
+        
+        Returns:
+            Dictionaries with rules_version (content hash), saved_at and
+            whether the ruleset is current
+        """
+        current = self._snapshot.content_hash
+        versions = []
+        for path in self.history_dir.glob("*.json"):
+            try:
+                saved_at = path.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            versions.append({
+                "rules_version": path.stem,
+                "saved_at": datetime.utcfromtimestamp(saved_at).isoformat(),
+                "current": path.stem == current,
+            })
+        # The rules in effect since startup reach the history with the first save or reload
+        if not any(version["current"] for version in versions):
+            signature = self._snapshot.file_signature
+            versions.append({
+                "rules_version": current,
+                "saved_at": datetime.utcfromtimestamp(signature[0] / 1e9).isoformat() if signature else None,
+                "current": True,
+            })
+        versions.sort(key=lambda version: version["saved_at"], reverse=True)
+        return versions
+    
+    def get_cache_info(self) -> Dict:
+        """Hit and miss counts of the compiled snapshot cache"""
+        with self._cache_lock:
+            return {
+                "size": len(self._compiled),
+                "max_size": self._cache_size,
+                "hits": self._cache_hits,
+                "misses": self._cache_misses,
+            }
+    
+    def start_watching(self, interval: float = 2.0):
+        """
+        Poll the rules file's modification time in a background thread and
+        hot-reload it when it changes
+        
+        A poll is two stat() calls (the version file and the rules file).
+        Reviews in flight keep the snapshot they started with.
+        """
+        if self._watcher or interval <= 0:
+            return
+        self._watch_stop.clear()
+        
+        def watch():
+            while not self._watch_stop.wait(interval):
+                try:
+                    self.check_for_changes()
+                except Exception as e:
+                    print(f"Error checking rules file: {e}")
+        
+        self._watcher = threading.Thread(target=watch, name="rules-watcher", daemon=True)
+        self._watcher.start()
+    
+    def stop_watching(self):
+        """Stop the file watcher"""
+        if self._watcher:
+            self._watch_stop.set()
+            self._watcher.join()
+            self._watcher = None
+    
+    def _swap(self, rules: Dict, signature: Optional[Tuple[int, int, int]], version: int) -> RulesSnapshot:
+        """Compile rules into a new snapshot and make it current (caller holds the write lock)"""
+        snapshot = compile_rules(rules, version, signature)
+        # The outgoing rules may have scored assessments; keep them too
+        self.remember(self._snapshot)
+        self._snapshot = snapshot
+        self._rejected_signature = None
+        self.remember(snapshot)
+        return snapshot
+    
+    def remember(self, snapshot: RulesSnapshot):
+        """Keep a ruleset that went into effect in the history and the cache"""
+        path = self.history_dir / f"{snapshot.content_hash}.json"
+        if not path.exists():
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                write_atomic(path, json.dumps(snapshot.rules, indent=2))
+            except OSError as e:
+                print(f"⚠ Could not add rules version {snapshot.content_hash} to the history: {e}")
+        self._cache(snapshot)
+    
+    def _cache(self, snapshot: RulesSnapshot):
+        """Add a compiled snapshot to the LRU cache"""
+        with self._cache_lock:
+            self._compiled[snapshot.content_hash] = snapshot
+            self._compiled.move_to_end(snapshot.content_hash)
+            while len(self._compiled) > self._cache_size:
+                self._compiled.popitem(last=False)
+    
+    def _publish(self, signature: Optional[Tuple[int, int, int]]) -> int:
+        """
+        Get the shared version of the rules file with this signature,
+        bumping the counter if no worker has published it yet (caller
+        holds the shared lock)
+
+        A new version is also above this worker's own, which may be one
+        it took for an unpublished rules file at startup.
+        """
+        state = read_version_file(self.version_file)
+        if state["rules_signature"] == signature and state["version"]:
+            version = state["version"]
+        else:
+            version = max(state["version"], self._snapshot.version) + 1
+            write_atomic(self.version_file, json.dumps({
+                "version": version,
+                "rules_signature": signature,
+            }))
+        self._version_file_signature = file_signature(self.version_file)
+        return version
+    
+    @contextmanager
+    def _shared_lock(self):
+        """Serialize rules writers in this process and, where supported, across processes"""
+        with self._write_lock:
+            self.data_dir.mkdir(parents=True, exist_ok=True)
+            if not FILE_LOCKING:
+                yield
+                return
+            with open(self.lock_file, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
     def reset_to_defaults(self) -> bool:
         """Reset rules to default values"""
         return self.save_rules(self._get_default_rules())
@@ -118,33 +642,33 @@ class RulesManager:
     def add_country(self, country: str, risk_level: str) -> bool:
         """Add a country to a risk level list"""
         key = f"{risk_level}_risk_countries"
-        if key in self.rules and country not in self.rules[key]:
-            self.rules[key].append(country)
-            return self.save_rules(self.rules)
+        rules = self._snapshot.rules
+        if key in rules and country not in rules[key]:
+            return self.save_rules({**rules, key: [*rules[key], country]})
         return False
     
     def remove_country(self, country: str, risk_level: str) -> bool:
         """Remove a country from a risk level list"""
         key = f"{risk_level}_risk_countries"
-        if key in self.rules and country in self.rules[key]:
-            self.rules[key].remove(country)
-            return self.save_rules(self.rules)
+        rules = self._snapshot.rules
+        if key in rules and country in rules[key]:
+            return self.save_rules({**rules, key: [value for value in rules[key] if value != country]})
         return False
     
     def add_purpose(self, purpose: str, risk_level: str) -> bool:
         """Add a purpose to a risk level list"""
         key = f"{risk_level}_risk_purposes"
-        if key in self.rules and purpose not in self.rules[key]:
-            self.rules[key].append(purpose)
-            return self.save_rules(self.rules)
+        rules = self._snapshot.rules
+        if key in rules and purpose not in rules[key]:
+            return self.save_rules({**rules, key: [*rules[key], purpose]})
         return False
     
     def remove_purpose(self, purpose: str, risk_level: str) -> bool:
         """Remove a purpose from a risk level list"""
         key = f"{risk_level}_risk_purposes"
-        if key in self.rules and purpose in self.rules[key]:
-            self.rules[key].remove(purpose)
-            return self.save_rules(self.rules)
+        rules = self._snapshot.rules
+        if key in rules and purpose in rules[key]:
+            return self.save_rules({**rules, key: [value for value in rules[key] if value != purpose]})
         return False
 
 
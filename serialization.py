@@ -0,0 +1,166 @@
+"""
+JSON encoding and decoding for API responses and stored assessments
+Uses orjson or msgspec when installed (JSON_BACKEND) and the standard
+library otherwise
+
+Every backend writes the same JSON: compact, UTF-8 (non-ASCII characters
+are not escaped), NaN and infinity as null. Call the functions through the
+module (serialization.dumps), so use_backend() applies everywhere.
+"""
+
+import dataclasses
+import decimal
+import enum
+import json
+import math
+import uuid
+from datetime import date, datetime, time
+from typing import Any, Callable, Dict, Tuple, Union
+
+from config import Config
+
+try:
+    import orjson
+    ORJSON_SUPPORT = True
+except ImportError:
+    ORJSON_SUPPORT = False
+
+try:
+    import msgspec
+    MSGSPEC_SUPPORT = True
+except ImportError:
+    MSGSPEC_SUPPORT = False
+
+# Backends in order of preference for JSON_BACKEND=auto
+JSON_BACKENDS = ("orjson", "msgspec", "json")
+
+
+def _default(obj):
+    """Encode the non-JSON types the API may return, as Flask's provider does"""
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    if isinstance(obj, enum.Enum):
+        return obj.value
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, "__html__"):
+        return str(obj.__html__())
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _finite(obj):
+    """Replace NaN and infinity with None, as the fast backends encode them"""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: _finite(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(value) for value in obj]
+    return obj
+
+
+def _json_codec() -> Tuple[Callable, Callable, Callable]:
+    """Standard library json"""
+    def dumps(obj, sort_keys: bool = False) -> str:
+        try:
+            return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), sort_keys=sort_keys,
+                              default=_default, allow_nan=False)
+        except ValueError:
+            return json.dumps(_finite(obj), ensure_ascii=False, separators=(",", ":"), sort_keys=sort_keys,
+                              default=_default)
+
+    def dumpb(obj, sort_keys: bool = False) -> bytes:
+        return dumps(obj, sort_keys).encode("utf-8")
+
+    return dumps, dumpb, json.loads
+
+
+def _orjson_codec() -> Tuple[Callable, Callable, Callable]:
+    """orjson (datetime, UUID and dataclasses are encoded natively)"""
+    options = orjson.OPT_NON_STR_KEYS
+    sorted_options = options | orjson.OPT_SORT_KEYS
+    encode = orjson.dumps
+    fallback_dumpb = _json_codec()[1]
+
+    def dumpb(obj, sort_keys: bool = False) -> bytes:
+        try:
+            return encode(obj, default=_default, option=sorted_options if sort_keys else options)
+        except orjson.JSONEncodeError:
+            # Integers beyond 64 bits; anything else fails the same way below
+            return fallback_dumpb(obj, sort_keys)
+
+    def dumps(obj, sort_keys: bool = False) -> str:
+        return dumpb(obj, sort_keys).decode("utf-8")
+
+    return dumps, dumpb, orjson.loads
+
+
+def _msgspec_codec() -> Tuple[Callable, Callable, Callable]:
+    """msgspec"""
+    encoder = msgspec.json.Encoder(enc_hook=_default)
+    sorted_encoder = msgspec.json.Encoder(enc_hook=_default, order="sorted")
+    decoder = msgspec.json.Decoder()
+
+    def dumpb(obj, sort_keys: bool = False) -> bytes:
+        return (sorted_encoder if sort_keys else encoder).encode(obj)
+
+    def dumps(obj, sort_keys: bool = False) -> str:
+        return dumpb(obj, sort_keys).decode("utf-8")
+
+    def loads(data: Union[str, bytes]):
+        try:
+            return decoder.decode(data)
+        except msgspec.DecodeError as e:
+            # Callers catch ValueError, as raised by the other backends
+            raise ValueError(str(e)) from None
+
+    return dumps, dumpb, loads
+
+
+_CODECS: Dict[str, Callable] = {"json": _json_codec}
+if ORJSON_SUPPORT:
+    _CODECS["orjson"] = _orjson_codec
+if MSGSPEC_SUPPORT:
+    _CODECS["msgspec"] = _msgspec_codec
+
+
+def available_backends() -> Tuple[str, ...]:
+    """Backends that can be used here, fastest first"""
+    return tuple(name for name in JSON_BACKENDS if name in _CODECS)
+
+
+def use_backend(name: str = "auto") -> str:
+    """
+    Select the JSON backend
+
+    Args:
+        name: "orjson", "msgspec", "json", or "auto" for the fastest installed
+
+    Returns:
+        The backend now in use
+    """
+    global dumps, dumpb, loads, JSON_BACKEND
+    name = (name or "auto").lower()
+    if name == "auto":
+        name = available_backends()[0]
+    elif name not in JSON_BACKENDS:
+        raise ValueError(f"Unknown JSON backend: {name} (expected auto, {', '.join(JSON_BACKENDS)})")
+    elif name not in _CODECS:
+        print(f"⚠ JSON backend {name} is not installed, using the standard library")
+        name = "json"
+    dumps, dumpb, loads = _CODECS[name]()
+    JSON_BACKEND = name
+    return name
+
+
+# dumps(obj, sort_keys=False) -> str, dumpb(obj, sort_keys=False) -> bytes
+# and loads(str or bytes); loads raises ValueError on invalid JSON
+dumps: Callable[..., str]
+dumpb: Callable[..., bytes]
+loads: Callable[[Union[str, bytes]], Any]
+JSON_BACKEND: str
+use_backend(Config.JSON_BACKEND)
@@ -254,7 +254,9 @@ async function saveRules() {
             risk_score_thresholds: {
                 low_max: parseInt(document.getElementById('low-max-score').value),
                 medium_max: parseInt(document.getElementById('medium-max-score').value)
-            }
+            },
+            // Custom rules are edited in rules_config.json, not on this page
+            custom_rules: currentRules.custom_rules || []
         };
         
         const response = await fetch('/api/rules', {
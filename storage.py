@@ -0,0 +1,305 @@
+"""
+Storage backends for compliance assessments
+AssessmentStore is the interface the app relies on; AssessmentDB (SQLite,
+database.py) and InMemoryAssessmentStore implement it
+"""
+
+import bisect
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import serialization
+from compliance_engine import rule_mask
+
+# Columns of a stored assessment, in insert and export order
+ASSESSMENT_COLUMNS = (
+    "id", "timestamp", "amount", "currency", "source_country", "destination_country",
+    "purpose", "counterparty_type", "history_signals", "risk_score", "risk_level",
+    "triggered_rules", "rationale", "checklist_items", "ai_insights", "full_response",
+    "rule_mask", "rules_version",
+)
+
+# Risk levels counted in statistics
+RISK_LEVELS = ("Low", "Medium", "High")
+
+STORAGE_BACKENDS = ("sqlite", "memory")
+
+
+class AssessmentStore(ABC):
+    """
+    Interface for saving, listing, reading, summarizing and exporting
+    assessments
+
+    Backends may offer more (search, analytics, snapshots); callers check
+    for those with hasattr().
+    """
+
+    @abstractmethod
+    def save_assessment(self, transaction_data: Dict, assessment_result: Dict) -> int:
+        """
+        Save a compliance assessment
+
+        Returns:
+            ID of the saved assessment
+        """
+
+    def save_assessments(self, pairs: List[Tuple[Dict, Dict]]) -> List[int]:
+        """
+        Save several assessments (backends override this to write them together)
+
+        Args:
+            pairs: (transaction_data, assessment_result) pairs
+
+        Returns:
+            IDs of the saved assessments, in order
+        """
+        return [self.save_assessment(transaction_data, result) for transaction_data, result in pairs]
+
+    @abstractmethod
+    def get_all_assessments(self, limit: int = 100, offset: int = 0) -> List[Dict]:
+        """List assessments, newest first"""
+
+    @abstractmethod
+    def get_assessment_by_id(self, assessment_id: int) -> Optional[Dict]:
+        """Get one assessment, or None if it does not exist"""
+
+    @abstractmethod
+    def get_statistics(self) -> Dict:
+        """Get total count, risk breakdown and average risk score"""
+
+    @abstractmethod
+    def iter_assessment_rows(
+        self,
+        since_id: int = None,
+        start: str = None,
+        end: str = None,
+        batch_size: int = 1000
+    ) -> Iterator[tuple]:
+        """
+        Stream raw rows in ID order for export
+
+        Yields:
+            Tuples in ASSESSMENT_COLUMNS order, with JSON columns as text
+        """
+
+    @abstractmethod
+    def clear_all(self):
+        """Delete every assessment"""
+
+    def get_write_metrics(self) -> Dict:
+        """Get write-path metrics"""
+        return {'write_behind': False}
+
+    def get_data_version(self, assessment_id: int = None) -> Optional[str]:
+        """
+        Token that changes whenever stored assessments change
+
+        Cheaper than reading the data, so responses derived from it can be
+        revalidated and cached against it.
+
+        Args:
+            assessment_id: Only track changes that can affect this assessment
+
+        Returns:
+            The version token, or None if the backend cannot tell
+        """
+        return None
+
+    def is_pending(self, assessment_id: int) -> bool:
+        """Whether an assessment is accepted but not yet durably stored"""
+        return False
+
+    def flush(self, timeout: float = None) -> bool:
+        """Wait for pending writes (nothing is pending by default)"""
+        return True
+
+    def close(self):
+        """Release resources"""
+
+
+class InMemoryAssessmentStore(AssessmentStore):
+    """
+    Keeps assessments in process memory
+
+    For tests, benchmarks and ephemeral deployments: nothing survives a
+    restart. Rows are stored the way SQLite stores them (JSON columns as
+    text), so results match AssessmentDB exactly.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows: Dict[int, Dict] = {}
+        # IDs ordered by timestamp, with the timestamps as a parallel list for bisect
+        self._order: List[int] = []
+        self._timestamps: List[str] = []
+        self._next_id = 1
+        self._total = 0
+        self._score_sum = 0
+        self._level_counts: Dict[str, int] = {}
+        # Data versions: bumped by every save and by clear_all, and unique to
+        # this instance so versions from before a restart never match
+        self._instance = uuid.uuid4().hex[:8]
+        self._version = 0
+        self._clears = 0
+
+    def save_assessment(self, transaction_data: Dict, assessment_result: Dict) -> int:
+        """Save a compliance assessment and return its ID"""
+        return self.save_assessments([(transaction_data, assessment_result)])[0]
+
+    def save_assessments(self, pairs: List[Tuple[Dict, Dict]]) -> List[int]:
+        """Save several assessments under one lock and return their IDs"""
+        rows = [build_row(transaction_data, assessment_result) for transaction_data, assessment_result in pairs]
+        with self._lock:
+            for row in rows:
+                row['id'] = self._next_id
+                self._next_id += 1
+                self._rows[row['id']] = row
+
+                # Timestamps almost always arrive in order, so this is an append
+                position = bisect.bisect_right(self._timestamps, row['timestamp'])
+                self._timestamps.insert(position, row['timestamp'])
+                self._order.insert(position, row['id'])
+
+                self._total += 1
+                self._score_sum += row['risk_score'] or 0
+                self._level_counts[row['risk_level']] = self._level_counts.get(row['risk_level'], 0) + 1
+            self._version += 1
+        return [row['id'] for row in rows]
+
+    def get_all_assessments(self, limit: int = 100, offset: int = 0) -> List[Dict]:
+        """List assessments, newest first"""
+        with self._lock:
+            end = len(self._order) - offset
+            ids = self._order[max(0, end - limit):max(0, end)][::-1]
+            rows = [self._rows[assessment_id] for assessment_id in ids]
+        return [row_to_assessment(row) for row in rows]
+
+    def get_assessment_by_id(self, assessment_id: int) -> Optional[Dict]:
+        """Get one assessment, or None if it does not exist"""
+        with self._lock:
+            row = self._rows.get(assessment_id)
+        return row_to_assessment(row) if row else None
+
+    def get_statistics(self) -> Dict:
+        """Get total count, risk breakdown and average risk score"""
+        with self._lock:
+            total = self._total
+            score_sum = self._score_sum
+            risk_breakdown = {
+                level: self._level_counts[level]
+                for level in RISK_LEVELS
+                if self._level_counts.get(level)
+            }
+        return {
+            'total_assessments': total,
+            'risk_breakdown': risk_breakdown,
+            'average_risk_score': round(score_sum / total, 2) if total else 0,
+        }
+
+    def iter_assessment_rows(
+        self,
+        since_id: int = None,
+        start: str = None,
+        end: str = None,
+        batch_size: int = 1000
+    ) -> Iterator[tuple]:
+        """Stream raw rows in ID order, a batch at a time"""
+        next_id = (since_id or 0) + 1
+        while True:
+            with self._lock:
+                last_id = min(self._next_id - 1, next_id + batch_size - 1)
+                rows = [self._rows.get(assessment_id) for assessment_id in range(next_id, last_id + 1)]
+            if next_id > last_id:
+                return
+            next_id = last_id + 1
+            for row in rows:
+                if row is None:
+                    continue
+                if start and row['timestamp'] < start:
+                    continue
+                if end and row['timestamp'][:10] > end:
+                    continue
+                yield tuple(row[column] for column in ASSESSMENT_COLUMNS)
+
+    def clear_all(self):
+        """Delete every assessment"""
+        with self._lock:
+            self._rows.clear()
+            self._order.clear()
+            self._timestamps.clear()
+            self._total = 0
+            self._score_sum = 0
+            self._level_counts.clear()
+            self._version += 1
+            self._clears += 1
+
+    def get_data_version(self, assessment_id: int = None) -> Optional[str]:
+        """Version of the data (stored rows never change, so one row's only changes when cleared)"""
+        with self._lock:
+            if assessment_id is not None:
+                return f"{self._instance}-c{self._clears}"
+            return f"{self._instance}-{self._version}"
+
+
+def build_row(transaction_data: Dict, assessment_result: Dict) -> Dict:
+    """Convert a transaction and its assessment into a stored row (id None)"""
+    return {
+        'id': None,
+        'timestamp': datetime.utcnow().isoformat(),
+        'amount': transaction_data.get('amount'),
+        'currency': transaction_data.get('currency', 'USD'),
+        'source_country': transaction_data.get('source_country'),
+        'destination_country': transaction_data.get('destination_country'),
+        'purpose': transaction_data.get('purpose'),
+        'counterparty_type': transaction_data.get('counterparty_type'),
+        'history_signals': transaction_data.get('history_signals', ''),
+        'risk_score': assessment_result.get('risk_score'),
+        'risk_level': assessment_result.get('risk_level'),
+        'triggered_rules': serialization.dumps(assessment_result.get('triggered_rules', [])),
+        'rationale': assessment_result.get('rationale'),
+        'checklist_items': serialization.dumps(assessment_result.get('checklist_items', [])),
+        'ai_insights': serialization.dumps(assessment_result.get('ai_insights')) if assessment_result.get('ai_insights') else None,
+        'full_response': serialization.dumps(assessment_result),
+        'rule_mask': rule_mask(assessment_result.get('triggered_rule_ids', [])),
+        'rules_version': assessment_result.get('rules_version'),
+    }
+
+
+def row_to_assessment(row) -> Dict:
+    """Convert a stored row into an assessment dictionary (JSON columns parsed)"""
+    loads = serialization.loads
+    assessment = dict(row)
+    assessment['triggered_rules'] = loads(assessment['triggered_rules'])
+    assessment['checklist_items'] = loads(assessment['checklist_items'])
+    if assessment['ai_insights']:
+        assessment['ai_insights'] = loads(assessment['ai_insights'])
+    assessment['full_response'] = loads(assessment['full_response'])
+    return assessment
+
+
+def create_store(backend: str = None) -> AssessmentStore:
+    """
+    Create the storage backend selected by STORAGE_BACKEND
+
+    Args:
+        backend: "sqlite" or "memory" (default: Config.STORAGE_BACKEND)
+    """
+    # Imported here because database.py itself imports this module
+    from config import Config
+    from database import AssessmentDB
+
+    backend = (backend or Config.STORAGE_BACKEND).lower()
+    if backend == "memory":
+        print("⚠ Using in-memory storage: assessments are lost on restart")
+        return InMemoryAssessmentStore()
+    if backend == "sqlite":
+        return AssessmentDB(
+            write_behind=Config.DB_WRITE_BEHIND,
+            batch_size=Config.DB_WRITE_BATCH_SIZE,
+            max_delay_ms=Config.DB_WRITE_MAX_DELAY_MS,
+            partition_dir=Config.DB_PARTITION_DIR or None
+        )
+    raise ValueError(f"Unknown storage backend: {backend} (expected one of {', '.join(STORAGE_BACKENDS)})")
@@ -0,0 +1,241 @@
+"""
+Per-tenant rulesets
+Business units can override the global rules (thresholds, scores, lists,
+custom rules) with a file in TENANT_RULES_DIR; each tenant's effective
+ruleset is compiled into its own snapshot and kept in a bounded LRU cache
+"""
+
+import copy
+import json
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from rules_manager import RulesManager, RulesSnapshot, compile_rules, file_signature, validate_rules, write_atomic
+
+# Tenant IDs name files, so they are restricted to safe characters
+TENANT_ID_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]{0,63}$")
+
+
+def merge_rules(base: Dict, overrides: Dict) -> Dict:
+    """
+    Merge a tenant's overrides over the global rules
+
+    Nested objects are merged key by key, so overriding one threshold keeps
+    the other global thresholds; lists and values are replaced. The result
+    shares no nested lists or objects with either argument.
+    """
+    merged = copy.deepcopy(base)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_rules(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+@dataclass
+class _CachedTenant:
+    """A compiled tenant snapshot and what it was compiled from"""
+    snapshot: RulesSnapshot
+    signature: Tuple[int, int, int]
+    base_hash: str
+    # (tenant file signature, global rules hash) of a merge that failed
+    # validation, so it is not retried until either changes
+    rejected: Optional[Tuple[Tuple[int, int, int], str]] = None
+
+
+class TenantRulesets:
+    """
+    Resolves each tenant's rules snapshot
+
+    A tenant file holds overrides merged over the global rules, so a tenant
+    follows global changes for everything it does not override. Snapshots
+    are recompiled when either the tenant file or the global rules change.
+
+    Cold tenants are loaded under a per-tenant lock: a slow load only holds
+    up requests for the same tenant.
+    """
+
+    def __init__(self, rules_manager: RulesManager, rules_dir: str, cache_size: int = 256,
+                 api_keys_file: str = None):
+        self.rules_manager = rules_manager
+        self.rules_dir = Path(rules_dir)
+        self._cache_size = max(1, cache_size)
+        self._cache: "OrderedDict[str, _CachedTenant]" = OrderedDict()
+        # Guards the cache and the loading locks; never held during a load
+        self._lock = threading.Lock()
+        self._loading: Dict[str, threading.Lock] = {}
+        self._hits = 0
+        self._loads = 0
+        self._evictions = 0
+        self._api_keys = self._load_api_keys(api_keys_file)
+
+    def has_api_keys(self) -> bool:
+        """Whether tenants are selected by API key (TENANT_API_KEYS_FILE)"""
+        return bool(self._api_keys)
+
+    def tenant_for_api_key(self, api_key: str) -> Optional[str]:
+        """Get the tenant an API key belongs to (None if the key is unknown)"""
+        return self._api_keys.get(api_key)
+
+    def snapshot_for(self, tenant_id: str) -> RulesSnapshot:
+        """
+        Get the compiled rules of a tenant
+
+        Raises:
+            ValueError: If the tenant ID is malformed, or its ruleset is
+                invalid and no earlier version is cached
+            KeyError: If the tenant has no ruleset
+        """
+        path = self.tenant_path(tenant_id)
+        base = self.rules_manager.snapshot
+        signature = file_signature(path)
+        if signature is None:
+            raise KeyError(f"Unknown tenant: {tenant_id}")
+
+        cached = self._cached(tenant_id, signature, base.content_hash)
+        if cached:
+            return cached
+
+        with self._loading_lock(tenant_id):
+            # Another request may have loaded the tenant while this one waited
+            cached = self._cached(tenant_id, signature, base.content_hash)
+            if cached:
+                return cached
+            try:
+                return self._load(tenant_id, path, base)
+            finally:
+                with self._lock:
+                    self._loading.pop(tenant_id, None)
+
+    def get_overrides(self, tenant_id: str) -> Dict:
+        """
+        Get the rules a tenant overrides
+
+        Raises:
+            ValueError: If the tenant ID is malformed
+            KeyError: If the tenant has no ruleset
+        """
+        try:
+            with open(self.tenant_path(tenant_id), 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise KeyError(f"Unknown tenant: {tenant_id}")
+
+    def save_overrides(self, tenant_id: str, overrides: Dict, create: bool = False) -> RulesSnapshot:
+        """
+        Validate and save a tenant's overrides
+
+        Args:
+            tenant_id: Tenant to update
+            overrides: Rules merged over the global rules (see merge_rules)
+            create: Allow creating a tenant that has no ruleset yet
+
+        Returns:
+            The tenant's new snapshot
+
+        Raises:
+            ValueError: If the tenant ID or the merged ruleset is invalid
+            KeyError: If the tenant has no ruleset and create is False
+        """
+        path = self.tenant_path(tenant_id)
+        if not create and not path.exists():
+            raise KeyError(f"Unknown tenant: {tenant_id}")
+        if not isinstance(overrides, dict):
+            raise ValueError("Rules must be a JSON object")
+        validate_rules(merge_rules(self.rules_manager.rules, overrides))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        write_atomic(path, json.dumps(overrides, indent=2))
+        return self.snapshot_for(tenant_id)
+
+    def list_tenants(self) -> List[str]:
+        """List tenants that have a ruleset"""
+        return sorted(
+            path.stem for path in self.rules_dir.glob("*.json")
+            if TENANT_ID_PATTERN.match(path.stem)
+        )
+
+    def get_cache_info(self) -> Dict:
+        """Size and hit/load/eviction counts of the tenant cache"""
+        with self._lock:
+            return {
+                "size": len(self._cache),
+                "max_size": self._cache_size,
+                "hits": self._hits,
+                "loads": self._loads,
+                "evictions": self._evictions,
+            }
+
+    def tenant_path(self, tenant_id: str) -> Path:
+        """Path of a tenant's ruleset file"""
+        if not isinstance(tenant_id, str) or not TENANT_ID_PATTERN.match(tenant_id):
+            raise ValueError("Tenant IDs are 1-64 letters, digits, '_' or '-'")
+        return self.rules_dir / f"{tenant_id}.json"
+
+    def _cached(self, tenant_id: str, signature, base_hash: str) -> Optional[RulesSnapshot]:
+        """Get a cached snapshot that is still current"""
+        with self._lock:
+            entry = self._cache.get(tenant_id)
+            if not entry:
+                return None
+            current = entry.signature == signature and entry.base_hash == base_hash
+            if not current and entry.rejected != (signature, base_hash):
+                return None
+            self._cache.move_to_end(tenant_id)
+            self._hits += 1
+            return entry.snapshot
+
+    def _loading_lock(self, tenant_id: str) -> threading.Lock:
+        """Lock serializing loads of one tenant"""
+        with self._lock:
+            return self._loading.setdefault(tenant_id, threading.Lock())
+
+    def _load(self, tenant_id: str, path: Path, base: RulesSnapshot) -> RulesSnapshot:
+        """Read, merge and compile a tenant's ruleset, and cache it"""
+        signature = file_signature(path)
+        if signature is None:
+            raise KeyError(f"Unknown tenant: {tenant_id}")
+        try:
+            with open(path, 'r') as f:
+                overrides = json.load(f)
+            if not isinstance(overrides, dict):
+                raise ValueError("Tenant rules must be a JSON object")
+            snapshot = compile_rules(merge_rules(base.rules, overrides), base.version, signature)
+        except ValueError as e:
+            with self._lock:
+                entry = self._cache.get(tenant_id)
+                if not entry:
+                    raise ValueError(f"Invalid rules for tenant {tenant_id}: {e}")
+                entry.rejected = (signature, base.content_hash)
+            print(f"⚠ Ignoring invalid rules for tenant {tenant_id}: {e}")
+            return entry.snapshot
+
+        # Kept in the rules history, so the tenant's assessments can be re-evaluated
+        self.rules_manager.remember(snapshot)
+        with self._lock:
+            self._cache[tenant_id] = _CachedTenant(snapshot, signature, base.content_hash)
+            self._cache.move_to_end(tenant_id)
+            self._loads += 1
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+                self._evictions += 1
+        return snapshot
+
+    def _load_api_keys(self, api_keys_file: Optional[str]) -> Dict[str, str]:
+        """Read the API key -> tenant ID map"""
+        if not api_keys_file:
+            return {}
+        try:
+            with open(api_keys_file, 'r') as f:
+                api_keys = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠ Could not read tenant API keys from {api_keys_file}: {e}")
+            return {}
+        if not isinstance(api_keys, dict):
+            print(f"⚠ {api_keys_file} must map API keys to tenant IDs")
+            return {}
+        return {str(key): str(tenant) for key, tenant in api_keys.items() if TENANT_ID_PATTERN.match(str(tenant))}
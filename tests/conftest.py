@@ -0,0 +1,52 @@
+"""
+Shared pytest setup
+The application modules live at the repository root, next to this directory
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark import generate_assessments  # noqa: E402
+from config import Config  # noqa: E402
+
+ADMIN_TOKEN = "test-admin-token"
+
+
+@pytest.fixture(scope="session")
+def pairs():
+    """Five (transaction_data, assessment_result) pairs scored by the real engine"""
+    return list(generate_assessments(5, seed=7))
+
+
+@pytest.fixture(scope="session")
+def app_module(tmp_path_factory):
+    """The app module with its services created on in-memory storage and temporary rules directories"""
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(Config, "STORAGE_BACKEND", "memory")
+        patch.setattr(Config, "OPENAI_API_KEY", "")
+        patch.setattr(Config, "RULES_DATA_DIR", str(tmp_path_factory.mktemp("rules_data")))
+        patch.setattr(Config, "RULES_WATCH_INTERVAL_S", 0)
+        patch.setattr(Config, "TENANT_RULES_DIR", str(tmp_path_factory.mktemp("tenant_rules")))
+        import app as app_module
+        app_module.init_services()
+    return app_module
+
+
+@pytest.fixture
+def client(app_module, monkeypatch):
+    """
+    Flask test client over a fresh in-memory store and response cache
+
+    The admin token is ADMIN_TOKEN.
+    """
+    from response_cache import ResponseCache
+    from storage import InMemoryAssessmentStore
+
+    monkeypatch.setattr(app_module, "db", InMemoryAssessmentStore())
+    monkeypatch.setattr(app_module, "response_cache", ResponseCache(Config.RESPONSE_CACHE_SIZE, Config.RESPONSE_CACHE_TTL_S))
+    monkeypatch.setattr(Config, "ADMIN_TOKEN", ADMIN_TOKEN)
+    return app_module.app.test_client()
@@ -0,0 +1,137 @@
+"""
+Analytics rollups (get_analytics) checked against GROUP BY queries over the raw rows
+"""
+
+import sqlite3
+
+import pytest
+
+from benchmark import populate
+from database import AssessmentDB
+
+KEY_EXPRESSIONS = {
+    "day": "substr(timestamp, 1, 10)",
+    "corridor": "source_country || ' → ' || destination_country",
+    "purpose": "lower(purpose)",
+}
+
+
+@pytest.fixture
+def db(tmp_path):
+    """A database with 300 assessments spread over 2025"""
+    db = AssessmentDB(str(tmp_path / "analytics.db"))
+    populate(db, 300, seed=11)
+    return db
+
+
+def query(path, sql, params=()):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+def execute(path, sql, params=()):
+    conn = sqlite3.connect(path)
+    try:
+        with conn:
+            conn.execute(sql, params)
+    finally:
+        conn.close()
+
+
+def recount(path, dimension, start=None, end=None):
+    """Buckets of get_analytics() computed from the assessments table"""
+    conditions = ["1 = 1"]
+    params = []
+    if start:
+        conditions.append("substr(timestamp, 1, 10) >= ?")
+        params.append(start)
+    if end:
+        conditions.append("substr(timestamp, 1, 10) <= ?")
+        params.append(end)
+    rows = query(path, f"""
+        SELECT {KEY_EXPRESSIONS[dimension]}, risk_level, COUNT(*), SUM(risk_score), SUM(amount)
+        FROM assessments WHERE {" AND ".join(conditions)}
+        GROUP BY 1, 2
+    """, params)
+
+    buckets = {}
+    for key, risk_level, count, score_sum, amount_sum in rows:
+        bucket = buckets.setdefault(key, {'total_assessments': 0, 'risk_breakdown': {}, 'score_sum': 0, 'amount': 0})
+        bucket['total_assessments'] += count
+        bucket['risk_breakdown'][risk_level] = count
+        bucket['score_sum'] += score_sum
+        bucket['amount'] += amount_sum
+    return {
+        key: {
+            'total_assessments': bucket['total_assessments'],
+            'risk_breakdown': bucket['risk_breakdown'],
+            'average_risk_score': round(bucket['score_sum'] / bucket['total_assessments'], 2),
+            'total_amount': round(bucket['amount'], 2),
+        }
+        for key, bucket in buckets.items()
+    }
+
+
+def by_bucket(results, bucket):
+    return {entry.pop(bucket): entry for entry in results}
+
+
+@pytest.mark.parametrize("dimension", sorted(KEY_EXPRESSIONS))
+def test_rollups_match_recount(db, dimension):
+    bucket = "day" if dimension == "day" else "key"
+    assert by_bucket(db.get_analytics(dimension), bucket) == recount(db.db_path, dimension)
+
+
+@pytest.mark.parametrize("dimension", sorted(KEY_EXPRESSIONS))
+def test_rollups_match_recount_over_a_range(db, dimension):
+    bucket = "day" if dimension == "day" else "key"
+    results = db.get_analytics(dimension, start="2025-03-01", end="2025-05-31")
+    assert by_bucket(results, bucket) == recount(db.db_path, dimension, "2025-03-01", "2025-05-31")
+
+
+def test_single_key_is_a_daily_series(db):
+    purpose = query(db.db_path, "SELECT lower(purpose) FROM assessments LIMIT 1")[0][0]
+    series = db.get_analytics("purpose", key=purpose)
+    expected = query(db.db_path, """
+        SELECT substr(timestamp, 1, 10), COUNT(*) FROM assessments
+        WHERE lower(purpose) = ? GROUP BY 1 ORDER BY 1
+    """, (purpose,))
+    assert [(entry['day'], entry['total_assessments']) for entry in series] == expected
+
+
+def test_rollups_follow_deletes(db):
+    execute(db.db_path, "DELETE FROM assessments WHERE id % 4 = 0")
+    for dimension in KEY_EXPRESSIONS:
+        bucket = "day" if dimension == "day" else "key"
+        assert by_bucket(db.get_analytics(dimension), bucket) == recount(db.db_path, dimension)
+
+    execute(db.db_path, "DELETE FROM assessments")
+    assert db.get_analytics("day") == []
+    assert query(db.db_path, "SELECT COUNT(*) FROM analytics_rollup") == [(0,)]
+
+
+def test_backfill_of_rows_saved_before_rollups(db):
+    # Rows written while the rollup triggers did not exist
+    conn = sqlite3.connect(db.db_path)
+    with conn:
+        conn.execute("DROP TRIGGER assessments_rollup_insert")
+        conn.execute("DELETE FROM analytics_rollup")
+    conn.close()
+    populate(db, 50, seed=12)
+
+    # Reopening recreates the triggers but does not backfill
+    db = AssessmentDB(db.db_path)
+    assert db.get_analytics("day") == []
+
+    assert db.rebuild_rollups() > 0
+    for dimension in KEY_EXPRESSIONS:
+        bucket = "day" if dimension == "day" else "key"
+        assert by_bucket(db.get_analytics(dimension), bucket) == recount(db.db_path, dimension)
+
+
+def test_unknown_dimension_is_rejected(db):
+    with pytest.raises(ValueError):
+        db.get_analytics("country")
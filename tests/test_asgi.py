@@ -0,0 +1,140 @@
+"""
+ASGI serving mode (asgi_app.py): the natively async routes answer as the
+Flask routes do, the rest are served by the mounted Flask app, and uploaded
+documents are reviewed concurrently
+"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("starlette")
+pytest.importorskip("a2wsgi")
+pytest.importorskip("multipart")
+pytest.importorskip("httpx")
+
+from starlette.testclient import TestClient  # noqa: E402
+
+import metrics  # noqa: E402
+from storage import InMemoryAssessmentStore  # noqa: E402
+
+PAYLOAD = {
+    "amount": 30000, "currency": "USD", "source_country": "Nigeria", "destination_country": "Singapore",
+    "purpose": "investment", "counterparty_type": "corporate",
+}
+
+
+@pytest.fixture
+def asgi_app(app_module, client, monkeypatch):
+    """asgi_app with the async routes and the Flask app sharing one fresh in-memory store"""
+    import asgi_app
+
+    store = InMemoryAssessmentStore()
+    monkeypatch.setattr(asgi_app, "db", store)
+    monkeypatch.setattr(app_module, "db", store)
+    return asgi_app
+
+
+@pytest.fixture
+def asgi_client(asgi_app):
+    with TestClient(asgi_app.create_asgi_app(wsgi_workers=2)) as asgi_client:
+        yield asgi_client
+
+
+class FakeAsyncOpenAI:
+    """Answers document extractions after a delay, recording how many ran at once"""
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.running = 0
+        self.most_running = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **request):
+        self.running += 1
+        self.most_running = max(self.most_running, self.running)
+        await asyncio.sleep(0.05)
+        self.running -= 1
+        content = json.dumps(self.replies.pop(0))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+
+def without_id(result):
+    return {key: value for key, value in result.items() if key != "assessment_id"}
+
+
+def test_risk_check_answers_as_the_flask_route(asgi_client, client, app_module):
+    response = asgi_client.post("/api/risk-check", json=PAYLOAD)
+    expected = client.post("/api/risk-check", json=PAYLOAD)
+    assert response.status_code == expected.status_code == 200
+    assert without_id(response.json()) == without_id(expected.get_json())
+    assert response.headers["content-type"] == expected.headers["Content-Type"]
+
+    # Both are saved in the shared store
+    saved = app_module.db.get_assessment_by_id(response.json()["assessment_id"])
+    assert saved["risk_score"] == response.json()["risk_score"]
+    assert app_module.db.get_statistics()["total_assessments"] == 2
+
+
+@pytest.mark.parametrize("payload", [
+    {key: value for key, value in PAYLOAD.items() if key != "amount"},
+    {**PAYLOAD, "amount": "lots"},
+    {**PAYLOAD, "amount": -5},
+])
+def test_validation_errors_match_the_flask_route(asgi_client, client, payload):
+    response = asgi_client.post("/api/risk-check", json=payload)
+    expected = client.post("/api/risk-check", json=payload)
+    assert response.status_code == expected.status_code == 400
+    assert response.json() == expected.get_json()
+
+
+def test_other_routes_are_served_by_flask(asgi_client):
+    assert asgi_client.post("/api/risk-check", json=PAYLOAD).status_code == 200
+    response = asgi_client.get("/api/statistics")
+    assert response.status_code == 200 and response.json()["total_assessments"] == 1
+    assert asgi_client.get("/api/rules").json()["risk_score_thresholds"]["low_max"] == 30
+    assert asgi_client.get("/api/assessments/0").status_code == 404
+
+
+def test_async_routes_are_timed(asgi_client):
+    before = metrics.REQUESTS.get("/api/risk-check", "POST", "200")
+    response = asgi_client.post("/api/risk-check", json=PAYLOAD)
+    stages = [part.split(";")[0] for part in response.headers["server-timing"].split(", ")]
+    assert stages[:3] == ["validate", "review", "save"] and stages[-1] == "total"
+    assert metrics.REQUESTS.get("/api/risk-check", "POST", "200") == before + 1
+
+
+def test_document_routes_need_their_inputs(asgi_client):
+    response = asgi_client.post("/api/analyze-documents", files={"proofOfIdentity": ("id.png", b"png", "image/png")})
+    assert response.status_code == 503 and "OPENAI_API_KEY" in response.json()["error"]
+
+    response = asgi_client.post("/api/risk-check-with-documents", data={"other": "field"})
+    assert response.status_code == 400 and response.json() == {"error": "No transaction data provided"}
+
+
+def test_documents_are_analyzed_concurrently(asgi_app, asgi_client, monkeypatch):
+    openai = FakeAsyncOpenAI([
+        {"amount": 1000, "source_country": "Kenya"},
+        {"amount": 2500, "red_flags": "round amounts"},
+        {"purpose": "payroll"},
+    ])
+    monkeypatch.setattr(asgi_app, "async_openai_client", openai)
+    response = asgi_client.post("/api/analyze-documents", files={
+        "sourceOfFunds": ("funds.png", b"funds", "image/png"),
+        "proofOfIdentity": ("id.jpeg", b"id", "image/jpeg"),
+        "contractsInvoices": ("contract.png", b"contract", "image/png"),
+        "proofOfResidency": ("residency.docx", b"docx", "application/octet-stream"),
+    })
+    assert response.status_code == 200
+    assert openai.most_running == 3
+
+    # Merged in upload order, as the Flask route does; the Word document is skipped
+    result = response.json()
+    assert result["documents_analyzed"] == 4
+    assert result["extracted_data"]["amount"] == 2500
+    assert result["extracted_data"]["source_country"] == "Kenya"
+    assert result["extracted_data"]["purpose"] == "payroll"
+    assert result["extracted_data"]["history_signals"] == "round amounts"
+    assert result["document_analysis"]["proofOfResidency"]["status"] == "skipped"
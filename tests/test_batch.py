@@ -0,0 +1,144 @@
+"""
+Batch risk checks (/api/risk-check/batch): chunk sizes, per-row errors and
+one database transaction per chunk
+"""
+
+import json
+
+import pytest
+
+from config import Config
+from database import AssessmentDB
+
+VALID = {
+    "amount": 1200, "currency": "USD", "source_country": "Singapore", "destination_country": "Vietnam",
+    "purpose": "payroll", "counterparty_type": "smb",
+}
+
+
+@pytest.fixture
+def db(app_module, client, tmp_path, monkeypatch):
+    """A SQLite store for the app that records the statements of every connection"""
+    db = AssessmentDB(str(tmp_path / "batch.db"))
+    db.statements = []
+    connect = db._connect
+
+    def traced_connect(path=None):
+        conn = connect(path)
+        conn.set_trace_callback(db.statements.append)
+        return conn
+
+    monkeypatch.setattr(db, "_connect", traced_connect)
+    monkeypatch.setattr(app_module, "db", db)
+    return db
+
+
+def post_batch(client, rows, **params):
+    response = client.post("/api/risk-check/batch", json=rows, query_string=params)
+    return response, [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def commits(db):
+    return sum(statement.strip().upper() == "COMMIT" for statement in db.statements)
+
+
+@pytest.mark.parametrize("chunk_size", ["0", "-1", "6", "many", "2.5"])
+def test_chunk_size_out_of_range(client, db, monkeypatch, chunk_size):
+    monkeypatch.setattr(Config, "RISK_CHECK_BATCH_MAX_CHUNK_SIZE", 5)
+    response, _ = post_batch(client, [VALID], chunk_size=chunk_size)
+    assert response.status_code == 400
+    assert "chunk_size must be" in response.get_json()["error"]
+    assert db.get_statistics()["total_assessments"] == 0
+
+
+@pytest.mark.parametrize("chunk_size, expected_commits", [("1", 5), ("2", 3), ("5", 1)])
+def test_each_chunk_is_one_transaction(client, db, monkeypatch, chunk_size, expected_commits):
+    monkeypatch.setattr(Config, "RISK_CHECK_BATCH_MAX_CHUNK_SIZE", 5)
+    db.statements.clear()
+    response, lines = post_batch(client, [VALID] * 5, chunk_size=chunk_size)
+    assert response.status_code == 200
+    assert lines[-1] == {"summary": {"rows": 5, "saved": 5, "errors": 0}}
+    assert commits(db) == expected_commits
+    assert db.get_statistics()["total_assessments"] == 5
+
+
+def test_default_chunk_size(client, db, monkeypatch):
+    monkeypatch.setattr(Config, "RISK_CHECK_BATCH_CHUNK_SIZE", 3)
+    db.statements.clear()
+    _, lines = post_batch(client, [VALID] * 7)
+    assert lines[-1]["summary"]["saved"] == 7
+    assert commits(db) == 3
+
+
+def test_row_errors_are_reported_in_order(client, db):
+    rows = [
+        VALID,
+        {key: value for key, value in VALID.items() if key != "amount"},
+        ["not", "an", "object"],
+        {**VALID, "amount": "lots"},
+        {**VALID, "amount": -1},
+        {**VALID, "source_country": 42},
+        {**VALID, "amount": 90000, "source_country": "Iran"},
+    ]
+    db.statements.clear()
+    response, lines = post_batch(client, rows, chunk_size=3)
+    assert response.status_code == 200
+    assert [line.get("row") for line in lines[:-1]] == list(range(7))
+    assert [line.get("error") for line in lines[:-1]] == [
+        None,
+        "Missing required field: amount",
+        "Each row must be a JSON object",
+        "Invalid amount",
+        "Amount must be positive",
+        "Countries, purpose, counterparty type and history signals must be strings",
+        None,
+    ]
+    assert lines[-1] == {"summary": {"rows": 7, "saved": 2, "errors": 5}}
+
+    # Only valid rows are saved; the chunk of rows 3-5 had none, so no transaction
+    saved = [lines[0], lines[6]]
+    assert commits(db) == 2
+    for line in saved:
+        stored = db.get_assessment_by_id(line["assessment_id"])
+        assert (stored["risk_score"], stored["risk_level"]) == (line["risk_score"], line["risk_level"])
+    assert lines[6]["risk_level"] == "High"
+
+
+def test_ndjson_body(client, db):
+    body = "\n".join([json.dumps(VALID), "{not json", "", json.dumps({**VALID, "purpose": "gambling"})]) + "\n"
+    response = client.post("/api/risk-check/batch", data=body, content_type="application/x-ndjson",
+                           query_string={"chunk_size": 2})
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line.get("row") for line in lines[:-1]] == [0, 1, 2]
+    assert lines[1]["error"].startswith("Invalid JSON")
+    assert lines[-1] == {"summary": {"rows": 3, "saved": 2, "errors": 1}}
+
+
+def test_failed_chunk_saves_none_of_its_rows(client, db, monkeypatch):
+    write_rows = AssessmentDB._write_rows
+    calls = []
+
+    def fail_second_chunk(self, conn, rows):
+        calls.append(len(rows))
+        ids = write_rows(self, conn, rows)
+        if len(calls) == 2:
+            raise OSError("disk full")
+        return ids
+
+    monkeypatch.setattr(AssessmentDB, "_write_rows", fail_second_chunk)
+    _, lines = post_batch(client, [VALID] * 6, chunk_size=2)
+
+    assert calls == [2, 2, 2]
+    assert [line.get("error") for line in lines[:-1]] == \
+        [None, None, "Failed to save assessment: disk full", "Failed to save assessment: disk full", None, None]
+    assert lines[-1] == {"summary": {"rows": 6, "saved": 4, "errors": 2}}
+    # The second chunk was rolled back whole, even though its rows were written first
+    assert db.get_statistics()["total_assessments"] == 4
+    assert db.verify_statistics()["consistent"]
+    assert all(db.get_assessment_by_id(line["assessment_id"]) for line in lines[:-1] if "assessment_id" in line)
+
+
+def test_body_must_be_a_list(client, db):
+    response = client.post("/api/risk-check/batch", json=VALID)
+    assert response.status_code == 400
+    assert "JSON array" in response.get_json()["error"]
@@ -0,0 +1,98 @@
+"""
+Benchmark suite (benchmark.py): deterministic datasets, the measurements,
+small runs of the quick benchmarks, the suite runner and result comparison
+"""
+
+import json
+
+import pytest
+
+import benchmark
+
+# Benchmarks that finish in about a second on a few hundred rows
+QUICK_BENCHMARKS = ("engine", "rules", "reload", "storage", "scale", "batch", "http_cache")
+
+
+def test_datasets_are_deterministic():
+    assert list(benchmark.generate_assessments(20, seed=3)) == list(benchmark.generate_assessments(20, seed=3))
+    assert list(benchmark.generate_assessments(20, seed=3)) != list(benchmark.generate_assessments(20, seed=4))
+    assert benchmark.generate_transactions(50, seed=3) == benchmark.generate_transactions(50, seed=3)
+
+
+def test_measure_times_each_run_after_its_setup():
+    calls = []
+    result = benchmark.measure(lambda: calls.append("run"), repeat=5, setup=lambda: calls.append("setup"))
+    assert calls == ["setup", "run"] * 5
+    assert result["runs"] == 5
+    assert 0 <= result["p50_ms"] <= result["p95_ms"] <= result["max_ms"]
+
+
+@pytest.mark.parametrize("name", QUICK_BENCHMARKS)
+def test_quick_benchmarks_run(name, tmp_path, capsys):
+    output = tmp_path / f"{name}.json"
+    assert benchmark.main([name, "--rows", "100", "--repeat", "2", "--output", str(output)]) == 0
+
+    saved = json.loads(output.read_text())
+    assert saved["seed"] == 42 and saved["repeat"] == 2 and saved["json_backend"]
+    assert saved["results"] and all(result["benchmark"] == name for result in saved["results"])
+    # Every result has at least one value compare() looks at
+    for result in saved["results"]:
+        assert any(benchmark.metric_direction(field) for field in result), result
+    assert f"results written to {output}" in capsys.readouterr().out
+
+
+def test_suite_runs_each_benchmark_and_reports_failures(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(benchmark, "SUITE", ("engine", "missing"))
+    monkeypatch.setitem(benchmark.DEFAULT_ROWS, "missing", 10)
+    output = tmp_path / "suite.json"
+    assert benchmark.main(["suite", "--rows", "100", "--repeat", "2", "--output", str(output)]) == 1
+
+    results = json.loads(output.read_text())["results"]
+    assert results and {result["benchmark"] for result in results} == {"engine"}
+    assert all(result["rows"] == 100 for result in results)
+    assert "Failed: missing" in capsys.readouterr().out
+
+
+def result_file(path, *results):
+    path.write_text(json.dumps({"commit": path.stem, "results": list(results)}))
+    return str(path)
+
+
+def test_compare_results():
+    baseline = {"results": [
+        {"benchmark": "engine", "mode": "disabled", "rows": 100, "reviews_per_s": 1000, "overhead_pct": 0},
+        {"benchmark": "storage", "backend": "memory", "rows": 100, "save_p50_ms": 2.0, "list_p50_ms": 1.0},
+        {"benchmark": "gone", "rows": 1, "p50_ms": 1.0},
+    ]}
+    current = {"results": [
+        {"benchmark": "engine", "mode": "disabled", "rows": 100, "reviews_per_s": 850, "overhead_pct": 50},
+        {"benchmark": "storage", "backend": "memory", "rows": 100, "save_p50_ms": 1.0, "list_p50_ms": 1.05},
+        {"benchmark": "storage", "backend": "memory", "rows": 200, "save_p50_ms": 9.0},
+    ]}
+    changes = {(json.loads(change["key"])["benchmark"], change["field"]): change
+               for change in benchmark.compare_results(baseline, current, threshold_pct=10)}
+
+    # Only matching measurements and compared fields; overhead_pct is not a speed
+    assert sorted(changes) == [("engine", "reviews_per_s"), ("storage", "list_p50_ms"), ("storage", "save_p50_ms")]
+    assert changes[("engine", "reviews_per_s")]["change_pct"] == -15.0
+    assert changes[("engine", "reviews_per_s")]["regression"] is True
+    assert changes[("storage", "save_p50_ms")]["change_pct"] == 50.0
+    assert changes[("storage", "list_p50_ms")]["regression"] is False
+
+
+def test_compare_command(tmp_path, capsys):
+    base = result_file(tmp_path / "base.json", {"benchmark": "engine", "rows": 10, "reviews_per_s": 1000})
+    faster = result_file(tmp_path / "faster.json", {"benchmark": "engine", "rows": 10, "reviews_per_s": 1500})
+    slower = result_file(tmp_path / "slower.json", {"benchmark": "engine", "rows": 10, "reviews_per_s": 500})
+
+    assert benchmark.main(["compare", base, faster]) == 0
+    assert "1 values compared: 0 regressions, 1 improvements" in capsys.readouterr().out
+
+    output = tmp_path / "comparison.json"
+    assert benchmark.main(["compare", base, slower, "--threshold", "20", "--output", str(output)]) == 1
+    assert "reviews_per_s: 1000 -> 500 (-50.0%)" in capsys.readouterr().out
+    assert json.loads(output.read_text())["changes"][0]["regression"] is True
+
+    assert benchmark.main(["compare", base]) == 2
+    with pytest.raises(SystemExit):
+        benchmark.main(["engine", base])
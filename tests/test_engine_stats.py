@@ -0,0 +1,118 @@
+"""
+Engine instrumentation (EngineStats): per-rule hit counts and risk factor
+tiers checked against the reviews, sampled step latencies, the metrics
+families and /api/engine/stats
+"""
+
+from collections import Counter
+
+import pytest
+
+import metrics
+from benchmark import generate_transactions
+from compliance_engine import AMOUNT_TIERS, INSTRUMENTED_STEPS, ComplianceEngine, EngineStats, RuleHits
+from conftest import ADMIN_TOKEN
+from rules_manager import RULES_FILE, RulesManager
+
+ADMIN = {"X-Admin-Token": ADMIN_TOKEN}
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return ComplianceEngine(rules_manager=RulesManager(rules_file=str(RULES_FILE), data_dir=str(tmp_path)))
+
+
+@pytest.fixture(scope="module")
+def transactions():
+    return generate_transactions(500, seed=91)
+
+
+def test_counts_match_the_reviews(engine, transactions):
+    stats = engine.enable_instrumentation(EngineStats(sample_every=7))
+    results = [engine.review(t, use_ai=False) for t in transactions]
+
+    snapshot = stats.snapshot()
+    assert snapshot["reviews"] == len(transactions)
+    assert snapshot["rule_hits"] == dict(Counter(rule_id for result in results for rule_id in result["triggered_rule_ids"]))
+    hits = list(snapshot["rule_hits"].values())
+    assert hits == sorted(hits, reverse=True)
+
+    tiers = snapshot["tiers"]
+    assert tiers["risk_level"] == dict(Counter(result["risk_level"] for result in results))
+    assert tiers["customer"] == dict(Counter(t.customer_type.value for t in transactions))
+    countries = Counter(
+        "unknown" if "country_unknown" in result["triggered_rule_ids"]
+        else engine._assess_country_risk(t.origin_country, engine.rules, RuleHits())
+        for t, result in zip(transactions, results)
+    )
+    assert tiers["country"] == dict(countries)
+    amounts = Counter(
+        next((tier for rule_id, tier in AMOUNT_TIERS if rule_id in result["triggered_rule_ids"]), "below_threshold")
+        for result in results
+    )
+    assert tiers["amount"] == dict(amounts)
+    assert all(sum(counts.values()) == len(transactions) for counts in tiers.values())
+
+
+def test_instrumentation_does_not_change_results(engine, transactions):
+    plain = [engine.review(t, use_ai=False) for t in transactions[:100]]
+    engine.enable_instrumentation(EngineStats(sample_every=1))
+    assert [engine.review(t, use_ai=False) for t in transactions[:100]] == plain
+    engine.disable_instrumentation()
+    assert [engine.review(t, use_ai=False) for t in transactions[:100]] == plain
+
+
+def test_one_review_in_sample_every_is_timed(engine, transactions):
+    stats = engine.enable_instrumentation(EngineStats(sample_every=10))
+    for t in transactions[:50]:
+        engine.review(t, use_ai=False)
+    steps = stats.snapshot()["steps"]
+    assert sorted(steps) == sorted(INSTRUMENTED_STEPS.values())
+    assert all(step["samples"] == 5 and step["avg_us"] > 0 for step in steps.values())
+
+
+def test_disabled_and_reset_stats(engine, transactions):
+    stats = engine.enable_instrumentation(EngineStats(sample_every=1))
+    engine.review(transactions[0], use_ai=False)
+    engine.disable_instrumentation()
+    engine.review(transactions[1], use_ai=False)
+    assert stats.snapshot()["reviews"] == 1 and engine.stats is None
+
+    stats.reset()
+    assert stats.snapshot() == {"reviews": 0, "sample_every": 1, "rule_hits": {}, "tiers": {}, "steps": {}}
+
+
+def test_metrics_families(engine, transactions):
+    registry = metrics.MetricsRegistry()
+    stats = engine.enable_instrumentation(EngineStats(sample_every=1, registry=registry))
+    results = [engine.review(t, use_ai=False) for t in transactions[:20]]
+
+    rendered = registry.render()
+    assert "compliance_engine_reviews_total 20" in rendered
+    rule_id, count = next(iter(stats.snapshot()["rule_hits"].items()))
+    assert f'compliance_rule_hits_total{{rule="{rule_id}"}} {count}' in rendered
+    level = results[0]["risk_level"]
+    count = sum(result["risk_level"] == level for result in results)
+    assert f'compliance_rule_tiers_total{{factor="risk_level",tier="{level}"}} {count}' in rendered
+    assert 'compliance_engine_step_seconds_count{step="assess_country_risk"} 20' in rendered
+
+
+def test_engine_stats_endpoints(client, app_module, engine, monkeypatch):
+    monkeypatch.setattr(app_module, "engine", engine)
+    assert client.get("/api/engine/stats").status_code == 401
+    assert client.get("/api/engine/stats", headers=ADMIN).get_json() == {"enabled": False}
+    assert client.post("/api/engine/stats/reset", headers=ADMIN).status_code == 409
+
+    engine.enable_instrumentation(EngineStats(sample_every=1))
+    payload = {
+        "amount": 30000, "currency": "USD", "source_country": "Nigeria", "destination_country": "Singapore",
+        "purpose": "investment", "counterparty_type": "corporate",
+    }
+    triggered = client.post("/api/risk-check", json=payload).get_json()["triggered_rule_ids"]
+    stats = client.get("/api/engine/stats", headers=ADMIN).get_json()
+    assert stats["enabled"] is True and stats["reviews"] == 1
+    assert stats["rule_hits"] == {rule_id: 1 for rule_id in triggered}
+
+    assert client.post("/api/engine/stats/reset").status_code == 401
+    assert client.post("/api/engine/stats/reset", headers=ADMIN).status_code == 200
+    assert client.get("/api/engine/stats", headers=ADMIN).get_json()["reviews"] == 0
@@ -0,0 +1,113 @@
+"""
+Data versions (AssessmentDB.get_data_version) and the ETags and response
+cache entries of /api/statistics and /api/assessments/<id> built on them
+"""
+
+import sqlite3
+
+import pytest
+
+from benchmark import populate
+from database import AssessmentDB
+
+
+def execute(path, sql, params=()):
+    """Change a database file behind the store's back, as another process would"""
+    conn = sqlite3.connect(path)
+    try:
+        with conn:
+            conn.execute(sql, params)
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def db(app_module, client, tmp_path, monkeypatch, pairs):
+    db = AssessmentDB(str(tmp_path / "etags.db"))
+    db.ids = db.save_assessments(pairs)
+    monkeypatch.setattr(app_module, "db", db)
+    return db
+
+
+def revalidate(client, url):
+    """(first response, response to a conditional request with its ETag)"""
+    first = client.get(url)
+    assert first.status_code == 200 and first.headers["ETag"]
+    return first, client.get(url, headers={"If-None-Match": first.headers["ETag"]})
+
+
+def test_statistics_etag_follows_row_updates(client, db):
+    first, again = revalidate(client, "/api/statistics")
+    assert again.status_code == 304
+
+    execute(db.db_path, "UPDATE assessments SET risk_score = risk_score + 10, risk_level = 'High' WHERE id = ?",
+            (db.ids[0],))
+    changed = client.get("/api/statistics", headers={"If-None-Match": first.headers["ETag"]})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != first.headers["ETag"]
+    assert changed.get_json() == db.get_statistics() != first.get_json()
+    assert client.get("/api/statistics", headers={"If-None-Match": changed.headers["ETag"]}).status_code == 304
+
+
+def test_assessment_etag_follows_row_updates(client, db):
+    url = f"/api/assessments/{db.ids[1]}"
+    first, again = revalidate(client, url)
+    assert again.status_code == 304
+
+    # A column the statistics do not use; the cached response must not be served
+    execute(db.db_path, "UPDATE assessments SET rationale = 'Reviewed again' WHERE id = ?", (db.ids[1],))
+    changed = client.get(url, headers={"If-None-Match": first.headers["ETag"]})
+    assert changed.status_code == 200
+    assert changed.get_json()["rationale"] == "Reviewed again"
+    assert changed.headers["ETag"] != first.headers["ETag"]
+
+
+def test_every_change_bumps_the_version(db, pairs):
+    versions = [db.get_data_version()]
+    db.save_assessment(*pairs[0])
+    versions.append(db.get_data_version())
+    execute(db.db_path, "UPDATE assessments SET rule_mask = rule_mask WHERE id = ?", (db.ids[0],))
+    versions.append(db.get_data_version())
+    execute(db.db_path, "DELETE FROM assessments WHERE id = ?", (db.ids[0],))
+    versions.append(db.get_data_version())
+    db.rebuild_statistics()
+    versions.append(db.get_data_version())
+    assert len(set(versions)) == len(versions)
+    # Other stores on the same file (other workers) agree
+    assert AssessmentDB(db.db_path).get_data_version() == versions[-1]
+    assert db.verify_statistics()['consistent']
+
+
+def test_recreated_file_does_not_repeat_versions(tmp_path, pairs):
+    path = tmp_path / "recreated.db"
+    db = AssessmentDB(str(path))
+    db.save_assessments(pairs)
+    version = db.get_data_version()
+
+    for suffix in ("", "-wal", "-shm"):
+        (tmp_path / f"recreated.db{suffix}").unlink(missing_ok=True)
+    db = AssessmentDB(str(path))
+    db.save_assessments(pairs)
+    assert db.get_data_version() != version
+
+
+def test_versions_of_partitions(tmp_path):
+    db = AssessmentDB(str(tmp_path / "main.db"), partition_dir=str(tmp_path / "partitions"))
+    populate(db, 60, seed=71)
+    ids = {assessment['timestamp'][:7]: assessment['id'] for assessment in db.get_all_assessments(limit=60)}
+    january, march = ids["2025-01"], ids["2025-03"]
+    total, january_version = db.get_data_version(), db.get_data_version(january)
+
+    partition = next(p['path'] for p in db.list_partitions() if p['month'] == "2025-03")
+    execute(partition, "UPDATE assessments SET rationale = 'Edited' WHERE id = ?", (march,))
+    # The total covers every partition; one assessment's version only its own
+    assert db.get_data_version() != total
+    assert db.get_data_version(january) == january_version
+    assert db.get_data_version(march) != db.get_data_version(january)
+    assert db.get_data_version(190001 * 10 ** 9 + 1) is None
+
+    # Dropping a partition changes the total too
+    before_drop = db.get_data_version()
+    db.drop_partition("2025-03")
+    assert db.get_data_version() != before_drop
+    assert db.get_data_version(march) is None
@@ -0,0 +1,142 @@
+"""
+Streaming export (export.py, /api/assessments/export, cli.py export): NDJSON,
+CSV and columnar files, incremental and date-filtered exports
+"""
+
+import csv
+import io
+import json
+
+import pytest
+
+import cli
+from benchmark import populate
+from database import ASSESSMENT_COLUMNS, AssessmentDB
+from export import JSON_COLUMNS, iter_csv, iter_ndjson, track_last_id
+
+
+@pytest.fixture
+def db(tmp_path):
+    """A database with 60 assessments spread over three months"""
+    db = AssessmentDB(str(tmp_path / "export.db"))
+    populate(db, 60, seed=81)
+    return db
+
+
+def ndjson_items(text):
+    return [json.loads(line) for line in text.splitlines()]
+
+
+def test_ndjson_lines_match_stored_assessments(db):
+    items = ndjson_items("".join(iter_ndjson(db.iter_assessment_rows())))
+    assert len(items) == 60
+    assert [item['id'] for item in items] == sorted(item['id'] for item in items)
+    for item in items[:10]:
+        assert item == db.get_assessment_by_id(item['id'])
+
+
+def test_csv_keeps_json_columns_as_stored(db):
+    rows = list(csv.reader(io.StringIO("".join(iter_csv(db.iter_assessment_rows())))))
+    assert rows[0] == list(ASSESSMENT_COLUMNS)
+    assert len(rows) == 61
+
+    stored = db.get_assessment_by_id(int(rows[1][0]))
+    for column in JSON_COLUMNS:
+        value = rows[1][ASSESSMENT_COLUMNS.index(column)]
+        # NULL (no AI insights) is an empty field
+        assert (json.loads(value) if value else None) == stored[column]
+    assert stored['triggered_rules']
+
+
+def test_encoders_stream_in_chunks():
+    consumed = []
+
+    def rows():
+        for index in range(1, 6):
+            consumed.append(index)
+            yield (index,) + (None,) * (len(ASSESSMENT_COLUMNS) - 1)
+
+    chunks = iter_ndjson(rows(), chunk_rows=2)
+    assert len(next(chunks).splitlines()) == 2
+    assert consumed == [1, 2]
+    assert [len(chunk.splitlines()) for chunk in chunks] == [2, 1]
+
+    # The header comes with the first chunk; a final chunk is always yielded
+    assert [len(chunk.splitlines()) for chunk in iter_csv(rows(), chunk_rows=2)] == [3, 2, 1]
+    assert list(iter_csv(iter(()))) == [",".join(ASSESSMENT_COLUMNS) + "\r\n"]
+    assert list(iter_ndjson(iter(()))) == []
+
+
+def test_incremental_and_date_filtered_exports(db):
+    ids = [row[0] for row in db.iter_assessment_rows()]
+    progress = {}
+    assert [row[0] for row in track_last_id(db.iter_assessment_rows(), progress)] == ids
+    assert progress == {"rows": 60, "last_id": ids[-1]}
+
+    assert [row[0] for row in db.iter_assessment_rows(since_id=ids[29])] == ids[30:]
+    assert list(db.iter_assessment_rows(since_id=ids[-1])) == []
+
+    february = list(db.iter_assessment_rows(start="2025-02-01", end="2025-02-28"))
+    timestamp = ASSESSMENT_COLUMNS.index("timestamp")
+    expected = [row for row in db.iter_assessment_rows() if row[timestamp].startswith("2025-02")]
+    assert february == expected and february
+
+
+def test_export_endpoint(client, app_module, db, monkeypatch):
+    monkeypatch.setattr(app_module, "db", db)
+    ids = [row[0] for row in db.iter_assessment_rows()]
+
+    response = client.get("/api/assessments/export")
+    assert response.status_code == 200 and response.mimetype == "application/x-ndjson"
+    assert response.headers["Content-Disposition"] == "attachment; filename=assessments_export.ndjson"
+    assert [item['id'] for item in ndjson_items(response.get_data(as_text=True))] == ids
+
+    response = client.get("/api/assessments/export", query_string={"format": "CSV", "since_id": ids[49]})
+    assert response.status_code == 200 and response.mimetype == "text/csv"
+    assert [int(row[0]) for row in list(csv.reader(io.StringIO(response.get_data(as_text=True))))[1:]] == ids[50:]
+
+
+@pytest.mark.parametrize("params, message", [
+    ({"format": "xml"}, "Unsupported export format: xml"),
+    ({"format": "parquet"}, "Unsupported export format: parquet"),
+    ({"since_id": "last"}, "since_id must be an integer"),
+    ({"start": "01/02/2025"}, "start"),
+])
+def test_export_endpoint_rejects_bad_parameters(client, params, message):
+    response = client.get("/api/assessments/export", query_string=params)
+    assert response.status_code == 400
+    assert message in response.get_json()["error"]
+
+
+def test_cli_export(db, tmp_path, capsys):
+    ids = [row[0] for row in db.iter_assessment_rows()]
+    output = tmp_path / "export.ndjson"
+    assert cli.main(["--db", db.db_path, "--partition-dir", "", "export", "-o", str(output),
+                     "--since-id", str(ids[54])]) == 0
+    assert [item['id'] for item in ndjson_items(output.read_text())] == ids[55:]
+    err = capsys.readouterr().err
+    assert "Exported 5 assessments" in err and f"--since-id {ids[-1]}" in err
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "arrow"])
+def test_cli_columnar_export(db, tmp_path, file_format):
+    pa = pytest.importorskip("pyarrow")
+    output = tmp_path / f"export.{file_format}"
+    assert cli.main(["--db", db.db_path, "--partition-dir", "", "export", "--format", file_format,
+                     "-o", str(output)]) == 0
+
+    if file_format == "parquet":
+        import pyarrow.parquet as pq
+        table = pq.read_table(str(output))
+    else:
+        with pa.memory_map(str(output)) as source:
+            table = pa.ipc.open_file(source).read_all()
+    assert table.column_names == list(ASSESSMENT_COLUMNS)
+    assert table.column("id").to_pylist() == [row[0] for row in db.iter_assessment_rows()]
+    assert table.schema.field("amount").type == pa.float64()
+
+
+def test_cli_columnar_export_needs_an_output_file(db, capsys):
+    pytest.importorskip("pyarrow")
+    assert cli.main(["--db", db.db_path, "--partition-dir", "", "export", "--format", "parquet"]) == 1
+    assert "--output is required for parquet export" in capsys.readouterr().err
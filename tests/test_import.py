@@ -0,0 +1,211 @@
+"""
+Bulk import (AssessmentDB.bulk_import, importer.py): CSV and JSONL files,
+checkpoint resume, per-row errors and the round trip from the export
+"""
+
+import csv
+import sqlite3
+
+import pytest
+
+import serialization
+from benchmark import generate_assessments, populate
+from database import AssessmentDB
+from export import iter_csv, iter_ndjson
+from importer import REQUIRED_FIELDS, raw_assessment_row
+
+TRANSACTION_FIELDS = REQUIRED_FIELDS + ("currency", "history_signals")
+
+
+def records(count, seed=51):
+    """JSONL records carrying their assessment as full_response, one per day of January 2025"""
+    return [
+        {**transaction_data, 'timestamp': f"2025-01-{index % 28 + 1:02d}T12:00:00", 'full_response': result}
+        for index, (transaction_data, result) in enumerate(generate_assessments(count, seed=seed))
+    ]
+
+
+def write_jsonl(path, items):
+    with open(path, "w", encoding="utf-8") as output:
+        for item in items:
+            output.write((item if isinstance(item, str) else serialization.dumps(item)) + "\n")
+    return str(path)
+
+
+def write_csv(path, rows, fields):
+    with open(path, "w", newline="", encoding="utf-8") as output:
+        writer = csv.DictWriter(output, fieldnames=fields, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+    return str(path)
+
+
+def schema_objects(path, kind):
+    conn = sqlite3.connect(path)
+    try:
+        return sorted(name for (name,) in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = ? AND sql IS NOT NULL", (kind,)
+        ))
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def db(tmp_path):
+    return AssessmentDB(str(tmp_path / "import.db"))
+
+
+def test_jsonl_import(db, tmp_path):
+    items = records(40)
+    report = db.bulk_import(write_jsonl(tmp_path / "history.jsonl", items), batch_size=15)
+
+    assert report['rows_read'] == report['rows_imported'] == 40
+    assert report['rows_failed'] == 0 and report['errors'] == []
+    assert db.verify_statistics()['consistent']
+    stored = db.get_all_assessments(limit=100)
+    assert sorted(a['timestamp'] for a in stored) == sorted(item['timestamp'] for item in items)
+    assert sorted(a['risk_score'] for a in stored) == sorted(item['full_response']['risk_score'] for item in items)
+    hits = {}
+    for item in items:
+        for rule_id in item['full_response']['triggered_rule_ids']:
+            hits[rule_id] = hits.get(rule_id, 0) + 1
+    assert {rule['rule_id']: rule['hits'] for rule in db.get_rule_analytics()['rules']} == hits
+
+
+def test_csv_transactions_are_scored(db, tmp_path):
+    items = records(20)
+    path = write_csv(tmp_path / "transactions.csv", items, TRANSACTION_FIELDS + ("timestamp",))
+
+    report = db.bulk_import(path, score=True)
+    assert report['rows_imported'] == 20
+    stored = sorted(db.get_all_assessments(limit=100), key=lambda a: a['timestamp'])
+    expected = sorted(items, key=lambda item: item['timestamp'])
+    # Same transactions, same rules: the same scores as when they were generated
+    assert [a['risk_score'] for a in stored] == [item['full_response']['risk_score'] for item in expected]
+    assert db.verify_statistics()['consistent']
+
+
+def test_unscored_transactions_are_reported(db, tmp_path):
+    path = write_csv(tmp_path / "transactions.csv", records(3), TRANSACTION_FIELDS)
+    report = db.bulk_import(path)
+    assert report['rows_imported'] == 0 and report['rows_failed'] == 3
+    assert "scoring enabled" in report['errors'][0]['error']
+
+
+def test_per_row_errors(db, tmp_path):
+    good = records(4)
+    missing = {key: value for key, value in good[0].items() if key != "purpose"}
+    lines = [
+        good[0],
+        "{not json",
+        missing,
+        {**good[1], 'amount': -5},
+        {**good[2], 'timestamp': "yesterday"},
+        "[1, 2]",
+        good[3],
+    ]
+    report = db.bulk_import(write_jsonl(tmp_path / "mixed.jsonl", lines))
+
+    assert report['rows_read'] == 7
+    assert report['rows_imported'] == 2 and report['rows_failed'] == 5
+    assert [error['position'] for error in report['errors']] == [2, 3, 4, 5, 6]
+    messages = [error['error'] for error in report['errors']]
+    assert messages[0].startswith("Invalid JSON")
+    assert messages[1] == "Missing required field: purpose"
+    assert messages[2] == "Amount must be positive"
+    assert messages[3] == "Invalid timestamp: yesterday"
+    assert messages[4] == "Each JSONL line must be an object"
+    assert db.get_statistics()['total_assessments'] == 2
+
+
+def test_resume_from_checkpoint(db, tmp_path):
+    path = write_jsonl(tmp_path / "history.jsonl", records(50))
+    indexes = schema_objects(db.db_path, "index")
+
+    def interrupt(progress):
+        if progress['rows_imported'] >= 20:
+            raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        db.bulk_import(path, batch_size=10, on_progress=interrupt)
+    assert db.get_statistics()['total_assessments'] == 20
+    # The interrupted import restored the secondary indexes
+    assert schema_objects(db.db_path, "index") == indexes
+
+    report = db.bulk_import(path, batch_size=10, restart=False)
+    assert report['rows_already_imported'] == 20 and report['rows_imported'] == 30
+    assert db.get_statistics()['total_assessments'] == 50
+
+    # Nothing left to import; restart imports the whole file again
+    assert db.bulk_import(path)['rows_imported'] == 0
+    assert db.bulk_import(path, restart=True)['rows_imported'] == 50
+    assert db.get_statistics()['total_assessments'] == 100
+    assert db.verify_statistics()['consistent']
+
+
+def test_failing_batch_leaves_statistics_consistent(db, tmp_path, monkeypatch):
+    path = write_jsonl(tmp_path / "history.jsonl", records(30))
+    triggers = schema_objects(db.db_path, "trigger")
+    indexes = schema_objects(db.db_path, "index")
+    apply_derived_range = AssessmentDB._apply_derived_range
+    calls = []
+
+    def fail_second_batch(self, *args):
+        calls.append(args)
+        if len(calls) == 2:
+            raise sqlite3.OperationalError("disk I/O error")
+        return apply_derived_range(self, *args)
+
+    monkeypatch.setattr(AssessmentDB, "_apply_derived_range", fail_second_batch)
+    with pytest.raises(sqlite3.OperationalError):
+        db.bulk_import(path, batch_size=10)
+
+    # The failed batch rolled back whole, triggers and indexes included
+    assert schema_objects(db.db_path, "trigger") == triggers
+    assert schema_objects(db.db_path, "index") == indexes
+    assert db.get_statistics()['total_assessments'] == 10
+    assert db.verify_statistics()['consistent']
+
+    # Triggers still maintain the statistics for ordinary saves
+    transaction_data, result = next(generate_assessments(1, seed=52))
+    db.save_assessment(transaction_data, result)
+    assert db.verify_statistics()['consistent']
+
+    monkeypatch.setattr(AssessmentDB, "_apply_derived_range", apply_derived_range)
+    report = db.bulk_import(path, batch_size=10)
+    assert report['rows_already_imported'] == 10 and report['rows_imported'] == 20
+    assert db.get_statistics()['total_assessments'] == 31
+    assert db.verify_statistics()['consistent']
+
+
+def test_csv_export_round_trip(tmp_path):
+    source = AssessmentDB(str(tmp_path / "source.db"))
+    populate(source, 120, seed=53)
+    path = tmp_path / "export.csv"
+    path.write_text("".join(iter_csv(source.iter_assessment_rows())), encoding="utf-8")
+
+    # Exported rows carry every stored column and are imported as stored
+    with open(path, newline="", encoding="utf-8") as exported:
+        assert all(raw_assessment_row(record) for record in csv.DictReader(exported))
+
+    target = AssessmentDB(str(tmp_path / "target.db"))
+    report = target.bulk_import(str(path), batch_size=50)
+    assert report['rows_imported'] == 120 and report['rows_failed'] == 0
+    assert list(target.iter_assessment_rows()) == list(source.iter_assessment_rows())
+    assert target.get_statistics() == source.get_statistics()
+    assert target.get_rule_analytics() == source.get_rule_analytics()
+    assert target.verify_statistics()['consistent']
+
+
+def test_ndjson_export_round_trip(tmp_path):
+    source = AssessmentDB(str(tmp_path / "source.db"))
+    populate(source, 60, seed=54)
+    path = tmp_path / "export.ndjson"
+    path.write_text("".join(iter_ndjson(source.iter_assessment_rows())), encoding="utf-8")
+
+    target = AssessmentDB(str(tmp_path / "target.db"))
+    assert target.bulk_import(str(path))['rows_imported'] == 60
+    assert target.get_statistics() == source.get_statistics()
+    assert target.get_rule_analytics() == source.get_rule_analytics()
+    assert [(a['timestamp'], a['risk_score'], a['triggered_rules']) for a in target.get_all_assessments(limit=100)] == \
+        [(a['timestamp'], a['risk_score'], a['triggered_rules']) for a in source.get_all_assessments(limit=100)]
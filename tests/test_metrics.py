@@ -0,0 +1,31 @@
+"""
+Request metrics (metrics.py): labels of the request counter and the
+/api/metrics output
+"""
+
+import pytest
+
+import metrics
+
+
+@pytest.mark.parametrize("method", ["BREW", "PROPFIND", "M-SEARCH", "X" * 200])
+def test_unknown_methods_are_counted_as_other(client, method):
+    # A method a route does not allow leaves the request unmatched (405)
+    other = metrics.REQUESTS.get("unmatched", "other", "405")
+    response = client.open("/api/statistics", method=method)
+    assert response.status_code == 405
+    assert metrics.REQUESTS.get("unmatched", "other", "405") == other + 1
+    assert metrics.REQUESTS.get("unmatched", method, "405") == 0
+
+    rendered = client.get("/api/metrics").get_data(as_text=True)
+    assert f'method="{method}"' not in rendered
+    assert 'compliance_requests_total{route="unmatched",method="other",status="405"}' in rendered
+
+
+def test_standard_methods_keep_their_label(client):
+    get = metrics.REQUESTS.get("/api/statistics", "GET", "200")
+    delete = metrics.REQUESTS.get("unmatched", "DELETE", "405")
+    assert client.get("/api/statistics").status_code == 200
+    assert client.delete("/api/statistics").status_code == 405
+    assert metrics.REQUESTS.get("/api/statistics", "GET", "200") == get + 1
+    assert metrics.REQUESTS.get("unmatched", "DELETE", "405") == delete + 1
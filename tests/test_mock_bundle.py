@@ -0,0 +1,126 @@
+"""
+Mock documents bundle (mock_bundle.py, /api/download-mock-documents): built
+once, rebuilt when its sources change, and served with ETag and Range support
+"""
+
+import os
+import zipfile
+
+import pytest
+
+from mock_bundle import QUICK_REFERENCE, MockDocumentsBundle, read_bundle_etag
+
+
+@pytest.fixture
+def source_dir(tmp_path):
+    """A mock_users directory with two PDFs per risk level and the judges' README"""
+    source = tmp_path / "mock_users"
+    for level in ("low_risk", "medium_risk", "high_risk"):
+        (source / level).mkdir(parents=True)
+        for name in ("b_sof.pdf", "a_id.pdf"):
+            (source / level / name).write_bytes(f"%PDF {level} {name}".encode())
+    (source / "high_risk" / "notes.txt").write_text("not bundled")
+    (source / "README_FOR_JUDGES.md").write_text("# Judges")
+    return source
+
+
+@pytest.fixture
+def bundle(source_dir, tmp_path):
+    return MockDocumentsBundle(str(source_dir), str(tmp_path / "bundle" / "mock_documents.zip"))
+
+
+def test_bundle_contents(bundle, capsys):
+    path, etag = bundle.get()
+    assert "Built mock documents bundle (7 files)" in capsys.readouterr().out
+    with zipfile.ZipFile(path) as zipf:
+        assert zipf.namelist() == [
+            "low_risk/a_id.pdf", "low_risk/b_sof.pdf",
+            "medium_risk/a_id.pdf", "medium_risk/b_sof.pdf",
+            "high_risk/a_id.pdf", "high_risk/b_sof.pdf",
+            "README_FOR_JUDGES.md", "README.md",
+        ]
+        assert zipf.read("medium_risk/a_id.pdf") == b"%PDF medium_risk a_id.pdf"
+        assert zipf.read("README.md").decode() == QUICK_REFERENCE
+    assert read_bundle_etag(path) == etag and etag.startswith("mock-documents-")
+
+
+def test_bundle_is_built_once(bundle, capsys):
+    path, etag = bundle.get()
+    built = os.stat(path).st_mtime_ns
+    capsys.readouterr()
+    assert bundle.get() == (path, etag)
+    assert os.stat(path).st_mtime_ns == built
+    assert capsys.readouterr().out == ""
+
+
+def test_changed_sources_rebuild_the_bundle(bundle, source_dir):
+    path, etag = bundle.get()
+    (source_dir / "low_risk" / "a_id.pdf").write_bytes(b"%PDF edited, and longer")
+    path, edited = bundle.get()
+    assert edited != etag
+    with zipfile.ZipFile(path) as zipf:
+        assert zipf.read("low_risk/a_id.pdf") == b"%PDF edited, and longer"
+
+    (source_dir / "medium_risk" / "b_sof.pdf").unlink()
+    path, removed = bundle.get()
+    assert removed not in (etag, edited)
+    with zipfile.ZipFile(path) as zipf:
+        assert "medium_risk/b_sof.pdf" not in zipf.namelist()
+
+
+def test_other_workers_reuse_the_bundle(bundle, source_dir, capsys):
+    path, etag = bundle.get()
+    capsys.readouterr()
+    other = MockDocumentsBundle(str(source_dir), str(path))
+    assert other.get() == (path, etag)
+    assert capsys.readouterr().out == ""
+
+
+def test_damaged_or_deleted_bundle_is_rebuilt(bundle):
+    path, etag = bundle.get()
+    path.write_bytes(b"not a zip")
+    assert read_bundle_etag(path) is None
+
+    # A new process cannot reuse it
+    assert MockDocumentsBundle(str(bundle.source_dir), str(path)).get() == (path, etag)
+    assert read_bundle_etag(path) == etag
+
+    path.unlink()
+    assert bundle.get() == (path, etag)
+    assert path.exists()
+
+
+def test_failed_build_keeps_the_previous_bundle(bundle, source_dir, monkeypatch):
+    path, etag = bundle.get()
+    (source_dir / "README_FOR_JUDGES.md").write_text("# Judges, edited")
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(zipfile.ZipFile, "write", fail)
+    with pytest.raises(OSError):
+        bundle.get()
+    assert read_bundle_etag(path) == etag
+    assert os.listdir(path.parent) == [path.name]
+
+    monkeypatch.undo()
+    assert bundle.get()[1] != etag
+
+
+def test_download_endpoint(client, app_module, bundle, monkeypatch):
+    monkeypatch.setattr(app_module, "mock_bundle", bundle)
+    response = client.get("/api/download-mock-documents")
+    assert response.status_code == 200 and response.mimetype == "application/zip"
+    assert "mock_compliance_documents.zip" in response.headers["Content-Disposition"]
+    etag = response.headers["ETag"]
+    assert etag == f'"{read_bundle_etag(bundle.bundle_path)}"'
+    content = response.get_data()
+    response.close()
+
+    response = client.get("/api/download-mock-documents", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    response.close()
+
+    response = client.get("/api/download-mock-documents", headers={"Range": "bytes=0-9"})
+    assert response.status_code == 206 and response.get_data() == content[:10]
+    response.close()
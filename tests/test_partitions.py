@@ -0,0 +1,162 @@
+"""
+Monthly partitions: ID routing, cross-month reads, archive/restore, drop and retention
+"""
+
+from datetime import date, datetime
+
+import pytest
+
+from benchmark import populate
+from database import MIN_PARTITION_ID, PARTITION_ID_STRIDE, AssessmentDB
+
+MONTHS_2025 = [f"2025-{month:02d}" for month in range(1, 13)]
+
+
+@pytest.fixture
+def db(tmp_path):
+    """A partitioned database with 240 assessments spread over 2025"""
+    db = AssessmentDB(str(tmp_path / "main.db"), partition_dir=str(tmp_path / "partitions"))
+    populate(db, 240, seed=31)
+    yield db
+    db.close()
+
+
+def all_rows(db):
+    """Every (id, timestamp), newest first, read shard by shard"""
+    rows = [(row[0], row[1]) for row in db.iter_assessment_rows()]
+    return sorted(rows, key=lambda row: row[1], reverse=True)
+
+
+def month_ids(db, month):
+    return [assessment_id for assessment_id, timestamp in all_rows(db) if timestamp.startswith(month)]
+
+
+def test_one_partition_per_month(db):
+    partitions = db.list_partitions()
+    assert [partition['month'] for partition in partitions] == MONTHS_2025
+    assert not any(partition['archived'] for partition in partitions)
+    assert db.get_statistics()['total_assessments'] == 240
+
+
+def test_ids_route_to_their_month(db):
+    for assessment_id, timestamp in all_rows(db):
+        assert assessment_id >= MIN_PARTITION_ID
+        assert assessment_id // PARTITION_ID_STRIDE == int(timestamp[:4] + timestamp[5:7])
+        assessment = db.get_assessment_by_id(assessment_id)
+        assert assessment['id'] == assessment_id and assessment['timestamp'] == timestamp
+
+    # IDs of months without a partition, and legacy IDs without a legacy database
+    assert db.get_assessment_by_id(202401 * PARTITION_ID_STRIDE + 1) is None
+    assert db.get_assessment_by_id(202501 * PARTITION_ID_STRIDE + 10 ** 6) is None
+    assert db.get_assessment_by_id(5) is None
+
+
+def test_paging_across_months(db):
+    expected = [assessment_id for assessment_id, _ in all_rows(db)]
+    paged = []
+    for offset in range(0, 250, 7):
+        paged.extend(assessment['id'] for assessment in db.get_all_assessments(limit=7, offset=offset))
+    assert paged == expected
+
+    # A page straddling two months
+    january = month_ids(db, "2025-01")
+    february = month_ids(db, "2025-02")
+    page = db.get_all_assessments(limit=4, offset=len(expected) - len(january) - 2)
+    assert [assessment['id'] for assessment in page] == february[-2:] + january[:2]
+    assert db.get_all_assessments(limit=5, offset=240) == []
+
+
+def test_legacy_database_is_read_with_partitions(tmp_path, pairs):
+    legacy = AssessmentDB(str(tmp_path / "legacy.db"))
+    legacy_ids = legacy.save_assessments(pairs[:2])
+
+    db = AssessmentDB(str(tmp_path / "legacy.db"), partition_dir=str(tmp_path / "partitions"))
+    new_id = db.save_assessment(*pairs[2])
+    assert all(legacy_id < MIN_PARTITION_ID for legacy_id in legacy_ids) and new_id >= MIN_PARTITION_ID
+    assert [db.get_assessment_by_id(assessment_id)['id'] for assessment_id in legacy_ids + [new_id]] == legacy_ids + [new_id]
+    assert db.get_statistics()['total_assessments'] == 3
+    assert [assessment['id'] for assessment in db.get_all_assessments()] == [new_id, *legacy_ids[::-1]]
+
+
+def test_archive_and_restore_round_trip(db):
+    march = month_ids(db, "2025-03")
+    before = [db.get_assessment_by_id(assessment_id) for assessment_id in march]
+
+    archive_path = db.archive_partition("2025-03")
+    assert archive_path.endswith("assessments_2025-03.db.gz")
+    partitions = {partition['month']: partition['archived'] for partition in db.list_partitions()}
+    assert partitions["2025-03"] is True and len(partitions) == 12
+    assert db.get_statistics()['total_assessments'] == 240 - len(march)
+    assert all(db.get_assessment_by_id(assessment_id) is None for assessment_id in march)
+    with pytest.raises(ValueError):
+        db.archive_partition("2025-03")
+
+    db.restore_partition("2025-03")
+    assert [db.get_assessment_by_id(assessment_id) for assessment_id in march] == before
+    assert db.get_statistics()['total_assessments'] == 240
+    assert not any(partition['archived'] for partition in db.list_partitions())
+    with pytest.raises(ValueError):
+        db.restore_partition("2025-03")
+
+
+def test_drop_partition(db):
+    april = month_ids(db, "2025-04")
+    assert db.drop_partition("2025-04")
+    assert "2025-04" not in [partition['month'] for partition in db.list_partitions()]
+    assert db.get_statistics()['total_assessments'] == 240 - len(april)
+    assert all(db.get_assessment_by_id(assessment_id) is None for assessment_id in april)
+    assert not db.drop_partition("2025-04")
+
+    db.archive_partition("2025-05")
+    assert db.drop_partition("2025-05")
+    assert "2025-05" not in [partition['month'] for partition in db.list_partitions()]
+
+
+def test_retention_boundaries(db):
+    # December is age 0, September age 3, June age 6
+    report = db.apply_retention(archive_after_months=3, retain_months=6, today=date(2025, 12, 15))
+    assert report == {
+        'archived': ["2025-07", "2025-08", "2025-09"],
+        'dropped': MONTHS_2025[:6],
+    }
+    partitions = {partition['month']: partition['archived'] for partition in db.list_partitions()}
+    assert partitions == {
+        "2025-07": True, "2025-08": True, "2025-09": True,
+        "2025-10": False, "2025-11": False, "2025-12": False,
+    }
+
+    # Nothing left to do on a second run; a shorter retention drops archives too
+    assert db.apply_retention(archive_after_months=3, retain_months=6, today=date(2025, 12, 15)) == \
+        {'archived': [], 'dropped': []}
+    assert db.apply_retention(retain_months=4, today=date(2025, 12, 15))['dropped'] == ["2025-07", "2025-08"]
+
+
+def test_retention_never_touches_the_current_month(db):
+    report = db.apply_retention(archive_after_months=1, retain_months=1, today=date(2025, 12, 1))
+    assert "2025-12" not in report['dropped'] + report['archived']
+    assert [partition['month'] for partition in db.list_partitions()] == ["2025-12"]
+
+
+def test_write_behind_partitions_survive_clear_and_restore(tmp_path, pairs):
+    """Saves after clear_all, archive and restore land in the recreated partition files"""
+    db = AssessmentDB(str(tmp_path / "main.db"), write_behind=True, partition_dir=str(tmp_path / "partitions"))
+    try:
+        db.save_assessments(pairs[:2])
+        db.flush()
+        db.clear_all()
+
+        ids = db.save_assessments(pairs[2:4])
+        db.flush()
+        assert db.get_statistics()['total_assessments'] == 2
+        assert all(db.get_assessment_by_id(assessment_id) for assessment_id in ids)
+
+        month = datetime.utcnow().strftime("%Y-%m")
+        db.archive_partition(month)
+        db.restore_partition(month)
+        restored_ids = db.save_assessments(pairs[4:])
+        db.flush()
+        assert db.get_statistics()['total_assessments'] == 3
+        assert all(db.get_assessment_by_id(assessment_id) for assessment_id in ids + restored_ids)
+        assert db.get_write_metrics()['rows_failed'] == 0
+    finally:
+        db.close()
@@ -0,0 +1,134 @@
+"""
+Sampling profiler (profiler.py, POST /api/admin/profile): collapsed stacks
+of busy threads, route labels, idle threads, overhead and one profile at a time
+"""
+
+import threading
+
+import pytest
+
+import profiler
+from conftest import ADMIN_TOKEN
+
+ADMIN = {"X-Admin-Token": ADMIN_TOKEN}
+
+
+def spin(stop):
+    """Busy loop until stop is set"""
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def handle_request(stop):
+    """Stands in for a route handler"""
+    spin(stop)
+
+
+def recurse(depth, stop):
+    if depth:
+        return recurse(depth - 1, stop)
+    spin(stop)
+
+
+@pytest.fixture
+def run_thread():
+    """Start threads running target(stop, *args); stopped and joined after the test"""
+    stop = threading.Event()
+    threads = []
+
+    def start(name, target, *args):
+        thread = threading.Thread(target=target, args=(*args, stop), name=name, daemon=True)
+        thread.start()
+        threads.append(thread)
+        return thread
+
+    yield start
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+
+def test_busy_threads_are_sampled(run_thread):
+    run_thread("busy-worker", spin)
+    profile = profiler.sample_stacks(0.3, interval_s=0.005)
+
+    stacks = {stack: count for stack, count in profile["stacks"].items() if stack.startswith("thread busy-worker;")}
+    # Samples taken inside Event.is_set() end in the threading module, so count as idle
+    assert stacks and all(stack.endswith(f";{__name__}.spin") for stack in stacks)
+    assert profile["samples"] > 10 and sum(stacks.values()) <= profile["samples"]
+    assert 0.3 <= profile["duration_s"] < 1.0 and profile["interval_s"] == 0.005
+    assert profile["overhead_pct"] <= profiler.MAX_OVERHEAD * 100 * 2
+
+
+def test_samples_inside_a_route_handler_name_the_route(run_thread):
+    profiler.label_route(handle_request, "POST /api/test")
+    try:
+        run_thread("request-thread", handle_request)
+        stacks = profiler.sample_stacks(0.2, interval_s=0.005)["stacks"]
+    finally:
+        profiler._route_labels.pop(handle_request.__code__)
+    routed = [stack for stack in stacks if stack.startswith("route POST /api/test;")]
+    assert routed and all(f"{__name__}.handle_request;{__name__}.spin" in stack for stack in routed)
+    assert not any(stack.startswith("thread request-thread;") for stack in stacks)
+
+
+def test_idle_threads_are_left_out_unless_asked_for(run_thread):
+    run_thread("idle-worker", lambda stop: stop.wait())
+    stacks = profiler.sample_stacks(0.1, interval_s=0.005)["stacks"]
+    assert not any(stack.startswith("thread idle-worker;") for stack in stacks)
+
+    stacks = profiler.sample_stacks(0.1, interval_s=0.005, include_idle=True)["stacks"]
+    idle = [stack for stack in stacks if stack.startswith("thread idle-worker;")]
+    assert idle and all(stack.split(";")[-1].startswith("threading.") for stack in idle)
+
+
+def test_deep_stacks_are_cut_at_the_root_end(run_thread):
+    run_thread("deep-worker", recurse, profiler.MAX_DEPTH + 50)
+    stacks = profiler.sample_stacks(0.1, interval_s=0.005)["stacks"]
+    deep = [stack.split(";") for stack in stacks if stack.startswith("thread deep-worker;")]
+    assert deep and all(len(frames) == profiler.MAX_DEPTH + 1 for frames in deep)
+
+
+def test_one_profile_at_a_time():
+    with profiler._profile_lock:
+        with pytest.raises(RuntimeError, match="already running"):
+            profiler.sample_stacks(0.01)
+    assert profiler.sample_stacks(0.01)["samples"] >= 1
+
+
+def test_collapsed_lines_most_frequent_first():
+    assert profiler.to_collapsed({"a;b": 2, "a;c": 5, "a;a": 2}) == ["a;c 5", "a;a 2", "a;b 2"]
+
+
+def test_profile_endpoint(client, run_thread):
+    run_thread("busy-worker", spin)
+    assert client.post("/api/admin/profile", query_string={"seconds": 0.1}).status_code == 401
+
+    response = client.post("/api/admin/profile", query_string={"seconds": 0.2, "interval_ms": 5}, headers=ADMIN)
+    assert response.status_code == 200 and response.mimetype == "text/plain"
+    lines = response.get_data(as_text=True).splitlines()
+    assert any(line.startswith("thread busy-worker;") and line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert int(response.headers["X-Profile-Samples"]) > 1
+    assert float(response.headers["X-Profile-Overhead-Pct"]) >= 0
+
+    response = client.post("/api/admin/profile", query_string={"seconds": 0.1, "format": "json"}, headers=ADMIN)
+    assert set(response.get_json()) == {"stacks", "samples", "duration_s", "interval_s", "overhead_pct"}
+
+
+@pytest.mark.parametrize("params, message", [
+    ({"seconds": "soon"}, "must be numbers"),
+    ({"seconds": 0}, "seconds must be between"),
+    ({"seconds": 10 ** 6}, "seconds must be between"),
+    ({"seconds": 0.1, "interval_ms": 0.5}, "interval_ms must be between"),
+    ({"seconds": 0.1, "format": "pprof"}, "format must be"),
+])
+def test_profile_endpoint_rejects_bad_parameters(client, params, message):
+    response = client.post("/api/admin/profile", query_string=params, headers=ADMIN)
+    assert response.status_code == 400
+    assert message in response.get_json()["error"]
+
+
+def test_profile_endpoint_while_another_runs(client):
+    with profiler._profile_lock:
+        response = client.post("/api/admin/profile", query_string={"seconds": 0.1}, headers=ADMIN)
+    assert response.status_code == 409
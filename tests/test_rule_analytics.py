@@ -0,0 +1,126 @@
+"""
+Rule hits and rule_mask (get_rule_analytics, rebuild_rule_hits) checked against the stored results
+"""
+
+import sqlite3
+
+import pytest
+
+from benchmark import generate_assessments, populate
+from compliance_engine import RULE_IDS, rule_id_for_text, rule_mask
+from database import AssessmentDB
+
+
+@pytest.fixture
+def db(tmp_path):
+    """A database with 300 assessments spread over 2025"""
+    db = AssessmentDB(str(tmp_path / "rules.db"))
+    populate(db, 300, seed=21)
+    return db
+
+
+def query(path, sql, params=()):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+def execute(path, sql, params=()):
+    conn = sqlite3.connect(path)
+    try:
+        with conn:
+            conn.execute(sql, params)
+    finally:
+        conn.close()
+
+
+def recount_hits(path, start=None, end=None):
+    """Rule ID -> assessments that triggered it, from the stored results"""
+    return dict(query(path, """
+        SELECT value, COUNT(*) FROM assessments, json_each(full_response, '$.triggered_rule_ids')
+        WHERE substr(timestamp, 1, 10) BETWEEN ? AND ?
+        GROUP BY value
+    """, (start or "0000-00-00", end or "9999-99-99")))
+
+
+def recount_pairs(path):
+    """(rule ID, rule ID) -> assessments that triggered both, in RULE_IDS order"""
+    pairs = {}
+    for (stored,) in query(path, "SELECT json_extract(full_response, '$.triggered_rule_ids') FROM assessments"):
+        fired = [rule_id for rule_id in RULE_IDS if rule_id in stored]
+        for index, first in enumerate(fired):
+            for second in fired[index + 1:]:
+                pairs[(first, second)] = pairs.get((first, second), 0) + 1
+    return pairs
+
+
+def analytics_hits(analytics):
+    return {rule['rule_id']: rule['hits'] for rule in analytics['rules']}
+
+
+def analytics_pairs(analytics):
+    return {tuple(pair['rules']): pair['count'] for pair in analytics['co_occurrence']}
+
+
+def test_stored_rule_ids_match_the_engine(tmp_path):
+    db = AssessmentDB(str(tmp_path / "engine.db"))
+    pairs = list(generate_assessments(50, seed=22))
+    ids = db.save_assessments(pairs)
+    for assessment_id, (_, result) in zip(ids, pairs):
+        stored = db.get_assessment_by_id(assessment_id)
+        assert stored['full_response']['triggered_rule_ids'] == result['triggered_rule_ids']
+        assert stored['rule_mask'] == rule_mask(result['triggered_rule_ids'])
+        # The rule IDs name the rules whose text was reported
+        assert [rule_id_for_text(text) for text in result['triggered_rules']] == result['triggered_rule_ids']
+
+
+def test_rule_analytics_match_recount(db):
+    analytics = db.get_rule_analytics()
+    assert analytics['total_assessments'] == 300
+    assert analytics_hits(analytics) == recount_hits(db.db_path)
+    assert analytics_pairs(analytics) == recount_pairs(db.db_path)
+    for rule in analytics['rules']:
+        assert rule['hit_rate'] == round(rule['hits'] / 300, 4)
+
+
+def test_rule_analytics_over_a_range(db):
+    analytics = db.get_rule_analytics(start="2025-02-01", end="2025-04-30")
+    (total,) = query(db.db_path, """
+        SELECT COUNT(*) FROM assessments WHERE substr(timestamp, 1, 10) BETWEEN '2025-02-01' AND '2025-04-30'
+    """)[0]
+    assert 0 < analytics['total_assessments'] == total
+    assert analytics_hits(analytics) == recount_hits(db.db_path, "2025-02-01", "2025-04-30")
+
+
+def test_rule_hits_follow_deletes(db):
+    execute(db.db_path, "DELETE FROM assessments WHERE id % 3 = 0")
+    assert analytics_hits(db.get_rule_analytics()) == recount_hits(db.db_path)
+    assert query(db.db_path, """
+        SELECT COUNT(*) FROM rule_hits WHERE assessment_id NOT IN (SELECT id FROM assessments)
+    """) == [(0,)]
+
+
+def test_rebuild_recovers_rule_ids_of_legacy_rows(db):
+    expected_hits = recount_hits(db.db_path)
+    expected_masks = query(db.db_path, "SELECT id, rule_mask FROM assessments ORDER BY id")
+
+    # Rows stored before rule IDs were recorded: no IDs, no mask, no hits
+    execute(db.db_path, """
+        UPDATE assessments SET full_response = json_remove(full_response, '$.triggered_rule_ids'), rule_mask = 0
+    """)
+    execute(db.db_path, "DELETE FROM rule_hits")
+    assert db.get_rule_analytics()['rules'] == []
+
+    written = db.rebuild_rule_hits()
+    assert written == sum(expected_hits.values())
+    assert analytics_hits(db.get_rule_analytics()) == expected_hits
+    assert query(db.db_path, "SELECT id, rule_mask FROM assessments ORDER BY id") == expected_masks
+
+
+def test_rebuild_is_idempotent(db):
+    before = db.get_rule_analytics()
+    db.rebuild_rule_hits()
+    db.rebuild_rule_hits()
+    assert db.get_rule_analytics() == before
@@ -0,0 +1,227 @@
+"""
+Declarative custom rules (rule_dsl.py): operators, tiers, validation and
+parity with the built-in risk factors
+"""
+
+import pytest
+
+from benchmark import builtin_rules_as_dsl, builtin_score, generate_transactions
+from compliance_engine import RULE_IDS, ComplianceEngine, CustomerType, RuleHits, Transaction
+from rule_dsl import compile_custom_rules
+from rules_manager import RULES_FILE, RulesManager
+
+RULES = {
+    "high_risk_countries": ["Nigeria", "Iran"],
+    "high_risk_purposes": ["Gambling", "crypto trading"],
+}
+
+
+def transaction(**fields):
+    values = {
+        "amount_usd": 1000.0,
+        "origin_country": "Singapore",
+        "destination_country": "Vietnam",
+        "purpose": "Payroll",
+        "customer_type": CustomerType.MEDIUM,
+        "has_structuring_signals": False,
+    }
+    values.update(fields)
+    return Transaction(**values)
+
+
+def compile_rules(*definitions, rules=RULES):
+    return compile_custom_rules({**rules, "custom_rules": list(definitions)}, RULE_IDS)
+
+
+def evaluate(compiled, t):
+    """(score, [(rule ID, text)]) of a transaction"""
+    hits = RuleHits()
+    score = compiled.evaluate(t, hits.add)
+    return score, list(zip(hits.rule_ids, hits.texts))
+
+
+def matches(condition, **fields):
+    compiled = compile_rules({"id": "probe", "when": condition, "score": 1})
+    return evaluate(compiled, transaction(**fields))[0] == 1
+
+
+@pytest.mark.parametrize("condition, fields, expected", [
+    ({"field": "amount", "gt": 1000}, {"amount_usd": 1000.0}, False),
+    ({"field": "amount", "gte": 1000}, {"amount_usd": 1000.0}, True),
+    ({"field": "amount", "lt": 1000}, {"amount_usd": 999.99}, True),
+    ({"field": "amount", "lte": 999}, {"amount_usd": 999.5}, False),
+    ({"field": "amount", "eq": 1000}, {}, True),
+    ({"field": "amount", "ne": 1000}, {}, False),
+    ({"field": "origin_country", "eq": "Singapore"}, {}, True),
+    ({"field": "origin_country", "eq": "singapore"}, {}, False),
+    ({"field": "customer_type", "eq": "high"}, {"customer_type": CustomerType.HIGH}, True),
+    ({"field": "structuring_signals", "eq": True}, {"has_structuring_signals": True}, True),
+    ({"field": "structuring_signals", "ne": True}, {"has_structuring_signals": True}, False),
+    ({"field": "destination_country", "in": ["Vietnam", "India"]}, {}, True),
+    ({"field": "destination_country", "not_in": ["Vietnam"]}, {}, False),
+    ({"field": "destination_country", "in": []}, {}, False),
+    ({"field": "origin_country", "in_rules": "high_risk_countries"}, {"origin_country": "Iran"}, True),
+    ({"field": "origin_country", "not_in_rules": "high_risk_countries"}, {"origin_country": "Iran"}, False),
+    ({"field": "origin_country", "contains": "GAP"}, {}, True),
+    ({"field": "purpose", "contains": "ROLL"}, {}, True),
+    ({"all": [{"field": "amount", "gt": 500}, {"field": "origin_country", "eq": "Singapore"}]}, {}, True),
+    ({"all": [{"field": "amount", "gt": 500}, {"field": "origin_country", "eq": "Iran"}]}, {}, False),
+    ({"any": [{"field": "amount", "gt": 5000}, {"field": "origin_country", "eq": "Singapore"}]}, {}, True),
+    ({"not": {"field": "amount", "gt": 500}}, {}, False),
+    ({"not": {"any": [{"field": "amount", "gt": 5000}, {"field": "purpose", "eq": "gifts"}]}}, {}, True),
+])
+def test_operators(condition, fields, expected):
+    assert matches(condition, **fields) is expected
+
+
+def test_purposes_compare_lowercased():
+    # Rule values and transaction purposes are both lowercased, as by the built-in rules
+    assert matches({"field": "purpose", "eq": "PAYROLL"})
+    assert matches({"field": "purpose", "in": ["payroll"]}, purpose="PayRoll")
+    assert matches({"field": "purpose", "in_rules": "high_risk_purposes"}, purpose="GAMBLING")
+    assert matches({"field": "purpose", "in_rules": "high_risk_purposes"}, purpose="Crypto Trading")
+    assert not matches({"field": "purpose", "not_in_rules": "high_risk_purposes"}, purpose="gambling")
+
+    # Texts show the purpose as entered
+    compiled = compile_rules({"id": "purpose_text", "when": {"field": "purpose", "eq": "payroll"},
+                              "text": "Purpose {purpose}"})
+    assert evaluate(compiled, transaction(purpose="PayRoll")) == (0, [("purpose_text", "Purpose PayRoll")])
+
+
+def test_first_applies_only_the_first_matching_tier():
+    compiled = compile_rules({"first": [
+        {"id": "tier_high", "when": {"field": "amount", "gt": 10000}, "score": 30, "text": "High ${amount:,.0f}"},
+        {"id": "tier_medium", "when": {"field": "amount", "gt": 5000}, "score": 10, "text": "Medium"},
+        {"id": "tier_default", "score": 1},
+    ]}, {"id": "always_text", "when": {"field": "amount", "gt": 0}, "text": "Any amount"})
+
+    assert evaluate(compiled, transaction(amount_usd=20000.0)) == \
+        (30, [("tier_high", "High $20,000"), ("always_text", "Any amount")])
+    assert evaluate(compiled, transaction(amount_usd=6000.0)) == \
+        (10, [("tier_medium", "Medium"), ("always_text", "Any amount")])
+    # The trailing default adds its score without being listed
+    assert evaluate(compiled, transaction(amount_usd=100.0)) == (1, [("always_text", "Any amount")])
+    assert compiled.rule_ids == ["tier_high", "tier_medium", "tier_default", "always_text"]
+
+
+def test_first_without_default_may_apply_nothing():
+    compiled = compile_rules({"first": [
+        {"id": "only_large", "when": {"field": "amount", "gt": 10000}, "score": 5},
+    ]})
+    assert evaluate(compiled, transaction()) == (0, [])
+
+
+def test_text_formatting():
+    compiled = compile_rules({
+        "id": "formatted", "when": {"field": "amount", "gt": 0},
+        "text": "{origin_country!r} -> {destination_country:>8} ${amount:,.2f} {{braces}}",
+    })
+    assert evaluate(compiled, transaction(amount_usd=1234.5))[1] == \
+        [("formatted", "'Singapore' ->  Vietnam $1,234.50 {braces}")]
+
+
+def test_no_custom_rules():
+    assert compile_custom_rules({}) is None
+    assert compile_custom_rules({"custom_rules": []}) is None
+
+
+@pytest.mark.parametrize("text", [
+    "{amount:,.2q}",             # unknown presentation type
+    "{amount:%s}",
+    "{amount:{origin_country}}",  # nested replacement field
+    "{amount:(x)}",
+    "{purpose:d}",               # integer format of a string
+])
+def test_bad_format_specs_are_rejected(text):
+    with pytest.raises(ValueError, match="format spec|invalid text template"):
+        compile_rules({"id": "bad_format", "when": {"field": "amount", "gt": 0}, "text": text})
+
+
+@pytest.mark.parametrize("definition, message", [
+    ({"id": RULE_IDS[0], "when": {"field": "amount", "gt": 0}, "score": 1}, "already used"),
+    ({"id": "Upper", "when": {"field": "amount", "gt": 0}, "score": 1}, "'id' must be"),
+    ({"id": "1st", "when": {"field": "amount", "gt": 0}, "score": 1}, "'id' must be"),
+    ({"id": "x" * 64, "when": {"field": "amount", "gt": 0}, "score": 1}, "'id' must be"),
+    ({"when": {"field": "amount", "gt": 0}, "score": 1}, "'id' must be"),
+    ({"id": "no_when", "score": 1}, "missing 'when'"),
+    ({"id": "no_action", "when": {"field": "amount", "gt": 0}}, "needs a 'text'"),
+    ({"id": "bool_score", "when": {"field": "amount", "gt": 0}, "score": True}, "whole number"),
+    ({"id": "float_score", "when": {"field": "amount", "gt": 0}, "score": 1.5}, "whole number"),
+    ({"id": "bad_field", "when": {"field": "iban", "eq": "x"}, "score": 1}, "unknown field"),
+    ({"id": "two_ops", "when": {"field": "amount", "gt": 1, "lt": 5}, "score": 1}, "exactly one operator"),
+    ({"id": "text_gt", "when": {"field": "purpose", "gt": "a"}, "score": 1}, "needs a number"),
+    ({"id": "nan", "when": {"field": "amount", "gt": float("nan")}, "score": 1}, "finite"),
+    ({"id": "bad_list", "when": {"field": "purpose", "in_rules": "amount_thresholds"}, "score": 1},
+     "must name a list"),
+    ({"id": "nested", "when": {"field": "purpose", "in": [["a"]]}, "score": 1}, "expected a string"),
+    ({"id": "empty_all", "when": {"all": []}, "score": 1}, "non-empty list"),
+    ({"first": [{"id": "default_first", "score": 1}, {"id": "second", "score": 2}]}, "missing 'when'"),
+    ({"first": [], "id": "x"}, "'first' must be the only key"),
+])
+def test_invalid_rules_are_rejected(definition, message):
+    with pytest.raises(ValueError, match=message):
+        compile_rules(definition)
+
+
+def test_duplicate_ids_are_rejected():
+    rule = {"id": "twice", "when": {"field": "amount", "gt": 0}, "score": 1}
+    with pytest.raises(ValueError, match="'twice' is already used"):
+        compile_rules(rule, rule)
+    with pytest.raises(ValueError, match="'twice' is already used"):
+        compile_rules({"first": [rule, {**rule, "when": {"field": "amount", "lt": 0}}]})
+
+
+@pytest.mark.parametrize("value", [
+    "x' or True or '",
+    "\" or True or \"",
+    "__import__('os').system('false')",
+    "x\n    score += 100\n",
+    "\0c0\0",
+])
+def test_string_values_stay_literals(value):
+    compiled = compile_rules(
+        {"id": "eq_value", "when": {"field": "origin_country", "eq": value}, "score": 1},
+        {"id": "in_value", "when": {"field": "destination_country", "in": [value]}, "score": 2},
+        {"id": "contains_value", "when": {"field": "purpose", "contains": value}, "score": 4},
+    )
+    assert evaluate(compiled, transaction()) == (0, [])
+    assert evaluate(compiled, transaction(origin_country=value, destination_country=value, purpose=value))[0] == 7
+
+
+@pytest.mark.parametrize("text, message", [
+    ("{amount.__class__}", "unknown field"),
+    ("{origin_country[0]}", "invalid text template|unknown field"),
+    ("{t}", "unknown field"),
+    ("{__builtins__}", "unknown field"),
+    ("{0}", "invalid text template|unknown field"),
+    ("{}", "invalid text template|unknown field"),
+    ("{amount!a:}{", "invalid text template"),
+])
+def test_template_injection_is_rejected(text, message):
+    with pytest.raises(ValueError, match=message):
+        compile_rules({"id": "template", "when": {"field": "amount", "gt": 0}, "text": text})
+
+
+def test_template_literals_stay_literals():
+    text = "''' + str(__import__('os')) + ''' \\n {{amount}}"
+    compiled = compile_rules({"id": "literal", "when": {"field": "amount", "gt": 0}, "text": text})
+    assert evaluate(compiled, transaction())[1] == [("literal", text.replace("{{", "{").replace("}}", "}"))]
+
+
+def test_compiled_function_has_no_builtins():
+    compiled = compile_rules({"id": "probe", "when": {"field": "amount", "gt": 0}, "text": "{amount:,.2f}"})
+    assert compiled.evaluate.__globals__["__builtins__"] == {}
+    assert "import" not in compiled.source
+
+
+def test_builtin_rules_as_dsl_score_like_the_engine(tmp_path):
+    engine = ComplianceEngine(rules_manager=RulesManager(rules_file=str(RULES_FILE), data_dir=str(tmp_path)))
+    rules = engine.rules
+    compiled = compile_custom_rules({**rules.rules, "custom_rules": builtin_rules_as_dsl(rules.rules)}, RULE_IDS)
+
+    for t in generate_transactions(2000, seed=61) + [transaction(purpose="GAMBLING", origin_country="Nigeria")]:
+        expected_hits = RuleHits()
+        expected = builtin_score(engine, t, rules, expected_hits)
+        score, hits = evaluate(compiled, t)
+        assert score == expected, t
+        assert [text for _, text in hits] == expected_hits.texts, t
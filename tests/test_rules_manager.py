@@ -0,0 +1,214 @@
+"""
+Rules snapshots (rules_manager.py): isolation of the shared configuration,
+hot reload, the version counter shared by worker processes and the history
+of rulesets by content hash
+"""
+
+import json
+import time
+
+import pytest
+
+from compliance_engine import ComplianceEngine, CustomerType, Transaction
+from rules_manager import RULES_FILE, RulesManager, compile_rules, ruleset_hash, write_atomic
+from tenants import merge_rules
+
+
+@pytest.fixture
+def rules_file(tmp_path):
+    """A copy of rules_config.json in a temporary directory"""
+    path = tmp_path / "rules_config.json"
+    path.write_text(RULES_FILE.read_text())
+    return path
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    return tmp_path / "data"
+
+
+@pytest.fixture
+def manager(rules_file, data_dir):
+    return RulesManager(rules_file=str(rules_file), data_dir=str(data_dir))
+
+
+def edit(path, **changes):
+    """Rewrite a rules file with some keys changed, as an operator would"""
+    rules = json.loads(path.read_text())
+    write_atomic(path, json.dumps({**rules, **changes}, indent=2))
+
+
+def test_get_rules_returns_a_copy(manager):
+    snapshot = manager.snapshot
+    before = {key: list(value) if isinstance(value, list) else value for key, value in snapshot.rules.items()}
+
+    rules = manager.get_rules()
+    rules["high_risk_countries"].append("Atlantis")
+    rules["risk_score_thresholds"]["low_max"] = 1
+    rules["extra"] = True
+
+    assert "Atlantis" not in snapshot.rules["high_risk_countries"]
+    assert snapshot.rules["risk_score_thresholds"]["low_max"] == 30
+    assert "extra" not in snapshot.rules
+    assert snapshot.rules == before == manager.get_rules()
+    assert manager.snapshot is snapshot
+
+
+def test_snapshot_owns_its_rules(manager):
+    rules = manager.get_rules()
+    assert manager.save_rules(rules)
+    rules["low_risk_purposes"].append("gifts")
+    assert "gifts" not in manager.snapshot.rules["low_risk_purposes"]
+    assert "gifts" not in manager.snapshot.low_risk_purposes
+
+
+def test_merged_rules_share_nothing_with_the_base(manager):
+    base = manager.snapshot
+    overrides = {"risk_score_thresholds": {"low_max": 20}, "medium_risk_countries": ["Brazil"]}
+    merged = merge_rules(base.rules, overrides)
+    assert merged["risk_score_thresholds"] == {"low_max": 20, "medium_max": 70}
+
+    merged["high_risk_countries"].append("Atlantis")
+    merged["amount_thresholds"]["moderate_threshold"] = 1
+    merged["medium_risk_countries"].append("Chile")
+    assert "Atlantis" not in base.rules["high_risk_countries"]
+    assert base.rules["amount_thresholds"]["moderate_threshold"] == 15000
+    assert overrides["medium_risk_countries"] == ["Brazil"]
+
+    tenant = compile_rules(merge_rules(base.rules, overrides), base.version)
+    tenant.rules["low_risk_countries"].append("Atlantis")
+    assert "Atlantis" not in base.rules["low_risk_countries"]
+
+
+def test_nothing_is_written_until_the_first_save(rules_file, data_dir, manager):
+    RulesManager(rules_file=str(rules_file), data_dir=str(data_dir))
+    assert not data_dir.exists()
+    assert manager.check_for_changes() is False and manager.sync_version() is False
+    assert not data_dir.exists()
+
+    assert manager.save_rules({**manager.get_rules(), "low_risk_purposes": ["payroll"]})
+    assert sorted(path.name for path in data_dir.iterdir()) == ["history", "rules_config.lock", "rules_config.version"]
+
+
+def test_external_edit_is_reloaded(rules_file, manager):
+    before = manager.snapshot
+    edit(rules_file, high_risk_countries=["Atlantis"])
+
+    assert manager.check_for_changes() is True
+    snapshot = manager.snapshot
+    assert snapshot.version == before.version + 1
+    assert snapshot.high_risk_countries == frozenset({"Atlantis"})
+    assert snapshot.content_hash != before.content_hash
+    # Reloaded once; nothing changed since
+    assert manager.check_for_changes() is False and manager.snapshot is snapshot
+
+
+def test_invalid_edit_is_ignored_until_fixed(rules_file, manager, capsys):
+    before = manager.snapshot
+    edit(rules_file, risk_score_thresholds={"low_max": 90, "medium_max": 70})
+    assert manager.check_for_changes() is False
+    assert "Ignoring invalid rules_config.json" in capsys.readouterr().out
+    assert manager.check_for_changes() is False and manager.snapshot is before
+    assert capsys.readouterr().out == ""
+
+    edit(rules_file, risk_score_thresholds={"low_max": 20, "medium_max": 70})
+    assert manager.check_for_changes() is True
+    assert manager.snapshot.low_max_score == 20 and manager.snapshot.version == before.version + 1
+
+
+def test_workers_adopt_each_others_saves(rules_file, data_dir, manager):
+    other = RulesManager(rules_file=str(rules_file), data_dir=str(data_dir))
+    assert other.snapshot.version == manager.snapshot.version
+
+    assert manager.save_rules({**manager.get_rules(), "medium_risk_purposes": ["remittance"]})
+    assert other.sync_version() is True
+    assert other.snapshot.version == manager.snapshot.version
+    assert other.snapshot.content_hash == manager.snapshot.content_hash
+
+    # An edit is published once, by whichever worker notices it first
+    edit(rules_file, low_risk_countries=["Singapore"])
+    assert other.check_for_changes() is True
+    assert manager.check_for_changes() is True
+    assert manager.snapshot.version == other.snapshot.version
+    assert manager.snapshot.low_risk_countries == frozenset({"Singapore"})
+
+    # A worker started later reads the published version
+    assert RulesManager(rules_file=str(rules_file), data_dir=str(data_dir)).snapshot.version == manager.snapshot.version
+
+
+def test_watcher_picks_up_edits(rules_file, manager):
+    version = manager.snapshot.version
+    manager.start_watching(interval=0.01)
+    try:
+        edit(rules_file, high_risk_purposes=["gambling"])
+        deadline = time.monotonic() + 5
+        while manager.snapshot.version == version and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        manager.stop_watching()
+    assert manager.snapshot.version == version + 1
+    assert manager.snapshot.high_risk_purposes == frozenset({"gambling"})
+
+
+def test_history_lookup_by_content_hash(rules_file, data_dir, manager):
+    first = manager.snapshot
+    assert manager.get_ruleset(first.content_hash) == first.rules
+    assert [version["rules_version"] for version in manager.list_versions()] == [first.content_hash]
+
+    assert manager.save_rules({**manager.get_rules(), "high_risk_countries": ["Atlantis"]})
+    second = manager.snapshot
+    edit(rules_file, medium_risk_countries=["Brazil"])
+    assert manager.check_for_changes()
+    third = manager.snapshot
+
+    # Every ruleset that was in effect, the startup one included, by content hash
+    history = sorted(path.stem for path in (data_dir / "history").glob("*.json"))
+    assert history == sorted(snapshot.content_hash for snapshot in (first, second, third))
+    for snapshot in (first, second, third):
+        rules = manager.get_ruleset(snapshot.content_hash)
+        assert rules == snapshot.rules and ruleset_hash(rules) == snapshot.content_hash
+    versions = manager.list_versions()
+    assert sorted(version["rules_version"] for version in versions) == history
+    assert [version["rules_version"] for version in versions if version["current"]] == [third.content_hash]
+
+    # A restarted worker finds them on disk
+    restarted = RulesManager(rules_file=str(rules_file), data_dir=str(data_dir))
+    assert restarted.get_ruleset(first.content_hash) == first.rules
+
+
+@pytest.mark.parametrize("content_hash", ["", "0123456789abcdef", "../rules_config", "ABCDEF0123456789"])
+def test_unknown_versions(manager, content_hash):
+    assert manager.get_ruleset(content_hash) is None
+    assert manager.get_snapshot(content_hash) is None
+
+
+def test_old_snapshots_are_compiled_once(rules_file, data_dir):
+    manager = RulesManager(cache_size=1, rules_file=str(rules_file), data_dir=str(data_dir))
+    first = manager.snapshot
+    assert manager.save_rules({**manager.get_rules(), "low_risk_countries": ["Singapore"]})
+
+    # The cache holds one ruleset: the current one; the first comes from the history
+    snapshot = manager.get_snapshot(first.content_hash)
+    assert snapshot.content_hash == first.content_hash and snapshot.rules == first.rules
+    assert manager.get_snapshot(first.content_hash) is snapshot
+    assert manager.get_cache_info() == {"size": 1, "max_size": 1, "hits": 1, "misses": 1}
+
+
+def test_reevaluation_under_the_original_rules(manager):
+    engine = ComplianceEngine(rules_manager=manager)
+    transaction = Transaction(
+        amount_usd=12000, origin_country="Nigeria", destination_country="Singapore",
+        purpose="investment", customer_type=CustomerType.MEDIUM,
+    )
+    original = engine.review(transaction, use_ai=False)
+    assert original["rules_version"] == manager.snapshot.content_hash
+
+    rules = manager.get_rules()
+    assert manager.save_rules({**rules, "high_risk_countries": [], "high_risk_purposes": []})
+    current = engine.review(transaction, use_ai=False)
+    assert current["rules_version"] != original["rules_version"]
+    assert current["risk_score"] < original["risk_score"]
+
+    replayed = engine.review(transaction, rules=manager.get_snapshot(original["rules_version"]), use_ai=False)
+    assert (replayed["risk_score"], replayed["risk_level"], replayed["rules_version"]) == \
+        (original["risk_score"], original["risk_level"], original["rules_version"])
@@ -0,0 +1,142 @@
+"""
+Full-text search (search_assessments, rebuild_search_index) and its index triggers
+"""
+
+import copy
+import sqlite3
+
+import pytest
+
+from database import AssessmentDB, fts5_available
+
+pytestmark = pytest.mark.skipif(not fts5_available(), reason="SQLite without FTS5")
+
+RATIONALES = (
+    "Payment to Acme Holdings near the northern border",
+    "Zebra logistics invoice settled on time",
+    "Payroll transfer for seasonal staff",
+)
+
+
+@pytest.fixture
+def db(tmp_path, pairs):
+    """A database with one assessment per rationale in RATIONALES, and their IDs"""
+    db = AssessmentDB(str(tmp_path / "search.db"))
+    ids = []
+    for (transaction_data, result), rationale in zip(pairs, RATIONALES):
+        result = copy.deepcopy(result)
+        result['rationale'] = rationale
+        ids.append(db.save_assessment(transaction_data, result))
+    return db, ids
+
+
+def found(db, query, **options):
+    return [result['id'] for result in db.search_assessments(query, **options)['results']]
+
+
+def execute(path, sql, params=()):
+    conn = sqlite3.connect(path)
+    try:
+        with conn:
+            conn.execute(sql, params)
+    finally:
+        conn.close()
+
+
+def test_match(db):
+    db, ids = db
+    response = db.search_assessments("zebra invoice")
+    assert [result['id'] for result in response['results']] == [ids[1]]
+    assert "[Zebra]" in response['results'][0]['snippet']
+    assert response['has_more'] is False
+    # Porter stemming: "settle" matches "settled"
+    assert found(db, "settle") == [ids[1]]
+
+
+def test_no_match(db):
+    db, _ = db
+    assert db.search_assessments("giraffe") == {'results': [], 'has_more': False}
+    # Every word must match
+    assert found(db, "zebra giraffe") == []
+
+
+@pytest.mark.parametrize("query, expected", [
+    ('acme" OR "zebra', []),                # quotes cannot close the phrase: "OR" is a word to match
+    ('"acme', [0]),                         # unbalanced quote
+    ("acme*", [0]),                         # * is dropped, not a prefix query
+    ("bord*", []),
+    ("NEAR(acme border)", [0]),             # NEAR is a word ("near" is in the text)
+    ("acme AND", []),                       # operators are plain words
+    ("payroll -staff", [2]),
+    ("rationale: zebra", []),               # column filters are words too
+])
+def test_fts_syntax_is_escaped(db, query, expected):
+    db, ids = db
+    assert found(db, query) == [ids[index] for index in expected]
+
+
+@pytest.mark.parametrize("query", ["", "  ", '"*"', "()"])
+def test_query_without_words_is_rejected(db, query):
+    db, _ = db
+    with pytest.raises(ValueError):
+        db.search_assessments(query)
+
+
+def test_raw_queries(db):
+    db, ids = db
+    assert found(db, "bord*", raw=True) == [ids[0]]
+    assert sorted(found(db, "acme OR zebra", raw=True)) == sorted(ids[:2])
+    assert found(db, "NEAR(acme border, 5)", raw=True) == [ids[0]]
+    with pytest.raises(ValueError):
+        db.search_assessments('acme AND', raw=True)
+    with pytest.raises(ValueError):
+        db.search_assessments('"acme', raw=True)
+
+
+def test_document_text_is_indexed(tmp_path, pairs):
+    db = AssessmentDB(str(tmp_path / "documents.db"))
+    transaction_data, result = pairs[0]
+    result = copy.deepcopy(result)
+    result['document_verification'] = {
+        "document_reviews": [{"analysis": {"notes": "Passport scan is blurry"}}],
+    }
+    assessment_id = db.save_assessment(transaction_data, result)
+    assert found(db, "blurry passport") == [assessment_id]
+
+
+def test_paging(db):
+    db, _ = db
+    first = db.search_assessments("the OR for OR on", raw=True, limit=1)
+    second = db.search_assessments("the OR for OR on", raw=True, limit=1, offset=1)
+    assert first['has_more'] and len(first['results']) == 1
+    assert first['results'][0]['id'] != second['results'][0]['id']
+
+
+def test_deleted_row_leaves_the_index(db):
+    db, ids = db
+    execute(db.db_path, "DELETE FROM assessments WHERE id = ?", (ids[1],))
+    assert found(db, "zebra") == []
+    conn = sqlite3.connect(db.db_path)
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM assessments_fts").fetchone() == (len(ids) - 1,)
+    finally:
+        conn.close()
+
+
+def test_updated_row_is_reindexed(db):
+    db, ids = db
+    execute(db.db_path, "UPDATE assessments SET rationale = 'Giraffe feed purchase' WHERE id = ?", (ids[1],))
+    assert found(db, "giraffe") == [ids[1]]
+    assert found(db, "zebra") == []
+    # Updates of other columns leave the index alone
+    execute(db.db_path, "UPDATE assessments SET rule_mask = 0 WHERE id = ?", (ids[1],))
+    assert found(db, "giraffe") == [ids[1]]
+
+
+def test_rebuild_search_index(db):
+    db, ids = db
+    execute(db.db_path, "DELETE FROM assessments_fts")
+    assert found(db, "zebra") == []
+    assert db.rebuild_search_index() == len(ids)
+    assert found(db, "zebra") == [ids[1]]
+    assert found(db, "acme holdings") == [ids[0]]
@@ -0,0 +1,123 @@
+"""
+JSON backends (serialization.py): every installed backend writes the same
+JSON, and the API and the database use whichever is selected
+"""
+
+import dataclasses
+import enum
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+import serialization
+from database import AssessmentDB
+
+BACKENDS = serialization.available_backends()
+
+
+class Level(enum.Enum):
+    HIGH = "High"
+
+
+@dataclasses.dataclass
+class Point:
+    x: int
+    y: str
+
+
+VALUE = {
+    "b": 1,
+    "a": [1.5, float("nan"), float("-inf"), None, True],
+    "text": "Zürich → São Paulo ✓ \"quoted\"\n",
+    "when": datetime(2025, 1, 2, 3, 4, 5, 123456),
+    "day": date(2025, 2, 28),
+    "amount": Decimal("1.10"),
+    "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+    "level": Level.HIGH,
+    "point": Point(1, "y"),
+    "tags": frozenset({"only"}),
+    "nested": {"tuple": (1, 2), "empty": {}},
+}
+
+EXPECTED = (
+    '{"b":1,"a":[1.5,null,null,null,true],"text":"Zürich → São Paulo ✓ \\"quoted\\"\\n",'
+    '"when":"2025-01-02T03:04:05.123456","day":"2025-02-28","amount":"1.10",'
+    '"uuid":"12345678-1234-5678-1234-567812345678","level":"High","point":{"x":1,"y":"y"},'
+    '"tags":["only"],"nested":{"tuple":[1,2],"empty":{}}}'
+)
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request):
+    """Each installed backend in turn; the configured one is restored afterwards"""
+    configured = serialization.JSON_BACKEND
+    assert serialization.use_backend(request.param) == request.param
+    yield request.param
+    serialization.use_backend(configured)
+
+
+def test_backends_write_the_same_json(backend):
+    assert serialization.dumps(VALUE) == EXPECTED
+    assert serialization.dumpb(VALUE) == EXPECTED.encode("utf-8")
+    assert serialization.dumps({"b": 1, "a": {"d": 2, "c": 3}}, sort_keys=True) == '{"a":{"c":3,"d":2},"b":1}'
+    # Beyond 64 bits
+    assert serialization.dumps({"big": 2 ** 70, "nan": float("nan")}) == '{"big":%d,"nan":null}' % 2 ** 70
+
+
+def test_backends_read_the_same_json(backend):
+    text = '{"a":[1,2.5,"ü",null,true],"b":{"c":-1e3}}'
+    assert serialization.loads(text) == serialization.loads(text.encode()) == \
+        {"a": [1, 2.5, "ü", None, True], "b": {"c": -1000.0}}
+
+
+@pytest.mark.parametrize("text", ["", "{", "{'a': 1}", "[1,]", "NaN x"])
+def test_invalid_json_raises_value_error(backend, text):
+    with pytest.raises(ValueError):
+        serialization.loads(text)
+
+
+def test_unencodable_values_raise_type_error(backend):
+    with pytest.raises(TypeError):
+        serialization.dumps({"value": object()})
+
+
+def test_selecting_backends(monkeypatch, capsys):
+    configured = serialization.JSON_BACKEND
+    try:
+        with pytest.raises(ValueError, match="Unknown JSON backend: yaml"):
+            serialization.use_backend("yaml")
+        assert serialization.use_backend("auto") == BACKENDS[0]
+        assert serialization.use_backend("") == BACKENDS[0]
+
+        monkeypatch.setattr(serialization, "_CODECS", {"json": serialization._json_codec})
+        assert serialization.use_backend("orJSON") == "json"
+        assert "JSON backend orjson is not installed" in capsys.readouterr().out
+        assert serialization.dumps(VALUE) == EXPECTED
+    finally:
+        monkeypatch.undo()
+        serialization.use_backend(configured)
+
+
+def test_api_responses_use_the_backend(client, backend):
+    response = client.post("/api/risk-check", json={
+        "amount": 2000, "currency": "EUR", "source_country": "Côte d'Ivoire", "destination_country": "Singapore",
+        "purpose": "payroll", "counterparty_type": "smb",
+    })
+    assert response.status_code == 200
+    body = response.get_data()
+    assert body == serialization.dumpb(serialization.loads(body)) + b"\n"
+    # Compact and unescaped: one newline, at the end
+    assert b"\\u" not in body and body.count(b"\n") == 1
+
+
+def test_stored_rows_read_back_under_any_backend(backend, tmp_path, pairs):
+    db = AssessmentDB(str(tmp_path / "serialization.db"))
+    ids = db.save_assessments(pairs)
+    stored = [db.get_assessment_by_id(assessment_id) for assessment_id in ids]
+
+    for other in BACKENDS:
+        serialization.use_backend(other)
+        assert [db.get_assessment_by_id(assessment_id) for assessment_id in ids] == stored
+    assert [item['full_response']['risk_score'] for item in stored] == [result['risk_score'] for _, result in pairs]
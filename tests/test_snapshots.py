@@ -0,0 +1,92 @@
+"""
+Online snapshots (AssessmentDB.snapshot, cli.py snapshot) and snapshot pruning
+"""
+
+import os
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+import cli
+from benchmark import populate
+from database import AssessmentDB
+
+
+def count_rows(path):
+    conn = sqlite3.connect(str(path))
+    try:
+        assert conn.execute("PRAGMA integrity_check").fetchone() == ("ok",)
+        return conn.execute("SELECT COUNT(*) FROM assessments").fetchone()[0]
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def db(tmp_path):
+    """A database with 200 assessments"""
+    db = AssessmentDB(str(tmp_path / "live.db"))
+    populate(db, 200, seed=41)
+    return db
+
+
+def test_snapshot_copies_every_row(db, tmp_path, pairs):
+    # Rows still in the WAL are part of the snapshot
+    db.save_assessments(pairs)
+    progress = []
+    report = db.snapshot(str(tmp_path / "snapshots"), pages_per_step=4, step_sleep_ms=0, on_progress=progress.append)
+
+    copy = Path(report['path']) / "live.db"
+    assert count_rows(copy) == 205
+    assert AssessmentDB(str(copy)).get_statistics() == db.get_statistics()
+    assert [result['file'] for result in report['files']] == ["live.db"]
+    assert report['files'][0]['steps'] > 1 and progress[-1]['percent'] == 100.0
+    assert report['bytes'] == os.path.getsize(copy)
+    assert not list(Path(report['path']).glob("*.partial"))
+
+
+def test_snapshot_of_a_partitioned_database(tmp_path):
+    db = AssessmentDB(str(tmp_path / "main.db"), partition_dir=str(tmp_path / "partitions"))
+    populate(db, 120, seed=42)
+
+    report = db.snapshot(str(tmp_path / "snapshots"), step_sleep_ms=0)
+    snapshot = Path(report['path'])
+    partitions = db.list_partitions()
+    assert sorted(result['file'] for result in report['files']) == sorted(Path(p['path']).name for p in partitions)
+    for partition in partitions:
+        assert count_rows(snapshot / Path(partition['path']).name) == count_rows(partition['path'])
+    assert sum(count_rows(snapshot / result['file']) for result in report['files']) == 120
+
+
+def test_keep_prunes_only_the_oldest_snapshots(db, tmp_path):
+    target = tmp_path / "snapshots"
+    for name in ("20240101T000000Z", "20240201T000000Z", "20240301T000000Z"):
+        (target / name).mkdir(parents=True)
+    # Not snapshots: never pruned
+    (target / "notes").mkdir()
+    (target / "20230101T000000Z.txt").write_text("not a snapshot directory")
+
+    report = db.snapshot(str(target), step_sleep_ms=0, keep=2)
+    assert report['pruned'] == ["20240101T000000Z", "20240201T000000Z"]
+    assert sorted(os.listdir(target)) == sorted([
+        "20230101T000000Z.txt", "20240301T000000Z", "notes", Path(report['path']).name,
+    ])
+
+
+def test_keep_zero_keeps_everything(db, tmp_path):
+    target = tmp_path / "snapshots"
+    (target / "20240101T000000Z").mkdir(parents=True)
+    assert db.snapshot(str(target), step_sleep_ms=0)['pruned'] == []
+    assert len(os.listdir(target)) == 2
+
+
+def test_snapshot_command(db, tmp_path, capsys):
+    target = tmp_path / "snapshots"
+    (target / "20240101T000000Z").mkdir(parents=True)
+    assert cli.main([
+        "--db", db.db_path, "--partition-dir", "",
+        "snapshot", "--output-dir", str(target), "--keep", "1", "--sleep-ms", "0",
+    ]) == 0
+    (snapshot,) = os.listdir(target)
+    assert count_rows(target / snapshot / "live.db") == 200
+    assert "Pruned old snapshots: 20240101T000000Z" in capsys.readouterr().out
@@ -0,0 +1,23 @@
+"""
+Import-time budgets (see IMPORT_BUDGETS in benchmark.py)
+"""
+
+import pytest
+
+from benchmark import IMPORT_BUDGETS, import_profile
+
+# Fresh-interpreter imports per module; the fastest is compared to the budget
+RUNS = 3
+
+
+@pytest.mark.parametrize("module", sorted(IMPORT_BUDGETS))
+def test_import_within_budget(module):
+    budget_ms, forbidden = IMPORT_BUDGETS[module]
+    timings = []
+    for _ in range(RUNS):
+        cumulative_ms, loaded = import_profile(module)
+        timings.append(cumulative_ms)
+
+    eager = sorted({name.split(".")[0] for name in loaded} & set(forbidden))
+    assert not eager, f"import {module} loads {', '.join(eager)}"
+    assert min(timings) <= budget_ms, f"import {module} took {min(timings):.1f}ms (budget {budget_ms}ms)"
@@ -0,0 +1,95 @@
+"""
+Trigger-maintained statistics aggregates (assessment_summary) and verify-stats
+"""
+
+import sqlite3
+
+import pytest
+
+import cli
+from benchmark import generate_assessments
+from database import AssessmentDB
+
+
+@pytest.fixture
+def db(tmp_path):
+    """A database with 40 assessments"""
+    db = AssessmentDB(str(tmp_path / "stats.db"))
+    db.save_assessments(list(generate_assessments(40, seed=3)))
+    return db
+
+
+def recount(path):
+    """Statistics computed with a full scan of the assessments table"""
+    conn = sqlite3.connect(path)
+    try:
+        total, score_sum = conn.execute("SELECT COUNT(*), COALESCE(SUM(risk_score), 0) FROM assessments").fetchone()
+        breakdown = dict(conn.execute("SELECT risk_level, COUNT(*) FROM assessments GROUP BY risk_level").fetchall())
+    finally:
+        conn.close()
+    return {
+        'total_assessments': total,
+        'risk_breakdown': breakdown,
+        'average_risk_score': round(score_sum / total, 2) if total else 0,
+    }
+
+
+def execute(path, sql, params=()):
+    conn = sqlite3.connect(path)
+    try:
+        with conn:
+            conn.execute(sql, params)
+    finally:
+        conn.close()
+
+
+def test_statistics_match_recount_after_inserts(db):
+    assert db.get_statistics() == recount(db.db_path)
+    assert db.get_statistics()['total_assessments'] == 40
+    assert db.verify_statistics()['consistent']
+
+
+def test_statistics_match_recount_after_deletes(db):
+    execute(db.db_path, "DELETE FROM assessments WHERE id % 3 = 0")
+    execute(db.db_path, "DELETE FROM assessments WHERE risk_level = 'High'")
+    assert db.get_statistics() == recount(db.db_path)
+    assert db.verify_statistics()['consistent']
+
+    execute(db.db_path, "DELETE FROM assessments")
+    assert db.get_statistics() == {'total_assessments': 0, 'risk_breakdown': {}, 'average_risk_score': 0}
+
+
+def test_statistics_unchanged_by_rebuild_rule_hits(db):
+    before = db.get_statistics()
+    db.rebuild_rule_hits()
+    assert db.get_statistics() == before == recount(db.db_path)
+    assert db.verify_statistics()['consistent']
+
+
+def test_repair_fixes_corrupted_summary(db):
+    execute(db.db_path, "UPDATE assessment_summary SET total = total + 7, high_count = 0 WHERE id = 1")
+
+    report = db.verify_statistics()
+    assert not report['consistent'] and not report['repaired']
+    assert report['stored']['total'] == report['actual']['total'] + 7
+
+    report = db.verify_statistics(repair=True)
+    assert not report['consistent'] and report['repaired']
+    assert db.verify_statistics()['consistent']
+    assert db.get_statistics() == recount(db.db_path)
+
+
+def test_repair_recreates_missing_summary_row(db):
+    execute(db.db_path, "DELETE FROM assessment_summary")
+    assert db.verify_statistics(repair=True)['repaired']
+    assert db.get_statistics() == recount(db.db_path)
+
+
+def test_verify_stats_command(db, capsys):
+    assert cli.main(["--db", db.db_path, "--partition-dir", "", "verify-stats"]) == 0
+
+    execute(db.db_path, "UPDATE assessment_summary SET score_sum = 0 WHERE id = 1")
+    assert cli.main(["--db", db.db_path, "--partition-dir", "", "verify-stats"]) == 1
+    assert cli.main(["--db", db.db_path, "--partition-dir", "", "verify-stats", "--repair"]) == 0
+    assert cli.main(["--db", db.db_path, "--partition-dir", "", "verify-stats"]) == 0
+    assert "had drifted and were rebuilt" in capsys.readouterr().out
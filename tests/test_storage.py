@@ -0,0 +1,116 @@
+"""
+Storage backends (storage.py, AssessmentDB): every AssessmentStore
+implementation (SQLite, SQLite with write-behind, in-memory) passes the
+same conformance checks
+"""
+
+import json
+from datetime import datetime
+
+import pytest
+
+from database import AssessmentDB
+from storage import ASSESSMENT_COLUMNS, InMemoryAssessmentStore
+
+BACKENDS = ("sqlite", "sqlite-write-behind", "memory")
+
+
+@pytest.fixture(params=BACKENDS)
+def store(request, tmp_path):
+    """An empty store of each backend"""
+    if request.param == "sqlite":
+        store = AssessmentDB(str(tmp_path / "sqlite.db"))
+    elif request.param == "sqlite-write-behind":
+        store = AssessmentDB(str(tmp_path / "write_behind.db"), write_behind=True)
+    else:
+        store = InMemoryAssessmentStore()
+    yield store
+    store.close()
+
+
+def save_all(store, pairs):
+    """Save pairs one at a time and wait until they are stored"""
+    ids = [store.save_assessment(transaction_data, result) for transaction_data, result in pairs]
+    store.flush()
+    return ids
+
+
+def test_new_store_is_empty(store):
+    assert store.get_statistics() == {'total_assessments': 0, 'risk_breakdown': {}, 'average_risk_score': 0}
+    assert store.get_all_assessments() == []
+
+
+def test_ids_are_unique_and_increasing(store, pairs):
+    ids = save_all(store, pairs)
+    assert len(set(ids)) == len(ids) and ids == sorted(ids)
+
+
+def test_saved_assessment_round_trips(store, pairs):
+    ids = save_all(store, pairs)
+    transaction_data, result = pairs[0]
+
+    saved = store.get_assessment_by_id(ids[0])
+    assert saved is not None and saved['id'] == ids[0]
+    for field in ("amount", "source_country", "destination_country", "purpose", "counterparty_type"):
+        assert saved[field] == transaction_data[field], f"{field} not stored"
+    assert saved['risk_score'] == result['risk_score'] and saved['risk_level'] == result['risk_level']
+    assert saved['triggered_rules'] == result['triggered_rules']
+    assert saved['full_response'] == json.loads(json.dumps(result))
+    assert store.get_assessment_by_id(max(ids) + 1000) is None
+
+
+def test_listing_is_newest_first(store, pairs):
+    ids = save_all(store, pairs)
+    assert [item['id'] for item in store.get_all_assessments(limit=3)] == ids[::-1][:3]
+    assert [item['id'] for item in store.get_all_assessments(limit=2, offset=3)] == ids[::-1][3:5]
+    assert store.get_all_assessments(limit=10, offset=10) == []
+
+
+def test_statistics(store, pairs):
+    save_all(store, pairs)
+    scores = [result['risk_score'] for _, result in pairs]
+    levels = {}
+    for _, result in pairs:
+        levels[result['risk_level']] = levels.get(result['risk_level'], 0) + 1
+
+    stats = store.get_statistics()
+    assert stats['total_assessments'] == len(pairs)
+    assert stats['risk_breakdown'] == levels
+    assert stats['average_risk_score'] == round(sum(scores) / len(scores), 2)
+
+
+def test_iter_assessment_rows(store, pairs):
+    ids = save_all(store, pairs)
+    rows = list(store.iter_assessment_rows())
+    assert [row[0] for row in rows] == ids and all(len(row) == len(ASSESSMENT_COLUMNS) for row in rows)
+    assert [row[0] for row in store.iter_assessment_rows(since_id=ids[1])] == ids[2:]
+    today = datetime.utcnow().date().isoformat()
+    assert len(list(store.iter_assessment_rows(start=today, end=today))) == len(ids)
+    assert list(store.iter_assessment_rows(end="2000-01-01")) == []
+
+
+def test_save_assessments_keeps_order(store, pairs):
+    ids = save_all(store, pairs)
+    batch_ids = store.save_assessments(pairs[:3])
+    store.flush()
+    assert len(batch_ids) == 3 and batch_ids == sorted(batch_ids) and batch_ids[0] > max(ids)
+    scores = [result['risk_score'] for _, result in pairs[:3]]
+    assert [store.get_assessment_by_id(assessment_id)['risk_score'] for assessment_id in batch_ids] == scores
+    assert store.save_assessments([]) == []
+
+
+def test_clear_all(store, pairs):
+    save_all(store, pairs)
+    store.clear_all()
+    assert store.get_statistics()['total_assessments'] == 0 and store.get_all_assessments() == []
+
+
+def test_data_version_changes_with_saves(store, pairs):
+    ids = save_all(store, pairs[:1])
+    version = store.get_data_version()
+    row_version = store.get_data_version(ids[0])
+    save_all(store, pairs[1:2])
+    assert store.get_data_version() != version
+    store.clear_all()
+    assert store.get_data_version(ids[0]) != row_version
+
@@ -0,0 +1,229 @@
+"""
+Per-tenant rulesets (tenants.py): override merging, the LRU cache, rejected
+edits, and how requests select a tenant
+"""
+
+import json
+
+import pytest
+
+from conftest import ADMIN_TOKEN
+from rules_manager import RULES_FILE, RulesManager, write_atomic
+from tenants import TenantRulesets, merge_rules
+
+API_KEYS = {"key-acme": "acme", "key-globex": "globex", "key-bad": "../etc"}
+
+
+@pytest.fixture
+def rules_manager(tmp_path):
+    rules_file = tmp_path / "rules_config.json"
+    rules_file.write_text(RULES_FILE.read_text())
+    return RulesManager(rules_file=str(rules_file), data_dir=str(tmp_path / "data"))
+
+
+def make_tenants(rules_manager, tmp_path, **options):
+    return TenantRulesets(rules_manager, str(tmp_path / "tenants"), **options)
+
+
+def write_tenant(tenants, tenant_id, overrides):
+    path = tenants.tenant_path(tenant_id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_atomic(path, json.dumps(overrides))
+
+
+def test_merge_rules():
+    base = {
+        "amount_thresholds": {"moderate_threshold": 15000, "general_high_threshold": 25000},
+        "high_risk_countries": ["Iran", "Syria"],
+        "low_risk_purposes": ["payroll"],
+    }
+    merged = merge_rules(base, {
+        "amount_thresholds": {"moderate_threshold": 5000},
+        "high_risk_countries": ["Nigeria"],
+        "custom_rules": [],
+    })
+    assert merged == {
+        "amount_thresholds": {"moderate_threshold": 5000, "general_high_threshold": 25000},
+        "high_risk_countries": ["Nigeria"],
+        "low_risk_purposes": ["payroll"],
+        "custom_rules": [],
+    }
+    assert base["amount_thresholds"]["moderate_threshold"] == 15000
+
+
+def test_tenant_follows_global_rules_it_does_not_override(rules_manager, tmp_path):
+    tenants = make_tenants(rules_manager, tmp_path)
+    tenants.save_overrides("acme", {"amount_thresholds": {"moderate_threshold": 5000}}, create=True)
+    snapshot = tenants.snapshot_for("acme")
+    assert snapshot.moderate_threshold == 5000 and snapshot.general_high_threshold == 25000
+    assert snapshot.content_hash != rules_manager.snapshot.content_hash
+    # Kept in the rules history for re-evaluation
+    assert rules_manager.get_ruleset(snapshot.content_hash) == snapshot.rules
+
+    assert rules_manager.save_rules({**rules_manager.get_rules(), "high_risk_countries": ["Atlantis"],
+                                     "amount_thresholds": {"moderate_threshold": 9000}})
+    snapshot = tenants.snapshot_for("acme")
+    assert snapshot.high_risk_countries == frozenset({"Atlantis"})
+    assert snapshot.moderate_threshold == 5000
+    assert snapshot.version == rules_manager.snapshot.version
+
+
+def test_unknown_and_malformed_tenants(rules_manager, tmp_path):
+    tenants = make_tenants(rules_manager, tmp_path)
+    with pytest.raises(KeyError):
+        tenants.snapshot_for("nobody")
+    with pytest.raises(KeyError):
+        tenants.save_overrides("nobody", {})
+    for tenant_id in ("../rules_config", "", "a" * 65, "with space"):
+        with pytest.raises(ValueError):
+            tenants.snapshot_for(tenant_id)
+    with pytest.raises(ValueError):
+        tenants.save_overrides("acme", ["not", "an", "object"], create=True)
+    with pytest.raises(ValueError):
+        tenants.save_overrides("acme", {"risk_score_thresholds": {"low_max": 90}}, create=True)
+    assert tenants.list_tenants() == []
+
+
+def test_lru_eviction(rules_manager, tmp_path):
+    tenants = make_tenants(rules_manager, tmp_path, cache_size=2)
+    for index, tenant_id in enumerate(("a", "b", "c")):
+        write_tenant(tenants, tenant_id, {"risk_score_thresholds": {"low_max": 10 + index}})
+
+    tenants.snapshot_for("a")
+    tenants.snapshot_for("b")
+    tenants.snapshot_for("a")          # a is now the most recently used
+    tenants.snapshot_for("c")          # evicts b
+    assert tenants.get_cache_info() == {"size": 2, "max_size": 2, "hits": 1, "loads": 3, "evictions": 1}
+
+    tenants.snapshot_for("a")
+    assert tenants.get_cache_info()["loads"] == 3
+    assert tenants.snapshot_for("b").low_max_score == 11
+    assert tenants.get_cache_info() == {"size": 2, "max_size": 2, "hits": 2, "loads": 4, "evictions": 2}
+
+
+def test_invalid_edit_keeps_the_cached_ruleset(rules_manager, tmp_path, capsys):
+    tenants = make_tenants(rules_manager, tmp_path)
+    write_tenant(tenants, "acme", {"risk_score_thresholds": {"low_max": 20}})
+    valid = tenants.snapshot_for("acme")
+
+    write_tenant(tenants, "acme", {"risk_score_thresholds": {"low_max": 90}})
+    assert tenants.snapshot_for("acme") is valid
+    assert "Ignoring invalid rules for tenant acme" in capsys.readouterr().out
+
+    # The rejected edit is remembered: not reloaded (or reported) again until it changes
+    loads = tenants.get_cache_info()["loads"]
+    assert tenants.snapshot_for("acme") is valid
+    assert capsys.readouterr().out == ""
+    assert tenants.get_cache_info()["loads"] == loads
+
+    write_tenant(tenants, "acme", {"risk_score_thresholds": {"low_max": 25}})
+    assert tenants.snapshot_for("acme").low_max_score == 25
+
+
+def test_global_change_that_breaks_a_tenant(rules_manager, tmp_path, capsys):
+    tenants = make_tenants(rules_manager, tmp_path)
+    write_tenant(tenants, "acme", {"risk_score_thresholds": {"low_max": 60}})
+    valid = tenants.snapshot_for("acme")
+
+    # Merged with the new global medium_max, the tenant's low_max is too high
+    assert rules_manager.save_rules({**rules_manager.get_rules(), "risk_score_thresholds": {"low_max": 30, "medium_max": 50}})
+    assert tenants.snapshot_for("acme") is valid
+    assert "Ignoring invalid rules for tenant acme" in capsys.readouterr().out
+    assert tenants.snapshot_for("acme") is valid
+    assert capsys.readouterr().out == ""
+
+
+def test_invalid_tenant_without_cached_ruleset(rules_manager, tmp_path):
+    tenants = make_tenants(rules_manager, tmp_path)
+    write_tenant(tenants, "acme", {"risk_score_thresholds": {"low_max": 90}})
+    with pytest.raises(ValueError, match="Invalid rules for tenant acme"):
+        tenants.snapshot_for("acme")
+
+
+@pytest.fixture
+def tenant_client(app_module, client, rules_manager, tmp_path, monkeypatch):
+    """The test client with tenants acme and globex, selected by API key (API_KEYS)"""
+    api_keys_file = tmp_path / "api_keys.json"
+    api_keys_file.write_text(json.dumps(API_KEYS))
+    tenants = make_tenants(rules_manager, tmp_path, api_keys_file=str(api_keys_file))
+    write_tenant(tenants, "acme", {"risk_score_thresholds": {"low_max": 11}})
+    write_tenant(tenants, "globex", {"risk_score_thresholds": {"low_max": 22}})
+    monkeypatch.setattr(app_module, "rules_manager", rules_manager)
+    monkeypatch.setattr(app_module, "tenants", tenants)
+    return client
+
+
+def low_max(response):
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()["risk_score_thresholds"]["low_max"]
+
+
+@pytest.mark.parametrize("headers, expected", [
+    ({}, 30),
+    ({"X-API-Key": "key-acme"}, 11),
+    ({"X-API-Key": "key-globex"}, 22),
+    # The key decides the tenant; X-Tenant-ID cannot switch to another
+    ({"X-API-Key": "key-acme", "X-Tenant-ID": "globex"}, 11),
+    ({"X-Tenant-ID": "globex", "X-Admin-Token": ADMIN_TOKEN}, 22),
+])
+def test_tenant_selection_with_api_keys(tenant_client, headers, expected):
+    assert low_max(tenant_client.get("/api/rules", headers=headers)) == expected
+
+
+@pytest.mark.parametrize("headers, status", [
+    ({"X-API-Key": "unknown"}, 401),
+    ({"X-API-Key": "key-bad"}, 401),             # maps to a malformed tenant ID, so it was never loaded
+    ({"X-Tenant-ID": "acme"}, 401),
+    ({"X-Tenant-ID": "acme", "X-Admin-Token": "wrong"}, 401),
+    ({"X-Tenant-ID": "nobody", "X-Admin-Token": ADMIN_TOKEN}, 404),
+])
+def test_tenant_selection_errors_with_api_keys(tenant_client, headers, status):
+    response = tenant_client.get("/api/rules", headers=headers)
+    assert response.status_code == status
+    assert "error" in response.get_json()
+
+
+def test_tenant_selection_without_api_keys(app_module, client, rules_manager, tmp_path, monkeypatch):
+    tenants = make_tenants(rules_manager, tmp_path)
+    write_tenant(tenants, "acme", {"risk_score_thresholds": {"low_max": 11}})
+    monkeypatch.setattr(app_module, "rules_manager", rules_manager)
+    monkeypatch.setattr(app_module, "tenants", tenants)
+
+    assert low_max(client.get("/api/rules")) == 30
+    assert low_max(client.get("/api/rules", headers={"X-Tenant-ID": "acme"})) == 11
+    assert client.get("/api/rules", headers={"X-Tenant-ID": "nobody"}).status_code == 404
+    assert client.get("/api/rules", headers={"X-Tenant-ID": "../x"}).status_code == 400
+    assert client.get("/api/rules", headers={"X-API-Key": "key-acme"}).status_code == 401
+
+
+def test_assessments_use_the_tenants_rules(tenant_client, app_module):
+    payload = {
+        "amount": 500, "currency": "USD", "source_country": "Singapore", "destination_country": "Vietnam",
+        "purpose": "payroll", "counterparty_type": "smb",
+    }
+    results = {}
+    for key in ("key-acme", "key-globex"):
+        response = tenant_client.post("/api/risk-check", json=payload, headers={"X-API-Key": key})
+        assert response.status_code == 200
+        results[key] = response.get_json()
+    assert results["key-acme"]["rules_version"] == app_module.tenants.snapshot_for("acme").content_hash
+    assert results["key-globex"]["rules_version"] == app_module.tenants.snapshot_for("globex").content_hash
+    assert tenant_client.post("/api/risk-check", json=payload, headers={"X-Tenant-ID": "acme"}).status_code == 401
+
+
+def test_creating_a_tenant_requires_the_admin_token(tenant_client, app_module):
+    overrides = {"risk_score_thresholds": {"low_max": 33}}
+    headers = {"X-Tenant-ID": "initech"}
+    assert tenant_client.post("/api/rules", json=overrides, headers=headers).status_code == 401
+
+    response = tenant_client.post("/api/rules", json=overrides, headers={**headers, "X-Admin-Token": ADMIN_TOKEN})
+    assert response.status_code == 200
+    assert response.get_json()["rules"]["risk_score_thresholds"] == {"low_max": 33, "medium_max": 70}
+    assert app_module.tenants.list_tenants() == ["acme", "globex", "initech"]
+
+    # A tenant's key edits its own overrides only
+    response = tenant_client.post("/api/rules", json={"risk_score_thresholds": {"low_max": 12}},
+                                  headers={"X-API-Key": "key-acme"})
+    assert response.status_code == 200
+    assert app_module.tenants.get_overrides("acme") == {"risk_score_thresholds": {"low_max": 12}}
+    assert app_module.rules_manager.snapshot.low_max_score == 30
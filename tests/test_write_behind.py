@@ -0,0 +1,119 @@
+"""
+Write-behind queue: cross-process ID reservation, failure handling and metrics
+"""
+
+import sqlite3
+import threading
+
+import serialization
+from conftest import ADMIN_TOKEN
+from database import AssessmentDB
+
+
+def close_within(db, timeout=5):
+    """Close a store on another thread; True if close() returned in time"""
+    closer = threading.Thread(target=db.close, daemon=True)
+    closer.start()
+    closer.join(timeout)
+    return not closer.is_alive()
+
+
+def test_two_queues_on_one_file_never_share_an_id(tmp_path, pairs):
+    """Two write-behind processes (and a plain one) sharing a file never reuse an ID"""
+    path = str(tmp_path / "shared.db")
+    # Small batches make each queue reserve several blocks
+    first = AssessmentDB(path, write_behind=True, batch_size=2)
+    second = AssessmentDB(path, write_behind=True, batch_size=2)
+    plain = AssessmentDB(path)
+    try:
+        ids = []
+        for _ in range(3):
+            ids.append(first.save_assessment(*pairs[0]))
+            ids.append(second.save_assessment(*pairs[1]))
+            ids.append(plain.save_assessment(*pairs[2]))
+        first.flush()
+        second.flush()
+
+        assert len(set(ids)) == len(ids)
+        assert plain.get_statistics()['total_assessments'] == len(ids)
+        assert all(plain.get_assessment_by_id(assessment_id) for assessment_id in ids)
+        assert first.get_write_metrics()['rows_failed'] == second.get_write_metrics()['rows_failed'] == 0
+    finally:
+        first.close()
+        second.close()
+
+
+def test_reopened_queue_allocates_above_existing_rows(tmp_path, pairs):
+    path = str(tmp_path / "reopened.db")
+    db = AssessmentDB(path, write_behind=True)
+    first_ids = [db.save_assessment(*pair) for pair in pairs[:2]]
+    db.close()
+
+    db = AssessmentDB(path, write_behind=True)
+    try:
+        new_id = db.save_assessment(*pairs[2])
+        db.flush()
+        assert new_id > max(first_ids)
+        assert db.get_statistics()['total_assessments'] == 3
+    finally:
+        db.close()
+
+
+def test_failed_commit_is_dead_lettered(tmp_path, pairs, monkeypatch):
+    """Rows that fail the per-row retry land in <database>.failed.jsonl and the writer keeps running"""
+    path = str(tmp_path / "failing.db")
+    db = AssessmentDB(path, write_behind=True)
+    try:
+        def fail(conn, rows):
+            raise sqlite3.OperationalError("disk I/O error")
+
+        with monkeypatch.context() as patch:
+            patch.setattr(db, "_write_rows", fail)
+            failed_id = db.save_assessment(*pairs[0])
+            assert db.flush(timeout=5)
+
+        metrics = db.get_write_metrics()
+        assert metrics['dead_letter_path'] == f"{path}.failed.jsonl"
+        assert metrics['rows_failed'] == 1
+        assert metrics['recent_failures'][0]['id'] == failed_id
+        with open(f"{path}.failed.jsonl", encoding='utf-8') as dead_letter:
+            records = [serialization.loads(line) for line in dead_letter]
+        assert [record['id'] for record in records] == [failed_id]
+        assert records[0]['row']['risk_score'] == pairs[0][1]['risk_score']
+        assert "disk I/O error" in records[0]['error']
+        assert not db.is_pending(failed_id) and db.get_assessment_by_id(failed_id) is None
+
+        saved_id = db.save_assessment(*pairs[1])
+        assert db.flush(timeout=5)
+        assert db.get_assessment_by_id(saved_id) is not None
+    finally:
+        db.close()
+
+
+def test_flush_and_close_return_after_writer_error(tmp_path, pairs, monkeypatch):
+    """An error outside the per-row retry dead-letters the batch instead of killing the writer"""
+    db = AssessmentDB(str(tmp_path / "broken.db"), write_behind=True)
+
+    def broken(rows):
+        raise ZeroDivisionError("writer bug")
+
+    monkeypatch.setattr(db, "_group_by_shard", broken)
+    ids = [db.save_assessment(*pair) for pair in pairs[:3]]
+    assert db.flush(timeout=5)
+    assert db.get_write_metrics()['rows_failed'] == len(ids)
+
+    assert close_within(db)
+    with open(db.get_write_metrics()['dead_letter_path'], encoding='utf-8') as dead_letter:
+        assert sorted(serialization.loads(line)['id'] for line in dead_letter) == ids
+
+
+def test_db_metrics_requires_admin(client, monkeypatch):
+    from config import Config
+
+    assert client.get("/api/db/metrics").status_code == 401
+    assert client.get("/api/db/metrics", headers={"X-Admin-Token": "wrong"}).status_code == 401
+    response = client.get("/api/db/metrics", headers={"X-Admin-Token": ADMIN_TOKEN})
+    assert response.status_code == 200 and "response_cache" in response.get_json()
+
+    monkeypatch.setattr(Config, "ADMIN_TOKEN", None)
+    assert client.get("/api/db/metrics").status_code == 403